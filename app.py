@@ -11,7 +11,18 @@ import autenticacao
 from utils_ui import load_custom_css
 from utils_icons import get_icon
 
-# from database_schema import inicializar_banco
+from database_schema import inicializar_banco
+
+# Aplica as migrações pendentes (executa uma única vez por processo)
+inicializar_banco()
+
+# Backups automáticos em segundo plano (uma thread por processo; ver backup_daemon.py)
+from backup_daemon import iniciar_agendador
+iniciar_agendador()
+
+# Servidor dos relatórios pesados (processo próprio, com o pool; ver jobs_relatorios.py)
+from jobs_relatorios import iniciar_servidor
+iniciar_servidor()
 
 # --- 3. CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(
@@ -212,9 +223,10 @@ paginas_config = [
     ("pages/4_Cadastro_Operacoes.py", "Tipos de Operação", "⚙️", False),
     ("pages/14_Cadastro_Areas.py", "Áreas / Talhões", "📍", False),
 
-    # Admin (3 PÁGINAS)
+    # Admin (4 PÁGINAS)
     ("pages/9_Gestao_Usuarios.py", "Usuários", "🔐", False),
     ("pages/12_Auditoria.py", "Auditoria", "🕵️", False),
+    ("pages/21_Desempenho_Consultas.py", "Desempenho", "⏱️", False),
     ("pages/8_Backup_Seguranca.py", "Backup", "💾", False),
 ]
 
@@ -0,0 +1,217 @@
+"""
+Arquivo morto: ordens concluídas antigas e logs de auditoria antigos saem do banco
+principal e vão para `manutencao_archive.db`.
+
+O banco principal fica pequeno (painéis e contadores só enxergam o que está ativo).
+As telas históricas (Prontuário, Indicadores, Auditoria) consultam a união
+principal + arquivo, via ATTACH, apenas quando o período pedido alcança o arquivo:
+
+    conn = get_db_connection()
+    origem = fonte(conn, "ordens_servico", data_inicio)   # 'ordens_servico' ou a view da união
+    pd.read_sql_query(f"SELECT ... FROM {origem} os WHERE ...", conn, ...)
+
+Uso pela linha de comando:
+    python arquivo_morto.py                 # horizontes padrão (ver abaixo)
+    python arquivo_morto.py --dias-os 365 --dias-audit 180 --vacuum
+"""
+import argparse
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+from database import DB_NAME, BUSY_TIMEOUT_MS, FORMATO_DATA_HORA, normalizar_data_hora
+from database_schema import somar_kpi_diario
+
+ARQUIVO_DB = os.environ.get(
+    "MANUTENCAO_ARCHIVE_DB", os.path.join(os.path.dirname(os.path.abspath(DB_NAME)), "manutencao_archive.db"))
+# Idade mínima (dias, pela data de abertura/registro) para ir ao arquivo
+HORIZONTE_OS_DIAS = int(os.environ.get("MANUTENCAO_ARQUIVO_OS_DIAS", "730"))
+HORIZONTE_AUDIT_DIAS = int(os.environ.get("MANUTENCAO_ARQUIVO_AUDIT_DIAS", "365"))
+# Linhas movidas por transação (cada lote trava o banco só por um instante)
+LOTE = 2000
+
+ALIAS = "arquivo"
+# Tabela -> (view temporária da união, condição extra para arquivar)
+TABELAS_ARQUIVADAS = {
+    "ordens_servico": ("ordens_servico_completa", "status = 'Concluído'"),
+    "audit_logs": ("audit_logs_completa", None),
+}
+# Índices do arquivo (os mesmos usados pelas consultas históricas no banco principal)
+INDICES_ARQUIVO = {
+    "idx_arq_os_equip_data": ("ordens_servico", "equipamento_id, data_hora"),
+    "idx_arq_os_data": ("ordens_servico", "data_hora"),
+    "idx_arq_audit_data": ("audit_logs", "data_hora"),
+}
+
+
+def _colunas(conn, banco, tabela):
+    return [linha[1] for linha in conn.execute(f"PRAGMA {banco}.table_info({tabela})").fetchall()]
+
+
+def _anexado(conn):
+    return any(linha[1] == ALIAS for linha in conn.execute("PRAGMA database_list").fetchall())
+
+
+# --- Leitura (telas históricas) ---
+def limite_arquivo(conn, tabela):
+    """Data até a qual `tabela` já foi arquivada (registros anteriores podem estar no arquivo) ou None."""
+    linha = conn.execute("SELECT ate FROM arquivo_limites WHERE tabela = ?", (tabela,)).fetchone()
+    return linha[0] if linha else None
+
+
+def anexar(conn):
+    """
+    Faz o ATTACH do arquivo morto em `conn` e cria as views temporárias da união
+    (uma vez por conexão do pool). Retorna False se ainda não existe arquivo.
+    """
+    if not _anexado(conn):
+        if not os.path.exists(ARQUIVO_DB):
+            return False
+        conn.execute(f"ATTACH DATABASE ? AS {ALIAS}", (ARQUIVO_DB,))
+
+    for tabela, (view, _) in TABELAS_ARQUIVADAS.items():
+        colunas_arquivo = set(_colunas(conn, ALIAS, tabela))
+        if not colunas_arquivo:
+            continue
+        colunas = _colunas(conn, "main", tabela)
+        lista = ", ".join(colunas)
+        # Colunas criadas depois do arquivamento não existem no arquivo: entram como NULL
+        lista_arquivo = ", ".join(c if c in colunas_arquivo else f"NULL AS {c}" for c in colunas)
+        # O NOT IN evita duplicidade se um arquivamento for interrompido entre os dois bancos
+        conn.execute(f"""
+            CREATE TEMP VIEW IF NOT EXISTS {view} AS
+            SELECT {lista} FROM main.{tabela}
+            UNION ALL
+            SELECT {lista_arquivo} FROM {ALIAS}.{tabela} WHERE id NOT IN (SELECT id FROM main.{tabela})
+        """)
+    return True
+
+
+def fonte(conn, tabela, data_inicio=None):
+    """
+    Nome para usar no FROM: a própria `tabela` quando o período começa depois do
+    que foi arquivado, ou a view da união (com ATTACH) quando alcança o arquivo.
+    `data_inicio=None` significa "desde o começo".
+    """
+    limite = limite_arquivo(conn, tabela)
+    if limite is None:
+        return tabela
+    if data_inicio is not None:
+        inicio = normalizar_data_hora(data_inicio)
+        if inicio is not None and inicio >= limite:
+            return tabela
+    if anexar(conn):
+        return TABELAS_ARQUIVADAS[tabela][0]
+    return tabela
+
+
+# --- Arquivamento ---
+def _sincronizar_estrutura(conn, tabela):
+    """Cria a tabela no arquivo com o mesmo CREATE do banco principal e acrescenta colunas novas."""
+    if not _colunas(conn, ALIAS, tabela):
+        ddl = conn.execute(
+            "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (tabela,)).fetchone()[0]
+        inicio_colunas = ddl.index("(")
+        conn.execute(f"CREATE TABLE {ALIAS}.{tabela} {ddl[inicio_colunas:]}")
+    existentes = set(_colunas(conn, ALIAS, tabela))
+    for linha in conn.execute(f"PRAGMA main.table_info({tabela})").fetchall():
+        coluna, tipo = linha[1], linha[2]
+        if coluna not in existentes:
+            conn.execute(f"ALTER TABLE {ALIAS}.{tabela} ADD COLUMN {coluna} {tipo}")
+    for indice, (tabela_indice, colunas) in INDICES_ARQUIVO.items():
+        if tabela_indice == tabela:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {ALIAS}.{indice} ON {tabela}({colunas})")
+
+
+def _mover(conn, tabela, condicao, params):
+    """Move, em lotes, as linhas de `tabela` que atendem à condição; retorna quantas."""
+    colunas = ", ".join(_colunas(conn, "main", tabela))
+    movidas = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ids = [linha[0] for linha in conn.execute(
+                f"SELECT id FROM main.{tabela} WHERE {condicao} LIMIT ?", params + (LOTE,)).fetchall()]
+            if ids:
+                marcadores = ", ".join("?" * len(ids))
+                conn.execute(f"""
+                    INSERT OR REPLACE INTO {ALIAS}.{tabela} ({colunas})
+                    SELECT {colunas} FROM main.{tabela} WHERE id IN ({marcadores})
+                """, ids)
+                conn.execute(f"DELETE FROM main.{tabela} WHERE id IN ({marcadores})", ids)
+                if tabela == "ordens_servico":
+                    # O DELETE tirou estas ordens do rollup dos indicadores: elas voltam, agora lidas do arquivo
+                    somar_kpi_diario(conn, f"{ALIAS}.{tabela}", f"r.id IN ({marcadores})", ids)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        movidas += len(ids)
+        if len(ids) < LOTE:
+            return movidas
+
+
+def arquivar(dias_os=None, dias_audit=None, vacuum=False):
+    """
+    Move para o arquivo morto as ordens concluídas abertas há mais de `dias_os` dias
+    e os logs de auditoria com mais de `dias_audit` dias. Retorna {tabela: linhas movidas}.
+
+    O limite de cada tabela é gravado antes de mover: durante o processo as telas
+    históricas já consultam a união, então nenhum registro "some".
+    """
+    horizontes = {
+        "ordens_servico": HORIZONTE_OS_DIAS if dias_os is None else dias_os,
+        "audit_logs": HORIZONTE_AUDIT_DIAS if dias_audit is None else dias_audit,
+    }
+    conn = sqlite3.connect(DB_NAME, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    try:
+        conn.execute(f"ATTACH DATABASE ? AS {ALIAS}", (ARQUIVO_DB,))
+        conn.execute(f"PRAGMA {ALIAS}.journal_mode = WAL")
+        resultado = {}
+        for tabela, (_, filtro) in TABELAS_ARQUIVADAS.items():
+            corte = (datetime.now() - timedelta(days=horizontes[tabela])).strftime(FORMATO_DATA_HORA)
+            _sincronizar_estrutura(conn, tabela)
+            conn.execute("""
+                INSERT INTO arquivo_limites (tabela, ate) VALUES (?, ?)
+                ON CONFLICT(tabela) DO UPDATE SET ate = MAX(ate, excluded.ate)
+            """, (tabela, corte))
+            condicao = "data_hora < ?" + (f" AND {filtro}" if filtro else "")
+            resultado[tabela] = _mover(conn, tabela, condicao, (corte,))
+        if vacuum and any(resultado.values()):
+            conn.execute("VACUUM main")
+    finally:
+        conn.close()
+    return resultado
+
+
+def resumo():
+    """Quantidade de registros e limite arquivado por tabela (para a tela de Backup)."""
+    conn = sqlite3.connect(DB_NAME, timeout=BUSY_TIMEOUT_MS / 1000)
+    try:
+        existe = os.path.exists(ARQUIVO_DB)
+        if existe:
+            conn.execute(f"ATTACH DATABASE ? AS {ALIAS}", (ARQUIVO_DB,))
+        linhas = []
+        for tabela in TABELAS_ARQUIVADAS:
+            no_arquivo = 0
+            if existe and _colunas(conn, ALIAS, tabela):
+                no_arquivo = conn.execute(f"SELECT COUNT(*) FROM {ALIAS}.{tabela}").fetchone()[0]
+            linhas.append({
+                "tabela": tabela,
+                "ativos": conn.execute(f"SELECT COUNT(*) FROM main.{tabela}").fetchone()[0],
+                "arquivados": no_arquivo,
+                "arquivado_ate": limite_arquivo(conn, tabela),
+            })
+        return linhas
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move ordens concluídas e logs antigos para o arquivo morto.")
+    parser.add_argument("--dias-os", type=int, default=HORIZONTE_OS_DIAS)
+    parser.add_argument("--dias-audit", type=int, default=HORIZONTE_AUDIT_DIAS)
+    parser.add_argument("--vacuum", action="store_true", help="Compacta o banco principal depois de mover")
+    args = parser.parse_args()
+    for tabela, qtd in arquivar(args.dias_os, args.dias_audit, args.vacuum).items():
+        print(f"{tabela}: {qtd} registro(s) movido(s) para {ARQUIVO_DB}")
@@ -1,11 +1,12 @@
 import streamlit as st
-import sqlite3
 import time
 import extra_streamlit_components as stx
 from datetime import datetime, timedelta
 import sys
 import os
 
+from database import get_db_connection
+
 # Tenta importar utils_senha
 try:
     from utils_senha import verificar_senha, hash_senha
@@ -19,27 +20,7 @@ except ImportError:
 
 
 # --- Banco de Dados ---
-def garantir_tabela_usuarios():
-    conn = sqlite3.connect("manutencao.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS usuarios (
-            username TEXT PRIMARY KEY,
-            password TEXT NOT NULL,
-            nome TEXT,
-            force_change_password INTEGER DEFAULT 0
-        )
-    """)
-    # Cria usuário admin padrão se não existir
-    cursor.execute("SELECT * FROM usuarios WHERE username = 'admin'")
-    if not cursor.fetchone():
-        try:
-            pass_hash = hash_senha('1234')
-        except:
-            pass_hash = '1234'
-        cursor.execute("INSERT INTO usuarios VALUES ('admin', ?, 'Administrador Geral', 0)", (pass_hash,))
-        conn.commit()
-    conn.close()
+# A tabela 'usuarios' e o admin padrão são criados pelas migrações (database_schema.py)
 
 
 # --- Gerenciador de Cookies ---
@@ -50,7 +31,6 @@ def get_manager():
 
 def check_password():
     """Retorna `True` se o usuário tiver uma senha correta / cookie válido."""
-    garantir_tabela_usuarios()
     cookie_manager = get_manager()
 
     # 1. Verifica se já está logado na sessão atual (RAM)
@@ -79,7 +59,7 @@ def check_password():
     if token:
         try:
             # O token salvo é o username direto
-            conn = sqlite3.connect("manutencao.db")
+            conn = get_db_connection()
             cursor = conn.cursor()
             cursor.execute("SELECT nome, force_change_password FROM usuarios WHERE username = ?", (token,))
             res = cursor.fetchone()
@@ -176,7 +156,7 @@ def check_password():
             submitted = st.form_submit_button("Entrar", type="primary", use_container_width=True)
 
             if submitted:
-                conn = sqlite3.connect("manutencao.db")
+                conn = get_db_connection()
                 cursor = conn.cursor()
                 cursor.execute("SELECT nome, password, force_change_password FROM usuarios WHERE username = ?", (user,))
                 res = cursor.fetchone()
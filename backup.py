@@ -0,0 +1,315 @@
+"""
+Backups do banco (snapshots) feitos com a API de backup do SQLite.
+
+A cópia é feita pela própria SQLite (`Connection.backup`), em passos de algumas
+páginas: o resultado é consistente mesmo com gravações acontecendo ao mesmo tempo
+e os usuários não ficam travados esperando. Cada snapshot é compactado em gzip
+e acompanhado de um arquivo .json com tamanhos e checksums (SHA-256).
+
+A restauração (`restaurar`) valida o arquivo numa cópia temporária, aplica as
+migrações pendentes nela e só então copia tudo para o banco em uso numa única
+transação da SQLite: quem está lendo vê o banco antigo ou o novo, nunca um meio-termo.
+
+Backups automáticos (periódicos, sem repetir conteúdo e com retenção) ficam
+em backup_daemon.py.
+
+Uso pela linha de comando:
+    python backup.py            # cria um snapshot em backups/
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime
+
+from database import DB_NAME, BUSY_TIMEOUT_MS, FORMATO_DATA_HORA, get_pool
+from database_schema import MARCADOR_RESTAURACAO, MIGRACOES, aplicar_migracoes, versao_atual
+
+# Pasta dos snapshots (ao lado do banco, salvo configuração)
+PASTA_BACKUPS = os.environ.get(
+    "MANUTENCAO_BACKUPS", os.path.join(os.path.dirname(os.path.abspath(DB_NAME)), "backups"))
+# Páginas copiadas por passo; entre passos a SQLite libera o banco para os outros
+PAGINAS_POR_PASSO = 256
+PAUSA_ENTRE_PASSOS_S = 0.005
+
+EXTENSAO = ".db.gz"
+_BLOCO = 1024 * 1024
+_ASSINATURA_GZIP = b"\x1f\x8b"
+
+# Tabelas que qualquer backup deste sistema precisa ter
+TABELAS_ESSENCIAIS = ("usuarios", "equipamentos", "funcionarios", "tipos_operacao", "ordens_servico")
+
+
+def _sha256_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(_BLOCO), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def copiar_banco(destino, origem=DB_NAME):
+    """Cópia online e consistente de `origem` para o arquivo `destino` (API de backup do SQLite)."""
+    fonte = sqlite3.connect(origem, timeout=BUSY_TIMEOUT_MS / 1000)
+    try:
+        alvo = sqlite3.connect(destino)
+        try:
+            fonte.backup(alvo, pages=PAGINAS_POR_PASSO, sleep=PAUSA_ENTRE_PASSOS_S)
+        finally:
+            alvo.close()
+    finally:
+        fonte.close()
+
+
+def criar_snapshot(origem_snapshot="manual", deduplicar=False):
+    """
+    Gera backups/manutencao_AAAA-MM-DD_HHhMMmSS.db.gz e retorna seus metadados.
+    `origem_snapshot` só identifica quem pediu (ex.: 'manual', 'agendado').
+    Com `deduplicar`, não guarda nada (retorna None) se já existir um snapshot
+    com exatamente o mesmo conteúdo de banco.
+    """
+    os.makedirs(PASTA_BACKUPS, exist_ok=True)
+    agora = datetime.now()
+    nome = f"manutencao_{agora.strftime('%Y-%m-%d_%Hh%Mm%S')}{EXTENSAO}"
+    caminho = os.path.join(PASTA_BACKUPS, nome)
+
+    # Copia para um arquivo temporário na mesma pasta e só então compacta
+    descritor, temporario = tempfile.mkstemp(suffix=".db", dir=PASTA_BACKUPS)
+    os.close(descritor)
+    try:
+        copiar_banco(temporario)
+        sha256_banco = _sha256_arquivo(temporario)
+        if deduplicar and any(s.get("sha256_banco") == sha256_banco for s in listar_snapshots()):
+            return None
+        tamanho_banco = os.path.getsize(temporario)
+        parcial = caminho + ".parcial"
+        with open(temporario, "rb") as f_in, open(parcial, "wb") as bruto:
+            # mtime=0: o mesmo banco gera sempre o mesmo .gz
+            with gzip.GzipFile(filename="manutencao.db", mode="wb", fileobj=bruto, mtime=0) as f_out:
+                shutil.copyfileobj(f_in, f_out, _BLOCO)
+        os.replace(parcial, caminho)
+    finally:
+        os.remove(temporario)
+
+    info = {
+        "arquivo": nome,
+        "criado_em": agora.strftime(FORMATO_DATA_HORA),
+        "origem": origem_snapshot,
+        "tamanho_banco": tamanho_banco,
+        "tamanho": os.path.getsize(caminho),
+        "sha256": _sha256_arquivo(caminho),
+        "sha256_banco": sha256_banco,
+    }
+    with open(caminho + ".json", "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+    return info
+
+
+def listar_snapshots():
+    """Metadados dos snapshots existentes, do mais novo para o mais antigo."""
+    if not os.path.isdir(PASTA_BACKUPS):
+        return []
+    snapshots = []
+    for nome in os.listdir(PASTA_BACKUPS):
+        if not nome.endswith(EXTENSAO):
+            continue
+        caminho = os.path.join(PASTA_BACKUPS, nome)
+        try:
+            with open(caminho + ".json", encoding="utf-8") as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            # Snapshot sem metadados (copiado à mão): calcula o básico
+            info = {
+                "arquivo": nome,
+                "criado_em": datetime.fromtimestamp(os.path.getmtime(caminho)).strftime(FORMATO_DATA_HORA),
+                "origem": "desconhecida",
+                "tamanho_banco": None,
+                "tamanho": os.path.getsize(caminho),
+                "sha256": _sha256_arquivo(caminho),
+                "sha256_banco": None,
+            }
+        snapshots.append(info)
+    return sorted(snapshots, key=lambda s: s["criado_em"], reverse=True)
+
+
+def caminho_snapshot(nome):
+    """Caminho completo de um snapshot da pasta de backups (recusa nomes com diretório)."""
+    if os.path.basename(nome) != nome or not nome.endswith(EXTENSAO):
+        raise ValueError(f"Nome de snapshot inválido: {nome}")
+    return os.path.join(PASTA_BACKUPS, nome)
+
+
+def excluir_snapshot(nome):
+    """Apaga o snapshot e seus metadados."""
+    caminho = caminho_snapshot(nome)
+    for arquivo in (caminho, caminho + ".json"):
+        if os.path.exists(arquivo):
+            os.remove(arquivo)
+
+
+# --- Retenção (avô/pai/filho) ---
+# Quantos snapshots manter: o mais recente de cada uma das últimas N horas, dias e semanas.
+# Vale só para os automáticos; os manuais e os de antes de uma restauração ficam até serem excluídos
+ORIGEM_AUTOMATICA = "agendado"
+RETER_HORARIOS = int(os.environ.get("MANUTENCAO_BACKUP_RETER_HORAS", "24"))
+RETER_DIARIOS = int(os.environ.get("MANUTENCAO_BACKUP_RETER_DIAS", "14"))
+RETER_SEMANAIS = int(os.environ.get("MANUTENCAO_BACKUP_RETER_SEMANAS", "8"))
+
+
+def snapshots_a_manter(snapshots):
+    """
+    Nomes mantidos pela política de retenção (recebe a lista de `listar_snapshots`).
+    Só os snapshots automáticos disputam as faixas; os demais são sempre mantidos.
+    """
+    automaticos = [s for s in snapshots if s.get("origem") == ORIGEM_AUTOMATICA]
+    manter = {s["arquivo"] for s in snapshots if s.get("origem") != ORIGEM_AUTOMATICA}
+    faixas = (
+        (lambda d: (d.date(), d.hour), RETER_HORARIOS),
+        (lambda d: d.date(), RETER_DIARIOS),
+        (lambda d: d.isocalendar()[:2], RETER_SEMANAIS),
+    )
+    for chave, limite in faixas:
+        periodos = set()
+        for snap in automaticos:  # do mais novo para o mais antigo
+            periodo = chave(datetime.strptime(snap["criado_em"], FORMATO_DATA_HORA))
+            if periodo in periodos:
+                continue
+            if len(periodos) >= limite:
+                break
+            periodos.add(periodo)
+            manter.add(snap["arquivo"])
+    return manter
+
+
+def aplicar_retencao():
+    """Apaga os snapshots automáticos fora da política de retenção; retorna os nomes apagados."""
+    snapshots = listar_snapshots()
+    manter = snapshots_a_manter(snapshots)
+    apagados = [s["arquivo"] for s in snapshots if s["arquivo"] not in manter]
+    for nome in apagados:
+        excluir_snapshot(nome)
+    return apagados
+
+
+# --- Restauração ---
+def _preparar_arquivo(arquivo, destino):
+    """Grava em `destino` o conteúdo de `arquivo` (caminho ou arquivo aberto; .db ou .db.gz)."""
+    entrada = open(arquivo, "rb") if isinstance(arquivo, (str, os.PathLike)) else arquivo
+    try:
+        if hasattr(entrada, "seek"):
+            entrada.seek(0)
+        inicio = entrada.read(2)
+        entrada.seek(0)
+        with open(destino, "wb") as f_out:
+            if inicio == _ASSINATURA_GZIP:
+                with gzip.GzipFile(fileobj=entrada, mode="rb") as f_in:
+                    shutil.copyfileobj(f_in, f_out, _BLOCO)
+            else:
+                shutil.copyfileobj(entrada, f_out, _BLOCO)
+    finally:
+        if entrada is not arquivo:
+            entrada.close()
+
+
+def validar_banco(conn):
+    """
+    Confere se o banco de `conn` pode substituir o atual: integridade, tabelas
+    essenciais e versão de schema não mais nova que a deste sistema.
+    Levanta ValueError com o motivo; retorna a versão de schema do backup.
+    """
+    try:
+        resultado = [linha[0] for linha in conn.execute("PRAGMA integrity_check").fetchall()]
+        tabelas = {linha[0] for linha in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    except sqlite3.DatabaseError as e:
+        raise ValueError(f"O arquivo não é um banco SQLite válido ({e}).")
+    if resultado != ["ok"]:
+        raise ValueError("Banco corrompido (integrity_check): " + "; ".join(resultado[:5]))
+
+    faltando = [t for t in TABELAS_ESSENCIAIS if t not in tabelas]
+    if faltando:
+        raise ValueError(f"O arquivo não é um backup deste sistema (faltam as tabelas: {', '.join(faltando)}).")
+
+    versao = versao_atual(conn) if "schema_version" in tabelas else 0
+    versao_sistema = max(m[0] for m in MIGRACOES)
+    if versao > versao_sistema:
+        raise ValueError(f"Backup de uma versão mais nova do sistema (schema {versao}, este sistema vai até {versao_sistema}).")
+    return versao
+
+
+def restaurar(arquivo, snapshot_antes=True):
+    """
+    Substitui o banco em uso pelo conteúdo de `arquivo` (caminho ou upload; .db ou .db.gz).
+
+    1. Copia para um arquivo temporário e valida (`validar_banco`);
+    2. Aplica nele as migrações pendentes e ajusta o tamanho de página ao do banco atual;
+    3. Opcionalmente guarda um snapshot do banco atual;
+    4. Copia o banco validado para o atual pela API de backup, numa única transação;
+    5. Descarta as conexões do pool e o cache de consultas deste processo.
+
+    As versões de `tabela_versoes` do banco restaurado ficam acima das do banco antigo,
+    então caches de outros processos também percebem a troca. Retorna um dict com o resumo.
+    """
+    os.makedirs(PASTA_BACKUPS, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(suffix=".db", prefix="restauracao_", dir=PASTA_BACKUPS)
+    os.close(descritor)
+    try:
+        _preparar_arquivo(arquivo, temporario)
+
+        novo = sqlite3.connect(temporario)
+        try:
+            versao_backup = validar_banco(novo)
+            try:
+                migracoes = aplicar_migracoes(novo)
+            except sqlite3.Error as e:
+                raise ValueError(f"Não foi possível atualizar o backup para a versão atual do sistema ({e}).")
+
+            atual = sqlite3.connect(DB_NAME, timeout=BUSY_TIMEOUT_MS / 1000)
+            try:
+                tamanho_pagina = atual.execute("PRAGMA page_size").fetchone()[0]
+                versoes_antigas = dict(atual.execute("SELECT tabela, versao FROM tabela_versoes").fetchall())
+            finally:
+                atual.close()
+
+            # Banco em WAL só aceita backup com o mesmo tamanho de página
+            if novo.execute("PRAGMA page_size").fetchone()[0] != tamanho_pagina:
+                novo.execute(f"PRAGMA page_size = {int(tamanho_pagina)}")
+                novo.execute("VACUUM")
+
+            versoes_novas = dict(novo.execute("SELECT tabela, versao FROM tabela_versoes").fetchall())
+            versoes_antigas.setdefault(MARCADOR_RESTAURACAO, 0)
+            with novo:
+                novo.executemany(
+                    "INSERT OR REPLACE INTO tabela_versoes (tabela, versao) VALUES (?, ?)",
+                    [(t, max(versoes_antigas.get(t, 0), versoes_novas.get(t, 0)) + 1)
+                     for t in set(versoes_antigas) | set(versoes_novas)])
+
+            info_snapshot = criar_snapshot("antes da restauração") if snapshot_antes else None
+
+            atual = sqlite3.connect(DB_NAME, timeout=BUSY_TIMEOUT_MS / 1000)
+            try:
+                novo.backup(atual)  # pages=-1: tudo em um passo, numa transação do banco atual
+            finally:
+                atual.close()
+        finally:
+            novo.close()
+    finally:
+        os.remove(temporario)
+
+    # Conexões abertas antes da troca são recriadas; resultados em memória são descartados
+    get_pool().fechar_todas()
+    from cache_consultas import limpar as limpar_cache_consultas
+    limpar_cache_consultas()
+
+    return {
+        "versao_backup": versao_backup,
+        "migracoes_aplicadas": migracoes,
+        "snapshot_anterior": info_snapshot["arquivo"] if info_snapshot else None,
+    }
+
+
+if __name__ == "__main__":
+    info = criar_snapshot()
+    print(f"Snapshot criado: {info['arquivo']} ({info['tamanho'] / 1024:.1f} KB, sha256 {info['sha256'][:16]}...)")
@@ -0,0 +1,85 @@
+"""
+Backups automáticos: um snapshot a cada INTERVALO_MIN minutos, sem guardar de novo
+um banco que não mudou, seguido da política de retenção (backup.aplicar_retencao).
+
+Roda de dois jeitos:
+  * dentro do app: `iniciar_agendador()` (chamado pelo app.py) sobe uma thread em
+    segundo plano, uma por processo — as telas nunca esperam pelo backup;
+  * separado:      `python backup_daemon.py` (ex.: serviço do Windows/systemd).
+    Nesse caso, inicie o app com MANUTENCAO_BACKUP_AUTOMATICO=0 para não rodar os dois.
+"""
+import logging
+import os
+import threading
+from datetime import datetime
+
+from backup import ORIGEM_AUTOMATICA, aplicar_retencao, criar_snapshot
+from database import FORMATO_DATA_HORA
+
+logger = logging.getLogger(__name__)
+
+# Minutos entre snapshots
+INTERVALO_MIN = float(os.environ.get("MANUTENCAO_BACKUP_INTERVALO_MIN", "60"))
+# Liga/desliga a thread dentro do app (o daemon separado ignora esta opção)
+AUTOMATICO = os.environ.get("MANUTENCAO_BACKUP_AUTOMATICO", "1") == "1"
+
+_lock = threading.Lock()
+_thread = None
+_parar = threading.Event()
+# Resultado da última rodada (mostrado na página de Backup)
+estado = {"ultima_execucao": None, "ultimo_snapshot": None, "ultimo_erro": None}
+
+
+def executar_ciclo():
+    """Um snapshot (deduplicado) + retenção. Retorna os metadados do snapshot ou None se nada mudou."""
+    try:
+        info = criar_snapshot(ORIGEM_AUTOMATICA, deduplicar=True)
+        apagados = aplicar_retencao()
+        estado.update(ultima_execucao=datetime.now().strftime(FORMATO_DATA_HORA), ultimo_erro=None)
+        if info:
+            estado["ultimo_snapshot"] = info["arquivo"]
+            logger.info(f"Backup automático criado: {info['arquivo']} ({info['tamanho'] / 1024:.1f} KB)")
+        if apagados:
+            logger.info(f"Retenção de backups: {len(apagados)} snapshot(s) antigo(s) apagado(s)")
+        return info
+    except Exception as e:
+        estado["ultimo_erro"] = str(e)
+        logger.error(f"Erro no backup automático: {e}")
+        return None
+
+
+def _loop():
+    while True:
+        executar_ciclo()
+        if _parar.wait(INTERVALO_MIN * 60):
+            break
+
+
+def iniciar_agendador():
+    """Sobe a thread de backups deste processo (só uma vez; respeita MANUTENCAO_BACKUP_AUTOMATICO)."""
+    global _thread
+    if not AUTOMATICO or INTERVALO_MIN <= 0:
+        return False
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _parar.clear()
+            _thread = threading.Thread(target=_loop, name="backup-automatico", daemon=True)
+            _thread.start()
+    return True
+
+
+def parar_agendador():
+    _parar.set()
+
+
+def agendador_ativo():
+    return _thread is not None and _thread.is_alive()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logger.info(f"Backups automáticos a cada {INTERVALO_MIN:g} min. Ctrl+C para sair.")
+    try:
+        _loop()
+    except KeyboardInterrupt:
+        pass
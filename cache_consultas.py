@@ -0,0 +1,88 @@
+"""
+Cache de consultas compartilhado por todas as sessões do processo.
+
+Cada resultado fica guardado junto com a versão das tabelas que a consulta lê
+(tabela `tabela_versoes`, incrementada por triggers a cada escrita). Antes de
+reaproveitar um resultado, o cache confere essas versões com uma leitura por
+chave primária: se alguma tabela mudou, a consulta roda de novo.
+
+Assim os dados ficam corretos logo após qualquer gravação (inclusive de outro
+processo) e não é mais preciso chamar `st.cache_data.clear()` depois de salvar,
+o que apagava também os caches de processamento de planilhas (PIMS/RH, SAP...).
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from database import get_db_connection
+from database_schema import TABELAS_VERSIONADAS
+
+# Quantidade máxima de resultados guardados (os menos usados saem primeiro)
+MAX_ENTRADAS = int(os.environ.get("MANUTENCAO_CACHE_CONSULTAS", "256"))
+
+_RE_TABELAS = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)", re.IGNORECASE)
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def tabelas_da_consulta(sql):
+    """Nomes das tabelas citadas em FROM/JOIN (subconsultas incluídas)."""
+    return tuple(sorted({nome.lower() for nome in _RE_TABELAS.findall(sql)}))
+
+
+def _versoes(conn, tabelas):
+    marcadores = ", ".join("?" * len(tabelas))
+    rows = conn.execute(
+        f"SELECT tabela, versao FROM tabela_versoes WHERE tabela IN ({marcadores})", tabelas).fetchall()
+    versoes = dict(rows)
+    return tuple(versoes.get(t, 0) for t in tabelas)
+
+
+def consultar(sql, params=None, tabelas=None):
+    """
+    Executa `pd.read_sql_query(sql, params=params)` reaproveitando o resultado
+    enquanto nenhuma das tabelas envolvidas for alterada.
+
+    `tabelas` é detectado automaticamente a partir do SQL; consultas que leem
+    alguma tabela sem controle de versão não são guardadas.
+    Retorna sempre uma cópia: quem chama pode alterar o DataFrame à vontade.
+    """
+    tabelas = tuple(tabelas) if tabelas else tabelas_da_consulta(sql)
+    params = tuple(params) if params else ()
+    cacheavel = bool(tabelas) and all(t in TABELAS_VERSIONADAS for t in tabelas)
+
+    conn = get_db_connection()
+    try:
+        if not cacheavel:
+            return pd.read_sql_query(sql, conn, params=params)
+
+        # A versão é lida ANTES da consulta: se houver escrita no meio, o resultado
+        # fica marcado com a versão antiga e será refeito na próxima chamada.
+        versoes = _versoes(conn, tabelas)
+        chave = (sql, params)
+        with _lock:
+            entrada = _cache.get(chave)
+            if entrada is not None and entrada[0] == versoes:
+                _cache.move_to_end(chave)
+                return entrada[1].copy()
+
+        df = pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+
+    with _lock:
+        _cache[chave] = (versoes, df)
+        _cache.move_to_end(chave)
+        while len(_cache) > MAX_ENTRADAS:
+            _cache.popitem(last=False)
+    return df.copy()
+
+
+def limpar():
+    """Descarta todos os resultados (ex.: após substituir o arquivo do banco)."""
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,145 @@
+"""
+Cache em disco de planilhas já processadas (PIMS/RH, ...), endereçado pelo conteúdo.
+
+A chave é o SHA-256 dos bytes enviados (mais uma versão do processamento): o mesmo
+arquivo enviado de novo — depois do TTL do st.cache_data, depois de reiniciar o
+servidor ou por outro supervisor — carrega o resultado colunar em milissegundos em
+vez de refazer a leitura do Excel e o cruzamento.
+
+Cada entrada é uma pasta `<chave>/` com um arquivo por DataFrame (Parquet; pickle se
+o pyarrow não estiver instalado ou se o DataFrame não voltar idêntico do Parquet). O uso da pasta
+é limitado a LIMITE_MB: passando disso, saem as entradas usadas há mais tempo.
+
+    chave = chave_conteudo(arquivo_a.getvalue(), arquivo_b.getvalue(), versao=2)
+    dados = carregar(chave)                      # {nome: DataFrame} ou None
+    if dados is None:
+        ...
+        salvar(chave, {"final": df_final, "improd": df_improd})
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+import pandas as pd
+
+from database import DB_NAME
+
+try:
+    import pyarrow  # noqa: F401 (usado pelo pandas para Parquet)
+    PARQUET_DISPONIVEL = True
+except ImportError:
+    PARQUET_DISPONIVEL = False
+
+# Pasta do cache (ao lado do banco, salvo configuração)
+PASTA_CACHE = os.environ.get(
+    "MANUTENCAO_CACHE_DATASETS", os.path.join(os.path.dirname(os.path.abspath(DB_NAME)), "cache_datasets"))
+# Tamanho máximo da pasta; as entradas menos usadas recentemente saem primeiro
+LIMITE_MB = float(os.environ.get("MANUTENCAO_CACHE_DATASETS_MB", "500"))
+
+_lock = threading.Lock()
+
+
+def chave_conteudo(*conteudos, versao=1):
+    """SHA-256 dos conteúdos (bytes ou str, nesta ordem) + versão do processamento que os consome."""
+    h = hashlib.sha256(f"v{versao}".encode())
+    for conteudo in conteudos:
+        dados = conteudo.encode() if isinstance(conteudo, str) else bytes(conteudo)
+        # Tamanho antes de cada parte: ("ab", "c") e ("a", "bc") geram chaves diferentes
+        h.update(len(dados).to_bytes(8, "little"))
+        h.update(dados)
+    return h.hexdigest()
+
+
+def _pasta(chave):
+    return os.path.join(PASTA_CACHE, chave)
+
+
+def carregar(chave):
+    """{nome: DataFrame} guardado para `chave`, ou None se não houver (ou estiver ilegível)."""
+    pasta = _pasta(chave)
+    try:
+        arquivos = sorted(os.listdir(pasta))
+    except FileNotFoundError:
+        return None
+    dados = {}
+    try:
+        for arquivo in arquivos:
+            nome, extensao = os.path.splitext(arquivo)
+            caminho = os.path.join(pasta, arquivo)
+            if extensao == ".parquet":
+                dados[nome] = pd.read_parquet(caminho)
+            elif extensao == ".pkl":
+                dados[nome] = pd.read_pickle(caminho)
+        os.utime(pasta)  # Marca o uso (ordem de saída pelo limite de tamanho)
+    except Exception as e:
+        print(f"ERRO AO LER CACHE DE DADOS {chave[:12]}: {e}")
+        shutil.rmtree(pasta, ignore_errors=True)
+        return None
+    return dados or None
+
+
+def _gravar(df, destino_sem_extensao):
+    if PARQUET_DISPONIVEL:
+        parquet = destino_sem_extensao + ".parquet"
+        try:
+            df.to_parquet(parquet, index=True)
+            # Só fica em Parquet se voltar idêntico (ex.: NaN em coluna de objetos volta como None)
+            pd.testing.assert_frame_equal(pd.read_parquet(parquet), df)
+            return
+        except Exception:
+            # Colunas com tipos misturados (ex.: matrícula int e str) não cabem no Parquet
+            if os.path.exists(parquet):
+                os.remove(parquet)
+    df.to_pickle(destino_sem_extensao + ".pkl")
+
+
+def salvar(chave, dataframes):
+    """Guarda {nome: DataFrame} sob `chave` (gravação atômica: quem lê nunca vê a entrada pela metade)."""
+    os.makedirs(PASTA_CACHE, exist_ok=True)
+    temporaria = tempfile.mkdtemp(prefix=".gravando-", dir=PASTA_CACHE)
+    try:
+        for nome, df in dataframes.items():
+            _gravar(df, os.path.join(temporaria, nome))
+        try:
+            os.replace(temporaria, _pasta(chave))
+        except OSError:
+            # Outra sessão gravou a mesma chave ao mesmo tempo: o conteúdo é o mesmo
+            pass
+    finally:
+        shutil.rmtree(temporaria, ignore_errors=True)
+    aplicar_limite()
+
+
+def _tamanho(pasta):
+    return sum(os.path.getsize(os.path.join(pasta, a)) for a in os.listdir(pasta))
+
+
+def aplicar_limite(limite_mb=None):
+    """Apaga as entradas usadas há mais tempo até a pasta caber no limite. Retorna as chaves apagadas."""
+    limite = (LIMITE_MB if limite_mb is None else limite_mb) * 1024 * 1024
+    with _lock:
+        entradas = []
+        for chave in os.listdir(PASTA_CACHE) if os.path.isdir(PASTA_CACHE) else []:
+            pasta = _pasta(chave)
+            if chave.startswith(".") or not os.path.isdir(pasta):
+                continue
+            try:
+                entradas.append((os.path.getmtime(pasta), _tamanho(pasta), chave))
+            except FileNotFoundError:
+                continue
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        apagadas = []
+        for _, tamanho, chave in sorted(entradas):
+            if total <= limite:
+                break
+            shutil.rmtree(_pasta(chave), ignore_errors=True)
+            total -= tamanho
+            apagadas.append(chave)
+        return apagadas
+
+
+def limpar():
+    """Apaga todo o cache em disco."""
+    shutil.rmtree(PASTA_CACHE, ignore_errors=True)
@@ -1,74 +1,204 @@
+import os
 import sqlite3
+import threading
+from datetime import date, datetime, time
 
 # Nome do arquivo do banco de dados
-DB_NAME = "manutencao.db"
+DB_NAME = os.environ.get("MANUTENCAO_DB", "manutencao.db")
+
+# --- Parâmetros do Pool (podem ser ajustados por variável de ambiente) ---
+# Tempo máximo (ms) que uma conexão espera pelo lock de escrita antes de falhar
+BUSY_TIMEOUT_MS = int(os.environ.get("MANUTENCAO_DB_BUSY_TIMEOUT_MS", "5000"))
+# Quantidade máxima de conexões ociosas mantidas abertas no pool
+POOL_MAX_OCIOSAS = int(os.environ.get("MANUTENCAO_DB_POOL_SIZE", "8"))
+# Quantidade de comandos SQL preparados mantidos em cache por conexão
+CACHE_COMANDOS = int(os.environ.get("MANUTENCAO_DB_STATEMENT_CACHE", "256"))
+# Mede o tempo de cada comando SQL (ver perfil_consultas.py); desligado por padrão
+PERFIL_CONSULTAS = os.environ.get("MANUTENCAO_PERFIL_CONSULTAS", "0") == "1"
+
+# Pragmas aplicados em toda conexão nova (journal_mode=WAL é persistente no arquivo)
+PRAGMAS_CONEXAO = (
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA synchronous = NORMAL",    # Seguro com WAL e bem mais rápido que FULL
+    "PRAGMA cache_size = -16000",     # ~16 MB de cache de páginas por conexão
+    "PRAGMA mmap_size = 268435456",   # Até 256 MB lidos via memória mapeada
+    "PRAGMA temp_store = MEMORY",     # Ordenações/tabelas temporárias em RAM
+)
+
+# --- Formato canônico de datas ---
+# Toda data/hora é gravada como texto 'AAAA-MM-DD HH:MM:SS': ordena certo, funciona com
+# BETWEEN e é lido pelo Pandas com formato fixo (sem format='mixed').
+FORMATO_DATA_HORA = "%Y-%m-%d %H:%M:%S"
+FORMATO_DATA = "%Y-%m-%d"
+
+# Formatos aceitos na entrada (registros antigos, planilhas importadas, digitação manual)
+_FORMATOS_ENTRADA = (
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y",
+    "%d/%m/%y %H:%M",
+    "%d/%m/%y",
+    "%d-%m-%Y %H:%M:%S",
+    "%d-%m-%Y %H:%M",
+    "%d-%m-%Y",
+)
+
+
+def normalizar_data_hora(valor):
+    """
+    Converte datetime, date, Timestamp do Pandas ou texto para 'AAAA-MM-DD HH:MM:SS'.
+    Retorna None para vazios (None, '', NaN, NaT) e para valores em formato desconhecido.
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, str):
+        texto = valor.strip()
+        if not texto:
+            return None
+        for formato in _FORMATOS_ENTRADA:
+            try:
+                return datetime.strptime(texto, formato).strftime(FORMATO_DATA_HORA)
+            except ValueError:
+                continue
+        return None
+    if isinstance(valor, datetime):
+        try:
+            return valor.strftime(FORMATO_DATA_HORA)
+        except ValueError:
+            return None  # pd.NaT
+    if isinstance(valor, date):
+        return datetime.combine(valor, time.min).strftime(FORMATO_DATA_HORA)
+    return None
+
+
+# Parâmetros datetime/date passados ao sqlite3 já saem no formato canônico
+# (o adaptador padrão grava microssegundos e está obsoleto desde o Python 3.12)
+sqlite3.register_adapter(datetime, lambda valor: valor.strftime(FORMATO_DATA_HORA))
+sqlite3.register_adapter(date, lambda valor: valor.strftime(FORMATO_DATA))
+
+
+class PooledConnection(sqlite3.Connection):
+    """Conexão SQLite que volta para o pool ao ser fechada, em vez de ser destruída."""
+
+    _pool = None
+    _geracao = 0
+    _emprestada = False
+
+    def close(self):
+        if self._pool is None:
+            super().close()
+        else:
+            self._pool.devolver(self)
+
+    def fechar_definitivo(self):
+        """Fecha a conexão de verdade (usado pelo próprio pool)."""
+        self._pool = None
+        super().close()
+
+
+class ConnectionManager:
+    """
+    Pool de conexões do processo inteiro.
+    Cada conexão é usada por uma única thread por vez (do empréstimo até o close()),
+    e até `max_ociosas` conexões ficam abertas para reaproveitamento entre reruns.
+    """
+
+    def __init__(self, db_path, max_ociosas=POOL_MAX_OCIOSAS, busy_timeout_ms=BUSY_TIMEOUT_MS):
+        self.db_path = db_path
+        self.max_ociosas = max_ociosas
+        self.busy_timeout_ms = busy_timeout_ms
+        self._ociosas = []
+        self._lock = threading.Lock()
+        self._geracao = 0
+        self._pid = os.getpid()
+        self._wal_configurado = False
+        self.perfil = PERFIL_CONSULTAS
+
+    def _abrir(self):
+        factory = PooledConnection
+        if self.perfil:
+            from perfil_consultas import ConexaoMedida
+            factory = ConexaoMedida
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            cached_statements=CACHE_COMANDOS,
+            check_same_thread=False,  # O pool garante o uso exclusivo por thread
+            factory=factory,
+        )
+        if not self._wal_configurado:
+            conn.execute("PRAGMA journal_mode = WAL")
+            self._wal_configurado = True
+        for pragma in PRAGMAS_CONEXAO:
+            conn.execute(pragma)
+        conn._pool = self
+        conn._geracao = self._geracao
+        return conn
+
+    def obter(self):
+        """Empresta uma conexão (reaproveitada ou nova)."""
+        with self._lock:
+            if os.getpid() != self._pid:
+                # Processo filho (fork): nunca reaproveita conexões herdadas do pai
+                self._ociosas = []
+                self._pid = os.getpid()
+            conn = self._ociosas.pop() if self._ociosas else None
+        if conn is None:
+            conn = self._abrir()
+        conn.row_factory = sqlite3.Row  # Permite acessar colunas por nome
+        conn._emprestada = True
+        return conn
+
+    def devolver(self, conn):
+        """Recebe a conexão de volta; descarta transações não confirmadas (mesmo efeito do close())."""
+        if not conn._emprestada:
+            return  # close() chamado duas vezes
+        conn._emprestada = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.fechar_definitivo()
+            return
+        with self._lock:
+            if conn._geracao == self._geracao and len(self._ociosas) < self.max_ociosas:
+                self._ociosas.append(conn)
+                return
+        conn.fechar_definitivo()
+
+    def fechar_todas(self):
+        """Fecha as conexões ociosas; as emprestadas são fechadas quando devolvidas."""
+        with self._lock:
+            ociosas, self._ociosas = self._ociosas, []
+            self._geracao += 1
+        for conn in ociosas:
+            conn.fechar_definitivo()
+
+
+_pool = ConnectionManager(DB_NAME)
+
+
+def get_pool():
+    """Retorna o gerenciador de conexões do processo."""
+    return _pool
+
 
 def get_db_connection():
-    """Cria e retorna uma conexão com o banco de dados."""
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row  # Permite acessar colunas por nome
-    return conn
+    """Cria e retorna uma conexão com o banco de dados (emprestada do pool; devolva com close())."""
+    return _pool.obter()
+
 
 def inicializar_banco():
-    """Cria as tabelas se elas não existirem."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Tabela de Equipamentos
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS equipamentos (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        frota TEXT NOT NULL UNIQUE,
-        modelo TEXT NOT NULL,
-        gestao_responsavel TEXT
-    );
-    """)
-    
-    # Tabela de Funcionários
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS funcionarios (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        matricula TEXT NOT NULL UNIQUE,
-        nome TEXT NOT NULL,
-        setor TEXT
-    );
-    """)
-
-    # Tabela de Tipos de Operação
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS tipos_operacao (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nome TEXT NOT NULL UNIQUE
-    );
-    """)
-    
-    # Tabela de Ordens de Serviço (a principal)
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS ordens_servico (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        data_hora DATETIME NOT NULL,
-        equipamento_id INTEGER NOT NULL,
-        local_atendimento TEXT,
-        descricao TEXT,
-        tipo_operacao_id INTEGER NOT NULL,
-        status TEXT NOT NULL, 
-        numero_os_oficial TEXT,
-        FOREIGN KEY (equipamento_id) REFERENCES equipamentos (id),
-        FOREIGN KEY (tipo_operacao_id) REFERENCES tipos_operacao (id)
-    );
-    """)
-
-    # Adiciona os tipos de operação padrão se a tabela estiver vazia
-    cursor.execute("SELECT COUNT(*) FROM tipos_operacao")
-    if cursor.fetchone()[0] == 0:
-        cursor.execute("INSERT INTO tipos_operacao (nome) VALUES ('Mecânico')")
-        cursor.execute("INSERT INTO tipos_operacao (nome) VALUES ('Elétrico')")
-        cursor.execute("INSERT INTO tipos_operacao (nome) VALUES ('Borracharia')")
-        cursor.execute("INSERT INTO tipos_operacao (nome) VALUES ('Terceiro')")
-
-    conn.commit()
-    conn.close()
-    print("Banco de dados inicializado com sucesso.")
+    """Cria as tabelas se elas não existirem (delegado ao executor de migrações)."""
+    from database_schema import inicializar_banco as aplicar_migracoes
+    aplicar_migracoes(forcar=True)
+
 
 # Se você executar este arquivo diretamente, ele cria o banco.
 if __name__ == "__main__":
@@ -1,146 +1,829 @@
-import sqlite3
 import logging
+import os
+import sqlite3
+import threading
+
+from database import DB_NAME, get_db_connection, normalizar_data_hora
 
 # Configuração de Log
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-DB_FILE = "manutencao.db"
+DB_FILE = DB_NAME
 
 
 def get_connection():
-    return sqlite3.connect(DB_FILE)
+    return get_db_connection()
+
+
+# ==============================================================================
+# FUNÇÕES AUXILIARES DAS MIGRAÇÕES
+# ==============================================================================
+def _colunas(cursor, tabela):
+    """Retorna o conjunto de colunas existentes em uma tabela."""
+    return {row[1] for row in cursor.execute(f"PRAGMA table_info({tabela})").fetchall()}
+
+
+def _adicionar_coluna(cursor, tabela, coluna, definicao):
+    """Adiciona a coluna apenas se ela ainda não existir (sem ALTER com erro esperado)."""
+    if coluna not in _colunas(cursor, tabela):
+        cursor.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
+        logger.info(f"Coluna '{coluna}' adicionada à tabela '{tabela}'.")
+
+
+# ==============================================================================
+# MIGRAÇÕES (EM ORDEM) - NUNCA ALTERE UMA MIGRAÇÃO JÁ PUBLICADA, CRIE UMA NOVA
+# ==============================================================================
+def _m001_estrutura_base(cursor):
+    """Tabelas e colunas que antes eram criadas pelos scripts atualizar_db_*/setup_* e pelas páginas."""
+    # Usuários
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS usuarios (
+            username TEXT PRIMARY KEY,
+            password TEXT NOT NULL,
+            nome TEXT,
+            force_change_password INTEGER DEFAULT 0,
+            role TEXT DEFAULT 'user'
+        )
+    """)
+
+    # Equipamentos
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS equipamentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            frota TEXT NOT NULL UNIQUE,
+            modelo TEXT NOT NULL,
+            gestao_responsavel TEXT
+        )
+    """)
+
+    # Funcionários
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS funcionarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            matricula TEXT NOT NULL UNIQUE,
+            nome TEXT NOT NULL,
+            setor TEXT,
+            telefone TEXT
+        )
+    """)
+
+    # Tipos de Operação
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tipos_operacao (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL UNIQUE,
+            cor TEXT
+        )
+    """)
+
+    # Ordens de Serviço (Tabela Central)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ordens_servico (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data_hora DATETIME NOT NULL,
+            equipamento_id INTEGER NOT NULL,
+            local_atendimento TEXT,
+            descricao TEXT,
+            tipo_operacao_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            numero_os_oficial TEXT,
+            data_encerramento DATETIME,
+            funcionario_id INTEGER REFERENCES funcionarios(id),
+            horimetro REAL,
+            prioridade TEXT,
+            latitude REAL,
+            longitude REAL,
+            classificacao TEXT DEFAULT 'Corretiva',
+            maquina_parada INTEGER DEFAULT 1,
+            solicitante_id INTEGER,
+            FOREIGN KEY (equipamento_id) REFERENCES equipamentos (id),
+            FOREIGN KEY (tipo_operacao_id) REFERENCES tipos_operacao (id)
+        )
+    """)
+
+    # Mural de Recados
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS recados (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data_hora DATETIME,
+            autor TEXT,
+            mensagem TEXT,
+            importante BOOLEAN
+        )
+    """)
+
+    # Auditoria (Logs)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS audit_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data_hora DATETIME,
+            usuario TEXT,
+            acao TEXT,      -- Ex: CRIAR, EDITAR, EXCLUIR, LOGIN
+            alvo TEXT,      -- Ex: OS #50, Usuário 'joao'
+            detalhes TEXT   -- Ex: Mudou status de Pendente para Concluído
+        )
+    """)
+
+    # Agenda Externa (Central WhatsApp)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS agenda_externa (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            telefone TEXT NOT NULL,
+            tipo TEXT -- Ex: Fornecedor, Mecânico Terceiro, etc.
+        )
+    """)
+
+    # Áreas / Talhões
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS areas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            codigo TEXT NOT NULL UNIQUE,
+            nome TEXT NOT NULL
+        )
+    """)
+
+    # Preventivas (16_Controle_Preventivas)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS prev_planos_def (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL, -- Ex: Lubrificação 50h
+            intervalo INTEGER NOT NULL,
+            unidade TEXT CHECK(unidade IN ('HORAS', 'KM', 'DIAS')),
+            tipo TEXT, -- Mecânica, Elétrica...
+            executante TEXT DEFAULT 'INTERNA'
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS prev_associacoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            plano_id INTEGER NOT NULL,
+            frota TEXT NOT NULL,
+            modelo_ref TEXT, -- Apenas para referência/filtro
+            FOREIGN KEY(plano_id) REFERENCES prev_planos_def(id),
+            UNIQUE(plano_id, frota) -- Evita duplicar o mesmo plano na mesma máquina
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS historico_manutencao (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            equipamento_id INTEGER NOT NULL,
+            data_realizacao DATE NOT NULL,
+            horimetro_km_realizado REAL NOT NULL,
+            tipo_servico TEXT,
+            observacao TEXT,
+            FOREIGN KEY(equipamento_id) REFERENCES equipamentos(id)
+        )
+    """)
+
+    # Liderança (17_Eficiencia_Apontamentos)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS mapa_gestores (
+            matricula TEXT PRIMARY KEY,
+            nome TEXT,
+            setor TEXT,
+            gestor TEXT
+        )
+    """)
+
+    # Evolução diária de pneus (18_Controle_Pneus)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS historico_saude_pneus (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data_registro DATE,
+            equip_cod TEXT,
+            equip_desc TEXT,
+            total_pos INTEGER,
+            instalados INTEGER,
+            ausentes INTEGER,
+            percentual REAL
+        )
+    """)
+
+    # Fecho de ciclo das análises de óleo (20_Analise_Preditiva_Oleo)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS analises_oleo_feedback (
+            amostra TEXT PRIMARY KEY,
+            acao_gestao TEXT,
+            status_acao TEXT DEFAULT 'Pendente'
+        )
+    """)
+
+    # Colunas adicionadas ao longo do tempo (bancos criados antes delas existirem)
+    _adicionar_coluna(cursor, "usuarios", "force_change_password", "INTEGER DEFAULT 0")
+    _adicionar_coluna(cursor, "usuarios", "role", "TEXT DEFAULT 'user'")
+    _adicionar_coluna(cursor, "equipamentos", "gestao_responsavel", "TEXT")
+    _adicionar_coluna(cursor, "funcionarios", "telefone", "TEXT")
+    _adicionar_coluna(cursor, "tipos_operacao", "cor", "TEXT")
+    _adicionar_coluna(cursor, "ordens_servico", "data_encerramento", "DATETIME")
+    _adicionar_coluna(cursor, "ordens_servico", "funcionario_id", "INTEGER REFERENCES funcionarios(id)")
+    _adicionar_coluna(cursor, "ordens_servico", "horimetro", "REAL")
+    _adicionar_coluna(cursor, "ordens_servico", "prioridade", "TEXT")
+    _adicionar_coluna(cursor, "ordens_servico", "latitude", "REAL")
+    _adicionar_coluna(cursor, "ordens_servico", "longitude", "REAL")
+    _adicionar_coluna(cursor, "ordens_servico", "classificacao", "TEXT DEFAULT 'Corretiva'")
+    _adicionar_coluna(cursor, "ordens_servico", "maquina_parada", "INTEGER DEFAULT 1")
+    _adicionar_coluna(cursor, "ordens_servico", "solicitante_id", "INTEGER")
+
+
+def _m002_dados_padrao(cursor):
+    """Registros mínimos para o sistema funcionar (tipos de operação, cores e usuário admin)."""
+    # Tipos de operação padrão se a tabela estiver vazia
+    if cursor.execute("SELECT COUNT(*) FROM tipos_operacao").fetchone()[0] == 0:
+        cursor.executemany("INSERT INTO tipos_operacao (nome) VALUES (?)",
+                           [("Mecânico",), ("Elétrico",), ("Borracharia",), ("Terceiro",)])
+
+    # Cores padrão (para não ficarem vazias)
+    cores = [
+        ('#2196F3', 'Elétrico'),      # Azul
+        ('#9E9E9E', 'Mecânico'),      # Cinza
+        ('#FF9800', 'Borracharia'),   # Laranja
+        ('#9C27B0', 'Terceiro'),      # Roxo
+    ]
+    for cor, nome in cores:
+        cursor.execute("UPDATE tipos_operacao SET cor = ? WHERE cor IS NULL AND nome LIKE ?", (cor, f"%{nome}%"))
+    cursor.execute("UPDATE tipos_operacao SET cor = '#BDC3C7' WHERE cor IS NULL")
+
+    # Prioridade padrão para ordens antigas
+    cursor.execute("UPDATE ordens_servico SET prioridade = 'Média' WHERE prioridade IS NULL")
+
+    # Usuário admin padrão se não existir
+    if not cursor.execute("SELECT 1 FROM usuarios WHERE username = 'admin'").fetchone():
+        try:
+            from utils_senha import hash_senha
+            pass_hash = hash_senha('1234')
+        except Exception:
+            pass_hash = '1234'
+        cursor.execute(
+            "INSERT INTO usuarios (username, password, nome, force_change_password) VALUES ('admin', ?, 'Administrador Geral', 0)",
+            (pass_hash,))
 
 
-def inicializar_banco():
+def _m003_indices_consultas(cursor):
+    """Índices das consultas quentes dos painéis (antes só existiam se alguém rodasse pages/otimizar_db.py)."""
+    # Substituídos pelos compostos abaixo (mesmo prefixo) ou pelo índice UNIQUE de equipamentos.frota
+    cursor.execute("DROP INDEX IF EXISTS idx_os_equipamento")
+    cursor.execute("DROP INDEX IF EXISTS idx_os_status")
+    cursor.execute("DROP INDEX IF EXISTS idx_equip_frota")
+
+    comandos = [
+        # Filtro por período (Painel Principal, KPI)
+        "CREATE INDEX IF NOT EXISTS idx_os_data ON ordens_servico(data_hora)",
+        # Prontuário da máquina e fusão de chamados: equipamento + período
+        "CREATE INDEX IF NOT EXISTS idx_os_equip_data ON ordens_servico(equipamento_id, data_hora)",
+        # Contadores e filtros de status
+        "CREATE INDEX IF NOT EXISTS idx_os_status_parada ON ordens_servico(status, maquina_parada)",
+        # Parciais: só as ordens em aberto (fração pequena e estável da tabela)
+        """CREATE INDEX IF NOT EXISTS idx_os_abertas_data ON ordens_servico(data_hora)
+           WHERE status != 'Concluído'""",
+        """CREATE INDEX IF NOT EXISTS idx_os_abertas_prioridade ON ordens_servico(prioridade, data_hora)
+           WHERE status != 'Concluído'""",
+        """CREATE INDEX IF NOT EXISTS idx_os_paradas ON ordens_servico(status, data_hora)
+           WHERE maquina_parada = 1""",
+        # Mural de recados, auditoria, pneus e preventivas
+        "CREATE INDEX IF NOT EXISTS idx_recados_data ON recados(data_hora)",
+        "CREATE INDEX IF NOT EXISTS idx_audit_data ON audit_logs(data_hora)",
+        "CREATE INDEX IF NOT EXISTS idx_pneus_data ON historico_saude_pneus(data_registro)",
+        """CREATE INDEX IF NOT EXISTS idx_hist_manut_equip_servico
+           ON historico_manutencao(equipamento_id, tipo_servico, horimetro_km_realizado)""",
+    ]
+    for cmd in comandos:
+        cursor.execute(cmd)
+
+    # Estatísticas para o planejador escolher entre os índices
+    cursor.execute("ANALYZE")
+
+
+def _m004_datas_canonicas(cursor):
+    """Reescreve as datas gravadas em formatos variados para 'AAAA-MM-DD HH:MM:SS'."""
+    # Valores irreconhecíveis são mantidos como estão (não perdemos informação)
+    cursor.connection.create_function(
+        "normalizar_data_hora", 1, lambda valor: normalizar_data_hora(valor) or valor, deterministic=True)
+    colunas = [
+        ("ordens_servico", "data_hora"),
+        ("ordens_servico", "data_encerramento"),
+        ("audit_logs", "data_hora"),
+        ("recados", "data_hora"),
+    ]
+    for tabela, coluna in colunas:
+        cursor.execute(f"""
+            UPDATE {tabela} SET {coluna} = normalizar_data_hora({coluna})
+            WHERE {coluna} IS NOT NULL AND {coluna} IS NOT normalizar_data_hora({coluna})
+        """)
+        if cursor.rowcount:
+            logger.info(f"{cursor.rowcount} data(s) normalizada(s) em {tabela}.{coluna}.")
+
+        # O que sobrar fora do padrão não é data reconhecível: só avisa, não apaga
+        invalidas = cursor.execute(f"""
+            SELECT COUNT(*) FROM {tabela}
+            WHERE {coluna} IS NOT NULL AND {coluna} NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]'
+        """).fetchone()[0]
+        if invalidas:
+            logger.warning(f"{invalidas} valor(es) em {tabela}.{coluna} não puderam ser convertidos.")
+
+
+# --- Contadores do painel mantidos por triggers ---
+# Cada contador é uma expressão 0/1 avaliada sobre a linha (NEW ou OLD) de ordens_servico
+CONTADORES_OS = {
+    # Ordens não concluídas (Início e DashboardRepository)
+    "os_abertas": "{r}.status IS NOT NULL AND {r}.status != 'Concluído'",
+    # Máquinas paradas segundo o DashboardRepository (exclui Pendente/Aguardando Peças)
+    "os_paradas": "COALESCE({r}.status NOT IN ('Concluído', 'Pendente', 'Aguardando Peças') AND {r}.maquina_parada = 1, 0)",
+    # Máquinas paradas segundo a página Início (qualquer status em aberto)
+    "os_abertas_paradas": "COALESCE({r}.status != 'Concluído' AND {r}.maquina_parada = 1, 0)",
+}
+_UPSERT_CONTADOR = "ON CONFLICT(chave) DO UPDATE SET valor = valor + excluded.valor"
+
+
+def _sql_deltas_os(registro, sinal):
+    """Comandos que somam (sinal=+1) ou subtraem (sinal=-1) a contribuição de uma linha de ordens_servico."""
+    valores = ", ".join(
+        f"('{chave}', {sinal} * ({expr.format(r=registro)}))" for chave, expr in CONTADORES_OS.items())
+    return f"""
+            INSERT INTO kpi_counters (chave, valor) VALUES {valores} {_UPSERT_CONTADOR};
+            INSERT INTO kpi_counters (chave, valor) SELECT 'status:' || {registro}.status, {sinal}
+            WHERE {registro}.status IS NOT NULL {_UPSERT_CONTADOR};"""
+
+
+def recalcular_contadores(cursor):
+    """Recalcula a tabela kpi_counters do zero (usada na criação e após restaurações)."""
+    cursor.execute("DELETE FROM kpi_counters")
+    somas = ", ".join(f"COALESCE(SUM({expr.format(r='ordens_servico')}), 0)" for expr in CONTADORES_OS.values())
+    totais = cursor.execute(f"SELECT {somas} FROM ordens_servico").fetchone()
+    cursor.executemany("INSERT INTO kpi_counters (chave, valor) VALUES (?, ?)", list(zip(CONTADORES_OS, totais)))
+    cursor.execute("""
+        INSERT INTO kpi_counters (chave, valor)
+        SELECT 'status:' || status, COUNT(*) FROM ordens_servico WHERE status IS NOT NULL GROUP BY status
+    """)
+    cursor.execute("INSERT INTO kpi_counters (chave, valor) SELECT 'recados', COUNT(*) FROM recados")
+
+
+def _m005_contadores_painel(cursor):
+    """Tabela kpi_counters mantida por triggers: os KPIs do Início viram leitura por chave primária."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS kpi_counters (
+            chave TEXT PRIMARY KEY,
+            valor INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    triggers = {
+        "trg_kpi_os_insert": f"""AFTER INSERT ON ordens_servico
+            BEGIN {_sql_deltas_os('NEW', 1)}
+        END""",
+        "trg_kpi_os_delete": f"""AFTER DELETE ON ordens_servico
+            BEGIN {_sql_deltas_os('OLD', -1)}
+        END""",
+        "trg_kpi_os_update": f"""AFTER UPDATE OF status, maquina_parada ON ordens_servico
+            WHEN OLD.status IS NOT NEW.status OR OLD.maquina_parada IS NOT NEW.maquina_parada
+            BEGIN {_sql_deltas_os('OLD', -1)}{_sql_deltas_os('NEW', 1)}
+        END""",
+        "trg_kpi_recados_insert": f"""AFTER INSERT ON recados BEGIN
+            INSERT INTO kpi_counters (chave, valor) VALUES ('recados', 1) {_UPSERT_CONTADOR};
+        END""",
+        "trg_kpi_recados_delete": f"""AFTER DELETE ON recados BEGIN
+            INSERT INTO kpi_counters (chave, valor) VALUES ('recados', -1) {_UPSERT_CONTADOR};
+        END""",
+    }
+    for nome, corpo in triggers.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nome}")
+        cursor.execute(f"CREATE TRIGGER {nome} {corpo}")
+
+    recalcular_contadores(cursor)
+
+
+# --- Versão de dados por tabela (invalidação do cache de consultas) ---
+# Toda escrita nestas tabelas incrementa `tabela_versoes.versao`; o cache_consultas.py
+# só reaproveita resultados de consultas cujas tabelas estejam todas nesta lista.
+TABELAS_VERSIONADAS = (
+    "ordens_servico", "equipamentos", "funcionarios", "tipos_operacao", "areas",
+    "recados", "audit_logs", "usuarios", "agenda_externa",
+    "prev_planos_def", "prev_associacoes", "historico_manutencao",
+    "mapa_gestores", "historico_saude_pneus", "analises_oleo_feedback",
+)
+# Linha extra de tabela_versoes incrementada a cada restauração de backup (backup.py):
+# snapshots mantidos em memória (ex.: carregar_com_deltas) são recarregados por inteiro
+MARCADOR_RESTAURACAO = "_restauracao"
+
+
+def _m006_versoes_tabelas(cursor):
+    """Tabela tabela_versoes + triggers que a incrementam a cada INSERT/UPDATE/DELETE."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tabela_versoes (
+            tabela TEXT PRIMARY KEY,
+            versao INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    for tabela in TABELAS_VERSIONADAS:
+        cursor.execute("INSERT OR IGNORE INTO tabela_versoes (tabela, versao) VALUES (?, 0)", (tabela,))
+        for evento in ("INSERT", "UPDATE", "DELETE"):
+            nome = f"trg_versao_{tabela}_{evento.lower()}"
+            cursor.execute(f"DROP TRIGGER IF EXISTS {nome}")
+            cursor.execute(f"""
+                CREATE TRIGGER {nome} AFTER {evento} ON {tabela} BEGIN
+                    UPDATE tabela_versoes SET versao = versao + 1 WHERE tabela = '{tabela}';
+                END
+            """)
+
+
+def _m007_feed_alteracoes_os(cursor):
     """
-    Verifica e cria/atualiza a estrutura completa do banco de dados.
-    Execute esta função no início do app.py.
+    Feed de alterações de ordens_servico: cada linha guarda a versão da tabela em que foi
+    gravada pela última vez (row_version) e as exclusões ficam em ordens_servico_excluidas.
+    Os triggers de versão da migração 006 para ordens_servico são substituídos por estes.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
+    _adicionar_coluna(cursor, "ordens_servico", "row_version", "INTEGER NOT NULL DEFAULT 0")
+    _adicionar_coluna(cursor, "ordens_servico", "updated_at", "TIMESTAMP")
+    cursor.execute("UPDATE ordens_servico SET updated_at = COALESCE(data_encerramento, data_hora) WHERE updated_at IS NULL")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_os_row_version ON ordens_servico(row_version)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ordens_servico_excluidas (
+            id INTEGER PRIMARY KEY,
+            row_version INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_os_excluidas_versao ON ordens_servico_excluidas(row_version)")
+
+    incrementa = "UPDATE tabela_versoes SET versao = versao + 1 WHERE tabela = 'ordens_servico';"
+    versao = "(SELECT versao FROM tabela_versoes WHERE tabela = 'ordens_servico')"
+    carimbo = f"row_version = {versao}, updated_at = datetime('now', 'localtime')"
+    triggers = {
+        "trg_versao_ordens_servico_insert": f"""AFTER INSERT ON ordens_servico BEGIN
+            {incrementa}
+            UPDATE ordens_servico SET {carimbo} WHERE id = NEW.id;
+            DELETE FROM ordens_servico_excluidas WHERE id = NEW.id;
+        END""",
+        # O carimbo abaixo é um UPDATE na própria tabela: a condição WHEN evita que ele se repita
+        "trg_versao_ordens_servico_update": f"""AFTER UPDATE ON ordens_servico
+            WHEN NEW.row_version IS OLD.row_version
+        BEGIN
+            {incrementa}
+            UPDATE ordens_servico SET {carimbo} WHERE id = NEW.id;
+        END""",
+        "trg_versao_ordens_servico_delete": f"""AFTER DELETE ON ordens_servico BEGIN
+            {incrementa}
+            INSERT OR REPLACE INTO ordens_servico_excluidas (id, row_version) VALUES (OLD.id, {versao});
+        END""",
+    }
+    for nome, corpo in triggers.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nome}")
+        cursor.execute(f"CREATE TRIGGER {nome} {corpo}")
+
+
+def _m008_indices_busca(cursor):
+    """Índice da busca rápida por OS oficial (Gerenciar Atendimento); ticket e frota já têm índice."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_os_numero_oficial ON ordens_servico(numero_os_oficial)")
+
 
+# --- Busca textual (FTS5) ---
+# Índice -> (tabela de origem, colunas indexadas). Tokenizador sem acentos: "eletrica" acha "elétrica".
+INDICES_TEXTO = {
+    "os_fts": ("ordens_servico", ("descricao", "local_atendimento", "numero_os_oficial")),
+    "audit_fts": ("audit_logs", ("alvo", "detalhes")),
+    "recados_fts": ("recados", ("mensagem",)),
+}
+
+
+def fts5_disponivel(cursor):
+    """Verifica se o SQLite em uso foi compilado com FTS5."""
     try:
-        # --- 1. TABELAS BASE ---
-
-        # Usuários
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS usuarios (
-                username TEXT PRIMARY KEY,
-                password TEXT NOT NULL,
-                nome TEXT,
-                force_change_password INTEGER DEFAULT 0,
-                role TEXT DEFAULT 'user'
-            )
-        """)
+        cursor.execute("CREATE VIRTUAL TABLE temp._teste_fts5 USING fts5(x)")
+        cursor.execute("DROP TABLE temp._teste_fts5")
+        return True
+    except Exception:
+        return False
 
-        # Equipamentos
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS equipamentos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                frota TEXT UNIQUE NOT NULL,
-                modelo TEXT,
-                gestao_responsavel TEXT
-            )
-        """)
 
-        # Tipos de Operação
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS tipos_operacao (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT UNIQUE NOT NULL,
-                cor TEXT DEFAULT '#6c757d'
-            )
-        """)
+def _m009_busca_texto(cursor):
+    """Tabelas FTS5 (external content) sincronizadas por triggers; sem FTS5 a busca usa LIKE."""
+    if not fts5_disponivel(cursor):
+        logger.warning("SQLite sem FTS5: a busca textual continuará usando LIKE.")
+        return
 
-        # Funcionários
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS funcionarios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT NOT NULL,
-                matricula TEXT,
-                setor TEXT,
-                funcao TEXT
+    for indice, (tabela, colunas) in INDICES_TEXTO.items():
+        lista = ", ".join(colunas)
+        novos = ", ".join(f"NEW.{c}" for c in colunas)
+        antigos = ", ".join(f"OLD.{c}" for c in colunas)
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {indice} USING fts5(
+                {lista}, content='{tabela}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
             )
         """)
+        triggers = {
+            f"trg_{indice}_insert": f"""AFTER INSERT ON {tabela} BEGIN
+                INSERT INTO {indice} (rowid, {lista}) VALUES (NEW.id, {novos});
+            END""",
+            f"trg_{indice}_delete": f"""AFTER DELETE ON {tabela} BEGIN
+                INSERT INTO {indice} ({indice}, rowid, {lista}) VALUES ('delete', OLD.id, {antigos});
+            END""",
+            f"trg_{indice}_update": f"""AFTER UPDATE OF {lista} ON {tabela} BEGIN
+                INSERT INTO {indice} ({indice}, rowid, {lista}) VALUES ('delete', OLD.id, {antigos});
+                INSERT INTO {indice} (rowid, {lista}) VALUES (NEW.id, {novos});
+            END""",
+        }
+        for nome, corpo in triggers.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {nome}")
+            cursor.execute(f"CREATE TRIGGER {nome} {corpo}")
+        # Indexa o que já existe
+        cursor.execute(f"INSERT INTO {indice} ({indice}) VALUES ('rebuild')")
 
-        # Ordens de Serviço (Tabela Central)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS ordens_servico (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                data_hora TIMESTAMP,
-                equipamento_id INTEGER,
-                local_atendimento TEXT,
-                descricao TEXT,
-                tipo_operacao_id INTEGER,
-                status TEXT,
-                numero_os_oficial TEXT,
-                funcionario_id INTEGER,
-                horimetro REAL,
-                prioridade TEXT,
-                latitude REAL,
-                longitude REAL,
-                data_encerramento TIMESTAMP,
-                classificacao TEXT,
-                maquina_parada INTEGER DEFAULT 0,
-                solicitante_id INTEGER,
-                FOREIGN KEY(equipamento_id) REFERENCES equipamentos(id),
-                FOREIGN KEY(tipo_operacao_id) REFERENCES tipos_operacao(id),
-                FOREIGN KEY(funcionario_id) REFERENCES funcionarios(id)
-            )
-        """)
 
-        # Recados
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS recados (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                data_hora TIMESTAMP,
-                usuario TEXT,
-                mensagem TEXT,
-                prioridade TEXT
-            )
-        """)
+def _m010_perfil_consultas(cursor):
+    """Medições do perfil de consultas (perfil_consultas.py), agrupadas por impressão digital do SQL."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS perf_queries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data_hora TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            consulta TEXT NOT NULL,
+            origem TEXT,
+            duracao_ms REAL NOT NULL,
+            linhas INTEGER,
+            plano TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_perf_data ON perf_queries(data_hora)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_perf_fingerprint ON perf_queries(fingerprint, data_hora)")
 
-        # Auditoria (Logs)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS auditoria (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                data_hora TIMESTAMP,
-                usuario TEXT,
-                acao TEXT,
-                detalhes TEXT
-            )
-        """)
 
-        # --- 2. MIGRAÇÕES (Verificação de Colunas Novas) ---
-        # Função auxiliar para adicionar coluna se não existir
-        def add_column_if_not_exists(table, column, definition):
-            try:
-                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
-                logger.info(f"Coluna '{column}' adicionada à tabela '{table}'.")
-            except sqlite3.OperationalError:
-                # Coluna já existe
-                pass
-
-        # Lista de colunas que foram adicionadas ao longo do tempo (Migrações)
-        add_column_if_not_exists("equipamentos", "gestao_responsavel", "TEXT")
-        add_column_if_not_exists("tipos_operacao", "cor", "TEXT DEFAULT '#6c757d'")
-        add_column_if_not_exists("ordens_servico", "classificacao", "TEXT")
-        add_column_if_not_exists("ordens_servico", "maquina_parada", "INTEGER DEFAULT 0")
-        add_column_if_not_exists("ordens_servico", "solicitante_id", "INTEGER")
-        add_column_if_not_exists("ordens_servico", "latitude", "REAL")
-        add_column_if_not_exists("ordens_servico", "longitude", "REAL")
-        add_column_if_not_exists("usuarios", "role", "TEXT DEFAULT 'user'")
-
-        conn.commit()
-        logger.info("Banco de dados verificado e atualizado com sucesso.")
-
-    except Exception as e:
-        logger.error(f"Erro ao inicializar banco de dados: {e}")
+def _m011_arquivo_morto(cursor):
+    """Até que data cada tabela já foi movida para o arquivo morto (arquivo_morto.py)."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS arquivo_limites (
+            tabela TEXT PRIMARY KEY,
+            ate TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+
+# --- Rollup diário dos indicadores (MTBF/MTTR/disponibilidade) ---
+# Turno pela hora de abertura: A 06:30-15:00, B 15:00-23:00, C o restante
+TURNO_SQL = """CASE
+    WHEN substr({r}.data_hora, 12, 5) >= '06:30' AND substr({r}.data_hora, 12, 5) < '15:00' THEN 'Turno A (Manhã)'
+    WHEN substr({r}.data_hora, 12, 5) >= '15:00' AND substr({r}.data_hora, 12, 5) < '23:00' THEN 'Turno B (Tarde)'
+    ELSE 'Turno C (Noite)' END"""
+# Falha = corretiva com máquina parada (vazios contam como 'Corretiva' e parada = 1)
+FALHA_SQL = "(COALESCE({r}.classificacao, 'Corretiva') LIKE '%Corretiva%' AND COALESCE({r}.maquina_parada, 1) = 1)"
+COLUNAS_KPI_DIARIO = ("dia", "equipamento_id", "turno", "ordens", "falhas", "falhas_encerradas", "horas_reparo")
+_UPSERT_KPI_DIARIO = "ON CONFLICT(dia, equipamento_id, turno) DO UPDATE SET " + ", ".join(
+    f"{c} = {c} + excluded.{c}" for c in COLUNAS_KPI_DIARIO[3:])
+
+
+def _expr_kpi_diario(registro, sinal=1):
+    """Expressões de COLUNAS_KPI_DIARIO para uma linha de ordens_servico (somadas com `sinal`)."""
+    falha = FALHA_SQL.format(r=registro)
+    horas = f"(julianday({registro}.data_encerramento) - julianday({registro}.data_hora)) * 24"
+    return [
+        f"substr({registro}.data_hora, 1, 10)",
+        f"{registro}.equipamento_id",
+        TURNO_SQL.format(r=registro),
+        f"{sinal}",
+        f"{sinal} * {falha}",
+        f"{sinal} * ({falha} AND {horas} IS NOT NULL)",
+        # Só as falhas encerradas têm duração fixa; as abertas são somadas na hora da consulta
+        f"{sinal} * CASE WHEN {falha} THEN COALESCE({horas}, 0) ELSE 0 END",
+    ]
+
+
+def _sql_kpi_diario(registro, sinal):
+    """Comando que soma (sinal=+1) ou subtrai (sinal=-1) a contribuição de uma linha ao rollup diário."""
+    return f"""
+            INSERT INTO kpi_diario ({", ".join(COLUNAS_KPI_DIARIO)})
+            SELECT {", ".join(_expr_kpi_diario(registro, sinal))}
+            WHERE {registro}.data_hora IS NOT NULL AND {registro}.equipamento_id IS NOT NULL {_UPSERT_KPI_DIARIO};"""
+
+
+def somar_kpi_diario(cursor, tabela="ordens_servico", filtro="1 = 1", params=()):
+    """Soma ao rollup diário as linhas de `tabela` que atendem ao filtro (ex.: ordens vindas do arquivo morto)."""
+    linha = ", ".join(f"{expr} AS {coluna}" for expr, coluna in zip(_expr_kpi_diario("r"), COLUNAS_KPI_DIARIO))
+    cursor.execute(f"""
+        INSERT INTO kpi_diario ({", ".join(COLUNAS_KPI_DIARIO)})
+        SELECT {", ".join(COLUNAS_KPI_DIARIO[:3])}, {", ".join(f"SUM({c})" for c in COLUNAS_KPI_DIARIO[3:])}
+        FROM (SELECT {linha} FROM {tabela} r
+              WHERE r.data_hora IS NOT NULL AND r.equipamento_id IS NOT NULL AND {filtro})
+        GROUP BY 1, 2, 3 {_UPSERT_KPI_DIARIO}
+    """, params)
+
+
+def recalcular_kpi_diario(cursor):
+    """Refaz o rollup diário do zero: ordens do banco principal + ordens do arquivo morto."""
+    cursor.execute("DELETE FROM kpi_diario")
+    somar_kpi_diario(cursor)
+
+    # Sem ATTACH (não é permitido dentro da transação da migração): lê o arquivo por outra conexão
+    from arquivo_morto import ARQUIVO_DB
+    if not os.path.exists(ARQUIVO_DB):
+        return
+    arquivo = sqlite3.connect(f"file:{ARQUIVO_DB}?mode=ro", uri=True)
+    try:
+        if not arquivo.execute("SELECT 1 FROM sqlite_master WHERE name = 'ordens_servico'").fetchone():
+            return
+        linhas = arquivo.execute(f"""
+            SELECT r.id, {", ".join(_expr_kpi_diario("r"))} FROM ordens_servico r
+            WHERE r.data_hora IS NOT NULL AND r.equipamento_id IS NOT NULL
+        """).fetchall()
     finally:
-        conn.close()
+        arquivo.close()
+    # Ordem que ainda está no banco principal (arquivamento interrompido) já foi somada acima
+    ativas = {linha[0] for linha in cursor.execute("SELECT id FROM ordens_servico").fetchall()}
+    cursor.executemany(f"""
+        INSERT INTO kpi_diario ({", ".join(COLUNAS_KPI_DIARIO)})
+        VALUES ({", ".join("?" * len(COLUNAS_KPI_DIARIO))}) {_UPSERT_KPI_DIARIO}
+    """, [linha[1:] for linha in linhas if linha[0] not in ativas])
+
+
+def _m012_rollup_indicadores(cursor):
+    """
+    Tabela kpi_diario (dia x equipamento x turno) mantida por triggers: a tela de
+    Indicadores soma o rollup em vez de recarregar todas as ordens do período.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS kpi_diario (
+            dia TEXT NOT NULL,
+            equipamento_id INTEGER NOT NULL,
+            turno TEXT NOT NULL,
+            ordens INTEGER NOT NULL DEFAULT 0,
+            falhas INTEGER NOT NULL DEFAULT 0,
+            falhas_encerradas INTEGER NOT NULL DEFAULT 0,
+            horas_reparo REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (dia, equipamento_id, turno)
+        ) WITHOUT ROWID
+    """)
+    campos = "data_hora, data_encerramento, classificacao, maquina_parada, equipamento_id"
+    mudou = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in campos.split(", "))
+    triggers = {
+        "trg_kpi_diario_insert": f"""AFTER INSERT ON ordens_servico
+            BEGIN {_sql_kpi_diario('NEW', 1)}
+        END""",
+        "trg_kpi_diario_delete": f"""AFTER DELETE ON ordens_servico
+            BEGIN {_sql_kpi_diario('OLD', -1)}
+        END""",
+        # Encerrar, reabrir ou reclassificar uma ordem move sua contribuição
+        "trg_kpi_diario_update": f"""AFTER UPDATE OF {campos} ON ordens_servico
+            WHEN {mudou}
+            BEGIN {_sql_kpi_diario('OLD', -1)}{_sql_kpi_diario('NEW', 1)}
+        END""",
+    }
+    for nome, corpo in triggers.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nome}")
+        cursor.execute(f"CREATE TRIGGER {nome} {corpo}")
+
+    recalcular_kpi_diario(cursor)
+
+
+def _m013_fato_eficiencia(cursor):
+    """
+    Histórico da Eficiência de Apontamentos (PIMS x RH): uma linha por matrícula x dia,
+    gravada a cada importação (dia repetido é substituído pela exportação mais nova).
+    A tela consulta qualquer período daqui sem reprocessar as planilhas.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fato_eficiencia (
+            matricula TEXT NOT NULL,
+            dt_ref TEXT NOT NULL,
+            nome TEXT,
+            setor TEXT,
+            turma TEXT,
+            esc_h TEXT,
+            real_h TEXT,
+            h_real_liq REAL NOT NULL DEFAULT 0,
+            horas_dec REAL NOT NULL DEFAULT 0,
+            horas_prod REAL NOT NULL DEFAULT 0,
+            horas_improd REAL NOT NULL DEFAULT 0,
+            apontou_refeicao TEXT NOT NULL DEFAULT 'Não',
+            falta_refeicao INTEGER NOT NULL DEFAULT 0,
+            status TEXT,
+            eficiencia_geral REAL NOT NULL DEFAULT 0,
+            importado_em TEXT,
+            PRIMARY KEY (matricula, dt_ref)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fato_eficiencia_dt_ref ON fato_eficiencia (dt_ref)")
+
+    # Horas improdutivas por operação (Raio-X da Improdutividade)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fato_eficiencia_improd (
+            matricula TEXT NOT NULL,
+            dt_ref TEXT NOT NULL,
+            operacao_nome TEXT NOT NULL,
+            horas REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (matricula, dt_ref, operacao_nome)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fato_eficiencia_improd_dt_ref ON fato_eficiencia_improd (dt_ref)")
+
+
+def _m014_jobs_relatorios(cursor):
+    """Relatórios gerados em segundo plano (jobs_relatorios.py): situação, progresso e arquivos prontos."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs_relatorios (
+            id TEXT PRIMARY KEY,
+            pagina TEXT NOT NULL,
+            funcao TEXT NOT NULL,
+            titulo TEXT,
+            usuario TEXT,
+            status TEXT NOT NULL,
+            progresso REAL NOT NULL DEFAULT 0,
+            mensagem TEXT,
+            artefatos TEXT,
+            erro TEXT,
+            criado_em TEXT NOT NULL,
+            iniciado_em TEXT,
+            concluido_em TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_relatorios_criado ON jobs_relatorios (criado_em)")
+
+
+MIGRACOES = [
+    (1, "Estrutura base (tabelas e colunas legadas)", _m001_estrutura_base),
+    (2, "Dados padrão (tipos de operação, cores, admin)", _m002_dados_padrao),
+    (3, "Índices compostos e parciais das consultas quentes", _m003_indices_consultas),
+    (4, "Datas no formato canônico AAAA-MM-DD HH:MM:SS", _m004_datas_canonicas),
+    (5, "Contadores do painel (kpi_counters) mantidos por triggers", _m005_contadores_painel),
+    (6, "Versão de dados por tabela (tabela_versoes) para o cache de consultas", _m006_versoes_tabelas),
+    (7, "Feed de alterações de ordens_servico (row_version, updated_at, exclusões)", _m007_feed_alteracoes_os),
+    (8, "Índice de busca por OS oficial", _m008_indices_busca),
+    (9, "Busca textual FTS5 (ordens, auditoria, recados)", _m009_busca_texto),
+    (10, "Tabela perf_queries do perfil de consultas", _m010_perfil_consultas),
+    (11, "Limites do arquivo morto (arquivo_limites)", _m011_arquivo_morto),
+    (12, "Rollup diário dos indicadores (kpi_diario) mantido por triggers", _m012_rollup_indicadores),
+    (13, "Histórico da eficiência de apontamentos (fato_eficiencia)", _m013_fato_eficiencia),
+    (14, "Relatórios gerados em segundo plano (jobs_relatorios)", _m014_jobs_relatorios),
+]
+
+
+# ==============================================================================
+# EXECUTOR
+# ==============================================================================
+def versao_atual(conn):
+    """Versão do schema registrada no banco (0 se nunca migrado)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            versao INTEGER PRIMARY KEY,
+            descricao TEXT,
+            aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    return conn.execute("SELECT COALESCE(MAX(versao), 0) FROM schema_version").fetchone()[0]
+
+
+def aplicar_migracoes(conn):
+    """
+    Aplica, em ordem, as migrações ainda não registradas em `schema_version`.
+    Cada migração roda em sua própria transação (BEGIN IMMEDIATE), então outro
+    processo que tente migrar ao mesmo tempo espera e depois não repete o trabalho.
+    Retorna a lista de versões aplicadas.
+    """
+    aplicadas = []
+    pendentes = [m for m in MIGRACOES if m[0] > versao_atual(conn)]
+    for versao, descricao, funcao in pendentes:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Relê dentro do lock: outro processo pode ter aplicado enquanto esperávamos
+            ja_aplicada = conn.execute("SELECT 1 FROM schema_version WHERE versao = ?", (versao,)).fetchone()
+            if not ja_aplicada:
+                funcao(conn.cursor())
+                conn.execute("INSERT INTO schema_version (versao, descricao) VALUES (?, ?)", (versao, descricao))
+                aplicadas.append(versao)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        if not ja_aplicada:
+            logger.info(f"Migração {versao:03d} aplicada: {descricao}")
+    return aplicadas
+
+
+_lock_inicializacao = threading.Lock()
+_banco_inicializado = False
+
+
+def inicializar_banco(forcar=False):
+    """
+    Verifica e cria/atualiza a estrutura completa do banco de dados.
+    Execute esta função no início do app.py: só roda uma vez por processo,
+    então as páginas não precisam (e não devem) executar DDL.
+    """
+    global _banco_inicializado
+    if _banco_inicializado and not forcar:
+        return
+    with _lock_inicializacao:
+        if _banco_inicializado and not forcar:
+            return
+        conn = get_connection()
+        try:
+            aplicar_migracoes(conn)
+            logger.info(f"Banco de dados na versão {versao_atual(conn)}.")
+            _banco_inicializado = True
+        except Exception as e:
+            logger.error(f"Erro ao inicializar banco de dados: {e}")
+            raise
+        finally:
+            conn.close()
 
 
 if __name__ == "__main__":
     # Permite rodar este arquivo diretamente para forçar atualização
-    inicializar_banco()
\ No newline at end of file
+    inicializar_banco(forcar=True)
@@ -0,0 +1,466 @@
+"""
+Relatórios pesados (PDF/Excel) gerados em segundo plano, num pool de processos.
+
+As funções que montam os relatórios (gráficos do matplotlib, avatares, centenas de
+páginas FPDF) rodavam dentro da execução da página: a tela ficava parada até o PDF
+sair. Agora a página só envia o pedido e segue; um processo do pool gera os arquivos,
+a situação e o progresso ficam na tabela jobs_relatorios e os arquivos prontos em
+PASTA_ARTEFATOS (uma pasta por job), de onde saem os botões de download.
+
+As funções ficam em módulos importáveis (relatorios_*.py), sem Streamlit, e são
+indicadas por "modulo:funcao". O id do job é o SHA-256 da função (e da versão do
+arquivo do módulo) e dos parâmetros: o mesmo pedido, da mesma ou de outra sessão,
+reaproveita o job em andamento ou já concluído.
+
+    job_id = enviar("relatorios_oleo:gerar_pdf_plano_acao", args=(df,), artefatos=("pdf",))
+    obter(job_id)                   # {'status': 'executando', 'progresso': 0.4, ...}
+    carregar_artefatos(job_id)      # {'pdf': b'%PDF...'} depois de concluído
+
+Dentro da função do relatório, `progresso(0.5, "Gráficos")` atualiza a barra da tela.
+
+O pool não fica no processo do Streamlit: lá o sys.modules['__main__'] é a página em
+execução (de qualquer sessão), e o spawn executaria essa página em cada processo novo.
+`iniciar_servidor()` (chamado pelo app.py) sobe este arquivo como um processo próprio,
+com um __main__ limpo; ele é o dono do pool e pega os jobs da fila (a própria tabela,
+com os parâmetros gravados em PASTA_ARTEFATOS/.fila). O servidor termina quando o
+processo do Streamlit fecha.
+"""
+import importlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from functools import partial
+
+import pandas as pd
+
+from cache_datasets import chave_conteudo
+from database import DB_NAME, FORMATO_DATA_HORA, get_db_connection
+
+PASTA_APP = os.path.dirname(os.path.abspath(__file__))
+# Arquivos prontos (ao lado do banco, salvo configuração)
+PASTA_ARTEFATOS = os.environ.get(
+    "MANUTENCAO_JOBS_ARTEFATOS", os.path.join(os.path.dirname(os.path.abspath(DB_NAME)), "relatorios_gerados"))
+# Processos que geram relatórios ao mesmo tempo (o resto espera na fila)
+MAX_PROCESSOS = int(os.environ.get("MANUTENCAO_JOBS_PROCESSOS", "2"))
+# Cada processo do pool é trocado depois de tantos relatórios (devolve a memória do matplotlib)
+TAREFAS_POR_PROCESSO = int(os.environ.get("MANUTENCAO_JOBS_TAREFAS_POR_PROCESSO", "20"))
+# Horas que um job concluído (e seus arquivos) fica disponível para reaproveitamento
+RETENCAO_H = float(os.environ.get("MANUTENCAO_JOBS_RETENCAO_H", "24"))
+INTERVALO_LIMPEZA_S = 600
+# Segundos entre leituras da fila pelo servidor (um job novo deste app o acorda na hora)
+INTERVALO_FILA_S = 5
+
+NA_FILA, EXECUTANDO, CONCLUIDO, ERRO = "na_fila", "executando", "concluido", "erro"
+
+_servidor = None  # subprocess.Popen do servidor de relatórios deste processo
+_lock = threading.RLock()  # RLock: _avisar_servidor chama iniciar_servidor
+_ultima_limpeza = 0.0
+
+# --- Estado do servidor ---
+_acordar = threading.Event()
+_futuros = {}  # id -> Future dos jobs enviados ao pool
+
+# --- Estado do processo do pool ---
+_modulos = {}  # nome -> mtime do arquivo quando foi importado
+_job_atual = None
+
+
+def _agora():
+    return datetime.now().strftime(FORMATO_DATA_HORA)
+
+
+def _pasta(job_id):
+    return os.path.join(PASTA_ARTEFATOS, job_id)
+
+
+def _entrada(job_id):
+    """Arquivo com (funcao, args, kwargs, artefatos) do job, lido pelo processo do pool."""
+    return os.path.join(PASTA_ARTEFATOS, ".fila", f"{job_id}.pkl")
+
+
+def _remover_entrada(job_id):
+    if os.path.exists(_entrada(job_id)):
+        os.remove(_entrada(job_id))
+
+
+# ==============================================================================
+# TABELA jobs_relatorios
+# ==============================================================================
+def _atualizar(job_id, **campos):
+    conn = get_db_connection()
+    try:
+        conn.execute(f"UPDATE jobs_relatorios SET {', '.join(f'{c} = ?' for c in campos)} WHERE id = ?",
+                     [*campos.values(), job_id])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _apagar(ids):
+    conn = get_db_connection()
+    try:
+        conn.executemany("DELETE FROM jobs_relatorios WHERE id = ?", [(i,) for i in ids])
+        conn.commit()
+    finally:
+        conn.close()
+    for job_id in ids:
+        shutil.rmtree(_pasta(job_id), ignore_errors=True)
+        _remover_entrada(job_id)
+
+
+def obter(job_id):
+    """Linha do job como dict (status, progresso, mensagem, erro, ...), ou None se não existir."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute("SELECT * FROM jobs_relatorios WHERE id = ?", (job_id,))
+        linha = cursor.fetchone()
+        return None if linha is None else dict(zip([c[0] for c in cursor.description], linha))
+    finally:
+        conn.close()
+
+
+def carregar_artefatos(job_id):
+    """{nome: bytes} de um job concluído, ou None (não concluído ou arquivos já apagados)."""
+    job = obter(job_id)
+    if job is None or job["status"] != CONCLUIDO:
+        return None
+    arquivos = {}
+    try:
+        for nome in json.loads(job["artefatos"] or "[]"):
+            with open(os.path.join(_pasta(job_id), nome), "rb") as f:
+                arquivos[nome] = f.read()
+    except FileNotFoundError:
+        return None
+    return arquivos
+
+
+def _limpar_antigos():
+    """Apaga jobs (e arquivos) criados há mais de RETENCAO_H horas; roda no máximo a cada INTERVALO_LIMPEZA_S."""
+    global _ultima_limpeza
+    if time.monotonic() - _ultima_limpeza < INTERVALO_LIMPEZA_S:
+        return
+    _ultima_limpeza = time.monotonic()
+    limite = (datetime.now() - timedelta(hours=RETENCAO_H)).strftime(FORMATO_DATA_HORA)
+    conn = get_db_connection()
+    try:
+        antigos = [i for (i,) in conn.execute("SELECT id FROM jobs_relatorios WHERE criado_em < ? AND status NOT IN (?, ?)",
+                                              (limite, NA_FILA, EXECUTANDO))]
+    finally:
+        conn.close()
+    if antigos:
+        _apagar(antigos)
+
+
+# ==============================================================================
+# ENVIO (processo do Streamlit)
+# ==============================================================================
+def _parte_chave(valor):
+    if isinstance(valor, pd.DataFrame):
+        try:
+            # Hash do conteúdo: o pickle de dois DataFrames iguais nem sempre é igual byte a byte
+            return (repr(list(valor.columns)) + repr(list(valor.dtypes.astype(str)))).encode() + \
+                pd.util.hash_pandas_object(valor, index=True).to_numpy().tobytes()
+        except TypeError:
+            pass
+    return pickle.dumps(valor)
+
+
+def _arquivo_modulo(funcao):
+    modulo = funcao.split(":")[0]
+    spec = importlib.util.find_spec(modulo)
+    if spec is None or not spec.origin:
+        raise ValueError(f"Módulo do relatório não encontrado: {modulo}")
+    return spec.origin
+
+
+def chave_job(funcao, args=(), kwargs=None):
+    """Id do job: mesma função "modulo:funcao" (e versão do arquivo), parâmetros -> mesmo id."""
+    partes = [funcao, str(os.path.getmtime(_arquivo_modulo(funcao)))]
+    partes += [_parte_chave(a) for a in args]
+    for nome in sorted(kwargs or {}):
+        partes += [nome, _parte_chave(kwargs[nome])]
+    return chave_conteudo(*partes)
+
+
+def iniciar_servidor():
+    """
+    Sobe o servidor de relatórios deste processo, se ainda não estiver rodando (chamado
+    pelo app.py na subida e, por garantia, a cada envio). É um subprocess, não um
+    multiprocessing: nada do __main__ do Streamlit vai para lá.
+    """
+    global _servidor
+    with _lock:
+        if _servidor is None or _servidor.poll() is not None:
+            # A entrada padrão fica aberta enquanto este processo viver: cada linha avisa de um job novo
+            _servidor = subprocess.Popen([sys.executable, os.path.join(PASTA_APP, "jobs_relatorios.py")],
+                                         stdin=subprocess.PIPE)
+        return _servidor
+
+
+def _avisar_servidor():
+    """Acorda o servidor para ler a fila agora."""
+    global _servidor
+    with _lock:
+        try:
+            servidor = iniciar_servidor()
+            servidor.stdin.write(b"\n")
+            servidor.stdin.flush()
+        except OSError:
+            # O servidor acabou de morrer: o próximo lê a fila inteira ao subir
+            _servidor = None
+            iniciar_servidor()
+
+
+def _gravar_entrada(job_id, entrada):
+    pasta = os.path.dirname(_entrada(job_id))
+    os.makedirs(pasta, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(suffix=".parcial", dir=pasta)
+    try:
+        with os.fdopen(descritor, "wb") as f:
+            pickle.dump(entrada, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, _entrada(job_id))
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def enviar(funcao, args=(), kwargs=None, artefatos=(), titulo="", usuario=None, substitui=None):
+    """
+    Pede a geração de `funcao(*args, **kwargs)`, indicada como "modulo:funcao" (ex.:
+    "relatorios_oleo:gerar_pdf_plano_acao"), e retorna o id do job na hora. O resultado (um valor ou uma tupla) é gravado na ordem
+    de `artefatos`; nome None descarta aquele valor. Os valores gravados devem ser bytes.
+
+    Mesmo pedido na fila, em andamento, concluído ou com erro reaproveita o job existente
+    (o erro fica visível até ser descartado). `substitui`: job anterior da mesma tela,
+    cancelado se ainda estiver na fila (o filtro mudou antes de ele começar).
+    """
+    kwargs = kwargs or {}
+    job_id = chave_job(funcao, args, kwargs)
+    if substitui and substitui != job_id:
+        cancelar(substitui)
+    # Um servidor novo (o anterior morreu) marca como erro os jobs que estavam executando
+    iniciar_servidor()
+
+    with _lock:
+        job = obter(job_id)
+        if job is not None and (job["status"] in (NA_FILA, EXECUTANDO, ERRO) or
+                                (job["status"] == CONCLUIDO and os.path.isdir(_pasta(job_id)))):
+            return job_id
+        _limpar_antigos()
+        _gravar_entrada(job_id, (funcao, tuple(args), kwargs, tuple(artefatos)))
+        conn = get_db_connection()
+        try:
+            conn.execute("""
+                INSERT OR REPLACE INTO jobs_relatorios (id, pagina, funcao, titulo, usuario, status, progresso, criado_em)
+                VALUES (?, ?, ?, ?, ?, ?, 0, ?)
+            """, (job_id, *funcao.split(":"), titulo, usuario, NA_FILA, _agora()))  # pagina = módulo
+            conn.commit()
+        finally:
+            conn.close()
+    _avisar_servidor()
+    return job_id
+
+
+def cancelar(job_id):
+    """Cancela o job se ainda estiver na fila (o que já começou vai até o fim)."""
+    conn = get_db_connection()
+    try:
+        cancelado = conn.execute("DELETE FROM jobs_relatorios WHERE id = ? AND status = ?",
+                                 (job_id, NA_FILA)).rowcount > 0
+        conn.commit()
+    finally:
+        conn.close()
+    if cancelado:
+        _apagar([job_id])
+    return cancelado
+
+
+def descartar(job_id):
+    """Apaga o job e seus arquivos (ex.: 'tentar de novo' depois de um erro)."""
+    _apagar([job_id])
+
+
+# ==============================================================================
+# SERVIDOR (processo próprio, dono do pool)
+# ==============================================================================
+def _iniciar_processo():
+    """Processo do pool: sai junto com o servidor, mesmo se ele for morto sem aviso."""
+    servidor = multiprocessing.parent_process()
+    threading.Thread(target=lambda: (servidor.join(), os._exit(1)), name="vigia-servidor", daemon=True).start()
+
+
+def _novo_pool():
+    # spawn: o servidor tem threads (fork copiaria locks presos). Aqui o __main__ é este
+    # arquivo (com a guarda abaixo), então o pool pode trocar processos sozinho
+    return ProcessPoolExecutor(max_workers=MAX_PROCESSOS, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_iniciar_processo, max_tasks_per_child=TAREFAS_POR_PROCESSO)
+
+
+def _interromper_orfaos():
+    """Jobs 'executando' de um servidor anterior (que morreu no meio) viram erro."""
+    conn = get_db_connection()
+    try:
+        orfaos = [i for (i,) in conn.execute("SELECT id FROM jobs_relatorios WHERE status = ?", (EXECUTANDO,))]
+        conn.executemany("UPDATE jobs_relatorios SET status = ?, erro = ?, concluido_em = ? WHERE id = ?",
+                         [(ERRO, "Interrompido: o servidor de relatórios foi reiniciado", _agora(), i) for i in orfaos])
+        conn.commit()
+    finally:
+        conn.close()
+    for job_id in orfaos:
+        _remover_entrada(job_id)
+
+
+def _na_fila():
+    conn = get_db_connection()
+    try:
+        return [i for (i,) in conn.execute("SELECT id FROM jobs_relatorios WHERE status = ? ORDER BY criado_em",
+                                           (NA_FILA,))]
+    finally:
+        conn.close()
+
+
+def _finalizado(job_id, futuro):
+    _futuros.pop(job_id, None)
+    erro = None if futuro.cancelled() else futuro.exception()
+    if erro is None:
+        return
+    # O processo morreu (falta de memória...): o job que executava vira erro; os que
+    # estavam só esperando no pool quebrado continuam na fila e vão para o pool novo
+    conn = get_db_connection()
+    try:
+        interrompido = conn.execute(
+            "UPDATE jobs_relatorios SET status = ?, erro = ?, concluido_em = ? WHERE id = ? AND status = ?",
+            (ERRO, f"{type(erro).__name__}: {erro}", _agora(), job_id, EXECUTANDO)).rowcount > 0
+        conn.commit()
+    finally:
+        conn.close()
+    if interrompido:
+        _remover_entrada(job_id)
+    _acordar.set()
+
+
+def _ler_avisos(fim):
+    """Cada linha na entrada padrão é um job novo; o fim da entrada é o fim do processo do Streamlit."""
+    for _ in sys.stdin.buffer:
+        _acordar.set()
+    fim.set()
+    _acordar.set()
+
+
+def _servir():
+    """Laço do servidor: envia ao pool os jobs na fila, até o processo do Streamlit fechar."""
+    fim = threading.Event()
+    threading.Thread(target=_ler_avisos, args=(fim,), name="avisos-relatorios", daemon=True).start()
+    _interromper_orfaos()
+    pool = None
+    while not fim.is_set():
+        _acordar.clear()
+        for job_id in _na_fila():
+            if job_id in _futuros:
+                continue
+            if pool is None:
+                pool = _novo_pool()
+            try:
+                futuro = pool.submit(_executar, job_id)
+            except (BrokenProcessPool, RuntimeError):
+                # Um processo do pool morreu: o executor fica inutilizável, cria outro
+                pool.shutdown(wait=False)
+                pool = _novo_pool()
+                futuro = pool.submit(_executar, job_id)
+            _futuros[job_id] = futuro
+            futuro.add_done_callback(partial(_finalizado, job_id))
+        _acordar.wait(INTERVALO_FILA_S)
+    if pool is not None:
+        # O que está na fila fica para o próximo servidor; o que já começou termina
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+# ==============================================================================
+# EXECUÇÃO (processo do pool)
+# ==============================================================================
+def _funcao(referencia):
+    """Função "modulo:funcao"; o módulo é recarregado se o arquivo mudou desde que foi importado."""
+    nome_modulo, nome = referencia.split(":")
+    modulo = importlib.import_module(nome_modulo)
+    mtime = os.path.getmtime(modulo.__file__)
+    if _modulos.setdefault(nome_modulo, mtime) != mtime:
+        modulo = importlib.reload(modulo)
+        _modulos[nome_modulo] = mtime
+    return getattr(modulo, nome)
+
+
+def progresso(fracao, mensagem=None):
+    """Atualiza a barra (0 a 1) do job em execução. Fora de um job não faz nada."""
+    if _job_atual is not None:
+        _atualizar(_job_atual, progresso=max(0.0, min(1.0, float(fracao))), mensagem=mensagem)
+
+
+def _gravar_artefatos(job_id, arquivos):
+    """Grava {nome: bytes} na pasta do job de uma vez (quem lê nunca vê a pasta pela metade)."""
+    os.makedirs(PASTA_ARTEFATOS, exist_ok=True)
+    temporaria = tempfile.mkdtemp(prefix=".gravando-", dir=PASTA_ARTEFATOS)
+    try:
+        gravados = []
+        for nome, dados in arquivos.items():
+            if nome is None or dados is None:  # Valor descartado ou arquivo não gerado (ex.: sem openpyxl)
+                continue
+            with open(os.path.join(temporaria, nome), "wb") as f:
+                f.write(bytes(dados))
+            gravados.append(nome)
+        shutil.rmtree(_pasta(job_id), ignore_errors=True)
+        os.replace(temporaria, _pasta(job_id))
+    finally:
+        shutil.rmtree(temporaria, ignore_errors=True)
+    return gravados
+
+
+def _assumir(job_id):
+    """Passa o job de 'na_fila' para 'executando'; False se ele foi cancelado (ou já assumido) antes."""
+    conn = get_db_connection()
+    try:
+        assumido = conn.execute("UPDATE jobs_relatorios SET status = ?, iniciado_em = ? WHERE id = ? AND status = ?",
+                                (EXECUTANDO, _agora(), job_id, NA_FILA)).rowcount > 0
+        conn.commit()
+    finally:
+        conn.close()
+    return assumido
+
+
+def _executar(job_id):
+    global _job_atual
+    if not _assumir(job_id):
+        return
+    _job_atual = job_id
+    try:
+        with open(_entrada(job_id), "rb") as f:
+            funcao, args, kwargs, artefatos = pickle.load(f)
+        resultado = _funcao(funcao)(*args, **kwargs)
+        if not isinstance(resultado, tuple):
+            resultado = (resultado,)
+        gravados = _gravar_artefatos(job_id, dict(zip(artefatos, resultado)))
+        _atualizar(job_id, status=CONCLUIDO, progresso=1.0, mensagem=None, artefatos=json.dumps(gravados),
+                   concluido_em=_agora())
+    except Exception as e:
+        traceback.print_exc()
+        _atualizar(job_id, status=ERRO, erro=f"{type(e).__name__}: {e}", concluido_em=_agora())
+    finally:
+        _job_atual = None
+        _remover_entrada(job_id)
+
+
+if __name__ == "__main__":
+    # Pelo nome do módulo (e não deste __main__), para o pool e os relatórios verem o mesmo jobs_relatorios
+    import jobs_relatorios
+    jobs_relatorios._servir()
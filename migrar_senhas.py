@@ -1,8 +1,8 @@
-import sqlite3
+from database import get_db_connection
 from utils_senha import hash_senha
 
 def migrar_banco():
-    conn = sqlite3.connect("manutencao.db")
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     print("Iniciando migração de senhas...")
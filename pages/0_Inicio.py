@@ -7,7 +7,7 @@ from datetime import datetime
 # --- BLINDAGEM DE IMPORTAÇÃO ---
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from database import get_db_connection
+import snapshot_inicio
 from utils_ui import load_custom_css
 from utils_icons import get_icon
 
@@ -120,42 +120,11 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# --- 2. DADOS (SEM CACHE) ---
-def get_data():
-    conn = get_db_connection()
-    try:
-        # Contadores
-        q_aberta = conn.execute("SELECT COUNT(*) FROM ordens_servico WHERE status != 'Concluído'").fetchone()[0]
-        q_parada = conn.execute(
-            "SELECT COUNT(*) FROM ordens_servico WHERE status != 'Concluído' AND maquina_parada = 1").fetchone()[0]
-        q_recados = conn.execute("SELECT COUNT(*) FROM recados").fetchone()[0]
-
-        # Dataframes para os Popups (CORRIGIDO AQUI: 'os.id' para evitar ambiguidade)
-
-        # 1. Pendências
-        df_ab = pd.read_sql("""
-            SELECT os.id, e.frota, os.descricao, os.data_hora, os.prioridade, os.status 
-            FROM ordens_servico os 
-            JOIN equipamentos e ON os.equipamento_id = e.id 
-            WHERE os.status != 'Concluído' 
-            ORDER BY os.prioridade = 'Alta' DESC, os.data_hora DESC LIMIT 20
-        """, conn)
-
-        # 2. Paradas
-        df_pa = pd.read_sql("""
-            SELECT os.id, e.frota, os.descricao, os.data_hora 
-            FROM ordens_servico os 
-            JOIN equipamentos e ON os.equipamento_id = e.id 
-            WHERE os.status != 'Concluído' AND os.maquina_parada = 1 
-            ORDER BY os.data_hora DESC
-        """, conn)
-
-        return q_aberta, q_parada, q_recados, df_ab, df_pa
-    finally:
-        conn.close()
-
-
-q_aberta, q_parada, q_recados, df_aberta, df_parada = get_data()
+# --- 2. DADOS (SNAPSHOT ÚNICO DO PROCESSO, atualizado em segundo plano quando os dados mudam) ---
+# Todas as sessões (TVs da oficina, popups) leem o mesmo snapshot: nenhuma consulta por rerun
+snapshot = snapshot_inicio.obter()
+q_aberta, q_parada, q_recados = snapshot.q_aberta, snapshot.q_parada, snapshot.q_recados
+df_aberta, df_parada = snapshot.df_aberta, snapshot.df_parada
 
 
 # --- 3. DIALOGS (POPUPS) ---
@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 import sqlite3
-from database import get_db_connection
+from database import get_db_connection, FORMATO_DATA_HORA
 from datetime import datetime
 import pytz # Importante
 
@@ -59,7 +59,7 @@ if df.empty: st.info("Nenhum recado.")
 else:
     for index, row in df.iterrows():
         try:
-            dt_obj = pd.to_datetime(row['data_hora'])
+            dt_obj = datetime.strptime(row['data_hora'], FORMATO_DATA_HORA)
             data_fmt = dt_obj.strftime('%d/%m às %H:%M')
         except: data_fmt = str(row['data_hora'])
 
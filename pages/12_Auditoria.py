@@ -1,6 +1,17 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
+import sys
+import os
+
+# --- BLINDAGEM DE IMPORTAÇÃO ---
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import FORMATO_DATA_HORA
+from repository import AuditoriaRepository
+from utils_ui import cursor_pagina_atual, ui_paginacao
+from utils_log import descarregar as descarregar_logs
+
+LOGS_POR_PAGINA = 100
 
 # OBS: NÃO importe 'autenticacao' aqui. O login já foi feito no app.py.
 
@@ -15,64 +26,45 @@ if user_atual != "admin":
     st.error("⛔ Acesso Restrito: Apenas administradores podem ver os logs de auditoria.")
     st.stop() # Para a execução aqui se não for admin
 
-def get_db_connection():
-    conn = sqlite3.connect("manutencao.db")
-    return conn
-
 # --- 2. FILTROS DE BUSCA ---
 with st.expander("🔎 Filtros de Busca Avançada", expanded=True):
     col1, col2, col3 = st.columns(3)
     
-    conn = get_db_connection()
     # Carrega listas únicas para os filtros
     try:
-        users_list = pd.read_sql("SELECT DISTINCT usuario FROM audit_logs ORDER BY usuario", conn)['usuario'].tolist()
-        actions_list = pd.read_sql("SELECT DISTINCT acao FROM audit_logs ORDER BY acao", conn)['acao'].tolist()
+        users_list, actions_list = AuditoriaRepository.get_filtros()
     except:
         users_list = []
         actions_list = []
-    finally:
-        conn.close()
         
     filtro_user = col1.multiselect("Filtrar por Usuário:", options=users_list)
     filtro_acao = col2.multiselect("Filtrar por Ação:", options=actions_list)
-    filtro_texto = col3.text_input("Buscar em Detalhes (ex: número da OS, placa, frota)")
+    filtro_texto = col3.text_input("Buscar em Detalhes (ex: número da OS, placa, frota)",
+                                   help="Busca por palavras, sem diferenciar acentos (ex: 'eletrica' acha 'Elétrica').")
 
-# --- 3. CONSULTA AO BANCO ---
-query = "SELECT * FROM audit_logs WHERE 1=1"
-params = []
+# --- 3. CONSULTA AO BANCO (PÁGINA A PÁGINA) ---
+# Paginação por cursor (data_hora, id): qualquer registro antigo é alcançável e cada página custa o mesmo
+filtros = (tuple(filtro_user), tuple(filtro_acao), filtro_texto)
+cursor_atual = cursor_pagina_atual("auditoria_paginas", filtros)
+proximo_cursor = None
 
-if filtro_user:
-    query += f" AND usuario IN ({','.join(['?']*len(filtro_user))})"
-    params.extend(filtro_user)
+# Logs ainda na fila de gravação (utils_log) entram na listagem
+descarregar_logs()
 
-if filtro_acao:
-    query += f" AND acao IN ({','.join(['?']*len(filtro_acao))})"
-    params.extend(filtro_acao)
-
-if filtro_texto:
-    query += " AND (alvo LIKE ? OR detalhes LIKE ?)"
-    term = f"%{filtro_texto}%"
-    params.extend([term, term])
-
-query += " ORDER BY data_hora DESC LIMIT 1000" # Limite de segurança
-
-conn = get_db_connection()
 try:
-    df_logs = pd.read_sql_query(query, conn, params=params)
+    df_logs, proximo_cursor = AuditoriaRepository.listar_pagina(
+        filtro_user, filtro_acao, filtro_texto, apos=cursor_atual, tamanho=LOGS_POR_PAGINA)
 except Exception as e:
     st.error(f"Erro ao ler logs: {e}")
     df_logs = pd.DataFrame()
-finally:
-    conn.close()
 
 # --- 4. VISUALIZAÇÃO ---
 if df_logs.empty:
     st.info("Nenhum registro encontrado com os filtros atuais.")
 else:
-    # --- TRATAMENTO DE DATAS ROBUSTO ---
-    # format='mixed' garante que o Pandas leia tanto datas com milissegundos quanto sem
-    df_logs['data_hora'] = pd.to_datetime(df_logs['data_hora'], format='mixed', dayfirst=True, errors='coerce')
+    # --- TRATAMENTO DE DATAS ---
+    # Datas gravadas sempre como 'AAAA-MM-DD HH:MM:SS' (migração 004), então o formato é fixo
+    df_logs['data_hora'] = pd.to_datetime(df_logs['data_hora'], format=FORMATO_DATA_HORA, errors='coerce')
     
     # Formata para exibição brasileira (Dia/Mês/Ano Hora:Min:Seg)
     # Como removemos o tzinfo na hora de salvar (no utils_log), aqui ele exibe exatamente o que salvou (Hora Local)
@@ -94,4 +86,6 @@ else:
         }
     )
     
-    st.caption(f"Mostrando os últimos {len(df_logs)} registros encontrados.")
+    st.caption(f"Mostrando {len(df_logs)} registros nesta página.")
+
+ui_paginacao("auditoria_paginas", proximo_cursor)
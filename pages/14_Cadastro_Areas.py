@@ -49,7 +49,6 @@ with tab_novo:
                 )
                 conn.commit()
                 st.success(f"✅ Área {codigo_novo} cadastrada com sucesso!")
-                st.cache_data.clear()
             except sqlite3.IntegrityError:
                 st.error("Erro: Já existe uma área com este código.")
             except Exception as e:
@@ -106,7 +105,6 @@ with tab_importar:
                     conn.commit()
                     conn.close()
                     st.success(f"Concluído! ✅ {sucessos} novos, ⚠️ {duplicados} duplicados.")
-                    if sucessos > 0: st.cache_data.clear()
                         
         except Exception as e:
             st.error(f"Erro ao ler arquivo: {e}")
@@ -12,6 +12,8 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from database import get_db_connection
 from datetime import datetime, time, timedelta
 from utils_pdf import gerar_relatorio_kpi
+from repository import IndicadoresRepository
+from utils_intervalos import unir_intervalos
 
 st.set_page_config(layout="wide", page_title="Indicadores de Confiabilidade")
 st.title("📈 Indicadores de Performance & Turnos")
@@ -56,19 +58,6 @@ def exibir_card(col, titulo, valor, icone, cor_borda, subtexto="", tooltip=""):
     col.markdown(html_content, unsafe_allow_html=True)
 
 
-# --- LÓGICA DE TURNOS ---
-def classificar_turno(dt):
-    if pd.isnull(dt): return "N/A"
-    hora_float = dt.hour + dt.minute / 60.0
-
-    if 6.5 <= hora_float < 15.0:
-        return "Turno A (Manhã)"
-    elif 15.0 <= hora_float < 23.0:
-        return "Turno B (Tarde)"
-    else:
-        return "Turno C (Noite)"
-
-
 # --- DEFINIÇÃO DE CORES DOS TURNOS ---
 CORES_TURNOS = {
     "Turno A (Manhã)": "#2ECC71",  # Verde
@@ -112,70 +101,45 @@ with st.sidebar:
     conn.close()
 
 
-# --- 2. CARREGAR E PROCESSAR DADOS ---
-def carregar_dados():
-    conn = get_db_connection()
-    query = """
-    SELECT 
-        os.id as Ticket, 
-        e.frota, e.modelo, os.data_hora as abertura, os.data_encerramento as fechamento,
-        os.classificacao, os.maquina_parada, op.nome as tipo_servico,
-        f_solic.nome as solicitante
-    FROM ordens_servico os
-    JOIN equipamentos e ON os.equipamento_id = e.id
-    JOIN tipos_operacao op ON os.tipo_operacao_id = op.id
-    LEFT JOIN funcionarios f_solic ON os.solicitante_id = f_solic.id
-    WHERE os.data_hora BETWEEN ? AND ?
-    """
-    params = [dt_inicio, datetime.combine(dt_fim, datetime.max.time())]
-    if filtro_modelo:
-        query += f" AND e.modelo IN ({','.join(['?'] * len(filtro_modelo))})"
-        params.extend(filtro_modelo)
-    if filtro_frota:
-        query += f" AND e.frota IN ({','.join(['?'] * len(filtro_frota))})"
-        params.extend(filtro_frota)
-
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
-    return df
-
-
-df = carregar_dados()
+# --- 2. CARREGAR DADOS ---
+# Resumo por dia x frota x modelo x turno (rollup kpi_diario, mantido por triggers) para
+# contagens e gráficos por turno/máquina. O turno é classificado no próprio SQL.
+filtros = dict(modelos=filtro_modelo, frotas=filtro_frota, turnos=turnos_selecionados)
+df_resumo = IndicadoresRepository.resumo_diario(dt_inicio, dt_fim, **filtros)
 
-if df.empty:
+if df_resumo.empty:
     st.warning("Sem dados para o período selecionado.")
     st.stop()
 
-# Tratamento
-df['abertura'] = pd.to_datetime(df['abertura'], format='mixed', errors='coerce')
-df['fechamento'] = pd.to_datetime(df['fechamento'], format='mixed', errors='coerce')
-df['Turno'] = df['abertura'].apply(classificar_turno)
-
-if turnos_selecionados:
-    df = df[df['Turno'].isin(turnos_selecionados)]
+# Falhas uma a uma: tempo parado, gráficos de detalhe, tabela e PDF
+df_falhas = IndicadoresRepository.listar_falhas(dt_inicio, dt_fim, **filtros)
+df_resumo_falhas = df_resumo[df_resumo['falhas'] > 0]
 
+# Paradas: ordens sobrepostas na mesma máquina (mecânico + eletricista) contam uma vez só,
+# recortadas ao período analisado
 agora = datetime.now()
-df['fechamento_calc'] = df['fechamento'].fillna(agora)
-df['duracao_horas'] = (df['fechamento_calc'] - df['abertura']).dt.total_seconds() / 3600
-
-if 'classificacao' not in df.columns: df['classificacao'] = 'Corretiva'
-if 'maquina_parada' not in df.columns: df['maquina_parada'] = 1
-df['classificacao'] = df['classificacao'].fillna('Corretiva')
-df['maquina_parada'] = df['maquina_parada'].fillna(1).astype(int)
-
-# Separa Falhas
-df_falhas = df[(df['classificacao'].str.contains('Corretiva', case=False)) & (df['maquina_parada'] == 1)].copy()
+df_paradas, rotulos_paradas = unir_intervalos(
+    df_falhas['equipamento_id'], df_falhas['abertura'], df_falhas['fechamento'].fillna(agora),
+    limite_inicio=datetime.combine(dt_inicio, time.min), limite_fim=min(agora, datetime.combine(dt_fim, time.max)))
+df_falhas['inicio_parada'] = df_paradas['inicio'].reindex(rotulos_paradas).to_numpy()
+df_paradas['frota'] = df_paradas['grupo'].map(df_falhas.drop_duplicates('equipamento_id')
+                                               .set_index('equipamento_id')['frota'])
+# Turno da parada = turno da primeira ordem (pela abertura) que entrou nela
+primeira_ordem = (df_falhas.assign(parada=rotulos_paradas).query('parada >= 0')
+                  .sort_values('abertura').drop_duplicates('parada').set_index('parada'))
+df_paradas['turno'] = primeira_ordem['Turno'].reindex(df_paradas.index)
 
 # --- 3. CÁLCULO DE KPIs ---
-num_falhas = len(df_falhas)
-tempo_total_reparo = df_falhas['duracao_horas'].sum()
-num_maquinas = df['frota'].nunique()
+num_falhas = int(df_resumo['falhas'].sum())
+num_paradas = len(df_paradas)
+tempo_total_reparo = df_paradas['horas'].sum()
+num_maquinas = df_resumo['frota'].nunique()
 dias_periodo = (dt_fim - dt_inicio).days + 1
 tempo_total_disponivel = dias_periodo * horas_operacionais_dia * num_maquinas
 
-mttr = (tempo_total_reparo / num_falhas) if num_falhas > 0 else 0
+mttr = (tempo_total_reparo / num_paradas) if num_paradas > 0 else 0
 tempo_operacao = tempo_total_disponivel - tempo_total_reparo
-mtbf = (tempo_operacao / num_falhas) if num_falhas > 0 else tempo_operacao
+mtbf = (tempo_operacao / num_paradas) if num_paradas > 0 else tempo_operacao
 disp = (mtbf / (mtbf + mttr)) * 100 if (mtbf + mttr) > 0 else 100.0
 
 # --- 4. DASHBOARD GLOBAL ---
@@ -185,7 +149,8 @@ c1, c2, c3, c4 = st.columns(4)
 exibir_card(c1, "MTBF", f"{mtbf:.1f} h", "🛡️", "#3B82F6", "Confiabilidade",
             tooltip="Tempo Médio Entre Falhas. Quanto maior, melhor.")
 exibir_card(c2, "MTTR", f"{mttr:.1f} h", "🔧", "#F59E0B", "Agilidade",
-            tooltip="Tempo Médio Para Reparo. Quanto menor, melhor.")
+            tooltip="Tempo Médio Para Reparo por parada (ordens simultâneas na mesma máquina contam uma vez). "
+                    "Quanto menor, melhor.")
 exibir_card(c3, "Disponibilidade", f"{disp:.1f}%", "✅", "#10B981", "Tempo pronta",
             tooltip="% do tempo disponível que a máquina não estava quebrada.")
 exibir_card(c4, "Total de Falhas", num_falhas, "🚨", "#EF4444", "Quebras",
@@ -199,7 +164,7 @@ st.markdown("### 🕒 Análise de Performance")
 # Dicionário para armazenar dados para o PDF
 graficos_para_pdf = {}
 
-if df_falhas.empty:
+if num_falhas == 0:
     st.info("Sem dados de falhas para gerar gráficos.")
 else:
     tab_t1, tab_t2, tab_t4, tab_t3 = st.tabs(
@@ -212,7 +177,9 @@ else:
         col_g1, col_g2 = st.columns(2)
 
         # Volume
-        df_turno_qtd = df_falhas['Turno'].value_counts().reset_index()
+        # Gráficos agregados saem do resumo diário; os de detalhe (mapa de calor, pareto) das falhas
+        por_turno = df_resumo_falhas.groupby('turno')['falhas'].sum()
+        df_turno_qtd = por_turno.sort_values(ascending=False).reset_index()
         df_turno_qtd.columns = ['Turno', 'Qtd']
 
         # Guardar para PDF
@@ -225,9 +192,11 @@ else:
         )
         col_g1.plotly_chart(fig_vol, use_container_width=True)
 
-        # Eficiência
-        df_turno_mttr = df_falhas.groupby('Turno')['duracao_horas'].mean().reset_index()
+        # Eficiência: mesma base do card de MTTR (paradas unidas e recortadas ao período)
+        paradas_turno = df_paradas.groupby('turno')['horas'].agg(['sum', 'size'])
+        df_turno_mttr = (paradas_turno['sum'] / paradas_turno['size']).reset_index()
         df_turno_mttr.columns = ['Turno', 'MTTR (h)']
+        graficos_para_pdf['turno_mttr'] = [(t, round(v, 1)) for t, v in df_turno_mttr.itertuples(index=False)]
         fig_eff = px.bar(
             df_turno_mttr, x='Turno', y='MTTR (h)', color='Turno', text_auto='.1f',
             title="<b>Eficiência (MTTR) - Tempo Médio de Reparo</b>",
@@ -240,14 +209,16 @@ else:
     # -----------------------------------------------------------
     with tab_t2:
         st.markdown("#### Quais máquinas mais impactam a operação?")
-        df_matrix = df_falhas.groupby(['frota', 'Turno']).size().reset_index(name='Contagem')
-        top_maquinas = df_falhas['frota'].value_counts().head(10).index
+        df_matrix = (df_resumo_falhas.groupby(['frota', 'turno'])['falhas'].sum()
+                     .reset_index().rename(columns={'turno': 'Turno', 'falhas': 'Contagem'}))
+        falhas_por_frota = df_resumo_falhas.groupby('frota')['falhas'].sum().sort_values(ascending=False)
+        top_maquinas = falhas_por_frota.head(10).index
         df_matrix_top = df_matrix[df_matrix['frota'].isin(top_maquinas)].copy()
         df_matrix_top['frota'] = df_matrix_top['frota'].astype(str)
 
         # Guardar dados das TOP 5 para PDF
         try:
-            dados_mq = df_falhas['frota'].value_counts().head(5).reset_index()
+            dados_mq = falhas_por_frota.head(5).reset_index()
             dados_mq.columns = ['Frota', 'Qtd']
             dados_mq['Frota'] = dados_mq['Frota'].astype(str)
             graficos_para_pdf['top_maquinas'] = list(dados_mq.itertuples(index=False, name=None))
@@ -275,8 +246,8 @@ else:
 
         with c_tend1:
             st.markdown("##### 📈 Evolução Temporal")
-            df_falhas['Data_Dia'] = df_falhas['abertura'].dt.date
-            df_trend = df_falhas.groupby(['Data_Dia', 'Turno']).size().reset_index(name='Qtd')
+            df_trend = (df_resumo_falhas.groupby(['dia', 'turno'])['falhas'].sum().reset_index()
+                        .rename(columns={'dia': 'Data_Dia', 'turno': 'Turno', 'falhas': 'Qtd'}))
 
             fig_trend = px.line(
                 df_trend, x='Data_Dia', y='Qtd', color='Turno', markers=True,
@@ -289,19 +260,17 @@ else:
         with c_tend2:
             st.markdown("##### 🔥 Mapa de Calor: Hora x Dia")
 
-            df_falhas['Hora'] = df_falhas['abertura'].dt.hour
-            df_falhas['Dia_Semana'] = df_falhas['abertura'].dt.day_name()
-
-            dias_trad = {'Monday': 'Seg', 'Tuesday': 'Ter', 'Wednesday': 'Qua', 'Thursday': 'Qui', 'Friday': 'Sex',
-                         'Saturday': 'Sáb', 'Sunday': 'Dom'}
-            df_falhas['Dia_Semana_PT'] = df_falhas['Dia_Semana'].map(dias_trad)
-
-            df_heatmap = df_falhas.groupby(['Dia_Semana_PT', 'Hora']).size().reset_index(name='Qtd')
+            # Uma contagem por parada (pelo início), não por ordem
             ordem_dias = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+            for tabela, coluna in ((df_paradas, 'inicio'), (df_falhas, 'inicio_parada')):
+                tabela['Hora'] = tabela[coluna].dt.hour
+                tabela['Dia_Semana_PT'] = tabela[coluna].dt.dayofweek.map(dict(enumerate(ordem_dias)))
+
+            df_heatmap = df_paradas.groupby(['Dia_Semana_PT', 'Hora']).size().reset_index(name='Qtd')
 
             fig_heat = px.density_heatmap(
                 df_heatmap, x='Hora', y='Dia_Semana_PT', z='Qtd',
-                title="<b>Concentração de Falhas</b>",
+                title="<b>Concentração de Paradas</b>",
                 color_continuous_scale='Reds',
                 category_orders={'Dia_Semana_PT': ordem_dias},
                 nbinsx=24
@@ -343,9 +312,10 @@ else:
 
         with c_prof1:
             st.markdown("##### 🐌 Dispersão: Frequência x Tempo")
-            df_scatter = df_falhas.groupby('frota').agg(
-                Qtd_Falhas=('Ticket', 'count'), MTTR_Medio=('duracao_horas', 'mean'), Modelo=('modelo', 'first')
-            ).reset_index()
+            df_scatter = df_paradas.groupby('frota').agg(
+                Qtd_Falhas=('horas', 'size'), MTTR_Medio=('horas', 'mean')).reset_index()
+            df_scatter['Modelo'] = df_scatter['frota'].map(
+                df_resumo_falhas.drop_duplicates('frota').set_index('frota')['modelo'])
 
             fig_scatter = px.scatter(
                 df_scatter, x='Qtd_Falhas', y='MTTR_Medio', color='Modelo', size='Qtd_Falhas', hover_name='frota',
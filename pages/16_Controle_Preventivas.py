@@ -64,24 +64,8 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# --- 2. SETUP DO BANCO DE DADOS ---
-def init_db():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    # Tabelas essenciais
-    cursor.execute("""CREATE TABLE IF NOT EXISTS prev_planos_def (
-        id INTEGER PRIMARY KEY AUTOINCREMENT, nome TEXT, intervalo INTEGER, unidade TEXT, tipo TEXT, executante TEXT)""")
-    cursor.execute("""CREATE TABLE IF NOT EXISTS prev_associacoes (
-        id INTEGER PRIMARY KEY AUTOINCREMENT, plano_id INTEGER, frota TEXT, modelo_ref TEXT,
-        FOREIGN KEY(plano_id) REFERENCES prev_planos_def(id), UNIQUE(plano_id, frota))""")
-    cursor.execute("""CREATE TABLE IF NOT EXISTS historico_manutencao (
-        id INTEGER PRIMARY KEY AUTOINCREMENT, equipamento_id INTEGER, data_realizacao DATE, 
-        horimetro_km_realizado REAL, tipo_servico TEXT, observacao TEXT)""")
-    conn.commit()
-    conn.close()
-
-
-init_db()
+# --- 2. BANCO DE DADOS ---
+# As tabelas prev_planos_def, prev_associacoes e historico_manutencao são criadas pelas migrações (database_schema.py)
 
 
 # --- 3. FUNÇÕES UTILITÁRIAS ---
@@ -4,11 +4,10 @@ import numpy as np
 import sys
 import os
 import re
+import importlib
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit.components.v1 as components
-from fpdf import FPDF
-import tempfile
 import sqlite3
 import io
 from datetime import datetime
@@ -17,7 +16,7 @@ from datetime import datetime
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 try:
-    from utils_ui import load_custom_css, ui_header, ui_kpi_card, ui_empty_state
+    from utils_ui import load_custom_css, ui_header, ui_kpi_card, ui_empty_state, ui_relatorio_em_segundo_plano
     from utils_icons import get_icon
     from database import get_db_connection
 except ImportError:
@@ -51,16 +50,19 @@ except ImportError:
     def get_db_connection():
         return sqlite3.connect("manutencao.db")
 
+
+    def ui_relatorio_em_segundo_plano(chave, funcao, args=(), kwargs=None, artefatos=(), titulo=""):
+        modulo, nome = funcao.split(":")
+        resultado = getattr(importlib.import_module(modulo), nome)(*args, **(kwargs or {}))
+        return dict(zip(artefatos, resultado if isinstance(resultado, tuple) else (resultado,)))
+
 # Tentativa segura de importar pacotes para Gráficos e Exportação Excel
 try:
     import matplotlib
 
     matplotlib.use('Agg')
     import matplotlib.pyplot as plt
-    import matplotlib.ticker as ticker
     import matplotlib.patches as patches
-    import matplotlib.gridspec as gridspec
-    import matplotlib.dates as mdates
 
     MATPLOTLIB_AVAILABLE = True
 except ImportError:
@@ -77,30 +79,8 @@ except ImportError:
 
 
 # ==============================================================================
-# INICIALIZAÇÃO DA TABELA DE HISTÓRICO (EVOLUÇÃO DIÁRIA)
+# HISTÓRICO (EVOLUÇÃO DIÁRIA) - tabela criada pelas migrações (database_schema.py)
 # ==============================================================================
-def criar_tabelas_historico():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS historico_saude_pneus (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            data_registro DATE,
-            equip_cod TEXT,
-            equip_desc TEXT,
-            total_pos INTEGER,
-            instalados INTEGER,
-            ausentes INTEGER,
-            percentual REAL
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-
-criar_tabelas_historico()
-
-
 def carregar_historico_salvo():
     conn = get_db_connection()
     df_hist = pd.read_sql("SELECT * FROM historico_saude_pneus ORDER BY data_registro ASC", conn)
@@ -317,482 +297,6 @@ def gerar_html_croqui(df_equip):
     return html_completo
 
 
-# ==============================================================================
-# MOTOR DE RENDERIZAÇÃO VETORIAL DO CROQUI PARA PDF E CAPA GERENCIAL
-# ==============================================================================
-
-class CroquiPDF(FPDF):
-    def __init__(self, orientacao='L', *args, **kwargs):
-        super().__init__(orientation=orientacao, *args, **kwargs)
-        self.orientacao = orientacao
-        self.largura_util = 277 if orientacao == 'L' else 190
-
-    def header(self):
-        caminho_logo = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logo_cedro.png")
-        if os.path.exists(caminho_logo):
-            self.image(caminho_logo, 10, 8, 12)
-
-        self.set_font('Arial', 'B', 14)
-        self.set_text_color(50, 50, 50)
-        self.cell(0, 10, 'Caderno de Inspecao de Pneus e Croquis - Cedro', 0, 1, 'C')
-
-        self.set_draw_color(22, 102, 53)
-        self.set_line_width(0.5)
-        y_linha = max(self.get_y() + 2, 22)
-        self.line(10, y_linha, 10 + self.largura_util, y_linha)
-        self.set_y(y_linha + 5)
-        self.set_line_width(0.2)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.set_text_color(150, 150, 150)
-        self.set_draw_color(220, 220, 220)
-        self.line(10, self.get_y() - 2, 10 + self.largura_util, self.get_y() - 2)
-        data_hora_atual = datetime.now().strftime('%d/%m/%Y %H:%M')
-        texto_rodape = f'Emitido automaticamente via Sistema Cedro em: {data_hora_atual}  |  Pagina {self.page_no()}'
-        self.cell(0, 10, texto_rodape, 0, 0, 'C')
-
-
-@st.cache_data(show_spinner="Desenhando capa e croquis vetoriais para o PDF...", ttl=600)
-def gerar_pdf_pneus_frota(df, df_hist_pdf, orientacao_pdf='L', filtros=None):
-    if filtros is None: filtros = {}
-
-    pdf = CroquiPDF(orientacao=orientacao_pdf, unit='mm', format='A4')
-    pdf.set_auto_page_break(auto=False)
-    pdf.add_page()
-
-    arquivos_temp = []
-    w_total = 277 if orientacao_pdf == 'L' else 190
-    max_y_page = 190 if orientacao_pdf == 'L' else 277
-
-    # ==========================================
-    # PÁGINA 1: CAPA (RESUMO EXECUTIVO E GRÁFICOS)
-    # ==========================================
-    pdf.set_font('Arial', 'B', 18)
-    pdf.set_text_color(22, 102, 53)
-    pdf.cell(0, 10, "Resumo Executivo da Frota", 0, 1, 'C')
-
-    pdf.set_font('Arial', '', 9)
-    pdf.set_text_color(100, 116, 139)
-    filtro_txt = f"Filtros: Status ({filtros.get('status', 'Todos')}) | Tipos ({filtros.get('tipo', 'Todos')}) | Fogo ({filtros.get('fogo', 'Nenhum')}) | Excluidas ({filtros.get('excluidas', 'Nenhuma')})"
-    pdf.cell(0, 5, filtro_txt.encode('latin-1', 'replace').decode('latin-1'), 0, 1, 'C')
-    pdf.ln(6)
-
-    total_equip = df['Equip_Cod'].nunique()
-    frotas_falta = df[df['Status'] == 'Ausente']['Equip_Cod'].nunique()
-    total_pneus = len(df[df['Status'] == 'Instalado'])
-    ausentes = len(df[df['Status'] == 'Ausente'])
-
-    y_kpi = pdf.get_y()
-    w_card = (w_total - 15) / 4
-
-    def draw_kpi_card(x, y, w, title, value, color_r, color_g, color_b):
-        pdf.set_fill_color(248, 250, 252)
-        pdf.set_draw_color(226, 232, 240)
-        pdf.rect(x, y, w, 20, 'DF')
-        pdf.set_fill_color(color_r, color_g, color_b)
-        pdf.rect(x, y, 2, 20, 'F')
-        pdf.set_font('Arial', 'B', 7)
-        pdf.set_text_color(100, 116, 139)
-        pdf.set_xy(x + 4, y + 4)
-        pdf.cell(w - 6, 4, title.encode('latin-1', 'replace').decode('latin-1'), 0, 1, 'L')
-        pdf.set_font('Arial', 'B', 14)
-        pdf.set_text_color(30, 41, 59)
-        pdf.set_xy(x + 4, y + 10)
-        pdf.cell(w - 6, 6, str(value), 0, 1, 'L')
-
-    draw_kpi_card(10, y_kpi, w_card, "FROTAS MAPEADAS", total_equip, 59, 130, 246)
-    draw_kpi_card(10 + w_card + 5, y_kpi, w_card, "FROTAS C/ FALTA", frotas_falta, 239, 68, 68)
-    draw_kpi_card(10 + 2 * (w_card + 5), y_kpi, w_card, "PNEUS INSTALADOS", total_pneus, 16, 185, 129)
-    draw_kpi_card(10 + 3 * (w_card + 5), y_kpi, w_card, "POSICOES VAZIAS", ausentes, 245, 158, 11)
-
-    pdf.set_y(y_kpi + 26)
-
-    pdf.set_font('Arial', 'B', 10)
-    pdf.set_text_color(30, 41, 59)
-    pdf.cell(0, 6, "Analise Geral de Calibragem e Posicoes", 0, 1, 'L')
-
-    pdf.set_font('Arial', '', 9)
-    pdf.set_text_color(80, 80, 80)
-    pct_faltas = (ausentes / (total_pneus + ausentes) * 100) if (total_pneus + ausentes) > 0 else 0
-    texto_resumo = f"Este relatorio audita e detalha {total_equip} maquinas/implementos da operacao baseado no filtro selecionado. " \
-                   f"Atualmente, a taxa de posicoes descalcadas e de {pct_faltas:.1f}% ({ausentes} pneus ausentes na base). " \
-                   f"Registamos {frotas_falta} maquinas circulando com pendencia ou falha na montagem de borracha. " \
-                   f"Abaixo seguem os principais indicadores graficos da frota."
-    pdf.multi_cell(0, 5, texto_resumo.encode('latin-1', 'replace').decode('latin-1'))
-    pdf.ln(4)
-
-    # ---------------- GRÁFICOS DINÂMICOS (MATPLOTLIB GRIDSPEC) ----------------
-    if MATPLOTLIB_AVAILABLE and not df.empty:
-        if orientacao_pdf == 'L':
-            fig_w, fig_h = 11.5, 3.6
-            fig = plt.figure(figsize=(fig_w, fig_h))
-            gs = gridspec.GridSpec(1, 3, figure=fig, wspace=0.3)
-            ax1 = fig.add_subplot(gs[0, 0])
-            ax2 = fig.add_subplot(gs[0, 1])
-            ax3 = fig.add_subplot(gs[0, 2])
-        else:
-            fig_w, fig_h = 7.5, 5.5
-            fig = plt.figure(figsize=(fig_w, fig_h))
-            gs = gridspec.GridSpec(2, 2, figure=fig, hspace=0.5, wspace=0.3)
-            ax1 = fig.add_subplot(gs[0, 0])
-            ax2 = fig.add_subplot(gs[0, 1])
-            ax3 = fig.add_subplot(gs[1, :])
-
-        # Gráfico 1: Pizza (Saúde)
-        s_counts = df['Status'].value_counts()
-        colors = ['#10B981' if s == 'Instalado' else '#EF4444' for s in s_counts.index]
-        ax1.pie(s_counts, labels=s_counts.index, autopct='%1.1f%%', colors=colors, startangle=90,
-                wedgeprops={'width': 0.4, 'edgecolor': 'w'}, textprops={'fontsize': 8})
-        ax1.set_title('Saude das Posicoes (%)', fontsize=10, fontweight='bold', color='#333333')
-
-        # Gráfico 2: Barras (Top Frotas)
-        df_ausentes = df[df['Status'] == 'Ausente']
-        if not df_ausentes.empty:
-            top_ausentes = df_ausentes['Equip_Cod'].value_counts().head(5).sort_values(ascending=True)
-            ax2.barh(top_ausentes.index.astype(str), top_ausentes.values, color='#EF4444')
-            ax2.set_title('Frotas c/ Mais Ausencias', fontsize=10, fontweight='bold', color='#333333')
-        else:
-            top_eq = df['Equip_Desc'].value_counts().head(5).sort_values(ascending=True)
-            ax2.barh(top_eq.index.astype(str).str.slice(0, 15), top_eq.values, color='#3B82F6')
-            ax2.set_title('Tipos de Frota (Top 5)', fontsize=10, fontweight='bold', color='#333333')
-
-        ax2.xaxis.set_major_locator(ticker.MaxNLocator(integer=True))
-        ax2.spines['top'].set_visible(False)
-        ax2.spines['right'].set_visible(False)
-        ax2.spines['bottom'].set_color('#CCCCCC')
-        ax2.spines['left'].set_color('#CCCCCC')
-        ax2.tick_params(axis='both', labelsize=8, colors='#555555')
-
-        # Gráfico 3: Evolução Histórica (Linha e Área)
-        if not df_hist_pdf.empty:
-            df_hist_global = df_hist_pdf.groupby('data_registro').agg(
-                Total_Pos=('total_pos', 'sum'),
-                Total_Instalados=('instalados', 'sum')
-            ).reset_index()
-            df_hist_global['Saude_Global_Pct'] = (df_hist_global['Total_Instalados'] / df_hist_global[
-                'Total_Pos']) * 100
-
-            ax3.plot(df_hist_global['data_registro'], df_hist_global['Saude_Global_Pct'], marker='o', color='#10B981',
-                     linewidth=2.5, markersize=5)
-            ax3.fill_between(df_hist_global['data_registro'], df_hist_global['Saude_Global_Pct'], color='#10B981',
-                             alpha=0.2)
-            ax3.set_title('Curva de Evolucao da Saude (%)', fontsize=10, fontweight='bold', color='#333333')
-            ax3.set_ylim([0, 105])
-            ax3.grid(True, linestyle='--', alpha=0.4)
-            ax3.spines['top'].set_visible(False)
-            ax3.spines['right'].set_visible(False)
-            ax3.spines['left'].set_color('#CCCCCC')
-            ax3.spines['bottom'].set_color('#CCCCCC')
-            ax3.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
-            ax3.tick_params(axis='x', labelsize=7, rotation=30, colors='#555555')
-            ax3.tick_params(axis='y', labelsize=8, colors='#555555')
-
-            # Adiciona rótulos de dados na linha
-            for x, y in zip(df_hist_global['data_registro'], df_hist_global['Saude_Global_Pct']):
-                ax3.text(x, y + 2, f'{y:.1f}%', ha='center', va='bottom', fontsize=6, color='#065F46',
-                         fontweight='bold')
-        else:
-            ax3.text(0.5, 0.5, 'Nenhum Historico\nGravado Diariamente', ha='center', va='center', color='#999999',
-                     fontsize=9)
-            ax3.axis('off')
-            ax3.set_title('Curva de Evolucao da Saude (%)', fontsize=10, fontweight='bold', color='#333333')
-
-        plt.tight_layout()
-        img_path = tempfile.mktemp(suffix=".png")
-        arquivos_temp.append(img_path)
-        fig.savefig(img_path, dpi=200, bbox_inches='tight')
-        plt.close(fig)
-
-        img_width = 265 if orientacao_pdf == 'L' else 180
-        img_x = (w_total + 20 - img_width) / 2
-        pdf.image(img_path, x=img_x, y=pdf.get_y(), w=img_width)
-
-    pdf.add_page()
-
-    # ==========================================
-    # PÁGINAS SEGUINTES: CROQUIS VETORIAIS
-    # ==========================================
-    frotas = df['Equip_Cod'].unique()
-
-    for frota in frotas:
-        df_f = df[df['Equip_Cod'] == frota].copy()
-        nome_equip = df_f.iloc[0]['Equip_Desc']
-        max_eixo = df_f['Eixo'].max()
-
-        axle_spacing = 16
-        tire_w = 14
-        tire_h = 13
-
-        croqui_h = 10 + (max_eixo * axle_spacing) + 5
-        table_h = 6 + (len(df_f) * 4)
-        block_h = max(croqui_h, table_h) + 10
-
-        if pdf.get_y() + block_h > max_y_page:
-            pdf.add_page()
-
-        y_start_block = pdf.get_y()
-
-        pdf.set_font('Arial', 'B', 9)
-        pdf.set_text_color(30, 41, 59)
-        pdf.set_xy(10, y_start_block)
-        pdf.cell(80, 4, f"{nome_equip[:30]} (Cód: {frota})".encode('latin-1', 'replace').decode('latin-1'), 0, 1, 'L')
-
-        y_content = pdf.get_y() + 2
-
-        center_x = 42 if orientacao_pdf == 'P' else 50
-        y_start_croqui = y_content + 4
-
-        pdf.set_fill_color(226, 232, 240)
-        pdf.rect(center_x - 12, y_start_croqui - 4, 24, 3, 'F')
-        pdf.set_font('Arial', 'B', 4.5)
-        pdf.set_text_color(71, 85, 105)
-        pdf.set_xy(center_x - 12, y_start_croqui - 4)
-        pdf.cell(24, 3, "FRENTE", 0, 0, 'C')
-
-        chassi_h = (max_eixo * axle_spacing) if max_eixo > 0 else axle_spacing
-        pdf.set_fill_color(148, 163, 184)
-        pdf.rect(center_x - 1.5, y_start_croqui, 3, chassi_h, 'F')
-
-        for eixo in range(1, max_eixo + 1):
-            df_e = df_f[df_f['Eixo'] == eixo]
-            y_axle = y_start_croqui + (eixo - 1) * axle_spacing + 1
-
-            pdf.set_fill_color(71, 85, 105)
-            pdf.rect(center_x - 22, y_axle + (tire_h / 2) - 1, 44, 2, 'F')
-
-            pdf.set_fill_color(71, 85, 105)
-            pdf.rect(center_x - 6, y_axle + (tire_h / 2) - 2, 12, 4, 'F')
-            pdf.set_xy(center_x - 6, y_axle + (tire_h / 2) - 2)
-            pdf.set_text_color(255, 255, 255)
-            pdf.set_font('Arial', 'B', 4)
-            pdf.cell(12, 4, f"EIXO {eixo}", 0, 0, 'C')
-
-            def draw_tire(p_df, pos_type):
-                if p_df.empty: return
-                row = p_df.iloc[0]
-
-                if pos_type == 'LO':
-                    tx = center_x - 23 - tire_w
-                elif pos_type == 'LI':
-                    tx = center_x - 8 - tire_w
-                elif pos_type == 'RI':
-                    tx = center_x + 8
-                elif pos_type == 'RO':
-                    tx = center_x + 23
-                else:
-                    return
-
-                ty = y_axle
-                pos_str = str(row['Pos_Desc'])[:5].strip().encode('latin-1', 'replace').decode('latin-1')
-                fogo_str = str(row['Pneu_Fogo'])[:8].strip().encode('latin-1', 'replace').decode('latin-1')
-
-                if row['Status'] == 'Ausente':
-                    pdf.set_fill_color(254, 242, 242)
-                    pdf.set_draw_color(239, 68, 68)
-                    pdf.rect(tx, ty, tire_w, tire_h, 'FD')
-
-                    pdf.set_text_color(153, 27, 27)
-                    pdf.set_font('Arial', 'B', 4.5)
-                    pdf.set_xy(tx, ty + 1.5)
-                    pdf.cell(tire_w, 3, pos_str, 0, 0, 'C')
-
-                    pdf.set_font('Arial', 'B', 4.5)
-                    pdf.set_xy(tx, ty + 7.5)
-                    pdf.cell(tire_w, 3, "FALTA", 0, 0, 'C')
-                else:
-                    pdf.set_fill_color(30, 41, 59)
-                    pdf.set_draw_color(15, 23, 42)
-                    pdf.rect(tx, ty, tire_w, tire_h, 'FD')
-
-                    pdf.set_text_color(148, 163, 184)
-                    pdf.set_font('Arial', 'B', 4.5)
-                    pdf.set_xy(tx, ty + 1.5)
-                    pdf.cell(tire_w, 3, pos_str, 0, 0, 'C')
-
-                    pdf.set_text_color(255, 255, 255)
-                    pdf.set_font('Arial', 'B', 4.5)
-                    pdf.set_xy(tx, ty + 7.5)
-                    pdf.cell(tire_w, 3, fogo_str, 0, 0, 'C')
-
-            draw_tire(df_e[df_e['Slot_Visual'] == 'LO'], 'LO')
-            draw_tire(df_e[df_e['Slot_Visual'] == 'LI'], 'LI')
-            draw_tire(df_e[df_e['Slot_Visual'] == 'RI'], 'RI')
-            draw_tire(df_e[df_e['Slot_Visual'] == 'RO'], 'RO')
-
-        y_croqui_end = y_start_croqui + chassi_h + 5
-
-        y_table_start = y_start_block
-
-        if orientacao_pdf == 'L':
-            x_table = 95
-            w_cols = [15, 20, 30, 20, 95]
-            desc_len = 65
-        else:
-            x_table = 85
-            w_cols = [9, 11, 20, 15, 48]
-            desc_len = 24
-
-        pdf.set_xy(x_table, y_table_start)
-        pdf.set_font('Arial', 'B', 7)
-        pdf.set_text_color(30, 41, 59)
-        pdf.cell(0, 4, "Detalhamento de Posicoes", 0, 1, 'L')
-
-        pdf.set_xy(x_table, pdf.get_y())
-        pdf.set_fill_color(226, 232, 240)
-        pdf.set_text_color(71, 85, 105)
-        pdf.set_font('Arial', 'B', 5 if orientacao_pdf == 'P' else 6)
-        pdf.set_draw_color(255, 255, 255)
-
-        pdf.cell(w_cols[0], 4, " Pos.", 1, 0, 'C', fill=True)
-        pdf.cell(w_cols[1], 4, " Local", 1, 0, 'C', fill=True)
-        pdf.cell(w_cols[2], 4, " Num Fogo", 1, 0, 'C', fill=True)
-        pdf.cell(w_cols[3], 4, " Situacao", 1, 0, 'C', fill=True)
-        pdf.cell(w_cols[4], 4, " Descricao do Pneu", 1, 1, 'L', fill=True)
-
-        pdf.set_font('Arial', '', 5 if orientacao_pdf == 'P' else 6)
-        pdf.set_draw_color(230, 230, 230)
-        fill = False
-
-        for _, row in df_f.iterrows():
-            pdf.set_xy(x_table, pdf.get_y())
-
-            if fill:
-                pdf.set_fill_color(245, 247, 250)
-            else:
-                pdf.set_fill_color(255, 255, 255)
-
-            pdf.set_text_color(40, 40, 40)
-            pdf.cell(w_cols[0], 4, str(row['Pos_Cod'])[:8].strip().encode('latin-1', 'replace').decode('latin-1'), 'B',
-                     0, 'C', fill=fill)
-            pdf.cell(w_cols[1], 4, str(row['Pos_Desc'])[:10].strip().encode('latin-1', 'replace').decode('latin-1'),
-                     'B', 0, 'C', fill=fill)
-            pdf.cell(w_cols[2], 4, str(row['Pneu_Fogo'])[:15].strip().encode('latin-1', 'replace').decode('latin-1'),
-                     'B', 0, 'C', fill=fill)
-
-            if row['Status'] == 'Ausente':
-                pdf.set_text_color(220, 38, 38)
-            else:
-                pdf.set_text_color(22, 163, 74)
-            pdf.cell(w_cols[3], 4, str(row['Status']).upper()[:10].encode('latin-1', 'replace').decode('latin-1'), 'B',
-                     0, 'C', fill=fill)
-
-            pdf.set_text_color(40, 40, 40)
-            desc_limpa = str(row['Pneu_Desc']).replace('nan', 'SEM INFO').strip()
-            pdf.cell(w_cols[4], 4, f" {desc_limpa[:desc_len]}".encode('latin-1', 'replace').decode('latin-1'), 'B', 1,
-                     'L', fill=fill)
-
-            fill = not fill
-
-        y_table_end = pdf.get_y()
-
-        next_y = max(y_croqui_end, y_table_end) + 4
-        pdf.set_y(next_y)
-
-        pdf.set_draw_color(200, 200, 200)
-        pdf.line(10, next_y - 2, w_total + 10, next_y - 2)
-
-    # ==============================================================================
-    # PÁGINA FINAL: SCORE DE SAÚDE DA FROTA
-    # ==============================================================================
-    pdf.add_page()
-    pdf.set_font('Arial', 'B', 16)
-    pdf.set_text_color(22, 102, 53)
-    pdf.cell(0, 10, "Quadro Analitico: Score de Saude por Maquina", 0, 1, 'C')
-
-    pdf.set_font('Arial', '', 9)
-    pdf.set_text_color(100, 116, 139)
-    pdf.cell(0, 5, "Consolidacao automatica do percentual de pneus instalados para cada equipamento auditado.", 0, 1,
-             'C')
-    pdf.ln(6)
-
-    df_health = df.groupby(['Equip_Cod', 'Equip_Desc']).agg(
-        Total_Pos=('Pos_Cod', 'count'),
-        Instalados=('Status', lambda x: (x == 'Instalado').sum())
-    ).reset_index()
-
-    df_health['Percentual'] = (df_health['Instalados'] / df_health['Total_Pos']) * 100
-    df_health['Faltas'] = df_health['Total_Pos'] - df_health['Instalados']
-    df_health = df_health.sort_values(by=['Percentual', 'Faltas'], ascending=[True, False])
-
-    if orientacao_pdf == 'L':
-        w_h = [40, 117, 30, 30, 30, 30]
-    else:
-        w_h = [25, 65, 25, 25, 25, 25]
-
-    def cabecalho_health():
-        pdf.set_font('Arial', 'B', 8)
-        pdf.set_text_color(255, 255, 255)
-        pdf.set_fill_color(22, 102, 53)
-        pdf.set_draw_color(255, 255, 255)
-
-        pdf.cell(w_h[0], 7, " Maquina", 1, 0, 'C', fill=True)
-        pdf.cell(w_h[1], 7, " Descricao", 1, 0, 'L', fill=True)
-        pdf.cell(w_h[2], 7, " Posicoes", 1, 0, 'C', fill=True)
-        pdf.cell(w_h[3], 7, " Instalados", 1, 0, 'C', fill=True)
-        pdf.cell(w_h[4], 7, " Faltas", 1, 0, 'C', fill=True)
-        pdf.cell(w_h[5], 7, " % Calcado", 1, 1, 'C', fill=True)
-
-    cabecalho_health()
-
-    pdf.set_font('Arial', 'B', 7)
-    pdf.set_draw_color(230, 230, 230)
-    fill = False
-
-    for _, row in df_health.iterrows():
-        if pdf.get_y() > max_y_page - 10:
-            pdf.add_page()
-            cabecalho_health()
-            pdf.set_font('Arial', 'B', 7)
-
-        if fill:
-            pdf.set_fill_color(245, 247, 250)
-        else:
-            pdf.set_fill_color(255, 255, 255)
-
-        pdf.set_text_color(40, 40, 40)
-        pdf.cell(w_h[0], 6, str(row['Equip_Cod'])[:15], 'B', 0, 'C', fill=fill)
-        desc_limpa = str(row['Equip_Desc']).encode('latin-1', 'replace').decode('latin-1')
-        pdf.cell(w_h[1], 6, f" {desc_limpa[:45]}", 'B', 0, 'L', fill=fill)
-
-        pdf.cell(w_h[2], 6, str(row['Total_Pos']), 'B', 0, 'C', fill=fill)
-        pdf.cell(w_h[3], 6, str(row['Instalados']), 'B', 0, 'C', fill=fill)
-
-        if row['Faltas'] > 0:
-            pdf.set_text_color(220, 38, 38)
-        else:
-            pdf.set_text_color(40, 40, 40)
-        pdf.cell(w_h[4], 6, str(row['Faltas']), 'B', 0, 'C', fill=fill)
-
-        if row['Percentual'] == 100:
-            pdf.set_text_color(22, 163, 74)
-        elif row['Percentual'] >= 70:
-            pdf.set_text_color(161, 98, 7)
-        else:
-            pdf.set_text_color(220, 38, 38)
-
-        pdf.cell(w_h[5], 6, f"{row['Percentual']:.1f}%", 'B', 1, 'C', fill=fill)
-        fill = not fill
-
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-    pdf_path = tmp.name
-    tmp.close()
-
-    pdf.output(pdf_path)
-    with open(pdf_path, "rb") as f:
-        pdf_bytes = f.read()
-    os.remove(pdf_path)
-
-    for img in arquivos_temp:
-        try:
-            os.remove(img)
-        except:
-            pass
-
-    return pdf_bytes
-
-
 # ==============================================================================
 # MOTOR DE RENDERIZAÇÃO DO ESPELHO EXCEL (COM IMAGENS)
 # ==============================================================================
@@ -1400,18 +904,22 @@ orientacao_escolhida = 'P' if 'Retrato' in orientacao_ui else 'L'
 if df_view.empty:
     st.info("Ajuste os filtros para visualizar e exportar o relatório.")
 else:
-    with st.spinner("Desenhando vetores e gerando ficheiros para download..."):
-        filtros_aplicados = {
-            'status': filtro_status_frota,
-            'tipo': ", ".join(filtro_tipo) if filtro_tipo else "Todos os Tipos",
-            'fogo': busca_fogo if busca_fogo else "Nenhum",
-            'excluidas': ", ".join(filtro_excluir_frota) if filtro_excluir_frota else "Nenhuma"
-        }
-
-        # Gerar PDF (Passando também o DataFrame do Histórico Global para a Capa)
-        pdf_oficial = gerar_pdf_pneus_frota(df_view, df_historico_global, orientacao_pdf=orientacao_escolhida,
-                                            filtros=filtros_aplicados)
+    filtros_aplicados = {
+        'status': filtro_status_frota,
+        'tipo': ", ".join(filtro_tipo) if filtro_tipo else "Todos os Tipos",
+        'fogo': busca_fogo if busca_fogo else "Nenhum",
+        'excluidas': ", ".join(filtro_excluir_frota) if filtro_excluir_frota else "Nenhuma"
+    }
+
+    # Gerar PDF num processo separado (jobs_relatorios), passando também o Histórico Global para a Capa
+    arquivos = ui_relatorio_em_segundo_plano(
+        "job_relatorio_pneus", "relatorios_pneus:gerar_pdf_pneus_frota",
+        args=(df_view, df_historico_global),
+        kwargs={'orientacao_pdf': orientacao_escolhida, 'filtros': filtros_aplicados},
+        artefatos=("pdf",), titulo="Caderno de Croquis"
+    )
 
+    with st.spinner("Gerando espelho em Excel..."):
         # O DataFrame de Saúde global do filtro para exportar no Excel
         df_health_export = df_view.groupby(['Equip_Cod', 'Equip_Desc']).agg(
             Total_Pos=('Pos_Cod', 'count'),
@@ -1428,14 +936,15 @@ else:
     c_btn_pdf, c_btn_xl = st.columns(2)
 
     with c_btn_pdf:
-        st.download_button(
-            label=f"📄 Descarregar PDF ({total_equip} frotas listadas)",
-            data=pdf_oficial,
-            file_name=f"Caderno_Pneus_Compacto_{datetime.now().strftime('%d%m%Y')}.pdf",
-            mime="application/pdf",
-            type="primary",
-            use_container_width=True
-        )
+        if arquivos is not None:
+            st.download_button(
+                label=f"📄 Descarregar PDF ({total_equip} frotas listadas)",
+                data=arquivos['pdf'],
+                file_name=f"Caderno_Pneus_Compacto_{datetime.now().strftime('%d%m%Y')}.pdf",
+                mime="application/pdf",
+                type="primary",
+                use_container_width=True
+            )
 
     with c_btn_xl:
         if excel_oficial:
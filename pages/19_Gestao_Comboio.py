@@ -3,31 +3,15 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from fpdf import FPDF
 import sys
 import os
-import io
-import tempfile
-from datetime import datetime
-
-# Tentativa segura de importar o matplotlib para o PDF
-try:
-    import matplotlib
-
-    matplotlib.use('Agg')
-    import matplotlib.pyplot as plt
-    import matplotlib.ticker as ticker
-    import matplotlib.dates as mdates
-
-    MATPLOTLIB_AVAILABLE = True
-except ImportError:
-    MATPLOTLIB_AVAILABLE = False
 
 # --- BLINDAGEM DE IMPORTAÇÃO ---
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from utils_ui import load_custom_css, ui_header, ui_empty_state, ui_kpi_card
+from utils_ui import load_custom_css, ui_header, ui_empty_state, ui_kpi_card, ui_relatorio_em_segundo_plano
 from utils_icons import get_icon
+from relatorios_comboio import formatar_qtd
 
 # --- CONFIGURAÇÃO VISUAL ---
 load_custom_css()
@@ -51,17 +35,6 @@ def limpar_numero(valor):
     return pd.to_numeric(valor_str, errors='coerce')
 
 
-def formatar_moeda(valor):
-    return f"R$ {valor:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-
-
-def formatar_qtd(valor, unidade='L'):
-    if pd.isna(valor) or valor == 0: return f"0 {unidade}"
-    fmt_val = f"{valor:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-    if fmt_val.endswith(',00'): fmt_val = fmt_val[:-3]
-    return f"{fmt_val} {unidade}"
-
-
 def draw_material_card(col, nome, saida, entrada, unidade):
     """Desenha um cartão HTML customizado focado em um material específico."""
     balanco = entrada - saida
@@ -93,616 +66,6 @@ def draw_material_card(col, nome, saida, entrada, unidade):
     """
     col.markdown(html, unsafe_allow_html=True)
 
-
-# ==============================================================================
-# MOTOR DO PDF (GEOMETRIA INTELIGENTE E RESPONSIVA)
-# ==============================================================================
-
-class RelatorioPDF(FPDF):
-    def __init__(self, titulo_relatorio="Relatorio Evolutivo do Comboio, Cedro", orientacao='L', *args, **kwargs):
-        super().__init__(orientation=orientacao, format='A4', *args, **kwargs)
-        self.titulo_relatorio = titulo_relatorio
-        self.orientacao = orientacao
-        self.largura_util = 277 if orientacao == 'L' else 190
-
-    def header(self):
-        caminho_logo = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logo_cedro.png")
-        if not os.path.exists(caminho_logo): caminho_logo = "logo_cedro.png"
-        if os.path.exists(caminho_logo): self.image(caminho_logo, 10, 8, 12)
-
-        self.set_font('Arial', 'B', 14)
-        self.set_text_color(50, 50, 50)
-        titulo = self.titulo_relatorio.encode('latin-1', 'replace').decode('latin-1')
-        self.cell(0, 10, titulo, 0, 1, 'C')
-
-        self.set_draw_color(245, 158, 11)
-        self.set_line_width(0.5)
-        y_linha = max(self.get_y() + 2, 22)
-        self.line(10, y_linha, 10 + self.largura_util, y_linha)
-        self.set_y(y_linha + 5)
-        self.set_line_width(0.2)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.set_text_color(150, 150, 150)
-        self.set_draw_color(220, 220, 220)
-        self.line(10, self.get_y() - 2, 10 + self.largura_util, self.get_y() - 2)
-
-        data_hora_atual = datetime.now().strftime('%d/%m/%Y %H:%M')
-        texto_rodape = f'Emitido automaticamente via Sistema Cedro em: {data_hora_atual}  |  Pagina {self.page_no()}'
-        texto_rodape = texto_rodape.encode('latin-1', 'replace').decode('latin-1')
-        self.cell(0, 10, texto_rodape, 0, 0, 'C')
-
-    def add_insight_box(self, texto):
-        """Desenha a caixa de insight apenas se houver espaço; caso contrário, pula de página."""
-        if self.get_y() > (275 if self.orientacao == 'P' else 185) - 25:
-            self.add_page()
-        else:
-            self.ln(3)
-
-        self.set_fill_color(255, 248, 220)
-        self.set_draw_color(245, 158, 11)
-        self.set_line_width(0.3)
-
-        self.set_font('Arial', 'B', 8)
-        self.set_text_color(194, 65, 12)
-        self.cell(0, 6, "  INSIGHT EVOLUTIVO ESTRITAMENTE POR MATERIAL", 'L T R', 1, 'L', fill=True)
-
-        self.set_font('Arial', 'I', 8)
-        self.set_text_color(60, 60, 60)
-        texto_limpo = texto.encode('latin-1', 'replace').decode('latin-1')
-        self.multi_cell(0, 5, "  " + texto_limpo, border='L B R', fill=True)
-        self.ln(4)
-
-    def check_space(self, required_space):
-        """Verifica se há espaço suficiente. Se não houver, adiciona nova página."""
-        max_y = 275 if self.orientacao == 'P' else 185
-        if self.get_y() + required_space > max_y:
-            self.add_page()
-            return True
-        return False
-
-
-@st.cache_data(show_spinner="Renderizando relatório PDF responsivo...", ttl=600)
-def compilar_relatorios_comboio_evolutivo(df_view, df_base_data_filtrada, df_estoque, df_autonomia, dt_in, dt_out,
-                                          orientacao_pdf='L'):
-    excel_io = io.BytesIO()
-    arquivos_temporarios = []
-
-    # Isola saídas e entradas estritamente por produto
-    df_saidas = df_view[df_view['CATEGORIA_OPERACAO'].str.contains('Saída|Estorno')].copy()
-    df_abast = df_base_data_filtrada[df_base_data_filtrada['CATEGORIA_OPERACAO'] == 'Entrada (Abastecimento)']
-
-    df_saida_pdf = df_saidas.groupby(['ITEM_COMPLETO', 'UNIDADE'])['QTD_DASHBOARD'].sum().reset_index(name='SAIDA')
-    df_abast_pdf = df_abast.groupby(['ITEM_COMPLETO', 'UNIDADE'])['QTD_DASHBOARD'].sum().reset_index(name='ENTRADA')
-
-    df_kpi_pdf = pd.merge(df_saida_pdf, df_abast_pdf, on=['ITEM_COMPLETO', 'UNIDADE'], how='outer').fillna(0)
-    df_kpi_pdf['BALANCO'] = df_kpi_pdf['ENTRADA'] - df_kpi_pdf['SAIDA']
-    df_kpi_pdf = df_kpi_pdf.sort_values('SAIDA', ascending=False)
-
-    w_total = 277 if orientacao_pdf == 'L' else 190
-    max_y_page = 190 if orientacao_pdf == 'L' else 277
-    w_ext = [22, 60, 25, 110, 25, 35] if orientacao_pdf == 'L' else [18, 40, 20, 69, 18, 25]
-
-    def desenhar_linha_multicell(pdf_obj, textos, larguras, alinhamentos, fill_row, func_cabecalho=None):
-        pdf_obj.set_font('Arial', '', 7.5)
-        texto_material = str(textos[3]).encode('latin-1', 'replace').decode('latin-1')
-
-        largura_util = larguras[3] - 2
-        largura_texto = pdf_obj.get_string_width(texto_material)
-        linhas_estimadas = max(1, int((largura_texto / largura_util) + 0.9))
-
-        altura_linha = 4.5
-        altura_total = max(6, (linhas_estimadas * altura_linha) + 2)
-
-        if pdf_obj.get_y() + altura_total > max_y_page:
-            pdf_obj.add_page()
-            if func_cabecalho: func_cabecalho()
-
-        x_inicial = pdf_obj.get_x()
-        y_inicial = pdf_obj.get_y()
-
-        if fill_row:
-            pdf_obj.set_fill_color(245, 247, 250)
-        else:
-            pdf_obj.set_fill_color(255, 255, 255)
-
-        pdf_obj.rect(x_inicial, y_inicial, sum(larguras), altura_total, 'F')
-
-        pdf_obj.set_draw_color(220, 220, 220)
-        pdf_obj.line(x_inicial, y_inicial + altura_total, x_inicial + sum(larguras), y_inicial + altura_total)
-
-        pdf_obj.set_text_color(40, 40, 40)
-
-        for i in range(len(textos)):
-            x_atual = x_inicial + sum(larguras[:i])
-            pdf_obj.set_xy(x_atual, y_inicial)
-
-            if i == 3:
-                pdf_obj.set_xy(x_atual, y_inicial + 1)
-                pdf_obj.multi_cell(larguras[i], altura_linha, f" {texto_material}", 0, alinhamentos[i])
-            else:
-                texto_celula = str(textos[i])
-                if i == 1 and len(texto_celula) > 35: texto_celula = texto_celula[:32] + "..."
-                texto_celula = texto_celula.encode('latin-1', 'replace').decode('latin-1')
-
-                if alinhamentos[i] == 'R':
-                    texto_celula = f"{texto_celula} "
-                elif alinhamentos[i] == 'L':
-                    texto_celula = f" {texto_celula}"
-
-                y_centralizado = y_inicial + (altura_total - 4) / 2
-                pdf_obj.set_xy(x_atual, y_centralizado)
-                pdf_obj.cell(larguras[i], 4, texto_celula, 0, 0, alinhamentos[i])
-
-        y_final_real = max(y_inicial + altura_total, pdf_obj.get_y() + 1)
-        pdf_obj.set_xy(x_inicial, y_final_real)
-
-    pdf = RelatorioPDF(titulo_relatorio="Auditoria Volumetrica do Comboio, Cedro", orientacao=orientacao_pdf)
-    pdf.set_margins(10, 10, 10)
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-
-    # --- SEÇÃO 1: GRADE DE MATERIAIS ---
-    pdf.set_font('Arial', 'B', 16)
-    pdf.set_text_color(245, 158, 11)
-    pdf.cell(0, 8, "Grade de Consumo e Balanco por Material", 0, 1, 'L')
-
-    pdf.set_font('Arial', '', 10)
-    pdf.set_text_color(80, 80, 80)
-    pdf.cell(0, 5,
-             f"Periodo Auditado: {dt_in.strftime('%d/%m/%Y')} a {dt_out.strftime('%d/%m/%Y')} (Sem misturas de fluidos)",
-             0, 1, 'L')
-    pdf.ln(4)
-
-    def desenhar_card_material(pdf_obj, x, y, largura, titulo, valor_saida, cor_borda_r, cor_borda_g, cor_borda_b,
-                               subtexto=""):
-        pdf_obj.set_fill_color(248, 250, 252)
-        pdf_obj.set_draw_color(cor_borda_r, cor_borda_g, cor_borda_b)
-        pdf_obj.set_line_width(0.8)
-        pdf_obj.rect(x, y, largura, 22, 'DF')
-        pdf_obj.set_line_width(0.2)
-
-        pdf_obj.set_xy(x + 2, y + 3)
-        pdf_obj.set_font('Arial', 'B', 7)
-        pdf_obj.set_text_color(71, 85, 105)
-        pdf_obj.cell(largura - 4, 4, titulo.encode('latin-1', 'replace').decode('latin-1'), 0, 1, 'C')
-
-        pdf_obj.set_xy(x + 2, y + 8)
-        pdf_obj.set_font('Arial', 'B', 10)
-        pdf_obj.set_text_color(239, 68, 68)
-        pdf_obj.cell(largura - 4, 7, valor_saida.encode('latin-1', 'replace').decode('latin-1'), 0, 1, 'C')
-
-        if subtexto:
-            pdf_obj.set_xy(x + 2, y + 16)
-            pdf_obj.set_font('Arial', '', 6)
-            pdf_obj.set_text_color(cor_borda_r, cor_borda_g, cor_borda_b)
-            pdf_obj.cell(largura - 4, 4, subtexto.encode('latin-1', 'replace').decode('latin-1'), 0, 1, 'C')
-
-    # Paginação inteligente dos Cartões:
-    # Paisagem = 4 cartões por linha | Retrato = 2 cartões por linha (Evita cartões minúsculos)
-    max_cols = 4 if orientacao_pdf == 'L' else 2
-    espaco_entre = 4
-    largura_card = (w_total - (espaco_entre * (max_cols - 1))) / max_cols
-    espaco_linha = 4
-
-    y_kpi = pdf.get_y()
-    col_idx = 0
-
-    if df_kpi_pdf.empty:
-        pdf.set_font('Arial', '', 10)
-        pdf.cell(0, 5, "Nenhuma movimentacao de materiais registrada.", 0, 1)
-        y_kpi = pdf.get_y()
-    else:
-        # Loop alterado: Imprime a lista COMPLETA de cartões de material!
-        for row in df_kpi_pdf.itertuples():
-            if col_idx == max_cols:
-                col_idx = 0
-                y_kpi += 22 + espaco_linha
-                if y_kpi + 22 > max_y_page:
-                    pdf.add_page()
-                    y_kpi = pdf.get_y()
-
-            pos_x = 10 + col_idx * (largura_card + espaco_entre)
-
-            titulo_mat = str(row.ITEM_COMPLETO).split('\n')[0][:30]
-            val_saida = f"SAIDA: {formatar_qtd(row.SAIDA, row.UNIDADE)}"
-            val_in = formatar_qtd(row.ENTRADA, row.UNIDADE)
-            val_bal = formatar_qtd(row.BALANCO, row.UNIDADE)
-            cor_r, cor_g, cor_b = (16, 185, 129) if row.BALANCO >= 0 else (239, 68, 68)
-
-            desenhar_card_material(pdf, pos_x, y_kpi, largura_card, titulo_mat, val_saida, cor_r, cor_g, cor_b,
-                                   f"Entrou: {val_in} | Bal: {val_bal}")
-            col_idx += 1
-
-    pdf.set_y(y_kpi + 22 + 8)
-
-    # --- SEÇÃO 2: GRÁFICO ÁREA EMPILHADA ---
-    df_litros_out = df_saidas[df_saidas['UNIDADE'] == 'L']
-    if MATPLOTLIB_AVAILABLE and not df_litros_out.empty:
-        # Geometria flexível para o Gráfico 1 (Necessita de ~100mm)
-        pdf.check_space(105)
-
-        df_evo = df_litros_out.groupby([df_litros_out['DATA'].dt.date, 'ITEM_COMPLETO'])[
-            'QTD_DASHBOARD'].sum().reset_index()
-        df_evo['ITEM_CURTO'] = df_evo['ITEM_COMPLETO'].apply(lambda x: str(x).split('\n')[0][:20] + '..')
-
-        top_mats = df_evo.groupby('ITEM_CURTO')['QTD_DASHBOARD'].sum().nlargest(5).index
-        df_evo['MAT_FILTER'] = np.where(df_evo['ITEM_CURTO'].isin(top_mats), df_evo['ITEM_CURTO'], 'Outros Óleos')
-        pivot_evo = df_evo.pivot_table(index='DATA', columns='MAT_FILTER', values='QTD_DASHBOARD',
-                                       aggfunc='sum').fillna(0)
-
-        # Ajusta a proporção para caber perfeito sem distorcer
-        fig_size_evo = (11.0, 4.0) if orientacao_pdf == 'L' else (7.4, 4.0)
-        fig_evo, ax_evo = plt.subplots(figsize=fig_size_evo)
-
-        colors = plt.cm.tab10.colors
-        ax_evo.stackplot(pivot_evo.index, pivot_evo.T.values, labels=pivot_evo.columns, colors=colors, alpha=0.85)
-
-        ax_evo.set_title('Evolucao Diaria de Consumo por Tipo de Fluido (Litros)', fontsize=11, fontweight='bold',
-                         color='#333333')
-        ax_evo.grid(True, axis='y', linestyle='--', alpha=0.4)
-        ax_evo.spines['top'].set_visible(False);
-        ax_evo.spines['right'].set_visible(False)
-        ax_evo.spines['left'].set_color('#CCCCCC');
-        ax_evo.spines['bottom'].set_color('#CCCCCC')
-        ax_evo.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
-        ax_evo.tick_params(axis='both', labelsize=8, colors='#555555')
-        ax_evo.yaxis.set_major_formatter(ticker.FuncFormatter(lambda val, pos: f"{val:,.0f}".replace(',', '.')))
-
-        ax_evo.legend(loc='center left', bbox_to_anchor=(1.01, 0.5), fontsize=7, frameon=False)
-
-        plt.tight_layout()
-        img_evo = tempfile.mktemp(suffix=".png")
-        arquivos_temporarios.append(img_evo)
-        fig_evo.savefig(img_evo, dpi=200, bbox_inches='tight')
-        plt.close(fig_evo)
-
-        # No Retrato a legenda pode exigir um pouco mais de margem à direita
-        largura_img = w_total - 25 if orientacao_pdf == 'L' else w_total - 20
-        pdf.image(img_evo, x=10, w=largura_img)
-
-        mat_top_geral = df_litros_out.groupby('ITEM_COMPLETO')['QTD_DASHBOARD'].sum().idxmax()
-        mat_top_geral_nome = str(mat_top_geral).split('\n')[0][:40]
-        texto_evo = f"O grafico de Area Empilhada ilustra a montanha de consumo diario isolada por produto. Neste periodo, o item '{mat_top_geral_nome}' dominou a volumetria. Picos indicam dias de alta demanda."
-        pdf.add_insight_box(texto_evo)
-
-    # --- SEÇÃO 3: EVOLUÇÃO DOS TOP 3 CENTROS DE CUSTO ---
-    if MATPLOTLIB_AVAILABLE and not df_litros_out.empty:
-        # Verifica espaço para título + gráfico 2 (~110mm)
-        if not pdf.check_space(110): pdf.ln(10)
-
-        pdf.set_font('Arial', 'B', 14)
-        pdf.set_text_color(245, 158, 11)
-        pdf.cell(0, 8, "Rastreio Temporal: Top 3 Centros de Custo Consumidores", 0, 1)
-        pdf.ln(2)
-
-        top3_ccs = df_litros_out.groupby('CENTRO_CUSTO')['QTD_DASHBOARD'].sum().nlargest(3).index.tolist()
-        df_top3 = df_litros_out[df_litros_out['CENTRO_CUSTO'].isin(top3_ccs)].copy()
-        pivot_top3 = df_top3.pivot_table(index=df_top3['DATA'].dt.date, columns='CENTRO_CUSTO', values='QTD_DASHBOARD',
-                                         aggfunc='sum').fillna(0)
-
-        idx_dates = pd.date_range(start=df_top3['DATA'].min(), end=df_top3['DATA'].max()).date
-        pivot_top3 = pivot_top3.reindex(idx_dates, fill_value=0)
-
-        fig_size_top3 = (11.0, 4.0) if orientacao_pdf == 'L' else (7.4, 4.0)
-        fig_top3, ax_top3 = plt.subplots(figsize=fig_size_top3)
-
-        cores_linhas = ['#EF4444', '#F59E0B', '#2196F3']
-        for i, cc in enumerate(pivot_top3.columns):
-            ax_top3.plot(pivot_top3.index, pivot_top3[cc], marker='o', linewidth=2.5, markersize=4, label=str(cc),
-                         color=cores_linhas[i % len(cores_linhas)])
-
-        ax_top3.set_title('Curvas de Consumo (Litros/Dia) dos Principais Ofensores', fontsize=11, fontweight='bold',
-                          color='#333333')
-        ax_top3.grid(True, linestyle='--', alpha=0.4)
-        ax_top3.spines['top'].set_visible(False);
-        ax_top3.spines['right'].set_visible(False)
-        ax_top3.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
-        ax_top3.tick_params(axis='both', labelsize=8)
-        ax_top3.yaxis.set_major_formatter(ticker.FuncFormatter(lambda val, pos: f"{val:,.0f}".replace(',', '.')))
-        ax_top3.legend(loc='upper right', frameon=True, fontsize=8)
-
-        plt.tight_layout()
-        img_top3 = tempfile.mktemp(suffix=".png")
-        arquivos_temporarios.append(img_top3)
-        fig_top3.savefig(img_top3, dpi=200, bbox_inches='tight')
-        plt.close(fig_top3)
-
-        pdf.image(img_top3, x=10, w=w_total - 5)
-
-        if top3_ccs:
-            cc_critico = top3_ccs[0]
-            df_cc_critico = df_litros_out[df_litros_out['CENTRO_CUSTO'] == cc_critico]
-            vol_critico = df_cc_critico['QTD_DASHBOARD'].sum()
-
-            if not df_cc_critico.empty:
-                mat_critico = df_cc_critico.groupby('ITEM_COMPLETO')['QTD_DASHBOARD'].sum().idxmax()
-                mat_critico_nome = str(mat_critico).split('\n')[0][:45]
-                texto_top3 = f"Isolar o consumo no tempo permite identificar vazamentos ou desperdicios padronizados. O Centro de Custo '{cc_critico}' foi o ofensor principal do periodo, consumindo um total de {formatar_qtd(vol_critico, 'L')}, puxado principalmente pelo uso de '{mat_critico_nome}'. Avalie os picos dessa linha para justificar a aplicacao."
-            else:
-                texto_top3 = f"Isolar o consumo no tempo permite identificar vazamentos ou desperdicios. O Centro de Custo '{cc_critico}' foi o ofensor principal do periodo, consumindo um total de {formatar_qtd(vol_critico, 'L')}."
-        else:
-            texto_top3 = "Sem dados suficientes para rastrear ofensores volumetricos neste periodo."
-
-        pdf.add_insight_box(texto_top3)
-
-    # --- SEÇÃO 4: MATRIZ DE CONSUMO PRODUTO X CENTRO DE CUSTO (VOLUME) ---
-    if not df_litros_out.empty:
-        pdf.check_space(60)  # Matriz precisa de espaço para Título + Header + Algumas linhas
-        pdf.ln(5)
-        pdf.set_font('Arial', 'B', 14);
-        pdf.set_text_color(245, 158, 11)
-        pdf.cell(0, 8, "Matriz Volumetrica Cruzada (Centro de Custo vs Produto)", 0, 1)
-
-        pdf.set_font('Arial', '', 8);
-        pdf.set_text_color(80, 80, 80)
-        pdf.cell(0, 5, "Legenda: Litros exatos consumidos por fluido.", 0, 1)
-        pdf.ln(2)
-
-        df_matriz_copy = df_litros_out.copy()
-        df_matriz_copy['MAT_SIMPLES'] = df_matriz_copy['ITEM_COMPLETO'].apply(lambda x: str(x).split('\n')[0][:18])
-
-        n_cols_prod = 7 if orientacao_pdf == 'L' else 4
-        top_mats = df_matriz_copy.groupby('MAT_SIMPLES')['QTD_DASHBOARD'].sum().nlargest(n_cols_prod).index.tolist()
-
-        df_top_mats = df_matriz_copy[df_matriz_copy['MAT_SIMPLES'].isin(top_mats)]
-        pivot_prod = df_top_mats.pivot_table(index='CENTRO_CUSTO', columns='MAT_SIMPLES', values='QTD_DASHBOARD',
-                                             aggfunc='sum').fillna(0)
-
-        colunas_plot = top_mats
-        w_cc_prod = 45 if orientacao_pdf == 'L' else 35
-        # Reduz 0.1 na divisão para evitar estouro de ponto flutuante em folhas exatas
-        w_prod = (w_total - w_cc_prod - 0.1) / len(colunas_plot)
-
-        def print_prod_header():
-            pdf.set_font('Arial', 'B', 7)
-            pdf.set_fill_color(245, 158, 11);
-            pdf.set_text_color(255, 255, 255)
-            pdf.cell(w_cc_prod, 8, " Centro de Custo", 1, 0, 'L', fill=True)
-            for c in colunas_plot:
-                c_clean = c.encode('latin-1', 'replace').decode('latin-1')
-                pdf.cell(w_prod, 8, c_clean, 1, 0, 'C', fill=True)
-            pdf.ln()
-
-        print_prod_header()
-        pdf.set_font('Arial', 'B', 6);
-        pdf.set_draw_color(220, 220, 220)
-
-        fill_prod = False
-        for cc, row in pivot_prod.iterrows():
-            if pdf.get_y() > max_y_page - 10:
-                pdf.add_page();
-                print_prod_header();
-                pdf.set_font('Arial', 'B', 6)
-
-            if fill_prod:
-                pdf.set_fill_color(245, 247, 250)
-            else:
-                pdf.set_fill_color(255, 255, 255)
-
-            cc_str = str(cc)[:20].encode('latin-1', 'replace').decode('latin-1')
-            pdf.set_text_color(40, 40, 40)
-            pdf.cell(w_cc_prod, 6, f" {cc_str}", 1, 0, 'L', fill=True)
-
-            for c in colunas_plot:
-                val = row.get(c, 0)
-                if val <= 0:
-                    pdf.set_text_color(180, 180, 180)
-                    pdf.cell(w_prod, 6, "-", 1, 0, 'C', fill=True)
-                else:
-                    txt = f"{val:,.1f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                    pdf.set_text_color(40, 40, 40)
-                    pdf.cell(w_prod, 6, txt, 1, 0, 'C', fill=True)
-
-            pdf.ln()
-            fill_prod = not fill_prod
-
-    # --- SEÇÃO 5: MATRIZ DE TRANSFERÊNCIAS (ENTRADAS NO COMBOIO) ---
-    df_transf_pdf = df_base_data_filtrada[
-        df_base_data_filtrada['CATEGORIA_OPERACAO'] == 'Entrada (Abastecimento)'].copy()
-    if not df_transf_pdf.empty:
-        pdf.check_space(60)
-        pdf.ln(5)
-        pdf.set_font('Arial', 'B', 14);
-        pdf.set_text_color(245, 158, 11)
-        pdf.cell(0, 8, "Matriz Diaria de Transferencias (Almoxarifado -> Comboio)", 0, 1)
-
-        pdf.set_font('Arial', '', 8);
-        pdf.set_text_color(80, 80, 80)
-        pdf.cell(0, 5, "Legenda: Entradas de abastecimento no tanque do Comboio.", 0, 1)
-        pdf.ln(2)
-
-        df_transf_pdf['MAT_SIMPLES'] = df_transf_pdf['ITEM_COMPLETO'].apply(lambda x: str(x).split('\n')[0][:18])
-        n_cols_transf = 7 if orientacao_pdf == 'L' else 4
-        top_mats_t = df_transf_pdf.groupby('MAT_SIMPLES')['QTD_DASHBOARD'].sum().nlargest(n_cols_transf).index.tolist()
-        df_top_mats_t = df_transf_pdf[df_transf_pdf['MAT_SIMPLES'].isin(top_mats_t)]
-        pivot_transf_pdf = df_top_mats_t.pivot_table(index=df_top_mats_t['DATA'].dt.date, columns='MAT_SIMPLES',
-                                                     values='QTD_DASHBOARD', aggfunc='sum').fillna(0)
-
-        w_data_t = 30 if orientacao_pdf == 'L' else 25
-        w_prod_t = (w_total - w_data_t - 0.1) / len(top_mats_t)
-
-        def print_transf_header():
-            pdf.set_font('Arial', 'B', 7)
-            pdf.set_fill_color(245, 158, 11);
-            pdf.set_text_color(255, 255, 255)
-            pdf.cell(w_data_t, 8, " Data", 1, 0, 'C', fill=True)
-            for c in top_mats_t:
-                c_clean = c.encode('latin-1', 'replace').decode('latin-1')
-                pdf.cell(w_prod_t, 8, c_clean, 1, 0, 'C', fill=True)
-            pdf.ln()
-
-        print_transf_header()
-        pdf.set_font('Arial', 'B', 6);
-        pdf.set_draw_color(220, 220, 220)
-
-        fill_t = False
-        for data_dt, row in pivot_transf_pdf.iterrows():
-            if pdf.get_y() > max_y_page - 10:
-                pdf.add_page();
-                print_transf_header();
-                pdf.set_font('Arial', 'B', 6)
-
-            if fill_t:
-                pdf.set_fill_color(245, 247, 250)
-            else:
-                pdf.set_fill_color(255, 255, 255)
-
-            dt_str = data_dt.strftime('%d/%m/%Y')
-            pdf.set_text_color(40, 40, 40)
-            pdf.cell(w_data_t, 6, f" {dt_str}", 1, 0, 'C', fill=True)
-
-            for c in top_mats_t:
-                val = row.get(c, 0)
-                if val <= 0:
-                    pdf.set_text_color(180, 180, 180)
-                    pdf.cell(w_prod_t, 6, "-", 1, 0, 'C', fill=True)
-                else:
-                    txt = f"{val:,.1f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                    pdf.set_text_color(40, 40, 40)
-                    pdf.cell(w_prod_t, 6, txt, 1, 0, 'C', fill=True)
-
-            pdf.ln()
-            fill_t = not fill_t
-
-    # --- SEÇÃO FINAL: EXTRATO COMPLETO ---
-    pdf.add_page()  # Extrato sempre quebra de página por ser longo
-    pdf.set_font('Arial', 'B', 14)
-    pdf.set_text_color(245, 158, 11)
-    pdf.cell(0, 8, "Extrato Auditavel de Movimentacoes", 0, 1)
-
-    def cabecalho_extrato():
-        pdf.set_font('Arial', 'B', 8)
-        pdf.set_text_color(255, 255, 255)
-        pdf.set_fill_color(245, 158, 11)
-        pdf.cell(w_ext[0], 7, " Data", 1, 0, 'C', fill=True)
-        pdf.cell(w_ext[1], 7, " Operacao", 1, 0, 'L', fill=True)
-        pdf.cell(w_ext[2], 7, " C.Custo", 1, 0, 'C', fill=True)
-        pdf.cell(w_ext[3], 7, " Material / Descricao", 1, 0, 'L', fill=True)
-        pdf.cell(w_ext[4], 7, " Qtd", 1, 0, 'C', fill=True)
-        pdf.cell(w_ext[5], 7, " Valor (R$)", 1, 1, 'R', fill=True)
-
-    cabecalho_extrato()
-
-    df_extrato = df_view.sort_values(by=['DATA', 'VALOR_DASHBOARD'], ascending=[False, False])
-
-    def formatar_linha_multicell(pdf_obj, textos, larguras, alinhamentos, fill_row, func_cabecalho=None):
-        pdf_obj.set_font('Arial', '', 7.5)
-        texto_material = str(textos[3]).encode('latin-1', 'replace').decode('latin-1')
-        largura_util = larguras[3] - 2
-        largura_texto = pdf_obj.get_string_width(texto_material)
-        linhas_estimadas = max(1, int((largura_texto / largura_util) + 0.9))
-        altura_linha = 4.5
-        altura_total = max(6, (linhas_estimadas * altura_linha) + 2)
-
-        if pdf_obj.get_y() + altura_total > max_y_page:
-            pdf_obj.add_page();
-            func_cabecalho()
-
-        x_inicial = pdf_obj.get_x();
-        y_inicial = pdf_obj.get_y()
-
-        if fill_row:
-            pdf_obj.set_fill_color(245, 247, 250)
-        else:
-            pdf_obj.set_fill_color(255, 255, 255)
-
-        pdf_obj.rect(x_inicial, y_inicial, sum(larguras), altura_total, 'F')
-        pdf_obj.set_draw_color(220, 220, 220)
-        pdf_obj.line(x_inicial, y_inicial + altura_total, x_inicial + sum(larguras), y_inicial + altura_total)
-        pdf_obj.set_text_color(40, 40, 40)
-
-        for i in range(len(textos)):
-            x_atual = x_inicial + sum(larguras[:i])
-            pdf_obj.set_xy(x_atual, y_inicial)
-            if i == 3:
-                pdf_obj.set_xy(x_atual, y_inicial + 1)
-                pdf_obj.multi_cell(larguras[i], altura_linha, f" {texto_material}", 0, alinhamentos[i])
-            else:
-                texto_celula = str(textos[i])
-                if i == 1 and len(texto_celula) > 35: texto_celula = texto_celula[:32] + "..."
-                texto_celula = texto_celula.encode('latin-1', 'replace').decode('latin-1')
-                if alinhamentos[i] == 'R':
-                    texto_celula = f"{texto_celula} "
-                elif alinhamentos[i] == 'L':
-                    texto_celula = f" {texto_celula}"
-
-                y_centralizado = y_inicial + (altura_total - 4) / 2
-                pdf_obj.set_xy(x_atual, y_centralizado)
-                pdf_obj.cell(larguras[i], 4, texto_celula, 0, 0, alinhamentos[i])
-
-        y_final_real = max(y_inicial + altura_total, pdf_obj.get_y() + 1)
-        pdf_obj.set_xy(x_inicial, y_final_real)
-
-    fill_row = False
-    for _, row in df_extrato.iterrows():
-        dt_str = row['DATA'].strftime('%d/%m/%y') if pd.notna(row['DATA']) else "-"
-        op_str = str(row['OPERACAO_FULL'])
-        cc_str = str(row['CENTRO_CUSTO'])[:12]
-        mat_str = str(row['ITEM_COMPLETO'])
-
-        un = str(row['UNIDADE']).upper()
-        if un == 'L':
-            qtd_str = f"{row['QTD_DASHBOARD']:,.2f} L".replace(',', 'X').replace('.', ',').replace('X', '.')
-        else:
-            qtd_str = f"{row['QTD_DASHBOARD']:,.0f} {un}".replace(',', 'X').replace('.', ',').replace('X', '.')
-
-        val_str = formatar_moeda(row['VALOR_DASHBOARD'])
-
-        textos = [dt_str, op_str, cc_str, mat_str, qtd_str, val_str]
-        alinhamentos = ['C', 'L', 'C', 'L', 'C', 'R']
-
-        formatar_linha_multicell(pdf, textos, w_ext, alinhamentos, fill_row, func_cabecalho=cabecalho_extrato)
-        fill_row = not fill_row
-
-    # ==============================================================================
-    # EXPORTAÇÃO EXCEL MULTI-ABA
-    # ==============================================================================
-    with pd.ExcelWriter(excel_io) as writer:
-        colunas_exibir = ['DATA', 'OPERACAO_FULL', 'CENTRO_CUSTO', 'ITEM_COMPLETO', 'QTD_ORIGINAL_SAP', 'QTD_DASHBOARD',
-                          'UNIDADE', 'VALOR_DASHBOARD', 'CATEGORIA_OPERACAO']
-        df_export = df_extrato[colunas_exibir].copy().rename(columns={'OPERACAO_FULL': 'Movimentação'})
-        df_export.to_excel(writer, sheet_name="Extrato SAP", index=False)
-
-        if not df_autonomia.empty:
-            df_auto_export = df_autonomia[
-                ['ITEM_COMPLETO', 'QTD_ATUAL', 'UNIDADE', 'VALOR_ATUAL', 'CONSUMO_MEDIO_DIA', 'AUTONOMIA_DIAS']].copy()
-            df_auto_export.columns = ['Material', 'Qtd Estoque', 'UN', 'Valor Financeiro (R$)', 'Consumo Médio Diário',
-                                      'Autonomia (Dias)']
-            df_auto_export.to_excel(writer, sheet_name="Posição Estoque", index=False)
-
-        if not df_saidas.empty:
-            pivot_excel = df_saidas.pivot_table(index='CENTRO_CUSTO', columns='ITEM_COMPLETO', values='QTD_DASHBOARD',
-                                                aggfunc='sum').fillna(0)
-            pivot_excel.to_excel(writer, sheet_name="Matriz Volume C.Custo")
-
-        if not df_abast.empty:
-            pivot_transf_ex = df_abast.pivot_table(index=df_abast['DATA'].dt.date, columns='ITEM_COMPLETO',
-                                                   values='QTD_DASHBOARD', aggfunc='sum').fillna(0)
-            pivot_transf_ex.to_excel(writer, sheet_name="Transferências Diárias")
-
-    bytes_excel = excel_io.getvalue()
-
-    temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-    pdf_path = temp_pdf.name
-    temp_pdf.close()
-    pdf.output(pdf_path)
-
-    with open(pdf_path, "rb") as f:
-        bytes_pdf = f.read()
-    os.remove(pdf_path)
-
-    for img in arquivos_temporarios:
-        try:
-            os.remove(img)
-        except:
-            pass
-
-    return bytes_excel, bytes_pdf
-
-
 @st.cache_data(show_spinner="Processando arquivos SAP e cruzando dados...", ttl=600)
 def processar_bases_comboio(file_export, file_codigos, file_estoque):
     try:
@@ -1186,19 +549,23 @@ st.markdown("---")
 st.markdown("### 🖨️ Extração de Relatórios Oficiais")
 st.caption("O PDF foi totalmente formatado para aproveitamento de espaço.")
 
-with st.spinner("Desenhando relatório com layout otimizado..."):
-    excel_bytes, pdf_bytes = compilar_relatorios_comboio_evolutivo(df_view, df_base_data_filtrada, df_estoque,
-                                                                   df_autonomia, d_in, d_out, orientacao_pdf)
-
-nome_padrao_arquivo = f"Comboio_Volumetrico_{d_in.strftime('%d%m')}_a_{d_out.strftime('%d%m')}"
-
-c_pdf, c_excel = st.columns(2)
-with c_pdf:
-    st.download_button(label="📄 Descarregar Relatório PDF Evolutivo", data=pdf_bytes,
-                       file_name=f"{nome_padrao_arquivo}.pdf", mime="application/pdf", type="primary",
-                       use_container_width=True)
-with c_excel:
-    st.download_button(label="📊 Descarregar Matrizes (Excel)", data=excel_bytes,
-                       file_name=f"{nome_padrao_arquivo}.xlsx",
-                       mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                       use_container_width=True)
\ No newline at end of file
+# Gerado num processo separado (jobs_relatorios): a tela segue livre enquanto o PDF é montado
+arquivos = ui_relatorio_em_segundo_plano(
+    "job_relatorio_comboio", "relatorios_comboio:compilar_relatorios_comboio_evolutivo",
+    args=(df_view, df_base_data_filtrada, df_estoque, df_autonomia, d_in, d_out, orientacao_pdf),
+    artefatos=("excel", "pdf"), titulo="Relatório do Comboio"
+)
+
+if arquivos is not None:
+    nome_padrao_arquivo = f"Comboio_Volumetrico_{d_in.strftime('%d%m')}_a_{d_out.strftime('%d%m')}"
+
+    c_pdf, c_excel = st.columns(2)
+    with c_pdf:
+        st.download_button(label="📄 Descarregar Relatório PDF Evolutivo", data=arquivos['pdf'],
+                           file_name=f"{nome_padrao_arquivo}.pdf", mime="application/pdf", type="primary",
+                           use_container_width=True)
+    with c_excel:
+        st.download_button(label="📊 Descarregar Matrizes (Excel)", data=arquivos['excel'],
+                           file_name=f"{nome_padrao_arquivo}.xlsx",
+                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                           use_container_width=True)
\ No newline at end of file
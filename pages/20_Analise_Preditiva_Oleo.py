@@ -3,12 +3,11 @@ import pandas as pd
 import numpy as np
 import sys
 import os
+import importlib
 import unicodedata
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
-from fpdf import FPDF
-import tempfile
 import io
 
 # --- BLINDAGEM E IMPORTAÇÃO DO BANCO DE DADOS ---
@@ -16,7 +15,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 try:
     from database import get_db_connection
-    from utils_ui import load_custom_css, ui_header, ui_kpi_card, ui_empty_state
+    from utils_ui import load_custom_css, ui_header, ui_kpi_card, ui_empty_state, ui_relatorio_em_segundo_plano
     from utils_icons import get_icon
 except ImportError:
     def load_custom_css():
@@ -50,18 +49,13 @@ except ImportError:
         import sqlite3
         return sqlite3.connect('manutencao.db', check_same_thread=False)
 
-# Tentativa segura de importar pacotes para Gráficos no PDF e Geração de Excel
-try:
-    import matplotlib
-
-    matplotlib.use('Agg')
-    import matplotlib.pyplot as plt
-    import matplotlib.ticker as ticker
 
-    MATPLOTLIB_AVAILABLE = True
-except ImportError:
-    MATPLOTLIB_AVAILABLE = False
+    def ui_relatorio_em_segundo_plano(chave, funcao, args=(), kwargs=None, artefatos=(), titulo=""):
+        modulo, nome = funcao.split(":")
+        resultado = getattr(importlib.import_module(modulo), nome)(*args, **(kwargs or {}))
+        return dict(zip(artefatos, resultado if isinstance(resultado, tuple) else (resultado,)))
 
+# Tentativa segura de importar o pacote de geração de Excel
 try:
     from openpyxl import Workbook
     from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
@@ -81,25 +75,7 @@ ui_header(
 )
 
 
-# Inicializa Tabela de Fecho de Ciclo no Banco de Dados
-def inicializar_tabela_feedback():
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS analises_oleo_feedback (
-                amostra TEXT PRIMARY KEY,
-                acao_gestao TEXT,
-                status_acao TEXT DEFAULT 'Pendente'
-            )
-        """)
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        st.error(f"Erro ao iniciar banco de dados de óleo: {e}")
-
-
-inicializar_tabela_feedback()
+# A tabela de fecho de ciclo (analises_oleo_feedback) é criada pelas migrações (database_schema.py)
 
 
 # Sincroniza o DataFrame da memória com o Banco de Dados
@@ -389,285 +365,6 @@ def gerar_excel_plano_acao(df_export):
     return output.getvalue()
 
 
-class PDFPlanoAcaoALS(FPDF):
-    def header(self):
-        caminho_logo = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logo_cedro.png")
-        if os.path.exists(caminho_logo):
-            self.image(caminho_logo, 10, 8, 15)
-        self.set_font('Arial', 'B', 16)
-        self.set_text_color(30, 41, 59)
-        self.set_xy(30, 10)
-        self.cell(0, 8, 'RELATORIO DE ANALISE PREDITIVA E ORDEM DE SERVICO', 0, 1, 'L')
-        self.set_font('Arial', '', 9)
-        self.set_text_color(100, 116, 139)
-        self.set_x(30)
-        self.cell(0, 4, 'Gestao de Frotas | Extracao do Laboratorio', 0, 1, 'L')
-        self.set_draw_color(226, 232, 240)
-        self.line(10, 24, 200, 24)
-        self.set_y(28)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.set_text_color(150, 150, 150)
-        self.cell(0, 10, f'Gerado via Sistema Cedro | Pagina {self.page_no()}', 0, 0, 'C')
-
-
-@st.cache_data(show_spinner="Gerando PDF de Ações (Gerencial + OS)...", ttl=60)
-def gerar_pdf_plano_acao(df_pdf):
-    pdf = PDFPlanoAcaoALS(orientation='P', unit='mm', format='A4')
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-
-    arquivos_temp = []
-
-    # ==========================================
-    # PÁGINA 1: RESUMO GERENCIAL E KPIs
-    # ==========================================
-    pdf.set_font('Arial', 'B', 14)
-    pdf.set_text_color(15, 23, 42)
-    pdf.cell(0, 8, "Resumo Executivo do Lote de Amostras", 0, 1, 'C')
-
-    tot = len(df_pdf)
-    crit = len(df_pdf[df_pdf['STATUS_CORRIGIDO'] == 'Crítico'])
-    ale = len(df_pdf[df_pdf['STATUS_CORRIGIDO'] == 'Alerta'])
-    norm = len(df_pdf[df_pdf['STATUS_CORRIGIDO'] == 'Normal'])
-
-    pdf.set_font('Arial', '', 10)
-    pdf.set_text_color(100, 116, 139)
-    pdf.cell(0, 5, f"Volume Total: {tot} amostras analisadas neste relatorio.", 0, 1, 'C')
-    pdf.ln(5)
-
-    y_kpi = pdf.get_y()
-    pdf.set_fill_color(248, 250, 252)
-    pdf.set_draw_color(226, 232, 240)
-
-    pdf.rect(15, y_kpi, 50, 20, 'DF')
-    pdf.set_fill_color(16, 185, 129);
-    pdf.rect(15, y_kpi, 2, 20, 'F')
-    pdf.set_xy(20, y_kpi + 4);
-    pdf.set_font('Arial', 'B', 8);
-    pdf.set_text_color(100, 116, 139);
-    pdf.cell(40, 4, "STATUS NORMAL", 0, 1, 'L')
-    pdf.set_xy(20, y_kpi + 10);
-    pdf.set_font('Arial', 'B', 14);
-    pdf.set_text_color(15, 23, 42);
-    pdf.cell(40, 6, str(norm), 0, 1, 'L')
-
-    pdf.set_fill_color(248, 250, 252);
-    pdf.rect(75, y_kpi, 50, 20, 'DF')
-    pdf.set_fill_color(245, 158, 11);
-    pdf.rect(75, y_kpi, 2, 20, 'F')
-    pdf.set_xy(80, y_kpi + 4);
-    pdf.set_font('Arial', 'B', 8);
-    pdf.set_text_color(100, 116, 139);
-    pdf.cell(40, 4, "EM ALERTA", 0, 1, 'L')
-    pdf.set_xy(80, y_kpi + 10);
-    pdf.set_font('Arial', 'B', 14);
-    pdf.set_text_color(15, 23, 42);
-    pdf.cell(40, 6, str(ale), 0, 1, 'L')
-
-    pdf.set_fill_color(248, 250, 252);
-    pdf.rect(135, y_kpi, 50, 20, 'DF')
-    pdf.set_fill_color(239, 68, 68);
-    pdf.rect(135, y_kpi, 2, 20, 'F')
-    pdf.set_xy(140, y_kpi + 4);
-    pdf.set_font('Arial', 'B', 8);
-    pdf.set_text_color(100, 116, 139);
-    pdf.cell(40, 4, "STATUS CRITICO", 0, 1, 'L')
-    pdf.set_xy(140, y_kpi + 10);
-    pdf.set_font('Arial', 'B', 14);
-    pdf.set_text_color(15, 23, 42);
-    pdf.cell(40, 6, str(crit), 0, 1, 'L')
-
-    pdf.set_y(y_kpi + 30)
-
-    if MATPLOTLIB_AVAILABLE and not df_pdf.empty:
-        fig, axes = plt.subplots(1, 2, figsize=(8.5, 4))
-
-        s_counts = df_pdf['STATUS_CORRIGIDO'].value_counts()
-        colors = ['#10B981' if s == 'Normal' else ('#F59E0B' if s == 'Alerta' else '#EF4444') for s in s_counts.index]
-        axes[0].pie(s_counts, labels=s_counts.index, autopct='%1.1f%%', colors=colors, startangle=90,
-                    wedgeprops={'width': 0.5, 'edgecolor': 'w'})
-        axes[0].set_title('Distribuicao de Saude (Volume)', fontsize=10, fontweight='bold', color='#333333')
-
-        df_prob = df_pdf[df_pdf['STATUS_CORRIGIDO'].isin(['Crítico', 'Alerta'])]
-        if not df_prob.empty:
-            top_prob = df_prob['FROTA'].astype(str).value_counts().head(5).sort_values(ascending=True)
-            axes[1].barh(top_prob.index, top_prob.values, color='#EF4444')
-            axes[1].set_title('Top 5 Frotas c/ Anomalias', fontsize=10, fontweight='bold', color='#333333')
-            axes[1].xaxis.set_major_locator(ticker.MaxNLocator(integer=True))
-        else:
-            axes[1].text(0.5, 0.5, 'Frota Saudavel\n(Nenhum Alerta)', ha='center', va='center', color='#10B981',
-                         fontsize=10, fontweight='bold')
-            axes[1].axis('off')
-
-        axes[1].spines['top'].set_visible(False);
-        axes[1].spines['right'].set_visible(False)
-        axes[1].tick_params(axis='both', labelsize=8, colors='#555555')
-
-        plt.tight_layout()
-        img_path = tempfile.mktemp(suffix=".png")
-        arquivos_temp.append(img_path)
-        fig.savefig(img_path, dpi=200, bbox_inches='tight')
-        plt.close(fig)
-
-        pdf.image(img_path, x=15, y=pdf.get_y(), w=180)
-        pdf.set_y(pdf.get_y() + 85)
-
-    pdf.add_page()
-
-    # ==========================================
-    # PÁGINAS DE ORDENS DE SERVIÇO (CARDS)
-    # ==========================================
-    for _, row in df_pdf.iterrows():
-        start_y = pdf.get_y()
-        if start_y > 150:
-            pdf.add_page()
-            start_y = pdf.get_y()
-
-        status_v = row.get('STATUS_CORRIGIDO', '')
-        if status_v == 'Crítico':
-            bg_r, bg_g, bg_b = 239, 68, 68
-            txt_status = "CRITICO  STOP"
-        elif status_v == 'Alerta':
-            bg_r, bg_g, bg_b = 245, 158, 11
-            txt_status = "ATENCAO  !"
-        else:
-            bg_r, bg_g, bg_b = 16, 185, 129
-            txt_status = "NORMAL  OK"
-
-        pdf.set_fill_color(bg_r, bg_g, bg_b)
-        pdf.rect(140, start_y, 60, 10, 'F')
-        pdf.set_xy(140, start_y + 2)
-        pdf.set_font('Arial', 'B', 12)
-        pdf.set_text_color(255, 255, 255)
-        pdf.cell(60, 6, txt_status, 0, 0, 'C')
-
-        pdf.set_font('Arial', 'B', 8)
-        pdf.set_text_color(71, 85, 105)
-        pdf.set_xy(10, start_y)
-
-        cliente_str = str(row.get('CLIENTE', '')).encode('latin-1', 'ignore').decode('latin-1')[:45]
-        obra_str = str(row.get('OBRA', '')).encode('latin-1', 'ignore').decode('latin-1')[:45]
-        amostra_str = str(row.get('NUM_AMOSTRA', '')).encode('latin-1', 'ignore').decode('latin-1')
-        dt_str = row['DATA_COLETA'].strftime('%d/%m/%Y') if pd.notnull(row.get('DATA_COLETA')) else "-"
-
-        pdf.cell(100, 4, f"CLIENTE: {cliente_str}", 0, 1, 'L')
-        pdf.cell(100, 4, f"UNIDADE/OBRA: {obra_str}", 0, 1, 'L')
-        pdf.cell(100, 4, f"AMOSTRA: {amostra_str}  |  DATA DA COLETA: {dt_str}", 0, 1, 'L')
-
-        box_equip_y = start_y + 14
-        pdf.set_fill_color(248, 250, 252)
-        pdf.set_draw_color(226, 232, 240)
-        pdf.rect(10, box_equip_y, 190, 18, 'DF')
-
-        pdf.set_xy(12, box_equip_y + 2)
-        pdf.set_font('Arial', 'B', 9)
-        pdf.set_text_color(15, 23, 42)
-
-        frota_str = str(row.get('FROTA', '')).encode('latin-1', 'ignore').decode('latin-1')
-        comp_str = str(row.get('COMPARTIMENTO', '')).encode('latin-1', 'ignore').decode('latin-1')
-        fam_str = str(row.get('Família do equipamento', '')).encode('latin-1', 'ignore').decode('latin-1')
-        mod_str = str(row.get('MODELO', '')).encode('latin-1', 'ignore').decode('latin-1')
-        hr_oleo = str(row.get('HORAS_OLEO', '0'))
-        hr_eq = str(row.get('HORAS_EQUIP', '0'))
-
-        pdf.cell(90, 5, f"TAG/FROTA: {frota_str}", 0, 0, 'L')
-        pdf.cell(90, 5, f"COMPARTIMENTO: {comp_str}", 0, 1, 'L')
-
-        pdf.set_x(12)
-        pdf.set_font('Arial', '', 8)
-        pdf.set_text_color(71, 85, 105)
-        pdf.cell(90, 4, f"FAMILIA / MODELO: {fam_str} - {mod_str}", 0, 0, 'L')
-        pdf.cell(90, 4, f"HORAS OLEO: {hr_oleo} h  |  HORAS EQUIP: {hr_eq} h", 0, 1, 'L')
-
-        av_y = box_equip_y + 20
-        pdf.set_xy(10, av_y)
-        pdf.set_font('Arial', 'B', 8)
-        pdf.set_text_color(30, 41, 59)
-        pdf.cell(190, 5, "AVALIACAO:", 0, 1, 'L')
-
-        pdf.set_x(10)
-        pdf.set_font('Arial', '', 8)
-        av_str = str(row.get('AVALIACAO', '')).encode('latin-1', 'ignore').decode('latin-1')
-        pdf.multi_cell(190, 4, av_str, 0, 'L')
-
-        ac_y = pdf.get_y() + 2
-        pdf.set_xy(10, ac_y)
-        pdf.set_font('Arial', 'B', 8)
-        pdf.set_text_color(30, 41, 59)
-        pdf.cell(190, 5, "ACOES DE INSPECAO:", 0, 1, 'L')
-
-        pdf.set_x(10)
-        pdf.set_font('Arial', '', 8)
-        ac_str = str(row.get('ACOES_INSPECAO', '')).encode('latin-1', 'ignore').decode('latin-1')
-        pdf.multi_cell(190, 4, ac_str, 0, 'L')
-
-        qui_y = pdf.get_y() + 3
-        pdf.set_xy(10, qui_y)
-        pdf.set_font('Arial', 'B', 7)
-        pdf.set_fill_color(226, 232, 240)
-        pdf.cell(30, 5, "Ferro (Fe)", 1, 0, 'C', fill=True)
-        pdf.cell(30, 5, "Cobre (Cu)", 1, 0, 'C', fill=True)
-        pdf.cell(30, 5, "Silicio (Si)", 1, 0, 'C', fill=True)
-        pdf.cell(30, 5, "Indice PQ", 1, 0, 'C', fill=True)
-        pdf.cell(40, 5, "Viscosidade / Diluicao", 1, 1, 'C', fill=True)
-
-        pdf.set_font('Arial', '', 8)
-        pdf.set_x(10)
-        pdf.cell(30, 5, f"{row.get('Ferro', 0):.0f}", 1, 0, 'C')
-        pdf.cell(30, 5, f"{row.get('Cobre', 0):.0f}", 1, 0, 'C')
-        pdf.cell(30, 5, f"{row.get('Silício', 0):.0f}", 1, 0, 'C')
-        pdf.cell(30, 5, f"{row.get('INDICE_PQ', 0):.0f}", 1, 0, 'C')
-        pdf.cell(40, 5, f"V: {row.get('Viscosidade', 0):.1f} | D: {row.get('Diluição Diesel', 0):.1f}", 1, 1, 'C')
-
-        box_acao_y = pdf.get_y() + 4
-        pdf.set_fill_color(255, 255, 255)
-        pdf.set_draw_color(100, 116, 139)
-        pdf.rect(10, box_acao_y, 190, 20, 'D')
-
-        pdf.set_xy(12, box_acao_y + 1)
-        pdf.set_font('Arial', 'B', 7)
-        pdf.set_text_color(100, 116, 139)
-        pdf.cell(190, 4, "PLANO DE ACAO E RETORNO DA OFICINA (A Preencher):", 0, 1, 'L')
-
-        # Inteligência de Banco de Dados na Impressão do PDF
-        acao_bd = str(row.get('ACAO_GESTAO', '')).strip()
-        if acao_bd and acao_bd.upper() != 'NAN':
-            pdf.set_xy(12, box_acao_y + 6)
-            pdf.set_font('Arial', 'I', 8)
-            pdf.set_text_color(30, 41, 59)
-            pdf.multi_cell(186, 4, acao_bd.encode('latin-1', 'ignore').decode('latin-1'), 0, 'L')
-        else:
-            pdf.set_draw_color(226, 232, 240)
-            pdf.line(12, box_acao_y + 9, 198, box_acao_y + 9)
-            pdf.line(12, box_acao_y + 14, 198, box_acao_y + 14)
-            pdf.line(12, box_acao_y + 19, 198, box_acao_y + 19)
-
-        pdf.set_y(box_acao_y + 24)
-        pdf.set_draw_color(30, 41, 59)
-        pdf.set_line_width(0.5)
-        pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-        pdf.set_y(pdf.get_y() + 4)
-
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-    pdf_path = tmp.name
-    tmp.close()
-    pdf.output(pdf_path)
-    with open(pdf_path, "rb") as f:
-        bytes_pdf = f.read()
-    os.remove(pdf_path)
-
-    for img in arquivos_temp:
-        try:
-            os.remove(img)
-        except:
-            pass
-
-    return bytes_pdf
-
-
 # ==============================================================================
 # INTERFACE PRINCIPAL E FILTROS
 # ==============================================================================
@@ -918,21 +615,25 @@ else:
     else:
         c_pdf, c_excel = st.columns(2)
 
-        with st.spinner("Compilando Gráficos Gerenciais e Ordens de Serviço (Padrão ALS)..."):
-            excel_bytes = gerar_excel_plano_acao(df_export)
-            pdf_bytes = gerar_pdf_plano_acao(df_export)
+        excel_bytes = gerar_excel_plano_acao(df_export)
 
         nome_arq = f"Plano_Acao_Oleo_{datetime.now().strftime('%d%m%Y')}"
 
         with c_pdf:
-            st.download_button(
-                label=f"📄 Caderno de Ações em PDF (Para Imprimir O.S.)",
-                data=pdf_bytes,
-                file_name=f"{nome_arq}.pdf",
-                mime="application/pdf",
-                type="primary",
-                use_container_width=True
+            # PDF gerado num processo separado (jobs_relatorios): a tela segue livre enquanto ele é montado
+            arquivos = ui_relatorio_em_segundo_plano(
+                "job_plano_acao_oleo", "relatorios_oleo:gerar_pdf_plano_acao",
+                args=(df_export,), artefatos=("pdf",), titulo="Caderno de Ações"
             )
+            if arquivos is not None:
+                st.download_button(
+                    label=f"📄 Caderno de Ações em PDF (Para Imprimir O.S.)",
+                    data=arquivos['pdf'],
+                    file_name=f"{nome_arq}.pdf",
+                    mime="application/pdf",
+                    type="primary",
+                    use_container_width=True
+                )
 
         with c_excel:
             if excel_bytes:
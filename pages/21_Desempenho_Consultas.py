@@ -0,0 +1,134 @@
+import streamlit as st
+import pandas as pd
+import sys
+import os
+from datetime import datetime, timedelta
+
+# --- BLINDAGEM DE IMPORTAÇÃO ---
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from database import get_db_connection, FORMATO_DATA_HORA
+import perfil_consultas
+
+# OBS: NÃO importe 'autenticacao' aqui. O login já foi feito no app.py.
+
+st.title("⏱️ Desempenho de Consultas")
+st.markdown("Tempo das consultas ao banco agrupadas por tipo (mesmo SQL com valores diferentes).")
+
+# --- 1. VERIFICAÇÃO DE SEGURANÇA (SOMENTE ADMIN) ---
+if st.session_state.get("username", "") != "admin":
+    st.error("⛔ Acesso Restrito: Apenas administradores podem ver o desempenho das consultas.")
+    st.stop()
+
+# --- 2. LIGA/DESLIGA A MEDIÇÃO ---
+col_status, col_botao = st.columns([3, 1])
+if perfil_consultas.ativo():
+    col_status.success(f"🟢 Medição ligada. Consultas acima de {perfil_consultas.LIMITE_LENTO_MS:.0f} ms guardam o plano de execução.")
+    if col_botao.button("⏹️ Desligar medição", use_container_width=True):
+        perfil_consultas.ativar(False)
+        st.rerun()
+else:
+    col_status.info("⚪ Medição desligada. Ligue aqui (vale até reiniciar o sistema) ou inicie com MANUTENCAO_PERFIL_CONSULTAS=1.")
+    if col_botao.button("▶️ Ligar medição", type="primary", use_container_width=True):
+        perfil_consultas.ativar(True)
+        st.rerun()
+
+# --- 3. PERÍODO ---
+PERIODOS = {"Última hora": 1, "Últimas 24 horas": 24, "Últimos 7 dias": 24 * 7, "Tudo": None}
+periodo = st.radio("Período:", list(PERIODOS), index=1, horizontal=True)
+horas = PERIODOS[periodo]
+
+# Medições ainda na fila entram no relatório
+perfil_consultas.gravar_pendentes()
+
+sql = "SELECT data_hora, fingerprint, consulta, origem, duracao_ms, linhas, plano FROM perf_queries"
+params = ()
+if horas:
+    sql += " WHERE data_hora >= ?"
+    params = ((datetime.now() - timedelta(hours=horas)).strftime(FORMATO_DATA_HORA),)
+
+try:
+    conn = get_db_connection()
+    df = pd.read_sql_query(sql, conn, params=params)
+    conn.close()
+except Exception as e:
+    st.error(f"Erro ao ler medições: {e}")
+    df = pd.DataFrame()
+
+# --- 4. RESUMO POR CONSULTA (p50 / p95) ---
+if df.empty:
+    st.info("Nenhuma medição no período. Ligue a medição e navegue pelas páginas para coletar dados.")
+else:
+    grupos = df.groupby("fingerprint")
+    resumo = grupos.agg(
+        consulta=("consulta", "first"),
+        execucoes=("duracao_ms", "size"),
+        p50=("duracao_ms", "median"),
+        p95=("duracao_ms", lambda s: s.quantile(0.95)),
+        maximo=("duracao_ms", "max"),
+        total=("duracao_ms", "sum"),
+        linhas=("linhas", "mean"),
+        origens=("origem", lambda s: ", ".join(sorted(s.dropna().unique()))),
+    ).reset_index().sort_values("p95", ascending=False)
+
+    k1, k2, k3 = st.columns(3)
+    k1.metric("Execuções medidas", f"{len(df):,}".replace(",", "."))
+    k2.metric("Consultas distintas", len(resumo))
+    k3.metric("Tempo total no banco", f"{df['duracao_ms'].sum() / 1000:.1f} s")
+
+    st.subheader("📊 Consultas por p95")
+    st.dataframe(
+        resumo,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "fingerprint": st.column_config.TextColumn("ID", width="small"),
+            "consulta": st.column_config.TextColumn("SQL", width="large"),
+            "execucoes": st.column_config.NumberColumn("Execuções"),
+            "p50": st.column_config.NumberColumn("p50 (ms)", format="%.1f"),
+            "p95": st.column_config.NumberColumn("p95 (ms)", format="%.1f"),
+            "maximo": st.column_config.NumberColumn("Máx (ms)", format="%.1f"),
+            "total": st.column_config.NumberColumn("Total (ms)", format="%.0f"),
+            "linhas": st.column_config.NumberColumn("Linhas (média)", format="%.0f"),
+            "origens": st.column_config.TextColumn("Chamada em", width="medium"),
+        }
+    )
+
+    # --- 5. DETALHE DE UMA CONSULTA ---
+    st.subheader("🔬 Detalhe")
+    opcoes = resumo["fingerprint"].tolist()
+    textos = dict(zip(resumo["fingerprint"], resumo["consulta"]))
+    escolhida = st.selectbox("Consulta:", opcoes, format_func=lambda f: f"{f} — {textos[f][:90]}")
+
+    if escolhida:
+        execucoes = df[df["fingerprint"] == escolhida]
+        st.code(textos[escolhida], language="sql")
+
+        planos = execucoes.dropna(subset=["plano"])
+        if planos.empty:
+            st.caption("Nenhuma execução passou do limite de lentidão; plano não registrado.")
+        else:
+            ultima_lenta = planos.sort_values("data_hora").iloc[-1]
+            st.markdown(f"**Plano da execução lenta mais recente** ({ultima_lenta['data_hora']}, {ultima_lenta['duracao_ms']:.1f} ms):")
+            st.code(ultima_lenta["plano"], language="text")
+
+        por_origem = execucoes.groupby("origem")["duracao_ms"].agg(
+            execucoes="size", p50="median", p95=lambda s: s.quantile(0.95)).reset_index()
+        st.dataframe(por_origem, use_container_width=True, hide_index=True)
+
+    with st.expander("🗑️ Limpar histórico de medições"):
+        if st.button("Apagar todas as medições gravadas", type="secondary"):
+            conn = get_db_connection()
+            conn.execute("DELETE FROM perf_queries")
+            conn.commit()
+            conn.close()
+            st.success("Histórico apagado.")
+            st.rerun()
+
+# --- 6. ÚLTIMAS MEDIÇÕES (MEMÓRIA) ---
+with st.expander("🕒 Últimas medições deste processo"):
+    recentes = perfil_consultas.medicoes_recentes()
+    if recentes:
+        st.dataframe(pd.DataFrame(recentes[::-1]).drop(columns=["plano"]), use_container_width=True, hide_index=True)
+    else:
+        st.caption("Nada medido ainda.")
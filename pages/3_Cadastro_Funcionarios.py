@@ -3,6 +3,7 @@ import sqlite3
 import pandas as pd
 import os
 from database import get_db_connection
+from utils_fotos import FOTOS_DIR, gerar_miniatura, remover_miniatura
 
 # Tenta importar o Pillow para recortar as fotos como "Avatar"
 try:
@@ -19,7 +20,6 @@ st.title("👷‍♂️ Gestão de Funcionários")
 # ==============================================================================
 # CONFIGURAÇÃO DE DIRETÓRIO DE FOTOS
 # ==============================================================================
-FOTOS_DIR = "fotos_funcionarios"
 os.makedirs(FOTOS_DIR, exist_ok=True)  # Cria a pasta automaticamente se não existir
 
 
@@ -51,6 +51,12 @@ def processar_foto(uploaded_file, matricula):
         with open(caminho, "wb") as f:
             f.write(uploaded_file.getbuffer())
 
+    # Miniatura das tabelas da Eficiência (utils_fotos): gerada uma vez aqui, não a cada exibição
+    try:
+        gerar_miniatura(matricula)
+    except Exception as e:
+        print(f"Não foi possível gerar a miniatura da foto: {e}")
+
 
 # --- Funções Auxiliares ---
 def carregar_funcionarios():
@@ -138,7 +144,6 @@ with tab_novo:
                     processar_foto(foto_novo, matricula_novo)
 
                 st.success(f"✅ Funcionário {nome_novo} cadastrado com sucesso!")
-                st.cache_data.clear()
             except sqlite3.IntegrityError:
                 st.error("Erro: Já existe um funcionário com essa matrícula.")
             except Exception as e:
@@ -210,9 +215,6 @@ with tab_importar:
                     col_res2.metric("⚠️ Duplicados (Ignorados)", duplicados)
                     col_res3.metric("❌ Erros", erros)
 
-                    if sucessos > 0:
-                        st.cache_data.clear()
-
         except Exception as e:
             st.error(f"Erro ao ler o arquivo: {e}")
 
@@ -293,13 +295,13 @@ with tab_editar:
                                     caminho_novo = os.path.join(FOTOS_DIR, f"{nova_mat}.jpg")
                                     if os.path.exists(caminho_velho):
                                         os.rename(caminho_velho, caminho_novo)
+                                        remover_miniatura(mat_atual)
 
                                 if nova_foto:
                                     # Se o usuário enviou uma foto nova, ela sobrescreve qualquer coisa
                                     processar_foto(nova_foto, nova_mat)
 
                                 st.success("✅ Dados atualizados com sucesso!")
-                                st.cache_data.clear()
                                 st.rerun()
                             except sqlite3.IntegrityError:
                                 st.error("Erro: Já existe outro funcionário com essa nova matrícula.")
@@ -354,11 +356,11 @@ with tab_excluir:
                         if os.path.exists(foto_del):
                             try:
                                 os.remove(foto_del)
+                                remover_miniatura(mat_del)
                             except Exception as e:
                                 print(f"Não foi possível apagar a foto: {e}")
 
                         st.success("Funcionário excluído do banco de dados.")
-                        st.cache_data.clear()
                         st.rerun()
                     except Exception as e:
                         st.error(f"Erro ao excluir: {e}")
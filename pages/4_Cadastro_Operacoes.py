@@ -52,7 +52,6 @@ with tab_novo:
                 )
                 conn.commit()
                 st.success(f"✅ Operação '{nome_novo}' cadastrada!")
-                st.cache_data.clear()
                 # st.rerun() # Opcional aqui
             except sqlite3.IntegrityError:
                 st.error(f"Erro: O tipo de operação '{nome_novo}' já existe.")
@@ -100,7 +99,6 @@ with tab_editar:
                         )
                         conn.commit()
                         st.success("✅ Operação atualizada com sucesso!")
-                        st.cache_data.clear()
                         st.rerun()
                     except Exception as e:
                         st.error(f"Erro ao atualizar: {e}")
@@ -141,7 +139,6 @@ with tab_excluir:
                         conn.execute("DELETE FROM tipos_operacao WHERE id = ?", (id_del,))
                         conn.commit()
                         st.success("Operação removida com sucesso.")
-                        st.cache_data.clear()
                         st.rerun()
                     except Exception as e:
                         st.error(f"Erro ao excluir: {e}")
@@ -1,6 +1,7 @@
 import streamlit as st
 import sqlite3
-from database import get_db_connection
+from database import get_db_connection, normalizar_data_hora
+from cache_consultas import consultar
 import pandas as pd
 from datetime import datetime
 import sys
@@ -17,40 +18,28 @@ st.title("📋 Nova Ordem de Serviço")
 # Fuso Horário
 FUSO_HORARIO = pytz.timezone('America/Campo_Grande')
 
-# --- Funções de Carregamento (COM CACHE) ---
+# --- Funções de Carregamento (COM CACHE POR VERSÃO DAS TABELAS, ver cache_consultas.py) ---
 
-@st.cache_data(ttl=300, show_spinner="Carregando frotas...")
 def carregar_frotas():
-    conn = get_db_connection()
     # ATUALIZADO: Agora busca também o gestao_responsavel
-    frotas = pd.read_sql_query("SELECT id, frota, modelo, gestao_responsavel FROM equipamentos ORDER BY frota", conn)
-    conn.close()
+    frotas = consultar("SELECT id, frota, modelo, gestao_responsavel FROM equipamentos ORDER BY frota")
     frotas['display'] = frotas['frota'] + " - " + frotas['modelo']
     return frotas
 
-@st.cache_data(ttl=300)
 def carregar_operacoes():
-    conn = get_db_connection()
-    operacoes = pd.read_sql_query("SELECT id, nome FROM tipos_operacao ORDER BY nome", conn)
-    conn.close()
-    return operacoes
+    return consultar("SELECT id, nome FROM tipos_operacao ORDER BY nome")
 
-@st.cache_data(ttl=300)
 def carregar_funcionarios():
-    conn = get_db_connection()
-    funcs = pd.read_sql_query("SELECT id, nome, matricula, setor FROM funcionarios ORDER BY nome", conn)
-    conn.close()
+    funcs = consultar("SELECT id, nome, matricula, setor FROM funcionarios ORDER BY nome")
     if not funcs.empty:
         funcs['display'] = funcs['nome'] + " (" + funcs['matricula'].astype(str) + ")"
     else:
         funcs['display'] = []
     return funcs
 
-@st.cache_data(ttl=300)
 def carregar_areas():
-    conn = get_db_connection()
     try:
-        areas = pd.read_sql_query("SELECT codigo, nome FROM areas ORDER BY codigo", conn)
+        areas = consultar("SELECT codigo, nome FROM areas ORDER BY codigo")
         if not areas.empty:
             areas['display'] = areas['codigo'] + " - " + areas['nome']
         else:
@@ -58,8 +47,6 @@ def carregar_areas():
         return areas
     except:
         return pd.DataFrame(columns=['display'])
-    finally:
-        conn.close()
 
 def obter_ordem_aberta(equipamento_id):
     conn = get_db_connection()
@@ -419,15 +406,14 @@ with tab_importar:
                             except: horim = 0.0
                             os_oficial = str(row['OS_Oficial']) if 'OS_Oficial' in df_up.columns and pd.notna(row['OS_Oficial']) else None
                             
-                            data_ab = datetime.now(FUSO_HORARIO).replace(tzinfo=None)
+                            # Datas da planilha (Timestamp ou texto dd/mm/aaaa) -> 'AAAA-MM-DD HH:MM:SS'; inválidas são ignoradas
+                            data_ab = normalizar_data_hora(datetime.now(FUSO_HORARIO).replace(tzinfo=None))
                             if 'Data_Abertura' in df_up.columns and pd.notna(row['Data_Abertura']):
-                                try: data_ab = pd.to_datetime(row['Data_Abertura'], dayfirst=True).to_pydatetime()
-                                except: pass
+                                data_ab = normalizar_data_hora(row['Data_Abertura']) or data_ab
                             
                             data_enc = None
                             if 'Data_Encerramento' in df_up.columns and pd.notna(row['Data_Encerramento']):
-                                try: data_enc = pd.to_datetime(row['Data_Encerramento'], dayfirst=True).to_pydatetime()
-                                except: pass
+                                data_enc = normalizar_data_hora(row['Data_Encerramento'])
 
                             # --- UPDATE / INSERT ---
                             cursor = conn.cursor()
@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
-from database import get_db_connection
+from database import get_db_connection, FORMATO_DATA_HORA
+from cache_consultas import consultar
+from repository import OrdemServicoRepository
 from datetime import datetime
 import sqlite3
 import sys
@@ -12,7 +14,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from utils_pdf import gerar_relatorio_os
 from utils_log import registrar_log
-from utils_ui import load_custom_css  # Visual consistente
+from utils_ui import load_custom_css, cursor_pagina_atual, ui_paginacao  # Visual consistente
 
 # Carrega Estilos
 load_custom_css()
@@ -22,19 +24,18 @@ st.title("🔄 Gerenciar Atendimento")
 # --- Fuso Horário ---
 FUSO_HORARIO = pytz.timezone('America/Campo_Grande')
 
+# Tamanho da página da lista e máximo de resultados da busca
+ATENDIMENTOS_POR_PAGINA = 50
+RESULTADOS_BUSCA = 20
 
-# --- Funções de Carregamento ---
+
+# --- Funções de Carregamento (cache por versão das tabelas, ver cache_consultas.py) ---
 def carregar_operacoes():
-    conn = get_db_connection()
-    operacoes = pd.read_sql_query("SELECT id, nome FROM tipos_operacao ORDER BY nome", conn)
-    conn.close()
-    return operacoes
+    return consultar("SELECT id, nome FROM tipos_operacao ORDER BY nome")
 
 
 def carregar_funcionarios():
-    conn = get_db_connection()
-    funcs = pd.read_sql_query("SELECT id, nome, matricula, setor FROM funcionarios ORDER BY nome", conn)
-    conn.close()
+    funcs = consultar("SELECT id, nome, matricula, setor FROM funcionarios ORDER BY nome")
     if not funcs.empty:
         funcs['display'] = funcs['nome'] + " (" + funcs['matricula'].astype(str) + ")"
     else:
@@ -43,9 +44,8 @@ def carregar_funcionarios():
 
 
 def carregar_areas():
-    conn = get_db_connection()
     try:
-        areas = pd.read_sql_query("SELECT codigo, nome FROM areas ORDER BY codigo", conn)
+        areas = consultar("SELECT codigo, nome FROM areas ORDER BY codigo")
         if not areas.empty:
             areas['display'] = areas['codigo'] + " - " + areas['nome']
         else:
@@ -53,60 +53,84 @@ def carregar_areas():
         return areas
     except:
         return pd.DataFrame(columns=['display'])
-    finally:
-        conn.close()
 
 
-def carregar_atendimentos(ver_todos=False):
-    conn = get_db_connection()
+def preparar_atendimentos(atendimentos):
+    """Converte as datas e monta o texto exibido no seletor."""
+    if not atendimentos.empty:
+        atendimentos['data_hora'] = pd.to_datetime(atendimentos['data_hora'], format=FORMATO_DATA_HORA,
+                                                   errors='coerce')
+        atendimentos['data_encerramento'] = pd.to_datetime(atendimentos['data_encerramento'],
+                                                           format=FORMATO_DATA_HORA, errors='coerce')
+        atendimentos['descricao_curta'] = atendimentos['descricao'].str.slice(0, 40) + '...'
+
+        # Tratamento de Nulos para Display
+        atendimentos['display'] = "Ticket " + atendimentos['id'].astype(str) + \
+                                  " (" + atendimentos['status'] + ") - Frota: " + \
+                                  atendimentos['frota'] + " - " + \
+                                  atendimentos['descricao_curta']
+
+        # Garante colunas
+        if 'classificacao' not in atendimentos.columns: atendimentos['classificacao'] = 'Corretiva'
+        if 'maquina_parada' not in atendimentos.columns: atendimentos['maquina_parada'] = 1
+    else:
+        atendimentos['display'] = []
+
+    return atendimentos
+
+
+def selecionar_atendimento(chave, somente_abertas):
+    """
+    Seletor de atendimento com busca no banco (ticket / frota / OS oficial / texto) e paginação por cursor:
+    nunca carrega o histórico inteiro. Retorna a linha escolhida (Series) ou None.
+    O ticket escolhido fica em st.session_state[f"{chave}_id"].
+    """
+    termo = st.text_input("🔎 Buscar por ticket, frota, OS oficial ou descrição", key=f"{chave}_busca",
+                          placeholder="Ex.: 1234 (ticket), 5070 (frota), eletrica...")
+    proximo_cursor = None
     try:
-        filtro_sql = "" if ver_todos else "WHERE os.status != 'Concluído'"
-
-        # Query com JOIN duplo para funcionários (Executante e Solicitante)
-        query = f"""
-        SELECT 
-            os.*, 
-            e.frota, e.modelo, e.gestao_responsavel,
-            f.nome as nome_executante,
-            f_solic.nome as nome_solicitante,
-            f_solic.matricula as mat_solicitante,
-            op.nome as nome_operacao
-        FROM ordens_servico os
-        JOIN equipamentos e ON os.equipamento_id = e.id
-        LEFT JOIN funcionarios f ON os.funcionario_id = f.id
-        LEFT JOIN funcionarios f_solic ON os.solicitante_id = f_solic.id
-        LEFT JOIN tipos_operacao op ON os.tipo_operacao_id = op.id
-        {filtro_sql}
-        ORDER BY os.data_hora DESC
-        LIMIT 500
-        """
-        atendimentos = pd.read_sql_query(query, conn)
-
-        if not atendimentos.empty:
-            atendimentos['data_hora'] = pd.to_datetime(atendimentos['data_hora'], format='mixed', errors='coerce',
-                                                       dayfirst=True)
-            atendimentos['data_encerramento'] = pd.to_datetime(atendimentos['data_encerramento'], format='mixed',
-                                                               errors='coerce', dayfirst=True)
-            atendimentos['descricao_curta'] = atendimentos['descricao'].str.slice(0, 40) + '...'
-
-            # Tratamento de Nulos para Display
-            atendimentos['display'] = "Ticket " + atendimentos['id'].astype(str) + \
-                                      " (" + atendimentos['status'] + ") - Frota: " + \
-                                      atendimentos['frota'] + " - " + \
-                                      atendimentos['descricao_curta']
-
-            # Garante colunas
-            if 'classificacao' not in atendimentos.columns: atendimentos['classificacao'] = 'Corretiva'
-            if 'maquina_parada' not in atendimentos.columns: atendimentos['maquina_parada'] = 1
+        if termo:
+            atendimentos = OrdemServicoRepository.buscar(termo, RESULTADOS_BUSCA, somente_abertas)
+            # Completa com a busca textual (descrição/local), ordenada por relevância
+            if len(atendimentos) < RESULTADOS_BUSCA:
+                por_texto = OrdemServicoRepository.buscar_texto(termo, RESULTADOS_BUSCA, somente_abertas)
+                atendimentos = pd.concat([atendimentos, por_texto], ignore_index=True) \
+                    .drop_duplicates('id').head(RESULTADOS_BUSCA)
         else:
-            atendimentos['display'] = []
-
-        return atendimentos
+            cursor = cursor_pagina_atual(f"{chave}_paginas", somente_abertas)
+            atendimentos, proximo_cursor = OrdemServicoRepository.listar_pagina(
+                cursor, ATENDIMENTOS_POR_PAGINA, somente_abertas)
+
+        # Mantém o ticket já escolhido entre as opções mesmo fora da página/busca atual
+        id_escolhido = st.session_state.get(f"{chave}_id")
+        if id_escolhido is not None and id_escolhido not in set(atendimentos['id']):
+            atendimentos = pd.concat([OrdemServicoRepository.obter(id_escolhido), atendimentos], ignore_index=True)
     except Exception as e:
         st.error(f"Erro ao carregar atendimentos: {e}")
-        return pd.DataFrame()
-    finally:
-        if conn: conn.close()
+        return None
+
+    atendimentos = preparar_atendimentos(atendimentos)
+    if atendimentos.empty:
+        st.info("Nenhum atendimento encontrado.")
+        return None
+
+    ids = atendimentos['id'].astype(int).tolist()
+    textos = dict(zip(ids, atendimentos['display']))
+    id_escolhido = st.selectbox(
+        "Selecione o Atendimento:",
+        options=ids,
+        format_func=textos.get,
+        index=ids.index(id_escolhido) if id_escolhido in ids else None,
+        placeholder="Escolha na lista ou use a busca acima...",
+        key=chave
+    )
+    if not termo:
+        ui_paginacao(f"{chave}_paginas", proximo_cursor)
+
+    st.session_state[f"{chave}_id"] = id_escolhido
+    if id_escolhido is None:
+        return None
+    return atendimentos[atendimentos['id'] == id_escolhido].iloc[0]
 
 
 # --- Layout ---
@@ -126,306 +150,272 @@ with tab_editar:
     with col_check:
         mostrar_concluidos = st.checkbox("Ver Concluídos?", value=False, help="Marque para editar ordens antigas")
 
-    atendimentos_df = carregar_atendimentos(ver_todos=mostrar_concluidos)
+    # --- LÓGICA DE PRE-SELEÇÃO DO PAINEL PRINCIPAL ---
+    if 'ticket_para_editar' in st.session_state:
+        target_id = st.session_state['ticket_para_editar']
+        if OrdemServicoRepository.obter(target_id).empty:
+            st.warning(f"O Ticket #{target_id} não foi encontrado.")
+        else:
+            st.session_state['sb_edit_os_id'] = int(target_id)
+            st.toast(f"Ticket #{target_id} carregado para edição.", icon="🖊️")
+
+        # Limpa a variável da sessão para não ficar travado nesse ticket para sempre
+        del st.session_state['ticket_para_editar']
+
+    selected_row = selecionar_atendimento("sb_edit_os", somente_abertas=not mostrar_concluidos)
+
+    if selected_row is not None:
+        selected_id = int(selected_row['id'])
+
+        # --- HEADER DO TICKET ---
+        with st.container(border=True):
+            col_info, col_print = st.columns([3, 1])
+            with col_info:
+                st.markdown(f"### 🎫 Ticket #{selected_id}")
+                st.markdown(f"**Frota:** {selected_row['frota']} ({selected_row['modelo']})")
+
+            with col_print:
+                # Prepara dados para impressão
+                dados_para_pdf = {
+                    'id': selected_id,
+                    'numero_os_oficial': selected_row['numero_os_oficial'],
+                    'frota': selected_row['frota'],
+                    'modelo': selected_row['modelo'],
+                    'gestao': selected_row['gestao_responsavel'],
+                    'horimetro': selected_row['horimetro'],
+                    'local_atendimento': selected_row['local_atendimento'],
+                    'status': selected_row['status'],
+                    'prioridade': selected_row['prioridade'],
+                    'operacao': selected_row['nome_operacao'],
+                    'executante': selected_row['nome_executante'],
+                    'descricao': selected_row['descricao'],
+                    'data_hora': selected_row['data_hora']
+                }
+                try:
+                    pdf_bytes = gerar_relatorio_os(dados_para_pdf)
+                    nome_arq = f"OS_{selected_row['numero_os_oficial']}.pdf" if selected_row[
+                        'numero_os_oficial'] else f"Ticket_{selected_id}.pdf"
+                    st.download_button(label="🖨️ Imprimir Ficha A4", data=pdf_bytes, file_name=nome_arq,
+                                       mime="application/pdf", type="primary", use_container_width=True)
+                except Exception as e:
+                    st.error(f"Erro ao gerar PDF: {e}")
+
+        st.markdown("<br>", unsafe_allow_html=True)
+
+        # --- FORMULÁRIO DE EDIÇÃO ---
+        with st.form("form_update_os"):
+            st.markdown("###### 📋 Dados Gerais")
+
+            # Linha 1
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                status_ops = ["Pendente", "Aberto (Parada)", "Em Andamento", "Aguardando Peças", "Concluído"]
+                try:
+                    idx_st = status_ops.index(selected_row['status'])
+                except:
+                    idx_st = 0
+                novo_status = st.selectbox("Status Atual", options=status_ops, index=idx_st)
+
+            with col2:
+                prio_ops = ["Alta", "Média", "Baixa"]
+                val_p = str(selected_row['prioridade']).title() if pd.notna(selected_row['prioridade']) else "Média"
+                # Fallback caso venha algo estranho do banco
+                if val_p not in prio_ops: val_p = "Média"
+                idx_p = prio_ops.index(val_p)
+                novo_prioridade = st.selectbox("Prioridade", options=prio_ops, index=idx_p)
+
+            with col3:
+                val_os = selected_row['numero_os_oficial'] if selected_row['numero_os_oficial'] else ""
+                novo_num_os = st.text_input("Número da OS Oficial", value=val_os)
+
+            # Linha 2
+            col4, col5, col6 = st.columns(3)
+            with col4:
+                ops_list = operacoes_df['nome'].tolist()
+                try:
+                    idx_op = ops_list.index(selected_row['nome_operacao'])
+                except:
+                    idx_op = 0
+                novo_op_nome = st.selectbox("Tipo de Operação", options=ops_list, index=idx_op)
+
+            with col5:
+                funcs_list = funcionarios_df['display'].tolist()
+                idx_f = None
+                nome_atual = selected_row['nome_executante']
+                if pd.notna(nome_atual):
+                    match = [f for f in funcs_list if nome_atual in f]
+                    if match: idx_f = funcs_list.index(match[0])
+
+                novo_func_display = st.selectbox("Executante", options=funcs_list, index=idx_f)
+
+            with col6:
+                val_h = float(selected_row['horimetro']) if pd.notna(selected_row['horimetro']) else 0.0
+                novo_horimetro = st.number_input("Horímetro", value=val_h, min_value=0.0, step=0.1, format="%.1f")
+
+            # Linha 3: Solicitante e Gestor
+            col_solic, col_gestor = st.columns(2)
+            with col_solic:
+                idx_s = None
+                nome_solic_atual = selected_row['nome_solicitante']
+                if pd.notna(nome_solic_atual):
+                    match_s = [f for f in funcs_list if nome_solic_atual in f]
+                    if match_s: idx_s = funcs_list.index(match_s[0])
+
+                novo_solicitante_display = st.selectbox(
+                    "Solicitante (Quem pediu)",
+                    options=funcs_list,
+                    index=idx_s,
+                    placeholder="Selecione..."
+                )
+
+            with col_gestor:
+                gestor_bd = selected_row['gestao_responsavel'] if pd.notna(
+                    selected_row['gestao_responsavel']) else "-"
+                st.text_input("Gestor Responsável (Da Frota)", value=gestor_bd, disabled=True)
+
+            # Linha 4: KPI
+            st.markdown("###### 🔧 Classificação (KPI)")
+            col_kpi1, col_kpi2 = st.columns(2)
+            with col_kpi1:
+                opcoes_class = ["Corretiva", "Preventiva", "Preditiva"]
+                val_class = selected_row.get('classificacao', 'Corretiva')
+                val_class_clean = val_class.split(' ')[0] if val_class else 'Corretiva'
+                if val_class_clean not in opcoes_class: val_class_clean = 'Corretiva'
+
+                nova_classificacao = st.selectbox("Tipo de Intervenção", options=opcoes_class,
+                                                  index=opcoes_class.index(val_class_clean))
+
+            with col_kpi2:
+                val_parada = bool(selected_row.get('maquina_parada', 1))
+                nova_parada = st.checkbox("Máquina Parada?", value=val_parada)
+
+            st.markdown("###### 📅 Datas e Local")
+            val_abertura = selected_row['data_hora']
+            if pd.isnull(val_abertura):
+                dt_ab_db = datetime.now(FUSO_HORARIO).replace(tzinfo=None)
+            else:
+                dt_ab_db = val_abertura.to_pydatetime()
+
+            col_d1, col_d2 = st.columns(2)
+            with col_d1:
+                d_ab = st.date_input("Data Abertura", value=dt_ab_db.date())
+                t_ab = st.time_input("Hora Abertura", value=dt_ab_db.time())
+
+            nova_data_fim = None;
+            nova_hora_fim = None
+            with col_d2:
+                if novo_status == "Concluído":
+                    val_fim = selected_row['data_encerramento']
+                    if pd.isnull(val_fim):
+                        dt_fim_db = datetime.now(FUSO_HORARIO).replace(tzinfo=None)
+                    else:
+                        dt_fim_db = val_fim.to_pydatetime()
+                    nova_data_fim = st.date_input("Data Encerramento", value=dt_fim_db.date())
+                    nova_hora_fim = st.time_input("Hora Encerramento", value=dt_fim_db.time())
+                else:
+                    st.info("Mude para 'Concluído' para fechar a data.")
+
+            col_loc, col_lat, col_lon = st.columns([2, 1, 1])
+            with col_loc:
+                opcoes_local = areas_df['display'].tolist() if not areas_df.empty else []
+                val_local_atual = selected_row['local_atendimento']
+                idx_local = None
+                if val_local_atual in opcoes_local: idx_local = opcoes_local.index(val_local_atual)
+                novo_local = st.selectbox("Local / Talhão", options=opcoes_local, index=idx_local)
 
-    if atendimentos_df.empty:
-        st.info("Nenhum atendimento encontrado.")
-    else:
-        # --- LÓGICA DE PRE-SELEÇÃO DO PAINEL PRINCIPAL ---
-        index_selecionado = None
+            lat_at = float(selected_row['latitude']) if pd.notna(selected_row['latitude']) else 0.0
+            lon_at = float(selected_row['longitude']) if pd.notna(selected_row['longitude']) else 0.0
+            with col_lat:
+                nova_lat = st.number_input("Latitude", value=lat_at, format="%.6f")
+            with col_lon:
+                nova_lon = st.number_input("Longitude", value=lon_at, format="%.6f")
 
-        # Verifica se veio um pedido de edição do Painel
-        if 'ticket_para_editar' in st.session_state:
-            target_id = st.session_state['ticket_para_editar']
+            nova_descricao = st.text_area("Descrição", value=selected_row['descricao'], height=100)
 
-            # Tenta encontrar a linha correspondente ao ID
-            row_match = atendimentos_df[atendimentos_df['id'] == target_id]
+            submitted = st.form_submit_button("💾 Salvar Alterações", type="primary")
 
-            if not row_match.empty:
-                # Pega o texto de exibição (display) dessa linha
-                display_value = row_match.iloc[0]['display']
+            if submitted:
+                conn = None
                 try:
-                    # Encontra o índice desse texto na lista de opções
-                    index_selecionado = atendimentos_df['display'].tolist().index(display_value)
-                    st.toast(f"Ticket #{target_id} carregado para edição.", icon="🖊️")
-                except:
-                    pass
-            else:
-                if not mostrar_concluidos:
-                    st.warning(
-                        f"O Ticket #{target_id} não foi encontrado na lista de abertos. Tente marcar 'Ver Concluídos'.")
-
-            # Limpa a variável da sessão para não ficar travado nesse ticket para sempre
-            del st.session_state['ticket_para_editar']
-
-        option_display = st.selectbox(
-            "Selecione o Atendimento:",
-            options=atendimentos_df['display'],
-            index=index_selecionado,  # Usa o índice calculado
-            placeholder="Busque pelo ticket ou frota...",
-            key="sb_edit_os"
-        )
-
-        if option_display:
-            selected_row = atendimentos_df[atendimentos_df['display'] == option_display].iloc[0]
-            selected_id = int(selected_row['id'])
-
-            # --- HEADER DO TICKET ---
-            with st.container(border=True):
-                col_info, col_print = st.columns([3, 1])
-                with col_info:
-                    st.markdown(f"### 🎫 Ticket #{selected_id}")
-                    st.markdown(f"**Frota:** {selected_row['frota']} ({selected_row['modelo']})")
-
-                with col_print:
-                    # Prepara dados para impressão
-                    dados_para_pdf = {
-                        'id': selected_id,
-                        'numero_os_oficial': selected_row['numero_os_oficial'],
-                        'frota': selected_row['frota'],
-                        'modelo': selected_row['modelo'],
-                        'gestao': selected_row['gestao_responsavel'],
-                        'horimetro': selected_row['horimetro'],
-                        'local_atendimento': selected_row['local_atendimento'],
-                        'status': selected_row['status'],
-                        'prioridade': selected_row['prioridade'],
-                        'operacao': selected_row['nome_operacao'],
-                        'executante': selected_row['nome_executante'],
-                        'descricao': selected_row['descricao'],
-                        'data_hora': selected_row['data_hora']
-                    }
-                    try:
-                        pdf_bytes = gerar_relatorio_os(dados_para_pdf)
-                        nome_arq = f"OS_{selected_row['numero_os_oficial']}.pdf" if selected_row[
-                            'numero_os_oficial'] else f"Ticket_{selected_id}.pdf"
-                        st.download_button(label="🖨️ Imprimir Ficha A4", data=pdf_bytes, file_name=nome_arq,
-                                           mime="application/pdf", type="primary", use_container_width=True)
-                    except Exception as e:
-                        st.error(f"Erro ao gerar PDF: {e}")
-
-            st.markdown("<br>", unsafe_allow_html=True)
-
-            # --- FORMULÁRIO DE EDIÇÃO ---
-            with st.form("form_update_os"):
-                st.markdown("###### 📋 Dados Gerais")
-
-                # Linha 1
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    status_ops = ["Pendente", "Aberto (Parada)", "Em Andamento", "Aguardando Peças", "Concluído"]
-                    try:
-                        idx_st = status_ops.index(selected_row['status'])
-                    except:
-                        idx_st = 0
-                    novo_status = st.selectbox("Status Atual", options=status_ops, index=idx_st)
-
-                with col2:
-                    prio_ops = ["Alta", "Média", "Baixa"]
-                    val_p = str(selected_row['prioridade']).title() if pd.notna(selected_row['prioridade']) else "Média"
-                    # Fallback caso venha algo estranho do banco
-                    if val_p not in prio_ops: val_p = "Média"
-                    idx_p = prio_ops.index(val_p)
-                    novo_prioridade = st.selectbox("Prioridade", options=prio_ops, index=idx_p)
-
-                with col3:
-                    val_os = selected_row['numero_os_oficial'] if selected_row['numero_os_oficial'] else ""
-                    novo_num_os = st.text_input("Número da OS Oficial", value=val_os)
-
-                # Linha 2
-                col4, col5, col6 = st.columns(3)
-                with col4:
-                    ops_list = operacoes_df['nome'].tolist()
-                    try:
-                        idx_op = ops_list.index(selected_row['nome_operacao'])
-                    except:
-                        idx_op = 0
-                    novo_op_nome = st.selectbox("Tipo de Operação", options=ops_list, index=idx_op)
-
-                with col5:
-                    funcs_list = funcionarios_df['display'].tolist()
-                    idx_f = None
-                    nome_atual = selected_row['nome_executante']
-                    if pd.notna(nome_atual):
-                        match = [f for f in funcs_list if nome_atual in f]
-                        if match: idx_f = funcs_list.index(match[0])
-
-                    novo_func_display = st.selectbox("Executante", options=funcs_list, index=idx_f)
-
-                with col6:
-                    val_h = float(selected_row['horimetro']) if pd.notna(selected_row['horimetro']) else 0.0
-                    novo_horimetro = st.number_input("Horímetro", value=val_h, min_value=0.0, step=0.1, format="%.1f")
-
-                # Linha 3: Solicitante e Gestor
-                col_solic, col_gestor = st.columns(2)
-                with col_solic:
-                    idx_s = None
-                    nome_solic_atual = selected_row['nome_solicitante']
-                    if pd.notna(nome_solic_atual):
-                        match_s = [f for f in funcs_list if nome_solic_atual in f]
-                        if match_s: idx_s = funcs_list.index(match_s[0])
-
-                    novo_solicitante_display = st.selectbox(
-                        "Solicitante (Quem pediu)",
-                        options=funcs_list,
-                        index=idx_s,
-                        placeholder="Selecione..."
-                    )
-
-                with col_gestor:
-                    gestor_bd = selected_row['gestao_responsavel'] if pd.notna(
-                        selected_row['gestao_responsavel']) else "-"
-                    st.text_input("Gestor Responsável (Da Frota)", value=gestor_bd, disabled=True)
-
-                # Linha 4: KPI
-                st.markdown("###### 🔧 Classificação (KPI)")
-                col_kpi1, col_kpi2 = st.columns(2)
-                with col_kpi1:
-                    opcoes_class = ["Corretiva", "Preventiva", "Preditiva"]
-                    val_class = selected_row.get('classificacao', 'Corretiva')
-                    val_class_clean = val_class.split(' ')[0] if val_class else 'Corretiva'
-                    if val_class_clean not in opcoes_class: val_class_clean = 'Corretiva'
-
-                    nova_classificacao = st.selectbox("Tipo de Intervenção", options=opcoes_class,
-                                                      index=opcoes_class.index(val_class_clean))
-
-                with col_kpi2:
-                    val_parada = bool(selected_row.get('maquina_parada', 1))
-                    nova_parada = st.checkbox("Máquina Parada?", value=val_parada)
-
-                st.markdown("###### 📅 Datas e Local")
-                val_abertura = selected_row['data_hora']
-                if pd.isnull(val_abertura):
-                    dt_ab_db = datetime.now(FUSO_HORARIO).replace(tzinfo=None)
-                else:
-                    dt_ab_db = val_abertura.to_pydatetime()
-
-                col_d1, col_d2 = st.columns(2)
-                with col_d1:
-                    d_ab = st.date_input("Data Abertura", value=dt_ab_db.date())
-                    t_ab = st.time_input("Hora Abertura", value=dt_ab_db.time())
-
-                nova_data_fim = None;
-                nova_hora_fim = None
-                with col_d2:
-                    if novo_status == "Concluído":
-                        val_fim = selected_row['data_encerramento']
-                        if pd.isnull(val_fim):
-                            dt_fim_db = datetime.now(FUSO_HORARIO).replace(tzinfo=None)
-                        else:
-                            dt_fim_db = val_fim.to_pydatetime()
-                        nova_data_fim = st.date_input("Data Encerramento", value=dt_fim_db.date())
-                        nova_hora_fim = st.time_input("Hora Encerramento", value=dt_fim_db.time())
-                    else:
-                        st.info("Mude para 'Concluído' para fechar a data.")
-
-                col_loc, col_lat, col_lon = st.columns([2, 1, 1])
-                with col_loc:
-                    opcoes_local = areas_df['display'].tolist() if not areas_df.empty else []
-                    val_local_atual = selected_row['local_atendimento']
-                    idx_local = None
-                    if val_local_atual in opcoes_local: idx_local = opcoes_local.index(val_local_atual)
-                    novo_local = st.selectbox("Local / Talhão", options=opcoes_local, index=idx_local)
-
-                lat_at = float(selected_row['latitude']) if pd.notna(selected_row['latitude']) else 0.0
-                lon_at = float(selected_row['longitude']) if pd.notna(selected_row['longitude']) else 0.0
-                with col_lat:
-                    nova_lat = st.number_input("Latitude", value=lat_at, format="%.6f")
-                with col_lon:
-                    nova_lon = st.number_input("Longitude", value=lon_at, format="%.6f")
-
-                nova_descricao = st.text_area("Descrição", value=selected_row['descricao'], height=100)
-
-                submitted = st.form_submit_button("💾 Salvar Alterações", type="primary")
-
-                if submitted:
-                    conn = None
-                    try:
-                        novo_op_id = operacoes_df[operacoes_df['nome'] == novo_op_nome]['id'].values[0]
-
-                        novo_func_id = None
-                        if novo_func_display:
-                            novo_func_id = \
-                            funcionarios_df[funcionarios_df['display'] == novo_func_display]['id'].values[0]
-
-                        novo_solic_id = None
-                        if novo_solicitante_display:
-                            novo_solic_id = \
-                            funcionarios_df[funcionarios_df['display'] == novo_solicitante_display]['id'].values[0]
-
-                        final_abertura = datetime.combine(d_ab, t_ab)
-                        final_encerramento = None
-                        if novo_status == "Concluído" and nova_data_fim:
-                            final_encerramento = datetime.combine(nova_data_fim, nova_hora_fim)
-                        elif novo_status == "Concluído" and final_encerramento is None:
-                            final_encerramento = datetime.now(FUSO_HORARIO).replace(tzinfo=None)
-
-                        final_lat = nova_lat if nova_lat != 0.0 else None
-                        final_lon = nova_lon if nova_lon != 0.0 else None
-                        final_parada = 1 if nova_parada else 0
-
-                        conn = get_db_connection()
-                        sql = """
-                            UPDATE ordens_servico 
-                            SET status=?, local_atendimento=?, descricao=?, tipo_operacao_id=?, 
-                                numero_os_oficial=?, funcionario_id=?, horimetro=?, prioridade=?, 
-                                latitude=?, longitude=?, data_hora=?, data_encerramento=?,
-                                classificacao=?, maquina_parada=?, solicitante_id=?
-                            WHERE id=?
-                        """
-                        params = (novo_status, novo_local, nova_descricao, int(novo_op_id),
-                                  novo_num_os, novo_func_id, novo_horimetro, novo_prioridade,
-                                  final_lat, final_lon, final_abertura, final_encerramento,
-                                  nova_classificacao, final_parada, novo_solic_id, selected_id)
-
-                        conn.execute(sql, params)
-                        conn.commit()
-
-                        detalhes = f"Status: {novo_status} | Class: {nova_classificacao}"
-                        registrar_log("EDITAR", f"OS #{selected_id}", detalhes)
-                        st.toast(f"Ticket {selected_id} atualizado com sucesso!", icon="✅")
-                        st.cache_data.clear()
-                        import time;
-
-                        time.sleep(1)
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Erro: {e}")
-                    finally:
-                        if conn: conn.close()
+                    novo_op_id = operacoes_df[operacoes_df['nome'] == novo_op_nome]['id'].values[0]
+
+                    novo_func_id = None
+                    if novo_func_display:
+                        novo_func_id = \
+                        funcionarios_df[funcionarios_df['display'] == novo_func_display]['id'].values[0]
+
+                    novo_solic_id = None
+                    if novo_solicitante_display:
+                        novo_solic_id = \
+                        funcionarios_df[funcionarios_df['display'] == novo_solicitante_display]['id'].values[0]
+
+                    final_abertura = datetime.combine(d_ab, t_ab)
+                    final_encerramento = None
+                    if novo_status == "Concluído" and nova_data_fim:
+                        final_encerramento = datetime.combine(nova_data_fim, nova_hora_fim)
+                    elif novo_status == "Concluído" and final_encerramento is None:
+                        final_encerramento = datetime.now(FUSO_HORARIO).replace(tzinfo=None)
+
+                    final_lat = nova_lat if nova_lat != 0.0 else None
+                    final_lon = nova_lon if nova_lon != 0.0 else None
+                    final_parada = 1 if nova_parada else 0
+
+                    conn = get_db_connection()
+                    sql = """
+                        UPDATE ordens_servico 
+                        SET status=?, local_atendimento=?, descricao=?, tipo_operacao_id=?, 
+                            numero_os_oficial=?, funcionario_id=?, horimetro=?, prioridade=?, 
+                            latitude=?, longitude=?, data_hora=?, data_encerramento=?,
+                            classificacao=?, maquina_parada=?, solicitante_id=?
+                        WHERE id=?
+                    """
+                    params = (novo_status, novo_local, nova_descricao, int(novo_op_id),
+                              novo_num_os, novo_func_id, novo_horimetro, novo_prioridade,
+                              final_lat, final_lon, final_abertura, final_encerramento,
+                              nova_classificacao, final_parada, novo_solic_id, selected_id)
+
+                    conn.execute(sql, params)
+                    conn.commit()
+
+                    detalhes = f"Status: {novo_status} | Class: {nova_classificacao}"
+                    registrar_log("EDITAR", f"OS #{selected_id}", detalhes)
+                    st.toast(f"Ticket {selected_id} atualizado com sucesso!", icon="✅")
+                    import time;
+
+                    time.sleep(1)
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Erro: {e}")
+                finally:
+                    if conn: conn.close()
 
 # ==============================================================================
 # ABA 2: EXCLUIR
 # ==============================================================================
 with tab_excluir:
     st.subheader("Remover Atendimento")
-    df_del = carregar_atendimentos(ver_todos=True)
-    if df_del.empty:
-        st.info("Nada para excluir.")
-    else:
-        option_del = st.selectbox("Selecione:", options=df_del['display'], index=None, key="sb_del_os")
-        if option_del:
-            row_del = df_del[df_del['display'] == option_del].iloc[0]
-            id_del = int(row_del['id'])
-            with st.container(border=True):
-                st.markdown(f"### 🗑️ Excluir Ticket #{id_del}?")
-                st.markdown(f"**Frota:** {row_del['frota']} - {row_del['modelo']}")
-                st.markdown(f"**Descrição:** {row_del['descricao']}")
-                st.warning("Esta ação é irreversível.")
-
-                if st.button("Confirmar Exclusão Permanente", type="primary"):
-                    conn = None
-                    try:
-                        conn = get_db_connection()
-                        conn.execute("DELETE FROM ordens_servico WHERE id = ?", (id_del,))
-                        conn.commit()
-                        registrar_log("EXCLUIR", f"OS #{id_del}", f"Frota: {row_del['frota']}")
-                        st.toast("Ticket excluído.", icon="🗑️")
-                        st.cache_data.clear()
-                        import time;
-
-                        time.sleep(1)
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Erro: {e}")
-                    finally:
-                        if conn: conn.close()
\ No newline at end of file
+    row_del = selecionar_atendimento("sb_del_os", somente_abertas=False)
+    if row_del is not None:
+        id_del = int(row_del['id'])
+        with st.container(border=True):
+            st.markdown(f"### 🗑️ Excluir Ticket #{id_del}?")
+            st.markdown(f"**Frota:** {row_del['frota']} - {row_del['modelo']}")
+            st.markdown(f"**Descrição:** {row_del['descricao']}")
+            st.warning("Esta ação é irreversível.")
+
+            if st.button("Confirmar Exclusão Permanente", type="primary"):
+                conn = None
+                try:
+                    conn = get_db_connection()
+                    conn.execute("DELETE FROM ordens_servico WHERE id = ?", (id_del,))
+                    conn.commit()
+                    registrar_log("EXCLUIR", f"OS #{id_del}", f"Frota: {row_del['frota']}")
+                    st.toast("Ticket excluído.", icon="🗑️")
+                    import time;
+
+                    time.sleep(1)
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Erro: {e}")
+                finally:
+                    if conn: conn.close()
\ No newline at end of file
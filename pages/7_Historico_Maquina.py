@@ -7,9 +7,12 @@ import os
 # --- BLINDAGEM DE IMPORTAÇÃO ---
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from database import get_db_connection
+from database import get_db_connection, FORMATO_DATA_HORA
 from datetime import datetime, timedelta
 from utils_pdf import gerar_prontuario_maquina
+from repository import OrdemServicoRepository
+from arquivo_morto import fonte
+from utils_intervalos import unir_intervalos
 
 st.set_page_config(layout="wide", page_title="Histórico da Máquina")
 st.title("🚜 Prontuário / Histórico da Máquina")
@@ -48,9 +51,11 @@ def carregar_historico_frota(equipamento_id, d_inicio, d_fim):
     try:
         d_inicio_str = d_inicio.strftime('%Y-%m-%d 00:00:00')
         d_fim_str = d_fim.strftime('%Y-%m-%d 23:59:59')
+        # Período que alcança o arquivo morto consulta a união (ativo + arquivo)
+        origem = fonte(conn, "ordens_servico", d_inicio_str)
         
         # Query atualizada com JOIN para Solicitante e campos KPI
-        query = """
+        query = f"""
         SELECT 
             os.id as Ticket,
             os.data_hora as Data,
@@ -65,7 +70,7 @@ def carregar_historico_frota(equipamento_id, d_inicio, d_fim):
             os.maquina_parada,
             f.nome as Executante,
             s.nome as Solicitante
-        FROM ordens_servico os
+        FROM {origem} os
         JOIN tipos_operacao op ON os.tipo_operacao_id = op.id
         LEFT JOIN funcionarios f ON os.funcionario_id = f.id
         LEFT JOIN funcionarios s ON os.solicitante_id = s.id
@@ -110,8 +115,8 @@ if frota_selecionada:
         st.warning(f"Nenhum registro encontrado para **{frota_selecionada}** neste período.")
     else:
         # --- TRATAMENTO DE DADOS ---
-        historico_df['Data_DT'] = pd.to_datetime(historico_df['Data'], format='mixed', dayfirst=True, errors='coerce')
-        historico_df['Fim_DT'] = pd.to_datetime(historico_df['Fim'], format='mixed', dayfirst=True, errors='coerce')
+        historico_df['Data_DT'] = pd.to_datetime(historico_df['Data'], format=FORMATO_DATA_HORA, errors='coerce')
+        historico_df['Fim_DT'] = pd.to_datetime(historico_df['Fim'], format=FORMATO_DATA_HORA, errors='coerce')
         
         # Duração
         historico_df['Duracao_Obj'] = historico_df['Fim_DT'] - historico_df['Data_DT']
@@ -135,9 +140,10 @@ if frota_selecionada:
         df_falhas = historico_df[historico_df['classificacao'].str.contains('Corretiva', case=False, na=False)]
         total_falhas = len(df_falhas)
         
-        # Tempo parado (Soma das durações onde houve parada)
+        # Tempo parado (união dos períodos com parada: ordens simultâneas contam uma vez só)
         df_parado = historico_df[historico_df['maquina_parada'] == True]
-        tempo_total = df_parado['Duracao_Obj'].sum(numeric_only=False)
+        paradas, _ = unir_intervalos([id_frota] * len(df_parado), df_parado['Data_DT'], df_parado['Fim_DT'])
+        tempo_total = pd.Timedelta(hours=paradas['horas'].sum())
         tempo_str = formatar_duracao(tempo_total)
         
         comum = historico_df['Operacao'].mode()[0] if not historico_df.empty else "-"
@@ -148,7 +154,8 @@ if frota_selecionada:
         k1, k2, k3, k4 = st.columns(4)
         k1.metric("Total Intervenções", total_ops)
         k2.metric("Falhas (Quebras)", total_falhas, help="Classificadas como 'Corretiva'")
-        k3.metric("Tempo Total Parado", tempo_str, help="Soma da duração onde Máquina Parada = Sim")
+        k3.metric("Tempo Total Parado", tempo_str,
+                  help="Tempo com Máquina Parada = Sim (ordens simultâneas contam uma vez; em andamento não entram)")
         k4.metric("Última Intervenção", ult_data)
         
         st.divider()
@@ -180,9 +187,23 @@ if frota_selecionada:
 
         # --- TABELA DETALHADA RICA ---
         st.subheader("📋 Registro Detalhado")
+        busca_hist = st.text_input("🔎 Buscar no histórico desta máquina", placeholder="Ex.: eletrica, bomba, vazamento...",
+                                   help="Busca por palavras na descrição, local e OS oficial, sem diferenciar acentos.")
+        df_tabela = historico_df
+        if busca_hist:
+            # Índice textual (FTS5) restrito à frota; mantém só os tickets do período, por relevância
+            achados = OrdemServicoRepository.buscar_texto(busca_hist, limite=1000, equipamento_id=int(id_frota))
+            ordem = {tid: pos for pos, tid in enumerate(achados['id'])}
+            # Ordens do arquivo morto não estão no índice textual: entram por texto simples, no fim
+            no_texto = historico_df['Descricao'].fillna('').str.contains(busca_hist, case=False, regex=False)
+            for tid in historico_df.loc[no_texto, 'Ticket']:
+                ordem.setdefault(tid, len(ordem))
+            df_tabela = historico_df[historico_df['Ticket'].isin(ordem)].sort_values(
+                'Ticket', key=lambda s: s.map(ordem))
+            st.caption(f"{len(df_tabela)} registro(s) encontrado(s), do mais relevante para o menos.")
         
         st.dataframe(
-            historico_df,
+            df_tabela,
             use_container_width=True,
             hide_index=True,
             column_order=[
@@ -1,17 +1,22 @@
 import streamlit as st
+import pandas as pd
 import os
 import sys
 
+# --- BLINDAGEM DE IMPORTAÇÃO ---
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-
-from datetime import datetime
+from backup import criar_snapshot, listar_snapshots, caminho_snapshot, restaurar
+from backup_daemon import INTERVALO_MIN, agendador_ativo, estado as estado_agendador
+import arquivo_morto
+from database import DB_NAME
 
 st.title("💾 Backup e Segurança de Dados")
 
 # Nome do arquivo de banco de dados
-DB_FILE = "manutencao.db"
+DB_FILE = DB_NAME
 
-tab_backup, tab_restore = st.tabs(["📥 Fazer Backup (Download)", "📤 Restaurar Backup (Upload)"])
+tab_backup, tab_restore, tab_arquivo = st.tabs(["📥 Fazer Backup (Download)", "📤 Restaurar Backup (Upload)", "🗄️ Arquivo Morto"])
 
 # ==============================================================================
 # ABA 1: FAZER BACKUP
@@ -23,33 +28,80 @@ with tab_backup:
     O sistema salva todos os dados em um arquivo local (`manutencao.db`). Se este computador der problema, você pode perder tudo.
     
     **Recomendação:**
-    1. Clique no botão abaixo para baixar o arquivo.
+    1. Clique em **Gerar backup agora** e depois baixe o arquivo gerado (`.db.gz`, compactado).
     2. Salve-o em um local seguro (Google Drive, OneDrive, Pen Drive ou envie por e-mail para si mesmo).
     3. Faça isso pelo menos **uma vez por semana**.
     """)
     
-    # Verifica se o banco existe antes de permitir o download
-    if os.path.exists(DB_FILE):
-        # Lê o arquivo em modo binário
-        with open(DB_FILE, "rb") as f:
-            db_bytes = f.read()
-            
-        # Gera um nome com data e hora (Ex: backup_manutencao_2023-10-27.db)
-        timestamp = datetime.now().strftime("%Y-%m-%d_%Hh%M")
-        nome_arquivo = f"backup_manutencao_{timestamp}.db"
-        
-        st.download_button(
-            label="⬇️ CLIQUE AQUI PARA BAIXAR O BACKUP",
-            data=db_bytes,
-            file_name=nome_arquivo,
-            mime="application/x-sqlite3",
-            type="primary", # Deixa o botão destacado
-            help="Salva uma cópia completa de todas as máquinas, funcionários e ordens de serviço."
-        )
-        st.success(f"Arquivo pronto: {len(db_bytes) / 1024:.1f} KB")
-        
-    else:
+    # Verifica se o banco existe antes de permitir o backup
+    if not os.path.exists(DB_FILE):
         st.error("⚠️ Erro crítico: O arquivo de banco de dados não foi encontrado na pasta do sistema.")
+    else:
+        # O snapshot só é gerado quando pedido (cópia online pela API de backup do SQLite,
+        # consistente mesmo com gente gravando no sistema ao mesmo tempo)
+        if st.button("📸 Gerar backup agora", type="primary"):
+            try:
+                with st.spinner("Copiando e compactando o banco..."):
+                    info = criar_snapshot()
+                st.session_state["backup_selecionado"] = info["arquivo"]
+                st.success(f"Backup gerado: {info['arquivo']} ({info['tamanho'] / 1024:.1f} KB)")
+            except Exception as e:
+                st.error(f"Erro ao gerar backup: {e}")
+
+        # Backups automáticos (backup_daemon.py): um por período, sem repetir banco igual
+        if agendador_ativo():
+            ultimo = estado_agendador["ultima_execucao"] or "em andamento"
+            st.caption(f"🕒 Backup automático a cada {INTERVALO_MIN:g} min (última verificação: {ultimo}). "
+                       "Bancos sem alteração não são guardados de novo; os automáticos antigos são apagados pela política de retenção "
+                       "(manuais e de antes de restaurações ficam até serem excluídos).")
+            if estado_agendador["ultimo_erro"]:
+                st.warning(f"Último backup automático falhou: {estado_agendador['ultimo_erro']}")
+        else:
+            st.caption("🕒 Backup automático desligado neste processo (MANUTENCAO_BACKUP_AUTOMATICO=0).")
+
+        snapshots = listar_snapshots()
+        if not snapshots:
+            st.info("Nenhum backup gerado ainda.")
+        else:
+            st.markdown("##### 🗂️ Backups disponíveis no servidor")
+            df_snap = pd.DataFrame(snapshots)
+            df_snap["tamanho_kb"] = df_snap["tamanho"] / 1024
+            df_snap["banco_kb"] = df_snap["tamanho_banco"] / 1024
+            st.dataframe(
+                df_snap[["criado_em", "arquivo", "origem", "tamanho_kb", "banco_kb", "sha256"]],
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "criado_em": st.column_config.TextColumn("Criado em"),
+                    "arquivo": st.column_config.TextColumn("Arquivo", width="medium"),
+                    "origem": st.column_config.TextColumn("Origem", width="small"),
+                    "tamanho_kb": st.column_config.NumberColumn("Compactado (KB)", format="%.1f"),
+                    "banco_kb": st.column_config.NumberColumn("Banco (KB)", format="%.1f"),
+                    "sha256": st.column_config.TextColumn("SHA-256", width="large"),
+                }
+            )
+
+            nomes = [s["arquivo"] for s in snapshots]
+            padrao = st.session_state.get("backup_selecionado")
+            escolhido = st.selectbox("Backup para baixar:", nomes,
+                                     index=nomes.index(padrao) if padrao in nomes else 0)
+
+            # O download_button lê o arquivo inteiro a cada execução da página, mesmo sem clique:
+            # o botão só é montado depois de pedido, e só para o backup escolhido naquele momento
+            if st.session_state.get("backup_preparado") != escolhido:
+                st.session_state.pop("backup_preparado", None)
+                if st.button("📦 Preparar download"):
+                    st.session_state["backup_preparado"] = escolhido
+                    st.rerun()
+            else:
+                with open(caminho_snapshot(escolhido), "rb") as f:
+                    st.download_button(
+                        label="⬇️ BAIXAR BACKUP SELECIONADO",
+                        data=f,
+                        file_name=escolhido,
+                        mime="application/gzip",
+                        help="Cópia completa de todas as máquinas, funcionários e ordens de serviço (compactada)."
+                    )
 
 # ==============================================================================
 # ABA 2: RESTAURAR (RESTORE)
@@ -67,25 +119,89 @@ with tab_restore:
     
     st.divider()
     
-    uploaded_file = st.file_uploader("Selecione o arquivo de backup (.db) para restaurar:", type=['db'])
-    
-    if uploaded_file:
-        st.warning(f"Você selecionou o arquivo: **{uploaded_file.name}**")
-        
+    def executar_restauracao(origem, chave):
+        """Pede a confirmação dupla e restaura a partir de `origem` (upload ou caminho de snapshot)."""
         # Checkbox de segurança dupla
-        confirmacao = st.checkbox("🔴 Estou ciente de que os dados atuais serão SUBSTITUÍDOS e não poderão ser recuperados.")
+        confirmacao = st.checkbox("🔴 Estou ciente de que os dados atuais serão SUBSTITUÍDOS e não poderão ser recuperados.",
+                                  key=f"{chave}_confirma")
         
-        if st.button("Confirmar Restauração", type="primary", disabled=not confirmacao):
+        if st.button("Confirmar Restauração", type="primary", disabled=not confirmacao, key=f"{chave}_botao"):
             try:
-                # Salva o arquivo enviado SOBRESCREVENDO o atual
-                with open(DB_FILE, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
+                # O arquivo é validado numa cópia temporária (integridade, estrutura, migrações)
+                # e só então copiado para o banco em uso, de uma vez; se algo falhar, nada muda
+                with st.spinner("Validando e restaurando o backup..."):
+                    resumo = restaurar(origem)
                 
                 st.success("✅ Restauração concluída com sucesso! O sistema foi atualizado.")
+                if resumo["migracoes_aplicadas"]:
+                    st.caption(f"Backup atualizado para a versão atual do sistema (migrações {resumo['migracoes_aplicadas']}).")
+                if resumo["snapshot_anterior"]:
+                    st.caption(f"Os dados de antes da restauração foram guardados em: {resumo['snapshot_anterior']}")
                 st.info("Por favor, recarregue a página ou navegue para o Painel Principal para ver os dados restaurados.")
                 
-                # Limpa cache do Streamlit para forçar recarregamento dos dados novos
-                st.cache_data.clear()
-                
+            except ValueError as e:
+                st.error(f"Arquivo recusado: {e}")
             except Exception as e:
-                st.error(f"Erro ao tentar restaurar o banco: {e}")
\ No newline at end of file
+                st.error(f"Erro ao tentar restaurar o banco: {e}")
+
+    modo = st.radio("Restaurar a partir de:", ["🗂️ Backup guardado no servidor", "📤 Arquivo do meu computador"], horizontal=True)
+
+    if modo.startswith("🗂️"):
+        snapshots = listar_snapshots()
+        if not snapshots:
+            st.info("Nenhum backup guardado no servidor ainda.")
+        else:
+            rotulos = {s["arquivo"]: f"{s['criado_em']} — {s['origem']} ({s['tamanho'] / 1024:.0f} KB)" for s in snapshots}
+            escolhido = st.selectbox("Backup:", list(rotulos), format_func=rotulos.get)
+            st.warning(f"Você selecionou o backup: **{escolhido}**")
+            executar_restauracao(caminho_snapshot(escolhido), "restaurar_snapshot")
+    else:
+        uploaded_file = st.file_uploader("Selecione o arquivo de backup (.db ou .db.gz) para restaurar:", type=['db', 'gz'])
+        
+        if uploaded_file:
+            st.warning(f"Você selecionou o arquivo: **{uploaded_file.name}**")
+            executar_restauracao(uploaded_file, "restaurar_upload")
+
+# ==============================================================================
+# ABA 3: ARQUIVO MORTO
+# ==============================================================================
+with tab_arquivo:
+    st.subheader("Arquivo Morto (Histórico Antigo)")
+    st.markdown(f"""
+    Ordens **concluídas** abertas há mais de um período e logs de auditoria antigos podem ser movidos
+    para um arquivo separado (`{os.path.basename(arquivo_morto.ARQUIVO_DB)}`). O banco principal fica menor e os painéis mais rápidos.
+    
+    Nada é apagado: o **Prontuário**, os **Indicadores** e a **Auditoria** continuam mostrando esses registros
+    quando o período escolhido alcança o arquivo.
+    
+    ⚠️ O arquivo morto não entra nos backups do banco principal: guarde uma cópia dele junto.
+    """)
+
+    try:
+        st.dataframe(
+            arquivo_morto.resumo(),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "tabela": st.column_config.TextColumn("Tabela"),
+                "ativos": st.column_config.NumberColumn("No banco principal"),
+                "arquivados": st.column_config.NumberColumn("No arquivo morto"),
+                "arquivado_ate": st.column_config.TextColumn("Arquivado até"),
+            }
+        )
+    except Exception as e:
+        st.error(f"Erro ao ler o arquivo morto: {e}")
+
+    col_os, col_audit = st.columns(2)
+    dias_os = col_os.number_input("Arquivar O.S. concluídas abertas há mais de (dias):", min_value=30,
+                                  value=arquivo_morto.HORIZONTE_OS_DIAS, step=30)
+    dias_audit = col_audit.number_input("Arquivar logs de auditoria com mais de (dias):", min_value=30,
+                                        value=arquivo_morto.HORIZONTE_AUDIT_DIAS, step=30)
+
+    if st.button("🗄️ Arquivar agora", type="primary"):
+        try:
+            with st.spinner("Movendo registros antigos para o arquivo morto..."):
+                movidos = arquivo_morto.arquivar(int(dias_os), int(dias_audit))
+            st.success(f"✅ {movidos['ordens_servico']} O.S. e {movidos['audit_logs']} logs movidos para o arquivo morto.")
+        except Exception as e:
+            st.error(f"Erro ao arquivar: {e}")
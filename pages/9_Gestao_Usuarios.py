@@ -14,6 +14,7 @@ except ImportError:
     def hash_senha(senha): return senha
 
 import autenticacao
+from database import get_db_connection
 
 st.set_page_config(layout="wide", page_title="Gestão de Usuários")
 
@@ -34,11 +35,6 @@ if usuario_atual != "admin":
 
 st.title("🔐 Gestão de Usuários (Área Administrativa)")
 
-def get_db_connection():
-    conn = sqlite3.connect("manutencao.db")
-    conn.row_factory = sqlite3.Row
-    return conn
-
 # --- ABAS ---
 tab_novo, tab_senha, tab_excluir = st.tabs(["➕ Novo Usuário", "🔑 Alterar Senha", "🗑️ Excluir Acesso"])
 
@@ -0,0 +1,276 @@
+"""
+Perfil de consultas (opcional): mede cada comando SQL executado pelas conexões do pool.
+
+Ativação:
+    MANUTENCAO_PERFIL_CONSULTAS=1 streamlit run app.py
+ou pelo botão da página "Desempenho de Consultas" (vale até o processo reiniciar).
+
+Para cada comando são registrados o tempo total (execute + leitura das linhas), a
+quantidade de linhas, a página/função que chamou e uma "impressão digital" do SQL
+(literais trocados por '?'), que agrupa as execuções da mesma consulta. Comandos
+acima de LIMITE_LENTO_MS guardam também o EXPLAIN QUERY PLAN.
+
+As medições vão para uma fila circular em memória (últimas N) e, em lotes, para a
+tabela `perf_queries`, gravada por uma thread em segundo plano com conexão própria
+(não medida) — assim a gravação nunca espera pelo lock de uma transação em andamento.
+Desligado, nada disso roda: o pool usa a conexão comum, sem custo extra.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from database import DB_NAME, FORMATO_DATA_HORA, BUSY_TIMEOUT_MS, PooledConnection, get_pool
+
+# Comandos acima deste tempo (ms) guardam o plano de execução
+LIMITE_LENTO_MS = float(os.environ.get("MANUTENCAO_PERFIL_LIMITE_MS", "200"))
+# Quantidade de medições mantidas em memória
+TAMANHO_BUFFER = int(os.environ.get("MANUTENCAO_PERFIL_BUFFER", "2000"))
+# Medições acumuladas que antecipam a gravação em perf_queries (senão, a cada INTERVALO_GRAVACAO_S)
+LOTE_GRAVACAO = 200
+INTERVALO_GRAVACAO_S = 5.0
+# Dias de histórico mantidos na tabela
+RETENCAO_DIAS = int(os.environ.get("MANUTENCAO_PERFIL_RETENCAO_DIAS", "14"))
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+# Arquivos da camada de banco: a origem registrada é quem chamou estes módulos
+_ARQUIVOS_INTERNOS = {
+    os.path.join(RAIZ, nome) for nome in ("database.py", "perfil_consultas.py", "cache_consultas.py")
+}
+
+_RE_COMENTARIOS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_RE_TEXTOS = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_ESPACOS = re.compile(r"\s+")
+
+_buffer = deque(maxlen=TAMANHO_BUFFER)
+_pendentes = []
+_lock = threading.Lock()
+_acordar_gravador = threading.Event()
+_gravador = None
+
+
+# --- Impressão digital e origem ---
+def normalizar_sql(sql):
+    """SQL sem comentários, com literais e listas IN trocados por '?' e espaços únicos."""
+    texto = _RE_COMENTARIOS.sub(" ", sql)
+    texto = _RE_TEXTOS.sub("?", texto)
+    texto = _RE_NUMEROS.sub("?", texto)
+    texto = _RE_LISTAS.sub("(?...)", texto)
+    return _RE_ESPACOS.sub(" ", texto).strip()
+
+
+def impressao_digital(sql_normalizado):
+    return hashlib.sha1(sql_normalizado.encode("utf-8")).hexdigest()[:12]
+
+
+def _origem():
+    """'arquivo:função' do primeiro trecho do projeto fora da camada de banco."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        arquivo = frame.f_code.co_filename
+        if arquivo.startswith(RAIZ) and arquivo not in _ARQUIVOS_INTERNOS:
+            return f"{os.path.relpath(arquivo, RAIZ)}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+# --- Registro das medições ---
+def _plano(conn, sql, params):
+    """EXPLAIN QUERY PLAN por um cursor comum (não medido)."""
+    if sql.lstrip()[:6].upper() not in ("SELECT", "WITH"):
+        return None
+    try:
+        cursor = sqlite3.Cursor(conn)
+        linhas = cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        return "\n".join(str(linha[3]) for linha in linhas)
+    except sqlite3.Error:
+        return None
+
+
+def _registrar(conn, sql, params, origem, duracao_ms, linhas):
+    normalizado = normalizar_sql(sql)
+    plano = _plano(conn, sql, params) if duracao_ms >= LIMITE_LENTO_MS else None
+    medicao = {
+        "data_hora": datetime.now().strftime(FORMATO_DATA_HORA),
+        "fingerprint": impressao_digital(normalizado),
+        "consulta": normalizado,
+        "origem": origem,
+        "duracao_ms": round(duracao_ms, 3),
+        "linhas": linhas,
+        "plano": plano,
+    }
+    global _gravador
+    with _lock:
+        _buffer.append(medicao)
+        _pendentes.append(medicao)
+        if _gravador is None:
+            _gravador = threading.Thread(target=_loop_gravador, name="perfil-consultas", daemon=True)
+            _gravador.start()
+        if len(_pendentes) >= LOTE_GRAVACAO:
+            _acordar_gravador.set()
+
+
+def _loop_gravador():
+    while True:
+        _acordar_gravador.wait(INTERVALO_GRAVACAO_S)
+        _acordar_gravador.clear()
+        gravar_pendentes()
+
+
+def gravar_pendentes():
+    """Grava em perf_queries as medições ainda não salvas (conexão própria, fora do pool)."""
+    global _pendentes
+    with _lock:
+        lote, _pendentes = _pendentes, []
+    if not lote:
+        return
+    limite = (datetime.now() - timedelta(days=RETENCAO_DIAS)).strftime(FORMATO_DATA_HORA)
+    try:
+        conn = sqlite3.connect(DB_NAME, timeout=BUSY_TIMEOUT_MS / 1000)
+        try:
+            with conn:
+                conn.executemany("""
+                    INSERT INTO perf_queries (data_hora, fingerprint, consulta, origem, duracao_ms, linhas, plano)
+                    VALUES (:data_hora, :fingerprint, :consulta, :origem, :duracao_ms, :linhas, :plano)
+                """, lote)
+                conn.execute("DELETE FROM perf_queries WHERE data_hora < ?", (limite,))
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        # Tabela ainda não migrada ou banco ocupado: as medições continuam no buffer em memória
+        print(f"ERRO AO GRAVAR PERFIL DE CONSULTAS: {e}")
+
+
+def medicoes_recentes():
+    """Cópia da fila em memória (mais antigas primeiro)."""
+    with _lock:
+        return list(_buffer)
+
+
+# --- Cursor e conexão medidos ---
+class CursorMedido(sqlite3.Cursor):
+    """
+    Cursor que mede do execute() até a última linha lida.
+    Consultas só são registradas ao final da leitura (fetchall, fim da iteração,
+    fetchone, novo execute ou close), para incluir o tempo de busca das linhas.
+    """
+
+    _medindo = None
+
+    def _iniciar(self, sql, params):
+        self._finalizar()
+        if sql.lstrip()[:6].upper() == "PRAGMA":
+            return
+        # [sql, parâmetros, origem, segundos no execute, segundos lendo linhas, linhas]
+        self._medindo = [sql, params, _origem(), 0.0, 0.0, 0]
+
+    def _acumular(self, inicio, linhas):
+        if self._medindo is not None:
+            self._medindo[4] += time.perf_counter() - inicio
+            self._medindo[5] += linhas
+
+    def _finalizar(self):
+        medindo, self._medindo = self._medindo, None
+        if medindo is not None:
+            sql, params, origem, execucao, leitura, linhas = medindo
+            _registrar(self.connection, sql, params, origem, (execucao + leitura) * 1000, linhas)
+
+    def execute(self, sql, parameters=()):
+        self._iniciar(sql, parameters)
+        inicio = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            if self._medindo is not None:
+                self._medindo[3] = time.perf_counter() - inicio
+        if self.description is None:
+            # INSERT/UPDATE/DELETE: não há linhas para ler
+            if self._medindo is not None:
+                self._medindo[5] = max(self.rowcount, 0)
+            self._finalizar()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._iniciar(sql, ())
+        inicio = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            if self._medindo is not None:
+                self._medindo[3] = time.perf_counter() - inicio
+                self._medindo[5] = max(self.rowcount, 0)
+            self._finalizar()
+        return self
+
+    def fetchall(self):
+        inicio = time.perf_counter()
+        linhas = super().fetchall()
+        self._acumular(inicio, len(linhas))
+        self._finalizar()
+        return linhas
+
+    def fetchmany(self, size=None):
+        inicio = time.perf_counter()
+        linhas = super().fetchmany(self.arraysize if size is None else size)
+        self._acumular(inicio, len(linhas))
+        if not linhas:
+            self._finalizar()
+        return linhas
+
+    def fetchone(self):
+        inicio = time.perf_counter()
+        linha = super().fetchone()
+        self._acumular(inicio, 0 if linha is None else 1)
+        self._finalizar()
+        return linha
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        inicio = time.perf_counter()
+        try:
+            linha = super().__next__()
+        except StopIteration:
+            self._finalizar()
+            raise
+        self._acumular(inicio, 1)
+        return linha
+
+    def close(self):
+        self._finalizar()
+        super().close()
+
+
+class ConexaoMedida(PooledConnection):
+    """Conexão do pool cujos cursores (inclusive os de conn.execute e do Pandas) são medidos."""
+
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# --- Liga/desliga em tempo de execução ---
+def ativo():
+    return get_pool().perfil
+
+
+def ativar(ligado=True):
+    """Liga ou desliga a medição para as próximas conexões do pool (as ociosas são descartadas)."""
+    pool = get_pool()
+    pool.perfil = bool(ligado)
+    pool.fechar_todas()
+    if not ligado:
+        gravar_pendentes()
@@ -0,0 +1,1513 @@
+"""
+Relatórios da Eficiência e Apontamentos (Excel e PDF de auditoria).
+
+Gerados em segundo plano por jobs_relatorios, a partir da tela
+pages/17_Eficiencia_Apontamentos.py:
+
+    ui_relatorio_em_segundo_plano(..., "relatorios_eficiencia:processar_e_gerar_relatorios_eficiencia", ...)
+"""
+import io
+import os
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from fpdf import FPDF
+
+from jobs_relatorios import progresso
+from utils_fotos import FOTOS_DIR
+
+# Tentativa segura de importar o matplotlib para gerar gráficos no PDF
+try:
+    import matplotlib
+
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+
+    MATPLOTLIB_AVAILABLE = True
+except ImportError:
+    MATPLOTLIB_AVAILABLE = False
+
+
+class RelatorioPDF(FPDF):
+    def __init__(self, titulo_relatorio="Relatorio de Eficiencia, Cedro", orientacao='L', *args, **kwargs):
+        super().__init__(orientation=orientacao, format='A4', *args, **kwargs)
+        self.titulo_relatorio = titulo_relatorio
+        self.orientacao = orientacao
+        self.largura_util = 277 if orientacao == 'L' else 190
+
+    def header(self):
+        caminho_logo = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logo_cedro.png")
+        if not os.path.exists(caminho_logo):
+            caminho_logo = "logo_cedro.png"
+
+        if os.path.exists(caminho_logo):
+            self.image(caminho_logo, 10, 8, 12)
+
+        self.set_font('Arial', 'B', 14)
+        self.set_text_color(50, 50, 50)
+        titulo = self.titulo_relatorio.encode('latin-1', 'replace').decode('latin-1')
+        self.cell(0, 10, titulo, 0, 1, 'C')
+
+        self.set_draw_color(22, 102, 53)
+        self.set_line_width(0.5)
+        y_linha = max(self.get_y() + 2, 22)
+        self.line(10, y_linha, 10 + self.largura_util, y_linha)
+        self.set_y(y_linha + 5)
+        self.set_line_width(0.2)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('Arial', 'I', 8)
+        self.set_text_color(150, 150, 150)
+        self.set_draw_color(220, 220, 220)
+        self.line(10, self.get_y() - 2, 10 + self.largura_util, self.get_y() - 2)
+
+        data_hora_atual = datetime.now().strftime('%d/%m/%Y %H:%M')
+        texto_rodape = f'Emitido automaticamente via Sistema Cedro em: {data_hora_atual}  |  Pagina {self.page_no()}'
+        texto_rodape = texto_rodape.encode('latin-1', 'replace').decode('latin-1')
+        self.cell(0, 10, texto_rodape, 0, 0, 'C')
+
+
+def processar_e_gerar_relatorios_eficiencia(df_view, df_improd_global, dt_in, dt_out, df_espelho, df_ref_dados,
+                                            orientacao_pdf='L', criterio_ranking="Engajamento (Horas Válidas)"):
+    excel_io = io.BytesIO()
+    arquivos_temporarios = []
+
+    w_total = 277 if orientacao_pdf == 'L' else 190
+    max_y_page = 185 if orientacao_pdf == 'L' else 275
+
+    total_dias_periodo = (dt_out - dt_in).days + 1
+    dias_trabalhados = df_view['DT_REF'].nunique()
+
+    efi_media = df_view[df_view['H_REAL_LIQ'] > 0]['EFICIENCIA_GERAL'].mean() if not df_view[
+        df_view['H_REAL_LIQ'] > 0].empty else 0
+    h_rh = df_view['H_REAL_LIQ'].sum()
+    h_prod = df_view['HORAS_PROD'].sum()
+    h_improd = df_view['HORAS_IMPROD'].sum()
+    h_apont = df_view['HORAS_DEC'].sum()
+
+    perc_produtivo = min((h_prod / h_apont * 100) if h_apont > 0 else 0, 100)
+
+    df_criticos = df_view[df_view['STATUS'].str.contains('Sem Apontamento|Ponto Não Batido', na=False)]
+    df_sem_ref = df_ref_dados[df_ref_dados['STATUS'] == 'ALERTA (Sem Refeição)']
+    fantasmas = df_criticos['NOME_FINAL'].nunique()
+
+    # --- HELPER: SISTEMA DE AVATARES CIRCULARES ---
+    avatar_cache = {}
+
+    def get_circular_avatar(matricula, bg_color):
+        cache_key = f"{matricula}_{bg_color}"
+        if cache_key in avatar_cache: return avatar_cache[cache_key]
+
+        foto_path = os.path.join(FOTOS_DIR, f"{str(matricula).strip()}.jpg")
+        if not os.path.exists(foto_path):
+            avatar_cache[cache_key] = None;
+            return None
+
+        try:
+            from PIL import Image, ImageDraw
+            img = Image.open(foto_path).convert("RGBA")
+            iw, ih = img.size
+            min_dim = min(iw, ih)
+            img = img.crop(((iw - min_dim) // 2, (ih - min_dim) // 2, (iw + min_dim) // 2, (ih + min_dim) // 2))
+
+            hr_size = 120
+            img = img.resize((hr_size, hr_size), Image.LANCZOS)
+            bg = Image.new('RGB', (hr_size, hr_size), bg_color)
+            draw = ImageDraw.Draw(bg)
+            draw.ellipse((0, 0, hr_size, hr_size), fill=(226, 232, 240))
+
+            mask = Image.new('L', (hr_size, hr_size), 0)
+            mask_draw = ImageDraw.Draw(mask)
+            b_w = 4
+            mask_draw.ellipse((b_w, b_w, hr_size - b_w, hr_size - b_w), fill=255)
+
+            bg.paste(img, (0, 0), mask)
+            temp = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
+            bg.save(temp.name, 'JPEG', quality=95)
+            arquivos_temporarios.append(temp.name)
+            avatar_cache[cache_key] = temp.name
+            return temp.name
+        except Exception:
+            avatar_cache[cache_key] = None;
+            return None
+
+    titulo_rel = "Relatorio Auditoria de Produtividade (Paisagem)" if orientacao_pdf == 'L' else "Relatorio Auditoria de Produtividade (Retrato)"
+    pdf = RelatorioPDF(titulo_relatorio=f"{titulo_rel}, Cedro", orientacao=orientacao_pdf)
+    pdf.set_margins(10, 10, 10)
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+
+    # --- PÁGINA 1: RESUMO EXECUTIVO ---
+    pdf.set_font('Arial', 'B', 16)
+    pdf.set_text_color(22, 102, 53)
+    pdf.cell(0, 8, "Resumo Executivo", 0, 1, 'L')
+
+    pdf.set_font('Arial', '', 10)
+    pdf.set_text_color(80, 80, 80)
+    str_periodo = f"Periodo Selecionado: {dt_in.strftime('%d/%m/%Y')} a {dt_out.strftime('%d/%m/%Y')} ({total_dias_periodo} dias)  |  Dias Trabalhados: {dias_trabalhados} dias com apontamento na base."
+    pdf.cell(0, 6, str_periodo, 0, 1, 'L')
+    pdf.ln(4)
+
+    y_kpi = pdf.get_y()
+    largura_card = (w_total - 15) / 4
+    fnt_kpi_t = 8 if orientacao_pdf == 'L' else 6
+    fnt_kpi_v = 14 if orientacao_pdf == 'L' else 10
+
+    # Cards KPI
+    pos_x1 = 10
+    pdf.set_fill_color(248, 250, 252)
+    pdf.set_draw_color(226, 232, 240)
+    pdf.rect(pos_x1, y_kpi, largura_card, 22, 'DF')
+    pdf.set_xy(pos_x1, y_kpi + 4)
+    pdf.set_font('Arial', 'B', fnt_kpi_t);
+    pdf.set_text_color(100, 116, 139)
+    pdf.cell(largura_card, 5, "APONTAMENTO (GERAL)", 0, 1, 'C')
+    pdf.set_xy(pos_x1, y_kpi + 10);
+    pdf.set_font('Arial', 'B', fnt_kpi_v);
+    pdf.set_text_color(15, 23, 42)
+    pdf.cell(largura_card, 7, f"{efi_media:.1f}%", 0, 1, 'C')
+
+    pos_x2 = pos_x1 + largura_card + 5
+    pdf.rect(pos_x2, y_kpi, largura_card, 22, 'DF')
+    pdf.set_xy(pos_x2, y_kpi + 4);
+    pdf.set_font('Arial', 'B', fnt_kpi_t);
+    pdf.set_text_color(100, 116, 139)
+    pdf.cell(largura_card, 5, "HORAS PAGAS (RH)", 0, 1, 'C')
+    pdf.set_xy(pos_x2, y_kpi + 10);
+    pdf.set_font('Arial', 'B', fnt_kpi_v);
+    pdf.set_text_color(15, 23, 42)
+    pdf.cell(largura_card, 7, f"{h_rh:.0f} h", 0, 1, 'C')
+
+    pos_x3 = pos_x2 + largura_card + 5
+    pdf.rect(pos_x3, y_kpi, largura_card, 22, 'DF')
+    pdf.set_xy(pos_x3, y_kpi + 4);
+    pdf.set_font('Arial', 'B', fnt_kpi_t);
+    pdf.set_text_color(100, 116, 139)
+    pdf.cell(largura_card, 5, "TAXA PRODUTIVIDADE", 0, 1, 'C')
+    pdf.set_xy(pos_x3, y_kpi + 10);
+    pdf.set_font('Arial', 'B', fnt_kpi_v);
+    pdf.set_text_color(22, 163, 74)
+    pdf.cell(largura_card, 7, f"{perc_produtivo:.1f}%", 0, 1, 'C')
+
+    pos_x4 = pos_x3 + largura_card + 5
+    pdf.rect(pos_x4, y_kpi, largura_card, 22, 'DF')
+    pdf.set_xy(pos_x4, y_kpi + 4);
+    pdf.set_font('Arial', 'B', fnt_kpi_t);
+    pdf.set_text_color(100, 116, 139)
+    pdf.cell(largura_card, 5, "FALHAS (SEM APONT.)", 0, 1, 'C')
+    pdf.set_xy(pos_x4, y_kpi + 10);
+    pdf.set_font('Arial', 'B', fnt_kpi_v);
+    pdf.set_text_color(220, 38, 38)
+    pdf.cell(largura_card, 7, f"{fantasmas} pessoas", 0, 1, 'C')
+
+    pdf.set_xy(10, y_kpi + 28)
+    pdf.ln(2)
+
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_font('Arial', 'B', 11)
+    pdf.cell(0, 6, "1. Produtividade Global:", 0, 1)
+    pdf.set_font('Arial', '', 10)
+    pdf.cell(0, 6,
+             f"   Das {h_apont:.0f} horas totais apontadas no PIMS, {h_prod:.0f}h foram PRODUTIVAS e {h_improd:.0f}h IMPRODUTIVAS.",
+             0, 1)
+    pdf.ln(1)
+
+    pdf.set_font('Arial', 'B', 11)
+    pdf.cell(0, 6, "2. Volume de Trabalho vs Apontamento:", 0, 1)
+    pdf.set_font('Arial', '', 10)
+    pdf.cell(0, 6,
+             f"   Foram identificadas {h_rh:.0f} horas liquidas trabalhadas (Jornada RH) contra {h_apont:.0f} horas declaradas.",
+             0, 1)
+    pdf.ln(1)
+
+    pdf.set_font('Arial', 'B', 11)
+    pdf.cell(0, 6, "3. Qualidade dos Apontamentos (Auditoria de Refeicao):", 0, 1)
+    pdf.set_font('Arial', '', 10)
+    pdf.cell(0, 6,
+             f"   Foram identificados {len(df_sem_ref)} dias em que o funcionario trabalhou mais de 4h mas nao apontou 'Refeicao' no sistema.",
+             0, 1)
+    pdf.ln(4)
+
+    if MATPLOTLIB_AVAILABLE and not df_view.empty:
+        df_timeline = df_view.groupby('DT_REF').agg({'H_REAL_LIQ': 'sum', 'HORAS_DEC': 'sum'}).reset_index()
+        df_timeline['EFI'] = np.where(df_timeline['H_REAL_LIQ'] > 0,
+                                      (df_timeline['HORAS_DEC'] / df_timeline['H_REAL_LIQ']) * 100, 0)
+        df_timeline['EFI'] = df_timeline['EFI'].clip(upper=100)
+        df_timeline = df_timeline.sort_values('DT_REF')
+
+        fig_w = 14 if orientacao_pdf == 'L' else 9
+        fig, ax = plt.subplots(figsize=(fig_w, 3.5))
+        ax.plot(df_timeline['DT_REF'], df_timeline['EFI'], marker='o', color='#16A34A', lw=2.5, markersize=6)
+        ax.fill_between(df_timeline['DT_REF'], df_timeline['EFI'], color='#16A34A', alpha=0.1)
+        ax.set_title('Evolucao da Eficiencia Media Diaria (%)', fontsize=12, fontweight='bold', color='#333333')
+        ax.grid(True, linestyle='--', alpha=0.4)
+        ax.spines['top'].set_visible(False);
+        ax.spines['right'].set_visible(False)
+        ax.spines['left'].set_color('#CCCCCC');
+        ax.spines['bottom'].set_color('#CCCCCC')
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%d/%m'))
+        ax.tick_params(axis='both', labelsize=9, colors='#555555')
+        ax.set_ylim(bottom=0)
+
+        plt.tight_layout()
+        img_trend = tempfile.mktemp(suffix=".png")
+        arquivos_temporarios.append(img_trend)
+        fig.savefig(img_trend, dpi=150, bbox_inches='tight')
+        plt.close(fig)
+
+        pdf.image(img_trend, x=10, w=w_total)
+
+    # ==============================================================================
+    # PÁGINA 2: RANKING DE DESEMPENHO POR SETOR
+    # ==============================================================================
+    progresso(1 / 10, "Ranking por setor")
+    pdf.add_page()
+
+    df_setor = df_view.groupby(['SETOR']).agg(
+        {'H_REAL_LIQ': 'sum', 'HORAS_DEC': 'sum', 'HORAS_PROD': 'sum'}).reset_index()
+    df_setor['EFI'] = np.where(df_setor['H_REAL_LIQ'] > 0, (df_setor['HORAS_DEC'] / df_setor['H_REAL_LIQ']) * 100,
+                               0).clip(max=100)
+    df_setor['PROD_PCT'] = np.where(df_setor['HORAS_DEC'] > 0, (df_setor['HORAS_PROD'] / df_setor['HORAS_DEC']) * 100,
+                                    0).clip(max=100)
+    df_setor = df_setor.sort_values('EFI', ascending=False)
+
+    pdf.set_font('Arial', 'B', 14)
+    pdf.set_text_color(22, 102, 53)
+    pdf.cell(0, 8, "Ranking de Desempenho por Equipe (Setor)", 0, 1)
+    pdf.ln(2)
+
+    if MATPLOTLIB_AVAILABLE and not df_setor.empty:
+        df_setor_plot = df_setor.head(15).sort_values('EFI', ascending=True)
+        fig_w = 14 if orientacao_pdf == 'L' else 9
+        fig2, ax2 = plt.subplots(figsize=(fig_w, 4))
+        ax2.barh(df_setor_plot['SETOR'].str.slice(0, 40), df_setor_plot['EFI'], color='#2196F3', edgecolor='none')
+        ax2.set_title('Top Setores por Eficiencia (%)', fontsize=12, fontweight='bold', color='#333333')
+        ax2.spines['top'].set_visible(False);
+        ax2.spines['right'].set_visible(False)
+        ax2.spines['left'].set_color('#CCCCCC');
+        ax2.spines['bottom'].set_visible(False)
+        ax2.tick_params(axis='both', labelsize=9, colors='#555555')
+
+        for i, v in enumerate(df_setor_plot['EFI']):
+            ax2.text(v + 1, i, f"{v:.1f}%", color='#333333', va='center', fontsize=9, fontweight='bold')
+
+        plt.tight_layout()
+        img_setor = tempfile.mktemp(suffix=".png")
+        arquivos_temporarios.append(img_setor)
+        fig2.savefig(img_setor, dpi=150, bbox_inches='tight')
+        plt.close(fig2)
+
+        pdf.image(img_setor, x=10, w=w_total)
+        pdf.ln(5)
+
+    pdf.set_font('Arial', 'B', 8 if orientacao_pdf == 'P' else 9)
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_fill_color(22, 102, 53)
+    pdf.set_draw_color(255, 255, 255)
+
+    w_s = [77, 40, 40, 40, 40, 40] if orientacao_pdf == 'L' else [50, 25, 25, 30, 30, 30]
+
+    pdf.cell(w_s[0], 8, " Equipe (Setor)", 1, 0, 'L', fill=True)
+    pdf.cell(w_s[1], 8, " Jornada RH", 1, 0, 'C', fill=True)
+    pdf.cell(w_s[2], 8, " Apontado", 1, 0, 'C', fill=True)
+    pdf.cell(w_s[3], 8, " Hrs Produtivas", 1, 0, 'C', fill=True)
+    pdf.cell(w_s[4], 8, " Eficiencia", 1, 0, 'C', fill=True)
+    pdf.cell(w_s[5], 8, " % Prod.", 1, 1, 'C', fill=True)
+
+    pdf.set_font('Arial', '', 8 if orientacao_pdf == 'P' else 9)
+    pdf.set_text_color(40, 40, 40)
+    pdf.set_draw_color(220, 220, 220)
+    fill = False
+
+    for _, row in df_setor.iterrows():
+        if pdf.get_y() > max_y_page - 8:
+            pdf.add_page()
+
+        if fill:
+            pdf.set_fill_color(245, 247, 250)
+        else:
+            pdf.set_fill_color(255, 255, 255)
+
+        s_str = str(row['SETOR'])[:(45 if orientacao_pdf == 'L' else 25)].encode('latin-1', 'replace').decode('latin-1')
+        pdf.cell(w_s[0], 7, f" {s_str}", 'B', 0, 'L', fill=True)
+        pdf.cell(w_s[1], 7, f"{row['H_REAL_LIQ']:.1f} h", 'B', 0, 'C', fill=True)
+        pdf.cell(w_s[2], 7, f"{row['HORAS_DEC']:.1f} h", 'B', 0, 'C', fill=True)
+        pdf.cell(w_s[3], 7, f"{row['HORAS_PROD']:.1f} h", 'B', 0, 'C', fill=True)
+        pdf.cell(w_s[4], 7, f"{row['EFI']:.1f}%", 'B', 0, 'C', fill=True)
+        pdf.cell(w_s[5], 7, f"{row['PROD_PCT']:.1f}%", 'B', 1, 'C', fill=True)
+        fill = not fill
+
+    # ==============================================================================
+    # PÁGINA 3: RAIO-X DA IMPRODUTIVIDADE
+    # ==============================================================================
+    progresso(2 / 10, "Raio-X da improdutividade")
+    valid_keys = df_view[['MATRICULA_FINAL', 'DT_REF']].drop_duplicates()
+    valid_keys.columns = ['MATRICULA', 'DT_REF']
+    improd_filtered = pd.merge(df_improd_global, valid_keys, on=['MATRICULA', 'DT_REF'],
+                               how='inner') if not df_improd_global.empty else pd.DataFrame()
+
+    if not improd_filtered.empty:
+        pdf.add_page()
+        pdf.set_font('Arial', 'B', 14)
+        pdf.set_text_color(22, 102, 53)
+        pdf.cell(0, 8, "Raio-X da Improdutividade (Motivos de Parada)", 0, 1)
+        pdf.ln(2)
+
+        improd_agrupado = improd_filtered.groupby('OPERACAO_NOME')['HORAS_DEC'].sum().reset_index().sort_values(
+            'HORAS_DEC', ascending=False)
+
+        if MATPLOTLIB_AVAILABLE:
+            df_improd_plot = improd_agrupado.head(15).sort_values('HORAS_DEC', ascending=True)
+            fig_w = 14 if orientacao_pdf == 'L' else 9
+            fig_imp, ax_imp = plt.subplots(figsize=(fig_w, 4.5))
+            ax_imp.barh(df_improd_plot['OPERACAO_NOME'].str.slice(0, 50), df_improd_plot['HORAS_DEC'], color='#F59E0B',
+                        edgecolor='none')
+            ax_imp.set_title('Top 15 Motivos de Improdutividade (Horas Totais)', fontsize=12, fontweight='bold',
+                             color='#333333')
+            ax_imp.spines['top'].set_visible(False);
+            ax_imp.spines['right'].set_visible(False)
+            ax_imp.spines['left'].set_color('#CCCCCC');
+            ax_imp.spines['bottom'].set_visible(False)
+            ax_imp.tick_params(axis='both', labelsize=9, colors='#555555')
+            for i, v in enumerate(df_improd_plot['HORAS_DEC']):
+                ax_imp.text(v + 0.5, i, f"{v:.1f}h", color='#333333', va='center', fontsize=9, fontweight='bold')
+            plt.tight_layout()
+            img_imp = tempfile.mktemp(suffix=".png")
+            arquivos_temporarios.append(img_imp)
+            fig_imp.savefig(img_imp, dpi=150, bbox_inches='tight')
+            plt.close(fig_imp)
+            pdf.image(img_imp, x=10, w=w_total)
+            pdf.ln(5)
+
+        pdf.set_font('Arial', 'B', 9)
+        pdf.set_text_color(255, 255, 255)
+        pdf.set_fill_color(22, 102, 53)
+
+        w_rx = [200, 77] if orientacao_pdf == 'L' else [130, 60]
+
+        pdf.cell(w_rx[0], 8, " Motivo / Operacao", 1, 0, 'L', fill=True)
+        pdf.cell(w_rx[1], 8, " Total Desperdicado", 1, 1, 'C', fill=True)
+
+        pdf.set_font('Arial', '', 9)
+        pdf.set_text_color(40, 40, 40)
+        fill = False
+        for _, row in improd_agrupado.iterrows():
+            if pdf.get_y() > max_y_page - 8:
+                pdf.add_page()
+                pdf.set_font('Arial', 'B', 9);
+                pdf.set_text_color(255, 255, 255);
+                pdf.set_fill_color(22, 102, 53)
+                pdf.cell(w_rx[0], 8, " Motivo / Operacao", 1, 0, 'L', fill=True)
+                pdf.cell(w_rx[1], 8, " Total Desperdicado", 1, 1, 'C', fill=True)
+                pdf.set_font('Arial', '', 9);
+                pdf.set_text_color(40, 40, 40)
+
+            if fill:
+                pdf.set_fill_color(245, 247, 250)
+            else:
+                pdf.set_fill_color(255, 255, 255)
+            op_str = str(row['OPERACAO_NOME'])[:(100 if orientacao_pdf == 'L' else 60)].encode('latin-1',
+                                                                                               'replace').decode(
+                'latin-1')
+            pdf.cell(w_rx[0], 7, f" {op_str}", 'B', 0, 'L', fill=True)
+            pdf.cell(w_rx[1], 7, f"{row['HORAS_DEC']:.1f} h", 'B', 1, 'C', fill=True)
+            fill = not fill
+
+    # ==============================================================================
+    # PÁGINA 4: RANKING COLABORADORES DETALHADO
+    # ==============================================================================
+    progresso(3 / 10, "Ranking de colaboradores")
+    pdf.add_page()
+
+    df_rank = df_view.groupby(['SETOR', 'GESTOR', 'MATRICULA_FINAL', 'NOME_FINAL']).agg({
+        'H_REAL_LIQ': 'sum', 'HORAS_DEC': 'sum', 'HORAS_PROD': 'sum', 'HORAS_IMPROD': 'sum', 'FALTA_REFEICAO': 'sum'
+    }).reset_index()
+
+    df_rank['EFI'] = np.where(df_rank['H_REAL_LIQ'] > 0, (df_rank['HORAS_DEC'] / df_rank['H_REAL_LIQ']) * 100, 0).clip(
+        max=100)
+    df_rank = df_rank.sort_values(['SETOR', 'GESTOR', 'HORAS_DEC'], ascending=[True, True, False])
+
+    pdf.set_font('Arial', 'B', 14)
+    pdf.set_text_color(22, 102, 53)
+    pdf.cell(0, 8, "Desempenho Detalhado por Colaborador", 0, 1)
+    pdf.ln(2)
+
+    if MATPLOTLIB_AVAILABLE and not df_rank.empty:
+        df_rank_plot_full = df_rank.sort_values('HORAS_DEC', ascending=False)
+        chunk_size = 20
+        chunks = [df_rank_plot_full[i:i + chunk_size] for i in range(0, len(df_rank_plot_full), chunk_size)]
+
+        for idx, chunk in enumerate(chunks):
+            chunk_plot = chunk.iloc[::-1]
+            altura_figura = max(3.0, len(chunk_plot) * 0.3)
+            fig_w = 14 if orientacao_pdf == 'L' else 9
+            fig3, ax3 = plt.subplots(figsize=(fig_w, altura_figura))
+
+            labels = chunk_plot['NOME_FINAL'].str.slice(0, 20) + " (" + chunk_plot['SETOR'].str.slice(0, 12) + ")"
+
+            ax3.barh(labels, chunk_plot['HORAS_PROD'], color='#22C55E', label='Produtivo', edgecolor='none')
+            ax3.barh(labels, chunk_plot['HORAS_IMPROD'], left=chunk_plot['HORAS_PROD'], color='#F59E0B',
+                     label='Improdutivo', edgecolor='none')
+
+            titulo = 'Desempenho de Colaboradores (Volume de Horas Apontadas)'
+            if len(chunks) > 1: titulo += f' - Parte {idx + 1}'
+
+            ax3.set_title(titulo, fontsize=12, fontweight='bold', color='#333333')
+            ax3.legend(loc='lower right', frameon=False)
+            ax3.spines['top'].set_visible(False);
+            ax3.spines['right'].set_visible(False)
+            ax3.spines['left'].set_color('#CCCCCC');
+            ax3.spines['bottom'].set_visible(False)
+            ax3.tick_params(axis='both', labelsize=8, colors='#555555')
+
+            plt.tight_layout()
+            img_colab = tempfile.mktemp(suffix=".png")
+            arquivos_temporarios.append(img_colab)
+            fig3.savefig(img_colab, dpi=150, bbox_inches='tight')
+            plt.close(fig3)
+
+            if idx > 0 or pdf.get_y() > (130 if orientacao_pdf == 'L' else 200): pdf.add_page()
+            pdf.image(img_colab, x=10, w=w_total)
+            pdf.ln(5)
+
+    w_c = [16, 36, 48, 43, 22, 22, 22, 22, 22, 22] if orientacao_pdf == 'L' else [14, 20, 36, 30, 15, 15, 15, 15, 15,
+                                                                                  15]
+
+    def print_colaboradores_header():
+        pdf.set_font('Arial', 'B', 8)
+        pdf.set_text_color(255, 255, 255)
+        pdf.set_fill_color(22, 102, 53)
+        pdf.cell(w_c[0], 8, " Foto", 1, 0, 'C', fill=True)
+        pdf.cell(w_c[1], 8, " Setor", 1, 0, 'L', fill=True)
+        pdf.cell(w_c[2], 8, " Colaborador", 1, 0, 'L', fill=True)
+        pdf.cell(w_c[3], 8, " Gestor", 1, 0, 'L', fill=True)
+        pdf.cell(w_c[4], 8, " Jornada", 1, 0, 'C', fill=True)
+        pdf.cell(w_c[5], 8, " Apontado", 1, 0, 'C', fill=True)
+        pdf.cell(w_c[6], 8, " Prod.", 1, 0, 'C', fill=True)
+        pdf.cell(w_c[7], 8, " Improd.", 1, 0, 'C', fill=True)
+        pdf.cell(w_c[8], 8, " Efic.", 1, 0, 'C', fill=True)
+        pdf.cell(w_c[9], 8, " S/ Ref.", 1, 1, 'C', fill=True)
+
+    print_colaboradores_header()
+    pdf.set_font('Arial', '', 7 if orientacao_pdf == 'P' else 8)
+    pdf.set_text_color(40, 40, 40)
+    pdf.set_draw_color(220, 220, 220)
+    fill = False
+
+    for _, row in df_rank.iterrows():
+        if pdf.get_y() > max_y_page - 14:
+            pdf.add_page()
+            print_colaboradores_header()
+            pdf.set_font('Arial', '', 7 if orientacao_pdf == 'P' else 8)
+            pdf.set_text_color(40, 40, 40)
+
+        bg_rgb = (245, 247, 250) if fill else (255, 255, 255)
+        pdf.set_fill_color(*bg_rgb)
+
+        s_str = str(row['SETOR'])[:(18 if orientacao_pdf == 'L' else 10)].encode('latin-1', 'replace').decode('latin-1')
+        n_str = str(row['NOME_FINAL'])[:(25 if orientacao_pdf == 'L' else 18)].encode('latin-1', 'replace').decode(
+            'latin-1')
+        g_str = str(row['GESTOR'])[:(22 if orientacao_pdf == 'L' else 12)].encode('latin-1', 'replace').decode(
+            'latin-1')
+
+        x_start = pdf.get_x();
+        y_start = pdf.get_y()
+
+        pdf.cell(w_c[0], 12, "", 'B', 0, 'C', fill=True)
+
+        matricula = str(row['MATRICULA_FINAL']).strip()
+        circ_img = get_circular_avatar(matricula, bg_rgb)
+        img_s = 10 if orientacao_pdf == 'P' else 11
+        img_x = x_start + (w_c[0] - img_s) / 2
+        img_y = y_start + (12 - img_s) / 2
+
+        if circ_img:
+            pdf.image(circ_img, x=img_x, y=img_y, w=img_s, h=img_s)
+        else:
+            pdf.set_draw_color(220, 220, 220); pdf.rect(img_x, img_y, img_s, img_s, 'D')
+
+        pdf.cell(w_c[1], 12, f" {s_str}", 'B', 0, 'L', fill=True)
+        pdf.cell(w_c[2], 12, f" {n_str}", 'B', 0, 'L', fill=True)
+        pdf.cell(w_c[3], 12, f" {g_str}", 'B', 0, 'L', fill=True)
+        pdf.cell(w_c[4], 12, f"{row['H_REAL_LIQ']:.1f}h", 'B', 0, 'C', fill=True)
+        pdf.cell(w_c[5], 12, f"{row['HORAS_DEC']:.1f}h", 'B', 0, 'C', fill=True)
+        pdf.cell(w_c[6], 12, f"{row['HORAS_PROD']:.1f}h", 'B', 0, 'C', fill=True)
+        pdf.cell(w_c[7], 12, f"{row['HORAS_IMPROD']:.1f}h", 'B', 0, 'C', fill=True)
+        pdf.cell(w_c[8], 12, f"{row['EFI']:.0f}%", 'B', 0, 'C', fill=True)
+        pdf.cell(w_c[9], 12, f"{row['FALTA_REFEICAO']}d", 'B', 1, 'C', fill=True)
+        fill = not fill
+
+    # ==============================================================================
+    # PÁGINA 5: MATRIZ DE CALENDÁRIO DIÁRIO
+    # ==============================================================================
+    progresso(4 / 10, "Matriz diária")
+    pdf.add_page()
+    pdf.set_font('Arial', 'B', 14)
+    pdf.set_text_color(22, 102, 53)
+    pdf.cell(0, 8, "Matriz de Apontamentos Diarios (Eficiencia %)", 0, 1)
+
+    pdf.set_font('Arial', '', 8)
+    pdf.set_text_color(80, 80, 80)
+    pdf.cell(0, 5,
+             "Legenda: Verde (>=85%) | Amarelo (70 a 84%) | Vermelho (<70%) | Laranja (Sem Apont.) | Roxo (>100% Super-Apont.) | Cinza (Folga)",
+             0, 1)
+    pdf.ln(2)
+
+    dias_unicos = sorted(df_view['DT_REF'].dropna().unique())
+    max_dias = min(len(dias_unicos), 31)
+    dias_to_plot = dias_unicos[:max_dias]
+
+    w_foto_m = 12
+    w_setor_m = 28 if orientacao_pdf == 'L' else 18
+    w_nome_m = 45 if orientacao_pdf == 'L' else 35
+    w_dia_m = (w_total - w_nome_m - w_setor_m - w_foto_m) / max_dias if max_dias > 0 else 10
+
+    def print_matrix_header():
+        pdf.set_font('Arial', 'B', 7)
+        pdf.set_fill_color(22, 102, 53)
+        pdf.set_text_color(255, 255, 255)
+        pdf.cell(w_foto_m, 6, " Foto", 1, 0, 'C', fill=True)
+        pdf.cell(w_setor_m, 6, " Setor", 1, 0, 'L', fill=True)
+        pdf.cell(w_nome_m, 6, " Colaborador", 1, 0, 'L', fill=True)
+        for d in dias_to_plot:
+            pdf.cell(w_dia_m, 6, d.strftime('%d'), 1, 0, 'C', fill=True)
+        pdf.ln()
+
+    if max_dias > 0:
+        print_matrix_header()
+
+        df_view_pdf = df_view.copy()
+        df_view_pdf['MATRIZ_VAL'] = df_view_pdf['EFICIENCIA_VISUAL']
+        mask_falta_pdf = (df_view_pdf['STATUS'] == 'CRÍTICO (Sem Apontamento)')
+        mask_super_pdf = (df_view_pdf['STATUS'] == 'ALERTA (Super-Apontamento)')
+
+        df_view_pdf.loc[mask_falta_pdf, 'MATRIZ_VAL'] = -1
+        df_view_pdf.loc[mask_super_pdf, 'MATRIZ_VAL'] = -2
+
+        pivot_matrix = df_view_pdf.pivot_table(index=['SETOR', 'MATRICULA_FINAL', 'NOME_FINAL'], columns='DT_REF',
+                                               values='MATRIZ_VAL', aggfunc='mean')
+        pivot_matrix = pivot_matrix.sort_index(level=[0, 1, 2])
+
+        pdf.set_font('Arial', 'B', 5 if orientacao_pdf == 'P' else 6)
+        pdf.set_draw_color(220, 220, 220)
+
+        for idx, row in pivot_matrix.iterrows():
+            if pdf.get_y() > max_y_page - 12:
+                pdf.add_page();
+                print_matrix_header()
+
+            setor, matricula, nome = idx
+            setor_str = str(setor)[:(15 if orientacao_pdf == 'L' else 10)].encode('latin-1', 'replace').decode(
+                'latin-1')
+            nome_str = str(nome)[:(22 if orientacao_pdf == 'L' else 16)].encode('latin-1', 'replace').decode('latin-1')
+
+            x_curr = pdf.get_x();
+            y_curr = pdf.get_y()
+
+            bg_rgb = (245, 247, 250)
+            pdf.set_fill_color(*bg_rgb)
+            pdf.rect(x_curr, y_curr, w_foto_m, 10, 'DF')
+
+            circ_img = get_circular_avatar(matricula, bg_rgb)
+            img_s = 8
+            img_x = x_curr + (w_foto_m - img_s) / 2
+            img_y = y_curr + (10 - img_s) / 2
+
+            if circ_img:
+                pdf.image(circ_img, x=img_x, y=img_y, w=img_s, h=img_s)
+            else:
+                pdf.set_draw_color(200, 200, 200); pdf.rect(img_x, img_y, img_s, img_s, 'D')
+
+            pdf.set_xy(x_curr + w_foto_m, y_curr)
+
+            pdf.set_text_color(40, 40, 40)
+            pdf.cell(w_setor_m, 10, f" {setor_str}", 1, 0, 'L', fill=True)
+            pdf.cell(w_nome_m, 10, f" {nome_str}", 1, 0, 'L', fill=True)
+
+            for d in dias_to_plot:
+                val = row.get(d, np.nan)
+
+                if pd.isna(val) or val == 0:
+                    pdf.set_fill_color(240, 240, 240);
+                    txt = "-";
+                    pdf.set_text_color(180, 180, 180)
+                elif val == -1:
+                    pdf.set_fill_color(254, 215, 170);
+                    txt = "0";
+                    pdf.set_text_color(154, 52, 18)
+                elif val == -2:
+                    pdf.set_fill_color(233, 213, 255);
+                    txt = ">100";
+                    pdf.set_text_color(107, 33, 168)
+                else:
+                    txt = f"{val:.0f}"
+                    if val >= 85:
+                        pdf.set_fill_color(187, 247, 208); pdf.set_text_color(22, 101, 52)
+                    elif val >= 70:
+                        pdf.set_fill_color(254, 240, 138); pdf.set_text_color(161, 98, 7)
+                    else:
+                        pdf.set_fill_color(254, 202, 202); pdf.set_text_color(153, 27, 27)
+
+                pdf.cell(w_dia_m, 10, txt, 1, 0, 'C', fill=True)
+            pdf.ln()
+
+    # ==============================================================================
+    # PÁGINA 6: MATRIZ DE APONTAMENTOS DE REFEIÇÃO (NOVA)
+    # ==============================================================================
+    progresso(5 / 10, "Matriz de refeição")
+    df_ref_pdf = df_ref_dados.copy()
+    if not df_ref_pdf.empty:
+        dias_unicos_ref = sorted(df_ref_pdf['DT_REF'].dropna().unique())
+        max_dias_ref = min(len(dias_unicos_ref), 31)
+        dias_to_plot_ref = dias_unicos_ref[:max_dias_ref]
+        w_dia_m_ref = (w_total - w_nome_m - w_setor_m - w_foto_m) / max_dias_ref if max_dias_ref > 0 else 10
+
+        pdf.add_page()
+        pdf.set_font('Arial', 'B', 14)
+        pdf.set_text_color(22, 102, 53)
+        pdf.cell(0, 8, "Matriz de Auditoria de Refeicao Diaria", 0, 1)
+
+        pdf.set_font('Arial', '', 8)
+        pdf.set_text_color(80, 80, 80)
+        pdf.cell(0, 5,
+                 "Legenda: Verde (Sim - Apontou) | Vermelho (Nao - Faltou) | Cinza (Folga / Sem Jornada Suficiente)", 0,
+                 1)
+        pdf.ln(2)
+
+        def get_ref_val(r):
+            if r['APONTOU_REFEICAO'] == 'Sim': return 1
+            if r['H_REAL_LIQ'] > 4.0 and r['APONTOU_REFEICAO'] == 'Não': return -1
+            return 0
+
+        df_ref_pdf['REF_VAL'] = df_ref_pdf.apply(get_ref_val, axis=1)
+        pivot_ref = df_ref_pdf.pivot_table(index=['SETOR', 'MATRICULA_FINAL', 'NOME_FINAL'], columns='DT_REF',
+                                           values='REF_VAL', aggfunc='min')
+        pivot_ref = pivot_ref.sort_index(level=[0, 1, 2])
+
+        def print_matrix_ref_header():
+            pdf.set_font('Arial', 'B', 7)
+            pdf.set_fill_color(22, 102, 53)
+            pdf.set_text_color(255, 255, 255)
+            pdf.cell(w_foto_m, 6, " Foto", 1, 0, 'C', fill=True)
+            pdf.cell(w_setor_m, 6, " Setor", 1, 0, 'L', fill=True)
+            pdf.cell(w_nome_m, 6, " Colaborador", 1, 0, 'L', fill=True)
+            for d in dias_to_plot_ref:
+                pdf.cell(w_dia_m_ref, 6, d.strftime('%d'), 1, 0, 'C', fill=True)
+            pdf.ln()
+
+        print_matrix_ref_header()
+        pdf.set_font('Arial', 'B', 5 if orientacao_pdf == 'P' else 6)
+        pdf.set_draw_color(220, 220, 220)
+
+        for idx, row in pivot_ref.iterrows():
+            if pdf.get_y() > max_y_page - 12:
+                pdf.add_page();
+                print_matrix_ref_header()
+
+            setor, matricula, nome = idx
+            setor_str = str(setor)[:(15 if orientacao_pdf == 'L' else 10)].encode('latin-1', 'replace').decode(
+                'latin-1')
+            nome_str = str(nome)[:(22 if orientacao_pdf == 'L' else 16)].encode('latin-1', 'replace').decode('latin-1')
+
+            x_curr = pdf.get_x();
+            y_curr = pdf.get_y()
+
+            bg_rgb = (245, 247, 250)
+            pdf.set_fill_color(*bg_rgb)
+            pdf.rect(x_curr, y_curr, w_foto_m, 10, 'DF')
+
+            circ_img = get_circular_avatar(matricula, bg_rgb)
+            img_s = 8
+            img_x = x_curr + (w_foto_m - img_s) / 2
+            img_y = y_curr + (10 - img_s) / 2
+
+            if circ_img:
+                pdf.image(circ_img, x=img_x, y=img_y, w=img_s, h=img_s)
+            else:
+                pdf.set_draw_color(200, 200, 200); pdf.rect(img_x, img_y, img_s, img_s, 'D')
+
+            pdf.set_xy(x_curr + w_foto_m, y_curr)
+
+            pdf.set_text_color(40, 40, 40)
+            pdf.cell(w_setor_m, 10, f" {setor_str}", 1, 0, 'L', fill=True)
+            pdf.cell(w_nome_m, 10, f" {nome_str}", 1, 0, 'L', fill=True)
+
+            for d in dias_to_plot_ref:
+                val = row.get(d, np.nan)
+
+                if pd.isna(val) or val == 0:
+                    pdf.set_fill_color(240, 240, 240);
+                    txt = "-";
+                    pdf.set_text_color(180, 180, 180)
+                elif val == 1:
+                    pdf.set_fill_color(187, 247, 208);
+                    txt = "Sim";
+                    pdf.set_text_color(22, 101, 52)
+                elif val == -1:
+                    pdf.set_fill_color(254, 202, 202);
+                    txt = "Nao";
+                    pdf.set_text_color(153, 27, 27)
+
+                pdf.cell(w_dia_m_ref, 10, txt, 1, 0, 'C', fill=True)
+            pdf.ln()
+
+    # ==============================================================================
+    # PÁGINA 7: ESPELHO DE PONTO DIÁRIO (COM FOTOS E TOTALIZADOR)
+    # ==============================================================================
+    progresso(6 / 10, "Espelho de ponto")
+    dias_unicos_espelho = sorted(df_espelho['DT_REF'].dropna().unique())
+    max_dias_espelho = min(len(dias_unicos_espelho), 31)
+    dias_to_plot_espelho = dias_unicos_espelho[:max_dias_espelho]
+
+    if max_dias_espelho > 0:
+        pdf.add_page()
+        pdf.set_font('Arial', 'B', 14)
+        pdf.set_text_color(22, 102, 53)
+        pdf.cell(0, 8, "Espelho de Ponto Diario (Jornada Realizada no RH)", 0, 1)
+
+        pdf.set_font('Arial', '', 8)
+        pdf.set_text_color(80, 80, 80)
+        pdf.cell(0, 5,
+                 "Legenda: Horarios exibidos em duas linhas (Entrada em cima, Saida embaixo). F = Folga, Feriado ou Compensado | - = Sem Registro",
+                 0, 1)
+        pdf.ln(2)
+
+        w_foto_p = 12
+        w_setor_p = 28 if orientacao_pdf == 'L' else 18
+        w_nome_p = 45 if orientacao_pdf == 'L' else 35
+        w_saldo_p = 16 if orientacao_pdf == 'L' else 14
+        w_dia_p = (
+                              w_total - w_nome_p - w_setor_p - w_foto_p - w_saldo_p) / max_dias_espelho if max_dias_espelho > 0 else 10
+
+        def print_matrix_ponto_header():
+            pdf.set_font('Arial', 'B', 7)
+            pdf.set_fill_color(22, 102, 53)
+            pdf.set_text_color(255, 255, 255)
+            pdf.cell(w_foto_p, 6, " Foto", 1, 0, 'C', fill=True)
+            pdf.cell(w_setor_p, 6, " Setor", 1, 0, 'L', fill=True)
+            pdf.cell(w_nome_p, 6, " Colaborador", 1, 0, 'L', fill=True)
+            for d in dias_to_plot_espelho:
+                pdf.cell(w_dia_p, 6, d.strftime('%d'), 1, 0, 'C', fill=True)
+            pdf.cell(w_saldo_p, 6, " Saldo", 1, 0, 'C', fill=True)
+            pdf.ln()
+
+        print_matrix_ponto_header()
+
+        pivot_ponto = df_espelho.pivot_table(index=['SETOR', 'MATRICULA_FINAL', 'NOME_FINAL'], columns='DT_REF',
+                                             values='REAL_H', aggfunc='first')
+        pivot_ponto = pivot_ponto.sort_index(level=[0, 1, 2])
+
+        pdf.set_draw_color(220, 220, 220)
+
+        df_rank_stats = df_view.groupby(['SETOR', 'MATRICULA_FINAL']).agg(
+            {'H_REAL_LIQ': 'sum', 'HORAS_DEC': 'sum'}).reset_index()
+
+        for idx, row in pivot_ponto.iterrows():
+            if pdf.get_y() > max_y_page - 12:
+                pdf.add_page();
+                print_matrix_ponto_header()
+
+            setor, matricula, nome = idx
+            setor_str = str(setor)[:(15 if orientacao_pdf == 'L' else 10)].encode('latin-1', 'replace').decode(
+                'latin-1')
+            nome_str = str(nome)[:(22 if orientacao_pdf == 'L' else 16)].encode('latin-1', 'replace').decode('latin-1')
+
+            x_start_row = pdf.get_x();
+            y_start_row = pdf.get_y()
+
+            bg_rgb = (245, 247, 250)
+            pdf.set_fill_color(*bg_rgb)
+            pdf.rect(x_start_row, y_start_row, w_foto_p, 10, 'DF')
+
+            circ_img = get_circular_avatar(matricula, bg_rgb)
+            img_s = 8
+            img_x = x_start_row + (w_foto_p - img_s) / 2
+            img_y = y_start_row + (10 - img_s) / 2
+
+            if circ_img:
+                pdf.image(circ_img, x=img_x, y=img_y, w=img_s, h=img_s)
+            else:
+                pdf.set_draw_color(200, 200, 200); pdf.rect(img_x, img_y, img_s, img_s, 'D')
+
+            pdf.set_text_color(40, 40, 40)
+            pdf.set_font('Arial', 'B', 6)
+
+            x_setor = x_start_row + w_foto_p
+            pdf.rect(x_setor, y_start_row, w_setor_p, 10, 'DF')
+            pdf.set_xy(x_setor, y_start_row + 2)
+            pdf.cell(w_setor_p, 6, f" {setor_str}", 0, 0, 'L')
+
+            x_nome = x_setor + w_setor_p
+            pdf.rect(x_nome, y_start_row, w_nome_p, 10, 'DF')
+            pdf.set_xy(x_nome, y_start_row + 2)
+            pdf.cell(w_nome_p, 6, f" {nome_str}", 0, 0, 'L')
+
+            pdf.set_xy(x_nome + w_nome_p, y_start_row)
+            pdf.set_font('Arial', '', 4.5)
+
+            for d in dias_to_plot_espelho:
+                val = row.get(d, np.nan)
+                val_str = str(val).strip().upper()
+
+                if pd.isna(val) or val_str == 'NAN' or val_str == '-' or val_str == '':
+                    pdf.set_fill_color(240, 240, 240);
+                    pdf.set_text_color(180, 180, 180);
+                    parts = ["-"]
+                elif any(k in val_str for k in ['FOLGA', 'FERIADO', 'DSR', 'COMPENSADO']):
+                    pdf.set_fill_color(219, 234, 254);
+                    pdf.set_text_color(30, 58, 138);
+                    parts = ["F"]
+                else:
+                    pdf.set_fill_color(255, 255, 255);
+                    pdf.set_text_color(40, 40, 40)
+                    val_clean = val_str.replace(',', '.')
+                    parts = val_clean.split('/') if '/' in val_clean else [val_clean]
+
+                x_curr = pdf.get_x();
+                y_curr = pdf.get_y()
+
+                pdf.rect(x_curr, y_curr, w_dia_p, 10, 'DF')
+
+                if len(parts) == 1:
+                    pdf.set_xy(x_curr, y_curr + 2)
+                    pdf.cell(w_dia_p, 6, parts[0], 0, 0, 'C')
+                else:
+                    pdf.set_xy(x_curr, y_curr + 1)
+                    pdf.cell(w_dia_p, 4, parts[0], 0, 0, 'C')
+                    pdf.set_xy(x_curr, y_curr + 5)
+                    pdf.cell(w_dia_p, 4, parts[1], 0, 0, 'C')
+
+                pdf.set_xy(x_curr + w_dia_p, y_curr)
+
+            emp_stats = df_rank_stats[
+                (df_rank_stats['MATRICULA_FINAL'] == matricula) & (df_rank_stats['SETOR'] == setor)]
+            if not emp_stats.empty:
+                tot_rh = emp_stats.iloc[0]['H_REAL_LIQ'];
+                tot_pims = emp_stats.iloc[0]['HORAS_DEC']
+            else:
+                tot_rh, tot_pims = 0, 0
+
+            x_curr = pdf.get_x();
+            y_curr = pdf.get_y()
+            pdf.set_fill_color(248, 250, 252)
+            pdf.rect(x_curr, y_curr, w_saldo_p, 10, 'DF')
+
+            pdf.set_font('Arial', 'B', 4.5)
+            pdf.set_text_color(30, 58, 138)
+            pdf.set_xy(x_curr, y_curr + 2)
+            pdf.cell(w_saldo_p, 3, f"RH: {tot_rh:.1f}h", 0, 0, 'C')
+
+            pdf.set_text_color(22, 101, 52)
+            pdf.set_xy(x_curr, y_curr + 5.5)
+            pdf.cell(w_saldo_p, 3, f"PIMS: {tot_pims:.1f}h", 0, 0, 'C')
+
+            pdf.set_xy(10, y_start_row + 10)
+
+    # ==============================================================================
+    # PÁGINA 8: RANKING TOP 10 COLABORADORES
+    # ==============================================================================
+    progresso(7 / 10, "Pódio dos colaboradores")
+
+    df_top10 = df_view.groupby(['MATRICULA_FINAL', 'NOME_FINAL', 'SETOR']).agg({
+        'HORAS_PROD': 'sum', 'HORAS_DEC': 'sum', 'H_REAL_LIQ': 'sum'
+    }).reset_index()
+
+    df_top10 = df_top10[df_top10['H_REAL_LIQ'] > 0]
+    df_top10['HORAS_VALIDAS'] = df_top10[['HORAS_DEC', 'H_REAL_LIQ']].min(axis=1)
+    df_top10['PCT_VISUAL'] = np.where(df_top10['H_REAL_LIQ'] > 0,
+                                      (df_top10['HORAS_DEC'] / df_top10['H_REAL_LIQ']) * 100, 0).clip(max=100)
+    df_top10['EFI_PROD'] = np.where(df_top10['HORAS_DEC'] > 0, (df_top10['HORAS_PROD'] / df_top10['HORAS_DEC']) * 100,
+                                    0).clip(max=100)
+
+    if "Eficiência" in criterio_ranking:
+        df_top10 = df_top10.sort_values(by=['EFI_PROD', 'HORAS_VALIDAS'], ascending=[False, False]).head(10)
+        sub_title_pdf = "Ranking focado na Eficiencia Produtiva (maior % de tempo produtivo / maquina operando)."
+    elif "Volume" in criterio_ranking:
+        df_top10 = df_top10.sort_values(by=['HORAS_DEC', 'EFI_PROD'], ascending=[False, False]).head(10)
+        sub_title_pdf = "Ranking focado no Volume Bruto de Horas Apontadas no PIMS (Produtivas + Improdutivas)."
+    else:
+        df_top10 = df_top10.sort_values(by=['HORAS_VALIDAS', 'EFI_PROD'], ascending=[False, False]).head(10)
+        sub_title_pdf = "Ranking focado em Volume Valido (PIMS alinhado ao RH), bloqueando super-apontamentos indevidos."
+
+    if not df_top10.empty:
+        pdf.add_page()
+        pdf.set_font('Arial', 'B', 16)
+        pdf.set_text_color(22, 102, 53)
+        titulo_ranking = f"Ranking de Excelencia: Os 10 Melhores Apontamentos ({dt_in.strftime('%d/%m')} a {dt_out.strftime('%d/%m')})"
+        pdf.cell(0, 8, titulo_ranking, 0, 1, 'C')
+
+        pdf.set_font('Arial', '', 9)
+        pdf.set_text_color(100, 116, 139)
+        pdf.cell(0, 4, sub_title_pdf, 0, 1, 'C')
+
+        y_base = pdf.get_y() + 20
+
+        top_list = df_top10.to_dict('records')
+        while len(top_list) < 10:
+            top_list.append(None)
+
+        def draw_pdf_podium_card(pdf_obj, rank, row, x, y, w, color_r, color_g, color_b):
+            if not row: return y
+            h = 42
+
+            pdf_obj.set_fill_color(252, 253, 254)
+            pdf_obj.rect(x, y, w, h, 'F')
+
+            pdf_obj.set_draw_color(226, 232, 240)
+            pdf_obj.set_line_width(0.2)
+            pdf_obj.rect(x, y, w, h, 'D')
+
+            pdf_obj.set_fill_color(color_r, color_g, color_b)
+            pdf_obj.rect(x, y, w, 3, 'F')
+
+            img_s = 20
+            img_x = x + (w - img_s) / 2
+            img_y = y - (img_s / 2) - 2
+
+            foto_path = os.path.join(FOTOS_DIR, f"{str(row['MATRICULA_FINAL']).strip()}.jpg")
+            circ_img_path = None
+
+            if os.path.exists(foto_path):
+                try:
+                    from PIL import Image, ImageDraw
+                    img = Image.open(foto_path).convert("RGBA")
+                    iw, ih = img.size
+                    min_dim = min(iw, ih)
+                    img = img.crop(((iw - min_dim) // 2, (ih - min_dim) // 2, (iw + min_dim) // 2, (ih + min_dim) // 2))
+
+                    hr_size = 300
+                    img = img.resize((hr_size, hr_size), Image.LANCZOS)
+
+                    bg = Image.new('RGB', (hr_size, hr_size), (255, 255, 255))
+                    draw = ImageDraw.Draw(bg)
+                    draw.ellipse((0, 0, hr_size, hr_size), fill=(color_r, color_g, color_b))
+
+                    mask = Image.new('L', (hr_size, hr_size), 0)
+                    mask_draw = ImageDraw.Draw(mask)
+                    b_w = 16
+                    mask_draw.ellipse((b_w, b_w, hr_size - b_w, hr_size - b_w), fill=255)
+
+                    bg.paste(img, (0, 0), mask)
+                    temp = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
+                    bg.save(temp.name, 'JPEG', quality=95)
+                    arquivos_temporarios.append(temp.name)
+                    circ_img_path = temp.name
+                except:
+                    pass
+
+            if circ_img_path:
+                pdf_obj.image(circ_img_path, x=img_x, y=img_y, w=img_s, h=img_s)
+            else:
+                pdf_obj.set_fill_color(color_r, color_g, color_b)
+                pdf_obj.rect(img_x, img_y, img_s, img_s, 'F')
+                pdf_obj.set_fill_color(220, 220, 220)
+                pdf_obj.rect(img_x + 1, img_y + 1, img_s - 2, img_s - 2, 'F')
+
+            badge_w = 6
+            badge_x = img_x + img_s - badge_w + 1
+            badge_y = img_y + img_s - badge_w + 1
+
+            pdf_obj.set_fill_color(color_r, color_g, color_b)
+            pdf_obj.rect(badge_x, badge_y, badge_w, badge_w, 'F')
+            pdf_obj.set_draw_color(255, 255, 255)
+            pdf_obj.set_line_width(0.4)
+            pdf_obj.rect(badge_x, badge_y, badge_w, badge_w, 'D')
+
+            pdf_obj.set_font('Arial', 'B', 9)
+            pdf_obj.set_text_color(255, 255, 255)
+            pdf_obj.set_xy(badge_x, badge_y)
+            pdf_obj.cell(badge_w, badge_w, f"{rank}", 0, 0, 'C')
+
+            y_text = y + 10
+            pdf_obj.set_xy(x + 2, y_text)
+            pdf_obj.set_font('Arial', 'B', 9)
+            pdf_obj.set_text_color(30, 41, 59)
+            nome_curto = str(row['NOME_FINAL']).encode('latin-1', 'replace').decode('latin-1')[
+                :(22 if orientacao_pdf == 'L' else 15)]
+            pdf_obj.cell(w - 4, 5, nome_curto, 0, 1, 'C')
+
+            pdf_obj.set_xy(x + 2, pdf_obj.get_y())
+            pdf_obj.set_font('Arial', '', 7)
+            pdf_obj.set_text_color(100, 116, 139)
+            setor_curto = str(row['SETOR']).encode('latin-1', 'replace').decode('latin-1')[
+                :(26 if orientacao_pdf == 'L' else 20)]
+            pdf_obj.cell(w - 4, 3, f"{setor_curto}", 0, 1, 'C')
+
+            if "Eficiência" in criterio_ranking:
+                val_destaque = f"{row['EFI_PROD']:.0f}% Efic."
+                val_sec = f"{row['PCT_VISUAL']:.0f}% Apontado"
+                is_good = row['EFI_PROD'] >= 85
+            elif "Volume" in criterio_ranking:
+                val_destaque = f"{row['HORAS_DEC']:.1f}h Apont."
+                val_sec = f"Efic: {row['EFI_PROD']:.1f}%"
+                is_good = True
+            else:
+                val_destaque = f"{row['PCT_VISUAL']:.0f}% Apont."
+                val_sec = f"Efic: {row['EFI_PROD']:.1f}%"
+                is_good = row['PCT_VISUAL'] >= 85
+
+            y_kpi = pdf_obj.get_y() + 4
+            pdf_obj.set_xy(x + 4, y_kpi)
+            if is_good:
+                pdf_obj.set_fill_color(220, 252, 231);
+                pdf_obj.set_text_color(22, 101, 52)
+            else:
+                pdf_obj.set_fill_color(254, 240, 138);
+                pdf_obj.set_text_color(161, 98, 7)
+
+            pdf_obj.set_font('Arial', 'B', 10)
+            pdf_obj.cell(w - 8, 6, val_destaque, 0, 1, 'C', fill=True)
+
+            pdf_obj.set_xy(x + 2, pdf_obj.get_y() + 2)
+            pdf_obj.set_font('Arial', 'B', 8)
+            if "Volume" in criterio_ranking:
+                pdf_obj.set_text_color(100, 116, 139)
+            else:
+                pdf_obj.set_text_color(34, 197, 94)
+            pdf_obj.cell(w - 4, 4, val_sec, 0, 1, 'C')
+
+            return y + h
+
+        center_x = 297 / 2 if orientacao_pdf == 'L' else 210 / 2
+        card_w = 65 if orientacao_pdf == 'L' else 50
+        gap = 4 if orientacao_pdf == 'L' else 2
+
+        x_1st = center_x - (card_w / 2)
+        x_2nd = x_1st - card_w - gap
+        x_3rd = x_1st + card_w + gap
+
+        y_1st = y_base
+        y_2nd = y_base + 10
+        y_3rd = y_base + 18
+
+        y_end_1 = draw_pdf_podium_card(pdf, 2, top_list[1], x_2nd, y_2nd, card_w, 148, 163, 184)
+        y_end_2 = draw_pdf_podium_card(pdf, 1, top_list[0], x_1st, y_1st, card_w, 250, 191, 36)
+        y_end_3 = draw_pdf_podium_card(pdf, 3, top_list[2], x_3rd, y_3rd, card_w, 180, 83, 9)
+
+        max_y_podium = max(y_end_1, y_end_2, y_end_3)
+
+        start_y = max_y_podium + 10
+        pdf.set_y(start_y)
+
+        pdf.set_draw_color(226, 232, 240)
+        pdf.set_line_width(0.3)
+        pdf.line(10, start_y, w_total + 10, start_y)
+
+        cols = 2 if orientacao_pdf == 'L' else 1
+        card_w_list = 130 if orientacao_pdf == 'L' else 150
+        gap_x = 8 if orientacao_pdf == 'L' else 0
+        total_w = (card_w_list * cols) + (gap_x * (cols - 1))
+        margin_l = (297 - total_w) / 2 if orientacao_pdf == 'L' else (210 - total_w) / 2
+
+        y_atual = start_y + 4
+
+        for idx, row in enumerate(top_list[3:], start=4):
+            if not row: continue
+
+            col_index = (idx - 4) % cols
+
+            if col_index == 0 and idx > 4:
+                y_atual += 14
+
+            x_start = margin_l + col_index * (card_w_list + gap_x)
+
+            pdf.set_fill_color(252, 253, 254)
+            pdf.rect(x_start, y_atual, card_w_list, 12, 'F')
+            pdf.set_draw_color(226, 232, 240)
+            pdf.rect(x_start, y_atual, card_w_list, 12, 'D')
+
+            pdf.set_fill_color(241, 245, 249)
+            pdf.rect(x_start, y_atual, 10, 12, 'F')
+            pdf.set_font('Arial', 'B', 9)
+            pdf.set_text_color(100, 116, 139)
+            pdf.set_xy(x_start, y_atual + 3)
+            pdf.cell(10, 6, f"{idx}o", 0, 0, 'C')
+
+            foto_path = os.path.join(FOTOS_DIR, f"{str(row['MATRICULA_FINAL']).strip()}.jpg")
+            img_s = 10
+            img_x = x_start + 12
+            img_y = y_atual + 1
+            circ_img_list = None
+
+            if os.path.exists(foto_path):
+                try:
+                    from PIL import Image, ImageDraw
+                    img = Image.open(foto_path).convert("RGBA")
+                    iw, ih = img.size
+                    min_dim = min(iw, ih)
+                    img = img.crop(((iw - min_dim) // 2, (ih - min_dim) // 2, (iw + min_dim) // 2, (ih + min_dim) // 2))
+                    hr_size = 150
+                    img = img.resize((hr_size, hr_size), Image.LANCZOS)
+                    bg = Image.new('RGB', (hr_size, hr_size), (252, 253, 254))
+                    draw = ImageDraw.Draw(bg)
+                    draw.ellipse((0, 0, hr_size, hr_size), fill=(226, 232, 240))
+
+                    mask = Image.new('L', (hr_size, hr_size), 0)
+                    mask_draw = ImageDraw.Draw(mask)
+                    b_w = 6
+                    mask_draw.ellipse((b_w, b_w, hr_size - b_w, hr_size - b_w), fill=255)
+                    bg.paste(img, (0, 0), mask)
+
+                    temp = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
+                    bg.save(temp.name, 'JPEG', quality=95)
+                    arquivos_temporarios.append(temp.name)
+                    circ_img_list = temp.name
+                except:
+                    pass
+
+            if circ_img_list:
+                pdf.image(circ_img_list, x=img_x, y=img_y, w=img_s, h=img_s)
+            else:
+                pdf.set_draw_color(220, 220, 220)
+                pdf.rect(img_x, img_y, img_s, img_s, 'D')
+
+            pdf.set_text_color(30, 41, 59)
+            pdf.set_font('Arial', 'B', 8)
+            pdf.set_xy(x_start + 24, y_atual + 2)
+            nome_linha = str(row['NOME_FINAL']).encode('latin-1', 'replace').decode('latin-1')
+            pdf.cell(50, 4, nome_linha[:(25 if orientacao_pdf == 'L' else 35)], 0, 1, 'L')
+
+            pdf.set_font('Arial', '', 6)
+            pdf.set_text_color(100, 116, 139)
+            pdf.set_xy(x_start + 24, y_atual + 6)
+            setor_linha = str(row['SETOR']).encode('latin-1', 'replace').decode('latin-1')
+            pdf.cell(50, 4, setor_linha[:(30 if orientacao_pdf == 'L' else 40)], 0, 1, 'L')
+
+            w_stat = 20
+            x_stat1 = x_start + card_w_list - (w_stat * 2) - 4
+            x_stat2 = x_start + card_w_list - w_stat - 2
+
+            if "Eficiência" in criterio_ranking:
+                val_main = f"{row['EFI_PROD']:.0f}%"
+                lbl_main = "Efic."
+                val_sec = f"{row['PCT_VISUAL']:.0f}%"
+                lbl_sec = "Apontado"
+                is_good = row['EFI_PROD'] >= 85
+            elif "Volume" in criterio_ranking:
+                val_main = f"{row['HORAS_DEC']:.1f}h"
+                lbl_main = "Apont."
+                val_sec = f"{row['EFI_PROD']:.1f}%"
+                lbl_sec = "Efic."
+                is_good = True
+            else:
+                val_main = f"{row['PCT_VISUAL']:.0f}%"
+                lbl_main = "Apont."
+                val_sec = f"{row['EFI_PROD']:.1f}%"
+                lbl_sec = "Efic."
+                is_good = row['PCT_VISUAL'] >= 85
+
+            if is_good:
+                pdf.set_fill_color(220, 252, 231);
+                pdf.set_text_color(22, 101, 52)
+            else:
+                pdf.set_fill_color(254, 240, 138);
+                pdf.set_text_color(161, 98, 7)
+
+            pdf.set_xy(x_stat1, y_atual + 2)
+            pdf.set_font('Arial', 'B', 8)
+            pdf.cell(18, 4, val_main, 0, 0, 'C', fill=True)
+            pdf.set_text_color(100, 116, 139);
+            pdf.set_font('Arial', '', 5)
+            pdf.set_xy(x_stat1, y_atual + 7);
+            pdf.cell(18, 3, lbl_main, 0, 1, 'C')
+
+            pdf.set_text_color(71, 85, 105)
+            pdf.set_font('Arial', 'B', 8)
+            pdf.set_xy(x_stat2, y_atual + 2)
+            pdf.cell(20, 4, val_sec, 0, 0, 'C')
+            pdf.set_text_color(100, 116, 139);
+            pdf.set_font('Arial', '', 5)
+            pdf.set_xy(x_stat2, y_atual + 7);
+            pdf.cell(20, 3, lbl_sec, 0, 1, 'C')
+
+    # ==============================================================================
+    # PÁGINA 9: RANKING DA GESTÃO E SETOR
+    # ==============================================================================
+    progresso(8 / 10, "Ranking da gestão")
+    df_gestao = df_view.groupby(['GESTOR', 'SETOR']).agg({
+        'HORAS_PROD': 'sum', 'HORAS_IMPROD': 'sum', 'HORAS_DEC': 'sum', 'H_REAL_LIQ': 'sum'
+    }).reset_index()
+
+    df_gestao = df_gestao[(df_gestao['H_REAL_LIQ'] > 0) & (df_gestao['GESTOR'] != 'Não Definido')]
+
+    df_gestao['HORAS_VALIDAS'] = df_gestao[['HORAS_DEC', 'H_REAL_LIQ']].min(axis=1)
+    df_gestao['PCT_VISUAL'] = np.where(df_gestao['H_REAL_LIQ'] > 0,
+                                       (df_gestao['HORAS_DEC'] / df_gestao['H_REAL_LIQ']) * 100, 0).clip(max=100)
+    df_gestao['EFI_PROD'] = np.where(df_gestao['HORAS_DEC'] > 0,
+                                     (df_gestao['HORAS_PROD'] / df_gestao['HORAS_DEC']) * 100, 0).clip(max=100)
+
+    if "Eficiência" in criterio_ranking:
+        df_gestao = df_gestao.sort_values(by=['EFI_PROD', 'HORAS_VALIDAS'], ascending=[False, False]).head(10)
+        sub_title_gestao = "Classificacao da Lideranca com base na media de Eficiencia Produtiva das suas equipes."
+    elif "Volume" in criterio_ranking:
+        df_gestao = df_gestao.sort_values(by=['HORAS_DEC', 'EFI_PROD'], ascending=[False, False]).head(10)
+        sub_title_gestao = "Classificacao da Lideranca com base no Volume Bruto de horas apontadas pelas equipes."
+    else:
+        df_gestao = df_gestao.sort_values(by=['HORAS_VALIDAS', 'EFI_PROD'], ascending=[False, False]).head(10)
+        sub_title_gestao = "Classificacao da Lideranca com base no Engajamento medio (Apontamento valido vs Jornada RH)."
+
+    if not df_gestao.empty:
+        pdf.add_page()
+        pdf.set_font('Arial', 'B', 16)
+        pdf.set_text_color(22, 102, 53)
+        pdf.cell(0, 8, f"Ranking da Lideranca: Desempenho por Gestor e Setor", 0, 1, 'C')
+
+        pdf.set_font('Arial', '', 9)
+        pdf.set_text_color(100, 116, 139)
+        pdf.cell(0, 4, sub_title_gestao, 0, 1, 'C')
+
+        start_y = pdf.get_y() + 10
+
+        cols = 2 if orientacao_pdf == 'L' else 1
+        card_w_list = 135 if orientacao_pdf == 'L' else 170
+        gap_x = 5 if orientacao_pdf == 'L' else 0
+        total_w = (card_w_list * cols) + (gap_x * (cols - 1))
+        margin_l = (297 - total_w) / 2 if orientacao_pdf == 'L' else (210 - total_w) / 2
+
+        y_atual = start_y
+
+        for idx, row in enumerate(df_gestao.to_dict('records'), start=1):
+            col_index = (idx - 1) % cols
+
+            if col_index == 0 and idx > 1:
+                y_atual += 18
+
+            if y_atual + 16 > max_y_page:
+                pdf.add_page()
+                y_atual = 20
+
+            x_start = margin_l + col_index * (card_w_list + gap_x)
+
+            pdf.set_fill_color(252, 253, 254)
+            pdf.rect(x_start, y_atual, card_w_list, 16, 'F')
+            pdf.set_draw_color(226, 232, 240)
+            pdf.rect(x_start, y_atual, card_w_list, 16, 'D')
+
+            if idx == 1:
+                pdf.set_fill_color(250, 191, 36);
+                pdf.set_text_color(255, 255, 255)
+            elif idx == 2:
+                pdf.set_fill_color(148, 163, 184);
+                pdf.set_text_color(255, 255, 255)
+            elif idx == 3:
+                pdf.set_fill_color(180, 83, 9);
+                pdf.set_text_color(255, 255, 255)
+            else:
+                pdf.set_fill_color(241, 245, 249);
+                pdf.set_text_color(100, 116, 139)
+
+            pdf.rect(x_start, y_atual, 12, 16, 'F')
+            pdf.set_font('Arial', 'B', 10)
+            pdf.set_xy(x_start, y_atual + 5)
+            pdf.cell(12, 6, f"{idx}o", 0, 0, 'C')
+
+            gestor_nome = str(row['GESTOR']).strip()
+            setor_nome = str(row['SETOR']).strip()
+
+            img_s = 10
+            img_x = x_start + 14
+            img_y = y_atual + 3
+            pdf.set_fill_color(226, 232, 240)
+            pdf.set_draw_color(200, 200, 200)
+            pdf.rect(img_x, img_y, img_s, img_s, 'F')
+            pdf.set_text_color(100, 116, 139)
+            pdf.set_font('Arial', 'B', 7)
+            pdf.set_xy(img_x, img_y + 1.5)
+            pdf.cell(img_s, img_s / 2, gestor_nome[0] if len(gestor_nome) > 0 else "?", 0, 0, 'C')
+
+            pdf.set_text_color(30, 41, 59)
+            pdf.set_font('Arial', 'B', 8)
+            pdf.set_xy(x_start + 26, y_atual + 3)
+            nome_linha = gestor_nome.encode('latin-1', 'replace').decode('latin-1')
+            pdf.cell(28, 5, nome_linha[:15], 0, 1, 'L')
+
+            pdf.set_font('Arial', '', 5)
+            pdf.set_text_color(100, 116, 139)
+            pdf.set_xy(x_start + 26, y_atual + 8)
+            pdf.cell(28, 4, "Gestor", 0, 1, 'L')
+
+            pdf.set_draw_color(226, 232, 240)
+            pdf.line(x_start + 55, y_atual + 2, x_start + 55, y_atual + 14)
+
+            pdf.set_text_color(30, 41, 59)
+            pdf.set_font('Arial', 'B', 7)
+            pdf.set_xy(x_start + 57, y_atual + 3)
+            setor_linha = setor_nome.encode('latin-1', 'replace').decode('latin-1')
+            pdf.cell(33, 5, setor_linha[:18], 0, 1, 'L')
+
+            pdf.set_font('Arial', '', 5)
+            pdf.set_text_color(100, 116, 139)
+            pdf.set_xy(x_start + 57, y_atual + 8)
+            pdf.cell(33, 4, "Setor", 0, 1, 'L')
+
+            w_stat = 20
+            x_stat1 = x_start + card_w_list - (w_stat * 2) - 6
+            x_stat2 = x_start + card_w_list - w_stat - 2
+
+            if "Eficiência" in criterio_ranking:
+                val_main = f"{row['EFI_PROD']:.0f}%"
+                lbl_main = "Eficiencia"
+                val_sec = f"{row['HORAS_DEC']:.0f}h"
+                lbl_sec = "Total Apontado"
+                is_good = row['EFI_PROD'] >= 85
+            elif "Volume" in criterio_ranking:
+                val_main = f"{row['HORAS_DEC']:.0f}h"
+                lbl_main = "Apontadas"
+                val_sec = f"{row['EFI_PROD']:.0f}%"
+                lbl_sec = "Eficiencia"
+                is_good = True
+            else:
+                val_main = f"{row['PCT_VISUAL']:.0f}%"
+                lbl_main = "Engajamento"
+                val_sec = f"{row['HORAS_DEC']:.0f}h"
+                lbl_sec = "Total Apontado"
+                is_good = row['PCT_VISUAL'] >= 85
+
+            if is_good:
+                pdf.set_fill_color(220, 252, 231);
+                pdf.set_text_color(22, 101, 52)
+            else:
+                pdf.set_fill_color(254, 240, 138);
+                pdf.set_text_color(161, 98, 7)
+
+            pdf.set_xy(x_stat1, y_atual + 3)
+            pdf.set_font('Arial', 'B', 8)
+            pdf.cell(18, 5, val_main, 0, 0, 'C', fill=True)
+            pdf.set_text_color(100, 116, 139);
+            pdf.set_font('Arial', '', 5)
+            pdf.set_xy(x_stat1, y_atual + 9);
+            pdf.cell(18, 3, lbl_main, 0, 1, 'C')
+
+            pdf.set_text_color(71, 85, 105)
+            pdf.set_font('Arial', 'B', 8)
+            pdf.set_xy(x_stat2, y_atual + 4)
+            pdf.cell(20, 4, val_sec, 0, 0, 'C')
+            pdf.set_text_color(100, 116, 139);
+            pdf.set_font('Arial', '', 5)
+            pdf.set_xy(x_stat2, y_atual + 9);
+            pdf.cell(20, 3, lbl_sec, 0, 1, 'C')
+
+    # --- GERAÇÃO DO EXCEL MULTI-ABA ---
+    progresso(9 / 10, "Planilha Excel")
+    with pd.ExcelWriter(excel_io) as writer:
+        colunas_excel = [
+            'DT_REF', 'SETOR', 'NOME_FINAL', 'GESTOR', 'TURMA', 'MATRICULA_FINAL',
+            'ESC_H', 'REAL_H', 'H_REAL_LIQ',
+            'HORAS_DEC', 'HORAS_PROD', 'HORAS_IMPROD',
+            'APONTOU_REFEICAO', 'FALTA_REFEICAO', 'EFICIENCIA_GERAL', 'STATUS'
+        ]
+
+        df_export = df_view[colunas_excel].rename(columns={
+            'DT_REF': 'Data', 'GESTOR': 'Gestor', 'SETOR': 'Equipe (Setor)',
+            'MATRICULA_FINAL': 'Matricula', 'NOME_FINAL': 'Colaborador',
+            'ESC_H': 'Escala Programada', 'REAL_H': 'Jornada Realizada',
+            'H_REAL_LIQ': 'Horas Pagas (RH)', 'HORAS_DEC': 'Horas Apontadas (PIMS)',
+            'HORAS_PROD': 'Hrs Produtivas', 'HORAS_IMPROD': 'Hrs Improdutivas',
+            'APONTOU_REFEICAO': 'Apontou Refeicao (Diario)?', 'FALTA_REFEICAO': 'Dias s/ Refeicao',
+            'EFICIENCIA_GERAL': 'Eficiencia (%)'
+        })
+
+        df_rank_excel = df_rank.rename(columns={
+            'SETOR': 'Equipe (Setor)', 'GESTOR': 'Gestor', 'MATRICULA_FINAL': 'Matricula', 'NOME_FINAL': 'Colaborador',
+            'H_REAL_LIQ': 'Jornada (h)', 'HORAS_DEC': 'Apontado (h)', 'HORAS_PROD': 'Produtivo (h)',
+            'HORAS_IMPROD': 'Improdutivo (h)', 'FALTA_REFEICAO': 'Dias sem Refeicao', 'EFI': 'Eficiencia (%)'
+        })
+
+        cols_order_rank = ['Equipe (Setor)', 'Colaborador', 'Gestor', 'Matricula', 'Jornada (h)', 'Apontado (h)',
+                           'Produtivo (h)', 'Improdutivo (h)', 'Eficiencia (%)', 'Dias sem Refeicao']
+        df_rank_excel = df_rank_excel[cols_order_rank]
+
+        # Excel 1: Matriz de Eficiência
+        df_matriz_excel = df_view.copy()
+        df_matriz_excel['MATRIZ_VAL'] = df_matriz_excel['EFICIENCIA_VISUAL']
+        mask_falta_ex = (df_matriz_excel['STATUS'] == 'CRÍTICO (Sem Apontamento)')
+        mask_super_ex = (df_matriz_excel['STATUS'] == 'ALERTA (Super-Apontamento)')
+        df_matriz_excel.loc[mask_falta_ex, 'MATRIZ_VAL'] = -1
+        df_matriz_excel.loc[mask_super_ex, 'MATRIZ_VAL'] = -2
+
+        pivot_excel = df_matriz_excel.pivot_table(index=['SETOR', 'GESTOR', 'MATRICULA_FINAL', 'NOME_FINAL'],
+                                                  columns='DT_REF',
+                                                  values='MATRIZ_VAL', aggfunc='mean').reset_index()
+
+        novas_colunas = []
+        for c in pivot_excel.columns:
+            if isinstance(c, datetime) or hasattr(c, 'strftime'):
+                col_name = c.strftime('%d/%m')
+                novas_colunas.append(col_name)
+                pivot_excel[c] = pivot_excel[c].apply(lambda x: "Sem Apont." if x == -1 else (
+                    ">100%" if x == -2 else ("-" if pd.isna(x) or x == 0 else round(x, 1))))
+            else:
+                novas_colunas.append(str(c))
+
+        pivot_excel.columns = novas_colunas
+
+        # Excel 2: Matriz de Refeição
+        df_ref_excel = df_ref_dados.copy()
+        if not df_ref_excel.empty:
+            def get_ref_val(r):
+                if r['APONTOU_REFEICAO'] == 'Sim': return 1
+                if r['H_REAL_LIQ'] > 4.0 and r['APONTOU_REFEICAO'] == 'Não': return -1
+                return 0
+
+            df_ref_excel['REF_VAL'] = df_ref_excel.apply(get_ref_val, axis=1)
+            pivot_ref_excel = df_ref_excel.pivot_table(index=['SETOR', 'GESTOR', 'MATRICULA_FINAL', 'NOME_FINAL'],
+                                                       columns='DT_REF', values='REF_VAL', aggfunc='min').reset_index()
+
+            novas_colunas_ref = []
+            for c in pivot_ref_excel.columns:
+                if isinstance(c, datetime) or hasattr(c, 'strftime'):
+                    novas_colunas_ref.append(c.strftime('%d/%m'))
+                else:
+                    novas_colunas_ref.append(str(c))
+            pivot_ref_excel.columns = novas_colunas_ref
+
+            for col in novas_colunas_ref[4:]:
+                pivot_ref_excel[col] = pivot_ref_excel[col].apply(
+                    lambda x: "Sim" if x == 1 else ("Não" if x == -1 else "-"))
+
+        # Excel 3: ESPELHO DE PONTO DO RH
+        pivot_excel_ponto = df_espelho.pivot_table(index=['SETOR', 'GESTOR', 'MATRICULA_FINAL', 'NOME_FINAL'],
+                                                   columns='DT_REF',
+                                                   values='REAL_H', aggfunc='first').reset_index()
+        novas_colunas_pt = []
+        for c in pivot_excel_ponto.columns:
+            if isinstance(c, datetime) or hasattr(c, 'strftime'):
+                novas_colunas_pt.append(c.strftime('%d/%m'))
+            else:
+                novas_colunas_pt.append(str(c))
+
+        pivot_excel_ponto.columns = novas_colunas_pt
+        pivot_excel_ponto.fillna('-', inplace=True)
+
+        # Salva as Abas
+        df_export.to_excel(writer, sheet_name="Base Detalhada", index=False)
+        df_setor.to_excel(writer, sheet_name="Ranking Setores", index=False)
+        df_rank_excel.to_excel(writer, sheet_name="Ranking Colaboradores", index=False)
+        pivot_excel.to_excel(writer, sheet_name="Matriz Diaria Eficiencia", index=False)
+        if not df_ref_excel.empty: pivot_ref_excel.to_excel(writer, sheet_name="Matriz de Refeicao", index=False)
+        pivot_excel_ponto.to_excel(writer, sheet_name="Espelho de Ponto", index=False)
+
+        if not improd_filtered.empty:
+            improd_agrupado.to_excel(writer, sheet_name="Raio-X Improdutividade", index=False)
+
+    bytes_excel = excel_io.getvalue()
+
+    temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+    pdf_path = temp_pdf.name
+    temp_pdf.close()
+    pdf.output(pdf_path)
+
+    with open(pdf_path, "rb") as f:
+        bytes_pdf = f.read()
+    os.remove(pdf_path)
+    for img in arquivos_temporarios:
+        try:
+            os.remove(img)
+        except:
+            pass
+
+    return bytes_excel, bytes_pdf
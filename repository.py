@@ -1,32 +1,70 @@
+import re
 import pandas as pd
 import sqlite3
-from database import get_db_connection
+from database import get_db_connection, normalizar_data_hora, FORMATO_DATA_HORA
+from cache_consultas import consultar
+from database_schema import MARCADOR_RESTAURACAO, TURNO_SQL, FALHA_SQL
+from arquivo_morto import fonte
+
+
+def _prefixo_glob(termo):
+    """Padrão GLOB 'termo*' com os curingas do próprio termo escapados (usa índice, ao contrário de LIKE '%x%')."""
+    return "".join(f"[{c}]" if c in "*?[" else c for c in termo) + "*"
+
+
+def expressao_fts(texto):
+    """
+    Converte o texto digitado em uma consulta FTS5 segura: cada palavra vira um prefixo
+    entre aspas ("eletr"*) e todas precisam aparecer. Retorna '' se não houver palavras.
+    """
+    return " ".join(f'"{palavra}"*' for palavra in re.findall(r"\w+", texto or ""))
+
+
+def _indice_texto_existe(indice):
+    """True se a tabela FTS5 foi criada (migração 009); sem ela as buscas usam LIKE."""
+    conn = get_db_connection()
+    try:
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (indice,)).fetchone() is not None
+    finally:
+        conn.close()
+
+
+def _proximo_cursor(df, tamanho, coluna_data="data_hora", coluna_id="id"):
+    """Cursor (data_hora, id) da última linha, ou None se esta foi a última página."""
+    if len(df) < tamanho:
+        return None
+    ultima = df.iloc[-1]
+    return ultima[coluna_data], int(ultima[coluna_id])
 
 
 class DashboardRepository:
     """Centraliza as consultas usadas nos Dashboards (Início e Painel Principal)."""
 
     @staticmethod
-    def get_kpis_gerais():
-        """Retorna os contadores principais: Abertas, Paradas e Recados."""
+    def get_contadores(*chaves):
+        """
+        Lê contadores da tabela kpi_counters (mantida por triggers, ver database_schema.py).
+        Retorna {chave: valor}; chaves ainda inexistentes valem 0.
+        """
         conn = get_db_connection()
         try:
-            # Busca contagem de ordens não concluídas
-            q_aberta = conn.execute("SELECT COUNT(*) FROM ordens_servico WHERE status != 'Concluído'").fetchone()[0]
-
-            # Filtro lógico de parada: Não concluído, não pendente, não aguardando E maquina_parada=1
-            filtro_parada = "status NOT IN ('Concluído', 'Pendente', 'Aguardando Peças') AND maquina_parada = 1"
-            q_parada = conn.execute(f"SELECT COUNT(*) FROM ordens_servico WHERE {filtro_parada}").fetchone()[0]
-
-            q_recados = conn.execute("SELECT COUNT(*) FROM recados").fetchone()[0]
-            return q_aberta, q_parada, q_recados
+            marcadores = ", ".join("?" * len(chaves))
+            rows = conn.execute(f"SELECT chave, valor FROM kpi_counters WHERE chave IN ({marcadores})", chaves)
+            valores = dict(rows.fetchall())
+            return {chave: valores.get(chave, 0) for chave in chaves}
         finally:
             conn.close()
 
+    @staticmethod
+    def get_kpis_gerais():
+        """Retorna os contadores principais: Abertas, Paradas e Recados."""
+        # Parada: não concluído, não pendente, não aguardando E maquina_parada=1 (contador 'os_paradas')
+        c = DashboardRepository.get_contadores("os_abertas", "os_paradas", "recados")
+        return c["os_abertas"], c["os_paradas"], c["recados"]
+
     @staticmethod
     def get_top_pendencias(limit=20):
         """Retorna as ordens pendentes, ordenadas por prioridade."""
-        conn = get_db_connection()
         # Query otimizada com aliases (os.* e e.*) para evitar ambiguidade
         query = """
             SELECT os.id, e.frota, os.descricao, os.data_hora, os.prioridade, os.status 
@@ -36,15 +74,11 @@ class DashboardRepository:
             ORDER BY os.prioridade = 'Alta' DESC, os.data_hora DESC 
             LIMIT ?
         """
-        try:
-            return pd.read_sql(query, conn, params=(limit,))
-        finally:
-            conn.close()
+        return consultar(query, (limit,))
 
     @staticmethod
     def get_maquinas_paradas():
         """Retorna detalhes das máquinas paradas atualmente."""
-        conn = get_db_connection()
         query = """
             SELECT os.id, e.frota, os.descricao, os.data_hora 
             FROM ordens_servico os
@@ -53,20 +87,17 @@ class DashboardRepository:
             AND os.maquina_parada = 1 
             ORDER BY os.data_hora DESC
         """
-        try:
-            return pd.read_sql(query, conn)
-        finally:
-            conn.close()
+        return consultar(query)
 
     @staticmethod
     def get_distribuicao_status():
         """Retorna dados para o gráfico de barras de status."""
         conn = get_db_connection()
+        # Contadores por status mantidos pelos triggers (chaves 'status:<nome>')
         query = """
-            SELECT status, COUNT(*) as qtd 
-            FROM ordens_servico 
-            WHERE status != 'Concluído' 
-            GROUP BY status 
+            SELECT substr(chave, 8) as status, valor as qtd 
+            FROM kpi_counters 
+            WHERE chave GLOB 'status:*' AND chave != 'status:Concluído' AND valor > 0 
             ORDER BY qtd DESC
         """
         try:
@@ -78,6 +109,173 @@ class DashboardRepository:
 class OrdemServicoRepository:
     """Manipulação de OS (Criar, Editar, Listar)."""
 
+    @staticmethod
+    def _changes_since(conn, versao):
+        atual = conn.execute("SELECT versao FROM tabela_versoes WHERE tabela = 'ordens_servico'").fetchone()[0]
+        alterados = [r[0] for r in conn.execute("SELECT id FROM ordens_servico WHERE row_version > ?", (versao,))]
+        excluidos = [r[0] for r in conn.execute("SELECT id FROM ordens_servico_excluidas WHERE row_version > ?", (versao,))]
+        return atual, alterados, excluidos
+
+    @staticmethod
+    def changes_since(versao):
+        """
+        Feed de alterações (ver migração 007): ordens criadas/alteradas e excluídas depois de `versao`.
+        Retorna (versao_atual, ids_alterados, ids_excluidos); guarde versao_atual para a próxima chamada.
+        """
+        conn = get_db_connection()
+        try:
+            conn.execute("BEGIN")  # Leitura consistente: versão e ids do mesmo instante
+            return OrdemServicoRepository._changes_since(conn, versao)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def carregar_com_deltas(estado, sql, params=(), coluna_id="id", tabelas_relacionadas=()):
+        """
+        Executa `sql` (SELECT sobre ordens_servico com alias `os`, terminando no WHERE, sem ORDER BY)
+        mantendo o resultado em `estado` (ex.: um dict em st.session_state).
+        Na primeira vez, se a consulta/parâmetros ou alguma das `tabelas_relacionadas` mudar,
+        ou após uma restauração de backup, lê tudo; nas seguintes busca só as ordens alteradas desde o último snapshot e as mescla.
+        A ordem das linhas não é garantida: ordene o DataFrame retornado (que é uma cópia).
+        """
+        params = tuple(params)
+        conn = get_db_connection()
+        try:
+            conn.execute("BEGIN")
+            versoes = dict(conn.execute("SELECT tabela, versao FROM tabela_versoes").fetchall())
+            versao_os = versoes.get("ordens_servico", 0)
+            relacionadas = tuple(versoes.get(t, 0) for t in (*tabelas_relacionadas, MARCADOR_RESTAURACAO))
+
+            if estado.get("chave") != (sql, params) or estado.get("relacionadas") != relacionadas:
+                df = pd.read_sql_query(sql, conn, params=params)
+            elif estado["versao"] == versao_os:
+                return estado["df"].copy()
+            else:
+                _, alterados, excluidos = OrdemServicoRepository._changes_since(conn, estado["versao"])
+                novos = pd.read_sql_query(f"{sql} AND os.row_version > ?", conn, params=params + (estado["versao"],))
+                base = estado["df"]
+                # Remove as versões antigas (inclusive as que deixaram de atender ao filtro) e entra com as novas
+                base = base[~base[coluna_id].isin(set(alterados) | set(excluidos))]
+                df = pd.concat([base, novos], ignore_index=True) if not novos.empty else base.reset_index(drop=True)
+        finally:
+            conn.close()
+
+        estado.update(chave=(sql, params), relacionadas=relacionadas, versao=versao_os, df=df)
+        return df.copy()
+
+    # OS + frota, executante, solicitante e operação (tela Gerenciar Atendimento)
+    SQL_ATENDIMENTOS = """
+        SELECT 
+            os.*, 
+            e.frota, e.modelo, e.gestao_responsavel,
+            f.nome as nome_executante,
+            f_solic.nome as nome_solicitante,
+            f_solic.matricula as mat_solicitante,
+            op.nome as nome_operacao
+        FROM ordens_servico os
+        JOIN equipamentos e ON os.equipamento_id = e.id
+        LEFT JOIN funcionarios f ON os.funcionario_id = f.id
+        LEFT JOIN funcionarios f_solic ON os.solicitante_id = f_solic.id
+        LEFT JOIN tipos_operacao op ON os.tipo_operacao_id = op.id
+    """
+    TABELAS_ATENDIMENTOS = ("ordens_servico", "equipamentos", "funcionarios", "tipos_operacao")
+
+    @staticmethod
+    def listar_pagina(apos=None, tamanho=50, somente_abertas=True):
+        """
+        Página de atendimentos, do mais recente para o mais antigo, paginada por chave (data_hora, id).
+        `apos` é o cursor devolvido pela página anterior (None = primeira página).
+        Retorna (DataFrame, proximo_cursor); proximo_cursor é None na última página.
+        O custo é o mesmo em qualquer página (não usa OFFSET).
+        """
+        condicoes, params = [], []
+        if somente_abertas:
+            condicoes.append("os.status != 'Concluído'")
+        if apos is not None:
+            condicoes.append("(os.data_hora, os.id) < (?, ?)")
+            params.extend(apos)
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        sql = f"{OrdemServicoRepository.SQL_ATENDIMENTOS} {where} ORDER BY os.data_hora DESC, os.id DESC LIMIT ?"
+        df = consultar(sql, params + [tamanho], tabelas=OrdemServicoRepository.TABELAS_ATENDIMENTOS)
+        return df, _proximo_cursor(df, tamanho)
+
+    @staticmethod
+    def buscar(termo, limite=20, somente_abertas=False):
+        """
+        Busca rápida (typeahead) por nº do ticket, início da frota ou início da OS oficial.
+        Retorna até `limite` atendimentos, com o ticket exato (se houver) em primeiro lugar.
+        """
+        termo = str(termo).strip().lstrip("#")
+        if not termo:
+            return consultar(f"{OrdemServicoRepository.SQL_ATENDIMENTOS} WHERE 0",
+                             tabelas=OrdemServicoRepository.TABELAS_ATENDIMENTOS)
+        ticket = int(termo) if termo.isdigit() else -1
+        prefixo = _prefixo_glob(termo)
+        filtro_status = "os.status != 'Concluído' AND " if somente_abertas else ""
+        # Uma subconsulta por índice (id, frota, OS oficial) em vez de um OR entre tabelas
+        sql = f"""
+            {OrdemServicoRepository.SQL_ATENDIMENTOS}
+            WHERE {filtro_status}os.id IN (
+                SELECT id FROM ordens_servico WHERE id = ?
+                UNION SELECT o.id FROM equipamentos eq JOIN ordens_servico o ON o.equipamento_id = eq.id WHERE eq.frota GLOB ?
+                UNION SELECT id FROM ordens_servico WHERE numero_os_oficial GLOB ?
+            )
+            ORDER BY os.id = ? DESC, os.data_hora DESC, os.id DESC
+            LIMIT ?
+        """
+        return consultar(sql, (ticket, prefixo, prefixo, ticket, limite),
+                         tabelas=OrdemServicoRepository.TABELAS_ATENDIMENTOS)
+
+    @staticmethod
+    def buscar_texto(texto, limite=20, somente_abertas=False, equipamento_id=None):
+        """
+        Busca textual em descrição, local e OS oficial, da mais relevante para a menos (bm25).
+        Ignora acentos e aceita início de palavra: "eletr" acha "Elétrica" e "eletrica".
+        Se o SQLite não tiver FTS5, usa LIKE (ordenado por data).
+        """
+        consulta = expressao_fts(texto)
+        if not consulta:
+            return consultar(f"{OrdemServicoRepository.SQL_ATENDIMENTOS} WHERE 0",
+                             tabelas=OrdemServicoRepository.TABELAS_ATENDIMENTOS)
+
+        filtros, params = [], []
+        if somente_abertas:
+            filtros.append("os.status != 'Concluído'")
+        if equipamento_id is not None:
+            filtros.append("os.equipamento_id = ?")
+            params.append(int(equipamento_id))
+
+        if _indice_texto_existe("os_fts"):
+            where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+            sql = f"""
+                WITH achados AS (
+                    SELECT rowid AS id, bm25(os_fts) AS relevancia FROM os_fts WHERE os_fts MATCH ?
+                )
+                {OrdemServicoRepository.SQL_ATENDIMENTOS}
+                JOIN achados ON achados.id = os.id
+                {where}
+                ORDER BY achados.relevancia, os.data_hora DESC
+                LIMIT ?
+            """
+            params = [consulta] + params
+        else:
+            termo = f"%{texto.strip()}%"
+            filtros.append("(os.descricao LIKE ? OR os.local_atendimento LIKE ? OR os.numero_os_oficial LIKE ?)")
+            params.extend([termo, termo, termo])
+            sql = f"""
+                {OrdemServicoRepository.SQL_ATENDIMENTOS}
+                WHERE {' AND '.join(filtros)}
+                ORDER BY os.data_hora DESC
+                LIMIT ?
+            """
+        return consultar(sql, params + [limite], tabelas=OrdemServicoRepository.TABELAS_ATENDIMENTOS)
+
+    @staticmethod
+    def obter(ticket_id):
+        """Um atendimento pelo número do ticket (DataFrame com 0 ou 1 linha)."""
+        return consultar(f"{OrdemServicoRepository.SQL_ATENDIMENTOS} WHERE os.id = ?", (int(ticket_id),),
+                         tabelas=OrdemServicoRepository.TABELAS_ATENDIMENTOS)
+
     @staticmethod
     def update_status(ticket_id, status, user_action=None):
         conn = get_db_connection()
@@ -88,7 +286,7 @@ class OrdemServicoRepository:
                 from datetime import datetime
                 import pytz
                 tz = pytz.timezone('America/Campo_Grande')
-                dt_fim = datetime.now(tz).replace(tzinfo=None)
+                dt_fim = normalizar_data_hora(datetime.now(tz).replace(tzinfo=None))
                 cursor.execute("UPDATE ordens_servico SET status=?, data_encerramento=? WHERE id=?",
                                (status, dt_fim, ticket_id))
             else:
@@ -102,4 +300,230 @@ class OrdemServicoRepository:
             print(f"Erro update: {e}")
             return False
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+
+class AuditoriaRepository:
+    """Consultas da tela de Auditoria (audit_logs)."""
+
+    @staticmethod
+    def get_filtros():
+        """Listas de usuários e ações distintos para os filtros."""
+        usuarios = consultar("SELECT DISTINCT usuario FROM audit_logs ORDER BY usuario")['usuario'].tolist()
+        acoes = consultar("SELECT DISTINCT acao FROM audit_logs ORDER BY acao")['acao'].tolist()
+        return usuarios, acoes
+
+    @staticmethod
+    def _sql_pagina(origem, usuarios, acoes, texto, apos, usar_fts):
+        query = f"SELECT * FROM {origem} WHERE 1=1"
+        params = []
+        if usuarios:
+            query += f" AND usuario IN ({','.join(['?'] * len(usuarios))})"
+            params.extend(usuarios)
+        if acoes:
+            query += f" AND acao IN ({','.join(['?'] * len(acoes))})"
+            params.extend(acoes)
+        if texto:
+            consulta_fts = expressao_fts(texto) if usar_fts else None
+            if consulta_fts and _indice_texto_existe("audit_fts"):
+                # Índice FTS5 (sem acentos, por início de palavra) em vez de varrer com LIKE '%x%'
+                query += " AND id IN (SELECT rowid FROM audit_fts WHERE audit_fts MATCH ?)"
+                params.append(consulta_fts)
+            else:
+                query += " AND (alvo LIKE ? OR detalhes LIKE ?)"
+                termo = f"%{texto}%"
+                params.extend([termo, termo])
+        if apos is not None:
+            query += " AND (data_hora, id) < (?, ?)"
+            params.extend(apos)
+        query += " ORDER BY data_hora DESC, id DESC LIMIT ?"
+        return query, params
+
+    @staticmethod
+    def listar_pagina(usuarios=(), acoes=(), texto="", apos=None, tamanho=100):
+        """
+        Página de logs do mais recente para o mais antigo, paginada por chave (data_hora, id).
+        Retorna (DataFrame, proximo_cursor), como OrdemServicoRepository.listar_pagina.
+        Quando os logs ativos acabam, a página continua nos logs do arquivo morto.
+        """
+        query, params = AuditoriaRepository._sql_pagina("audit_logs", usuarios, acoes, texto, apos, usar_fts=True)
+        df = consultar(query, params + [tamanho], tabelas=("audit_logs",))
+        if len(df) == tamanho:
+            return df, _proximo_cursor(df, tamanho)
+
+        # Página incompleta: se houver arquivo morto, refaz sobre a união (o índice FTS só cobre os ativos)
+        conn = get_db_connection()
+        try:
+            origem = fonte(conn, "audit_logs")
+            if origem != "audit_logs":
+                query, params = AuditoriaRepository._sql_pagina(origem, usuarios, acoes, texto, apos, usar_fts=False)
+                df = pd.read_sql_query(query, conn, params=params + [tamanho])
+        finally:
+            conn.close()
+        return df, _proximo_cursor(df, tamanho)
+
+
+class IndicadoresRepository:
+    """
+    Consultas da tela de Indicadores: contagens pelo rollup kpi_diario e, ordem a ordem,
+    as falhas de onde saem as horas paradas (MTTR/disponibilidade).
+    """
+
+    @staticmethod
+    def _filtros(modelos, frotas, turnos, coluna_turno):
+        sql, params = "", []
+        for coluna, valores in (("e.modelo", modelos), ("e.frota", frotas), (coluna_turno, turnos)):
+            if valores:
+                sql += f" AND {coluna} IN ({','.join(['?'] * len(valores))})"
+                params.extend(valores)
+        return sql, params
+
+    @staticmethod
+    def resumo_diario(inicio, fim, modelos=(), frotas=(), turnos=()):
+        """
+        Ordens e falhas por dia x frota x modelo x turno no período, somadas do rollup
+        kpi_diario (o custo não depende do tamanho do período). As horas paradas não saem
+        daqui: ordens sobrepostas na mesma máquina contam uma vez só (ver listar_falhas).
+        """
+        filtros, params = IndicadoresRepository._filtros(modelos, frotas, turnos, "k.turno")
+        df = consultar(f"""
+            SELECT k.dia, e.frota, e.modelo, k.turno,
+                   SUM(k.ordens) AS ordens, SUM(k.falhas) AS falhas
+            FROM kpi_diario k
+            JOIN equipamentos e ON e.id = k.equipamento_id
+            WHERE k.dia BETWEEN ? AND ? {filtros}
+            GROUP BY k.dia, e.frota, e.modelo, k.turno
+            HAVING SUM(k.ordens) > 0
+        """, [f"{inicio:%Y-%m-%d}", f"{fim:%Y-%m-%d}"] + params, tabelas=("ordens_servico", "equipamentos"))
+        return df
+
+    @staticmethod
+    def listar_falhas(inicio, fim, modelos=(), frotas=(), turnos=()):
+        """Falhas do período, uma por linha (gráficos de detalhe, tabela e PDF), com Turno e duracao_horas."""
+        conn = get_db_connection()
+        try:
+            # Período que alcança o arquivo morto consulta a união (ativo + arquivo)
+            origem = fonte(conn, "ordens_servico", inicio)
+            turno = TURNO_SQL.format(r="os")
+            filtros, params = IndicadoresRepository._filtros(modelos, frotas, turnos, turno)
+            df = pd.read_sql_query(f"""
+                SELECT
+                    os.id as Ticket, os.equipamento_id,
+                    e.frota, e.modelo, os.data_hora as abertura, os.data_encerramento as fechamento,
+                    os.classificacao, op.nome as tipo_servico,
+                    f_solic.nome as solicitante, {turno} as Turno
+                FROM {origem} os
+                JOIN equipamentos e ON os.equipamento_id = e.id
+                JOIN tipos_operacao op ON os.tipo_operacao_id = op.id
+                LEFT JOIN funcionarios f_solic ON os.solicitante_id = f_solic.id
+                WHERE os.data_hora BETWEEN ? AND ? AND {FALHA_SQL.format(r="os")} {filtros}
+            """, conn, params=[f"{inicio:%Y-%m-%d}", f"{fim:%Y-%m-%d} 23:59:59"] + params)
+        finally:
+            conn.close()
+        df['abertura'] = pd.to_datetime(df['abertura'], format=FORMATO_DATA_HORA, errors='coerce')
+        df['fechamento'] = pd.to_datetime(df['fechamento'], format=FORMATO_DATA_HORA, errors='coerce')
+        df['classificacao'] = df['classificacao'].fillna('Corretiva')
+        df['duracao_horas'] = (df['fechamento'].fillna(pd.Timestamp.now()) - df['abertura']).dt.total_seconds() / 3600
+        return df
+
+
+# Colunas do histórico na ordem de fato_eficiencia e o nome usado na tela de Eficiência
+COLUNAS_FATO_EFICIENCIA = {
+    "matricula": "MATRICULA_FINAL", "dt_ref": "DT_REF", "nome": "NOME_FINAL", "setor": "SETOR",
+    "turma": "TURMA", "esc_h": "ESC_H", "real_h": "REAL_H", "h_real_liq": "H_REAL_LIQ",
+    "horas_dec": "HORAS_DEC", "horas_prod": "HORAS_PROD", "horas_improd": "HORAS_IMPROD",
+    "apontou_refeicao": "APONTOU_REFEICAO", "falta_refeicao": "FALTA_REFEICAO", "status": "STATUS",
+    "eficiencia_geral": "EFICIENCIA_GERAL",
+}
+
+
+class EficienciaRepository:
+    """Histórico da Eficiência de Apontamentos (PIMS x RH) por matrícula x dia (fato_eficiencia)."""
+
+    @staticmethod
+    def _chaves(df, coluna_matricula):
+        """Matrícula como texto sem '.0' e dia 'AAAA-MM-DD'; linhas sem um dos dois são descartadas."""
+        df = df[df[coluna_matricula].notna() & df["DT_REF"].notna()].copy()
+        df["_matricula"] = df[coluna_matricula].astype(str).str.replace(r"\.0$", "", regex=True).str.strip()
+        df["_dt_ref"] = pd.to_datetime(df["DT_REF"]).dt.strftime("%Y-%m-%d")
+        return df
+
+    @staticmethod
+    def gravar(df_final, df_improd):
+        """
+        Grava uma importação já cruzada (resultado de processar_dados_corporativos).
+        Matrícula x dia que já existia é substituído (exportação nova de um período que
+        se sobrepõe ao anterior); o resto do histórico fica como está. Retorna as linhas gravadas.
+        """
+        df = EficienciaRepository._chaves(df_final, "MATRICULA_FINAL").drop_duplicates(["_matricula", "_dt_ref"],
+                                                                                        keep="last")
+        importado_em = pd.Timestamp.now().strftime(FORMATO_DATA_HORA)
+        colunas = list(COLUNAS_FATO_EFICIENCIA)
+        linhas = list(zip(
+            df["_matricula"].tolist(), df["_dt_ref"].tolist(),
+            *(df[COLUNAS_FATO_EFICIENCIA[c]].astype(object).where(df[COLUNAS_FATO_EFICIENCIA[c]].notna(), None)
+              .tolist() for c in colunas[2:]),
+            [importado_em] * len(df)))
+        atualizar = ", ".join(f"{c} = excluded.{c}" for c in colunas[2:] + ["importado_em"])
+
+        improd = pd.DataFrame(columns=["_matricula", "_dt_ref", "OPERACAO_NOME", "HORAS_DEC"])
+        if df_improd is not None and not df_improd.empty:
+            improd = EficienciaRepository._chaves(df_improd, "MATRICULA")
+            improd = improd.groupby(["_matricula", "_dt_ref", "OPERACAO_NOME"], as_index=False)["HORAS_DEC"].sum()
+
+        conn = get_db_connection()
+        try:
+            with conn:
+                conn.executemany(f"""
+                    INSERT INTO fato_eficiencia ({', '.join(colunas)}, importado_em)
+                    VALUES ({', '.join(['?'] * (len(colunas) + 1))})
+                    ON CONFLICT (matricula, dt_ref) DO UPDATE SET {atualizar}
+                """, linhas)
+                # Improdutividade dos dias reimportados é trocada inteira (operações podem ter sumido)
+                conn.executemany("DELETE FROM fato_eficiencia_improd WHERE matricula = ? AND dt_ref = ?",
+                                 [linha[:2] for linha in linhas])
+                conn.executemany("""
+                    INSERT OR REPLACE INTO fato_eficiencia_improd (matricula, dt_ref, operacao_nome, horas)
+                    VALUES (?, ?, ?, ?)
+                """, list(zip(improd["_matricula"].tolist(), improd["_dt_ref"].tolist(),
+                              improd["OPERACAO_NOME"].astype(str).tolist(), improd["HORAS_DEC"].astype(float).tolist())))
+        finally:
+            conn.close()
+        return len(linhas)
+
+    @staticmethod
+    def periodo():
+        """(primeiro dia, último dia) do histórico como date, ou (None, None) se estiver vazio."""
+        conn = get_db_connection()
+        try:
+            inicio, fim = conn.execute("SELECT MIN(dt_ref), MAX(dt_ref) FROM fato_eficiencia").fetchone()
+        finally:
+            conn.close()
+        if inicio is None:
+            return None, None
+        return pd.Timestamp(inicio).date(), pd.Timestamp(fim).date()
+
+    @staticmethod
+    def carregar(inicio, fim):
+        """
+        (df_final, df_improd) do período, no mesmo formato de processar_dados_corporativos:
+        a tela, o PDF e o resumo do WhatsApp usam o histórico como se fosse a planilha.
+        """
+        params = [f"{inicio:%Y-%m-%d}", f"{fim:%Y-%m-%d}"]
+        conn = get_db_connection()
+        try:
+            df = pd.read_sql_query(f"""
+                SELECT {', '.join(COLUNAS_FATO_EFICIENCIA)} FROM fato_eficiencia
+                WHERE dt_ref BETWEEN ? AND ? ORDER BY dt_ref, matricula
+            """, conn, params=params)
+            df_improd = pd.read_sql_query("""
+                SELECT matricula AS MATRICULA, dt_ref AS DT_REF, operacao_nome AS OPERACAO_NOME, horas AS HORAS_DEC
+                FROM fato_eficiencia_improd WHERE dt_ref BETWEEN ? AND ?
+            """, conn, params=params)
+        finally:
+            conn.close()
+        df = df.rename(columns=COLUNAS_FATO_EFICIENCIA)
+        df["DT_REF"] = pd.to_datetime(df["DT_REF"], format="%Y-%m-%d").dt.date
+        df_improd["DT_REF"] = pd.to_datetime(df_improd["DT_REF"], format="%Y-%m-%d").dt.date
+        df["EFICIENCIA_VISUAL"] = df["EFICIENCIA_GERAL"]
+        return df, df_improd
@@ -0,0 +1,118 @@
+"""
+Snapshot compartilhado da tela Início (contadores, pendências e máquinas paradas).
+
+A tela fica aberta o dia inteiro nas TVs da oficina, em várias sessões ao mesmo
+tempo. Em vez de cada rerun de cada sessão consultar o banco, um único snapshot
+por processo é mantido por uma thread que, a cada INTERVALO_S segundos, confere a
+versão dos dados (`tabela_versoes`, uma leitura por chave primária) e só refaz as
+consultas quando algo mudou. A carga no banco não depende de quantas pessoas olham.
+
+O snapshot é trocado inteiro (nunca alterado): quem leu um continua com ele.
+Os DataFrames são compartilhados entre sessões — apenas exiba, não altere.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from database import get_db_connection
+from repository import DashboardRepository
+
+# Segundos entre verificações de versão (e portanto o atraso máximo da tela)
+INTERVALO_S = float(os.environ.get("MANUTENCAO_INICIO_INTERVALO_S", "5"))
+# Tabelas lidas pelo snapshot: mudou alguma, refaz
+TABELAS = ("ordens_servico", "equipamentos", "recados")
+
+SQL_PENDENCIAS = """
+    SELECT os.id, e.frota, os.descricao, os.data_hora, os.prioridade, os.status
+    FROM ordens_servico os
+    JOIN equipamentos e ON os.equipamento_id = e.id
+    WHERE os.status != 'Concluído'
+    ORDER BY os.prioridade = 'Alta' DESC, os.data_hora DESC LIMIT 20
+"""
+
+SQL_PARADAS = """
+    SELECT os.id, e.frota, os.descricao, os.data_hora
+    FROM ordens_servico os
+    JOIN equipamentos e ON os.equipamento_id = e.id
+    WHERE os.status != 'Concluído' AND os.maquina_parada = 1
+    ORDER BY os.data_hora DESC
+"""
+
+
+class SnapshotInicio:
+    """Dados da tela Início num instante (somente leitura)."""
+
+    __slots__ = ("versoes", "gerado_em", "q_aberta", "q_parada", "q_recados", "df_aberta", "df_parada")
+
+    def __init__(self, versoes, q_aberta, q_parada, q_recados, df_aberta, df_parada):
+        self.versoes = versoes
+        self.gerado_em = datetime.now()
+        self.q_aberta = q_aberta
+        self.q_parada = q_parada
+        self.q_recados = q_recados
+        self.df_aberta = df_aberta
+        self.df_parada = df_parada
+
+
+_snapshot = None
+_lock = threading.Lock()
+_thread = None
+
+
+def _versoes(conn):
+    marcadores = ", ".join("?" * len(TABELAS))
+    versoes = dict(conn.execute(
+        f"SELECT tabela, versao FROM tabela_versoes WHERE tabela IN ({marcadores})", TABELAS).fetchall())
+    return tuple(versoes.get(t, 0) for t in TABELAS)
+
+
+def _gerar(versoes):
+    # Contadores (tabela kpi_counters, atualizada por triggers: leitura por chave primária)
+    contadores = DashboardRepository.get_contadores("os_abertas", "os_abertas_paradas", "recados")
+    conn = get_db_connection()
+    try:
+        df_aberta = pd.read_sql_query(SQL_PENDENCIAS, conn)
+        df_parada = pd.read_sql_query(SQL_PARADAS, conn)
+    finally:
+        conn.close()
+    return SnapshotInicio(versoes, contadores["os_abertas"], contadores["os_abertas_paradas"],
+                          contadores["recados"], df_aberta, df_parada)
+
+
+def atualizar(forcar=False):
+    """Refaz o snapshot se a versão dos dados mudou (ou sempre, com `forcar`)."""
+    global _snapshot
+    conn = get_db_connection()
+    try:
+        # Versão lida ANTES das consultas: escrita no meio só provoca mais uma atualização
+        versoes = _versoes(conn)
+    finally:
+        conn.close()
+    if forcar or _snapshot is None or _snapshot.versoes != versoes:
+        _snapshot = _gerar(versoes)
+    return _snapshot
+
+
+def _loop():
+    while True:
+        time.sleep(INTERVALO_S)
+        try:
+            atualizar()
+        except Exception as e:
+            print(f"ERRO AO ATUALIZAR SNAPSHOT DO INÍCIO: {e}")
+
+
+def obter():
+    """Snapshot atual, compartilhado por todas as sessões do processo."""
+    global _thread
+    if _snapshot is None or _thread is None or not _thread.is_alive():
+        with _lock:
+            if _snapshot is None:
+                atualizar()
+            if _thread is None or not _thread.is_alive():
+                _thread = threading.Thread(target=_loop, name="snapshot-inicio", daemon=True)
+                _thread.start()
+    return _snapshot
@@ -0,0 +1,146 @@
+"""
+Conversão das colunas de horas das exportações do PIMS e do RH (Eficiência e Apontamentos).
+
+As funções escalares (`safe_float`, `parse_rh_time_range`) definem o comportamento;
+as versões por coluna (`horas_decimais`, `horas_intervalo_rh`) dão o mesmo resultado
+sem .apply por linha: a coluna é fatorada (cada valor distinto é convertido uma vez),
+o formato 'HH,MM/HH,MM' é calculado com numpy sobre os códigos dos caracteres e só
+os valores fora do padrão (tokens, lixo, formatos exóticos) passam pela função escalar.
+
+Conferência e medição numa exportação sintética:
+    python utils_apontamentos.py            # 500 mil linhas
+    python utils_apontamentos.py 100000
+"""
+import numpy as np
+import pandas as pd
+
+# Faixa 'HH,MM/HH,MM' (ou com ponto): o formato de quase todas as marcações do RH
+_LARGURA_FAIXA = 11
+_POS_DIGITOS = [0, 1, 3, 4, 6, 7, 9, 10]
+_SEPARADORES_MINUTO = [ord(','), ord('.')]
+
+
+def safe_float(val):
+    if pd.isna(val): return 0.0
+    if isinstance(val, (int, float)): return float(val)
+    try:
+        return float(str(val).replace(',', '.').strip())
+    except:
+        return 0.0
+
+
+def parse_rh_time_range(val):
+    if pd.isna(val) or str(val).strip() in ['-', '', 'FOLGA', 'FERIADO', 'DSR', 'COMPENSADO', 'null']: return 0.0
+    try:
+        val = str(val).replace(',', '.')
+        if '/' in val:
+            s_str, e_str = val.split('/')
+
+            def to_h(t):
+                if '.' in t:
+                    parts = t.split('.')
+                    return float(parts[0]) + float(parts[1]) / 60.0
+                return float(t)
+
+            s, e = to_h(s_str), to_h(e_str)
+            if e < s: e += 24.0
+            return max(0.0, e - s)
+    except:
+        pass
+    return 0.0
+
+
+def _por_valor_distinto(serie, converter):
+    """
+    Converte a coluna calculando só os valores distintos (`converter` recebe o array deles
+    e devolve floats); a volta para as linhas é uma indexação numpy. Vazios valem 0.
+    """
+    codigos, unicos = pd.factorize(serie)
+    valores = np.append(converter(np.asarray(unicos, dtype=object)), 0.0)  # código -1 (vazio) -> 0.0
+    return pd.Series(valores[codigos], index=serie.index)
+
+
+def _aplicar(funcao):
+    return lambda unicos: np.fromiter(map(funcao, unicos), dtype="float64", count=len(unicos))
+
+
+def _faixas_rh(unicos):
+    """parse_rh_time_range para um array de valores; 'HH,MM/HH,MM' é calculado direto nos códigos dos caracteres."""
+    resultado = np.empty(len(unicos))
+    fixas = np.fromiter((isinstance(v, str) and len(v) == _LARGURA_FAIXA for v in unicos), dtype=bool,
+                        count=len(unicos))
+
+    if fixas.any():
+        codigos = np.array(list(unicos[fixas]), dtype=f"<U{_LARGURA_FAIXA}").view(np.uint32).reshape(-1, _LARGURA_FAIXA)
+        digitos = codigos[:, _POS_DIGITOS].astype(np.int64) - ord('0')
+        validas = ((digitos >= 0) & (digitos <= 9)).all(axis=1)
+        validas &= np.isin(codigos[:, 2], _SEPARADORES_MINUTO) & np.isin(codigos[:, 8], _SEPARADORES_MINUTO)
+        validas &= codigos[:, 5] == ord('/')
+
+        # Mesma conta do parser escalar: float(horas) + float(minutos) / 60.0, virada de meia-noite +24h
+        dois = digitos[:, 0::2] * 10 + digitos[:, 1::2]
+        inicio = dois[:, 0].astype("float64") + dois[:, 1] / 60.0
+        fim = dois[:, 2].astype("float64") + dois[:, 3] / 60.0
+        fim = np.where(fim < inicio, fim + 24.0, fim)
+        posicoes = np.flatnonzero(fixas)
+        resultado[posicoes[validas]] = np.maximum(0.0, fim - inicio)[validas]
+        fixas[posicoes[~validas]] = False
+
+    # Tokens (FOLGA, DSR, '-'...) e formatos fora do padrão: parser escalar, uma vez por valor distinto
+    resultado[~fixas] = _aplicar(parse_rh_time_range)(unicos[~fixas])
+    return resultado
+
+
+def horas_decimais(serie):
+    """`safe_float` aplicado à coluna inteira (HORAS do PIMS: '1,5', 2, ' 0.25 ', vazio...)."""
+    if pd.api.types.is_numeric_dtype(serie.dtype):
+        return serie.astype("float64").fillna(0.0)
+    # Exportações repetem poucos valores de horas: converte só os distintos
+    return _por_valor_distinto(serie, _aplicar(safe_float))
+
+
+def horas_intervalo_rh(serie):
+    """
+    `parse_rh_time_range` aplicado à coluna inteira (REAL_H/REAL_I do RH: '07,30/16,48').
+    Faixas que viram a meia-noite somam 24h; FOLGA, DSR, FERIADO, '-' e vazios valem 0.
+    """
+    return _por_valor_distinto(serie, _faixas_rh)
+
+
+def _exportacao_sintetica(linhas, semente=42):
+    """HORAS do PIMS e REAL_H do RH com a mistura de formatos vista nas exportações reais."""
+    rng = np.random.default_rng(semente)
+    minutos = rng.integers(0, 60, linhas)
+    entrada = rng.integers(0, 24, linhas)
+    saida = (entrada + rng.integers(4, 13, linhas)) % 24
+    faixas = pd.Series([f"{a:02d},{m:02d}/{b:02d},{n:02d}" for a, m, b, n in
+                        zip(entrada, minutos, saida, rng.integers(0, 60, linhas))], dtype=object)
+    tokens = np.array(["FOLGA", "DSR", "FERIADO", "-", "COMPENSADO", "null", "07:00/16:00", "7.30.15/16", None])
+    sorteio = rng.random(linhas)
+    faixas[sorteio < 0.15] = tokens[rng.integers(0, len(tokens), linhas)][sorteio < 0.15]
+
+    horas = pd.Series([f"{h:.2f}".replace('.', ',') for h in rng.random(linhas) * 3], dtype=object)
+    extras = np.array([1, 2.5, None, "", " 0,75 ", "abc", "1.234,5", "nan", "1e2"], dtype=object)
+    sorteio = rng.random(linhas)
+    horas[sorteio < 0.1] = extras[rng.integers(0, len(extras), linhas)][sorteio < 0.1]
+    return horas, faixas
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    horas, faixas = _exportacao_sintetica(linhas)
+
+    for nome, escalar, vetorizada, coluna in (
+            ("HORAS  (safe_float)", safe_float, horas_decimais, horas),
+            ("REAL_H (parse_rh_time_range)", parse_rh_time_range, horas_intervalo_rh, faixas)):
+        t0 = time.perf_counter()
+        esperado = coluna.apply(escalar)
+        t1 = time.perf_counter()
+        obtido = vetorizada(coluna)
+        t2 = time.perf_counter()
+        iguais = np.array_equal(esperado.to_numpy(), obtido.to_numpy(), equal_nan=True)
+        print(f"{nome}: apply {t1 - t0:.2f}s | vetorizado {t2 - t1:.2f}s "
+              f"({(t2 - t1) / linhas * 1e9:.0f} ns/linha) | resultados idênticos: {iguais}")
@@ -0,0 +1,114 @@
+"""
+Fotos dos colaboradores (fotos_funcionarios/<matricula>.jpg) em miniatura, prontas para a tela.
+
+As tabelas da Eficiência mostram uma foto por linha a cada rerun. Abrir e codificar
+em base64 o JPEG 300x300 de cada linha custava centenas de leituras de arquivo por
+interação. Agora:
+  * a miniatura (TAMANHO_MINIATURA px) é gravada uma vez em PASTA_MINIATURAS, quando
+    o cadastro salva a foto (ou na primeira exibição, para fotos copiadas direto na pasta);
+  * o data URI de cada miniatura fica em memória, compartilhado pelas sessões.
+Os dois valem enquanto o mtime da foto não mudar (a miniatura recebe o mesmo mtime da
+foto de origem): foto trocada ou renomeada é detectada por um os.stat.
+"""
+import base64
+import os
+import tempfile
+
+try:
+    from PIL import Image, ImageOps
+
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+FOTOS_DIR = "fotos_funcionarios"
+PASTA_MINIATURAS = os.path.join(FOTOS_DIR, ".miniaturas")
+# Lado da miniatura em pixels (o pódio exibe a foto com até 100 px)
+TAMANHO_MINIATURA = 128
+# GIF transparente de 1 pixel para quem não tem foto
+FOTO_VAZIA = "data:image/gif;base64,R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7"
+
+_data_uris = {}  # matricula -> (mtime da foto, data URI)
+
+
+def caminho_foto(matricula):
+    return os.path.join(FOTOS_DIR, f"{str(matricula).strip()}.jpg")
+
+
+def _caminho_miniatura(matricula):
+    return os.path.join(PASTA_MINIATURAS, f"{str(matricula).strip()}.jpg")
+
+
+def gerar_miniatura(matricula):
+    """
+    Grava a miniatura da foto do colaborador (recorte quadrado central) e retorna seu
+    caminho; None se não houver foto ou Pillow. Chamado quando o cadastro salva a foto.
+    """
+    origem = caminho_foto(matricula)
+    if not PIL_AVAILABLE or not os.path.exists(origem):
+        return None
+    destino = _caminho_miniatura(matricula)
+    os.makedirs(PASTA_MINIATURAS, exist_ok=True)
+    mtime = os.stat(origem).st_mtime_ns
+    with Image.open(origem) as img:
+        miniatura = ImageOps.fit(img.convert("RGB"), (TAMANHO_MINIATURA, TAMANHO_MINIATURA), Image.LANCZOS)
+    # Grava ao lado e troca de uma vez: quem lê nunca vê o JPEG pela metade
+    descritor, temporario = tempfile.mkstemp(suffix=".jpg", dir=PASTA_MINIATURAS)
+    try:
+        with os.fdopen(descritor, "wb") as f:
+            miniatura.save(f, "JPEG", quality=85)
+        os.utime(temporario, ns=(mtime, mtime))
+        os.replace(temporario, destino)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    return destino
+
+
+def remover_miniatura(matricula):
+    """Apaga a miniatura (foto excluída ou matrícula trocada)."""
+    _data_uris.pop(str(matricula).strip(), None)
+    try:
+        os.remove(_caminho_miniatura(matricula))
+    except FileNotFoundError:
+        pass
+
+
+def _ler_miniatura(matricula, mtime):
+    """Bytes da miniatura em dia com a foto (gerando se preciso); sem Pillow, a própria foto."""
+    destino = _caminho_miniatura(matricula)
+    try:
+        em_dia = os.stat(destino).st_mtime_ns == mtime
+    except FileNotFoundError:
+        em_dia = False
+    if not em_dia:
+        try:
+            destino = gerar_miniatura(matricula) or caminho_foto(matricula)
+        except Exception as e:
+            print(f"ERRO AO GERAR MINIATURA DA FOTO {matricula}: {e}")
+            destino = caminho_foto(matricula)
+    with open(destino, "rb") as f:
+        return f.read()
+
+
+def foto_data_uri(matricula):
+    """Data URI da miniatura do colaborador para st.column_config.ImageColumn ou <img src>."""
+    chave = str(matricula).strip()
+    try:
+        mtime = os.stat(caminho_foto(chave)).st_mtime_ns
+    except OSError:
+        return FOTO_VAZIA
+    salvo = _data_uris.get(chave)
+    if salvo is not None and salvo[0] == mtime:
+        return salvo[1]
+    try:
+        data_uri = "data:image/jpeg;base64," + base64.b64encode(_ler_miniatura(chave, mtime)).decode()
+    except OSError:
+        return FOTO_VAZIA
+    _data_uris[chave] = (mtime, data_uri)
+    return data_uri
+
+
+def fotos_data_uri(matriculas):
+    """foto_data_uri para uma coluna inteira (cada matrícula é resolvida uma vez)."""
+    return matriculas.map({m: foto_data_uri(m) for m in matriculas.unique()}).fillna(FOTO_VAZIA)
@@ -0,0 +1,79 @@
+"""
+Tempo parado sem contagem dupla: une os intervalos sobrepostos de cada máquina.
+
+Duas ordens abertas ao mesmo tempo na mesma máquina (ex.: mecânico + eletricista)
+são uma única parada. Somar a duração de cada ordem conta o mesmo tempo duas vezes
+e pode levar a disponibilidade a ficar negativa.
+
+Algoritmo (todas as máquinas de uma vez, sem laço em Python): ordena por
+(máquina, início), acumula o maior fim visto até cada linha e abre uma nova parada
+sempre que o início passa desse fim. O(n log n) pela ordenação.
+
+    paradas, rotulos = unir_intervalos(df['frota'], df['abertura'], df['fim'])
+    paradas.groupby('grupo')['horas'].sum()      # tempo parado real por máquina
+    df['parada'] = rotulos                       # a que parada cada ordem pertence
+"""
+import numpy as np
+import pandas as pd
+
+COLUNAS_PARADAS = ["grupo", "inicio", "fim", "ordens", "horas"]
+
+
+def _segundos(datas):
+    return np.asarray(pd.to_datetime(pd.Series(datas)), dtype="datetime64[s]")
+
+
+def unir_intervalos(grupos, inicios, fins, limite_inicio=None, limite_fim=None):
+    """
+    Une os intervalos [inicio, fim] sobrepostos ou encostados de cada grupo (máquina).
+
+    `limite_inicio`/`limite_fim` recortam os intervalos ao período analisado (o que
+    passa do período não conta). Intervalos sem início, sem fim ou sem grupo são ignorados.
+
+    Retorna (paradas, rotulos):
+      * paradas: DataFrame com COLUNAS_PARADAS, uma linha por parada unida,
+        ordenado por grupo e início (`ordens` = quantos intervalos foram unidos);
+      * rotulos: para cada intervalo de entrada, a linha de `paradas` em que ele
+        entrou (-1 se foi ignorado).
+    """
+    codigos, valores_grupo = pd.factorize(pd.Series(grupos))
+    ini, fim = _segundos(inicios), _segundos(fins)
+    if limite_inicio is not None:
+        ini = np.maximum(ini, np.datetime64(pd.Timestamp(limite_inicio), "s"))
+    if limite_fim is not None:
+        fim = np.minimum(fim, np.datetime64(pd.Timestamp(limite_fim), "s"))
+
+    rotulos = np.full(len(codigos), -1, dtype="int64")
+    validos = np.flatnonzero(~np.isnat(ini) & ~np.isnat(fim) & (codigos >= 0) & (fim >= ini))
+    if not len(validos):
+        vazio = {"grupo": [], "inicio": np.array([], dtype="datetime64[ns]"),
+                 "fim": np.array([], dtype="datetime64[ns]"), "ordens": np.array([], dtype="int64"), "horas": []}
+        return pd.DataFrame(vazio, columns=COLUNAS_PARADAS), rotulos
+
+    g = codigos[validos].astype("int64")
+    a = ini[validos].astype("int64")
+    b = fim[validos].astype("int64")
+    ordem = np.lexsort((a, g))
+    g, a, b = g[ordem], a[ordem], b[ordem]
+
+    # Cada grupo é deslocado para uma faixa própria de tempo: o máximo acumulado de um grupo
+    # nunca alcança o início do seguinte, então um único maximum.accumulate serve para todos
+    base = a.min()
+    passo = b.max() - base + 1
+    deslocamento = g * passo - base
+    fim_acumulado = np.maximum.accumulate(b + deslocamento)
+
+    nova = np.empty(len(a), dtype=bool)
+    nova[0] = True
+    nova[1:] = (a[1:] + deslocamento[1:]) > fim_acumulado[:-1]
+    rotulos[validos[ordem]] = np.cumsum(nova) - 1
+
+    inicios_paradas = np.flatnonzero(nova)
+    paradas = pd.DataFrame({
+        "grupo": valores_grupo.take(g[inicios_paradas]),
+        "inicio": a[inicios_paradas].astype("datetime64[s]").astype("datetime64[ns]"),
+        "fim": np.maximum.reduceat(b, inicios_paradas).astype("datetime64[s]").astype("datetime64[ns]"),
+        "ordens": np.diff(np.append(inicios_paradas, len(a))),
+    })
+    paradas["horas"] = (paradas["fim"] - paradas["inicio"]).dt.total_seconds() / 3600
+    return paradas, rotulos
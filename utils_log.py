@@ -1,44 +1,115 @@
-import sqlite3
+import atexit
+import queue
+import threading
+import time
 from datetime import datetime
 import streamlit as st
 import pytz
 
+from database import get_db_connection
+
 # --- Configuração do Fuso Horário ---
 FUSO_HORARIO = pytz.timezone('America/Campo_Grande')
 
-def garantir_tabela_logs():
-    """Cria a tabela de logs se ela não existir."""
-    conn = sqlite3.connect("manutencao.db")
-    cursor = conn.cursor()
-    try:
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS audit_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                data_hora DATETIME,
-                usuario TEXT,
-                acao TEXT,
-                alvo TEXT,
-                detalhes TEXT
-            )
-        """)
-        conn.commit()
-    except Exception as e:
-        print(f"Erro ao criar tabela de logs: {e}")
-    finally:
-        conn.close()
+# --- Gravação em segundo plano ---
+# As ações vão para uma fila; uma thread grava em lotes (uma transação por lote),
+# então a tela nunca espera pelo lock de escrita do SQLite.
+LOTE_MAXIMO = 200        # Registros por transação
+ESPERA_LOTE_S = 0.5      # Tempo máximo entre o primeiro registro do lote e a gravação
+TENTATIVAS_GRAVACAO = 3  # Banco ocupado: tenta de novo antes de desistir do lote
+
+_fila = queue.Queue()
+_PARAR = object()
+_thread = None
+_lock_thread = threading.Lock()
+
+
+def _gravar_lote(lote):
+    for tentativa in range(TENTATIVAS_GRAVACAO):
+        conn = None
+        try:
+            conn = get_db_connection()
+            conn.executemany("""
+                INSERT INTO audit_logs (data_hora, usuario, acao, alvo, detalhes)
+                VALUES (?, ?, ?, ?, ?)
+            """, lote)
+            conn.commit()
+            return
+        except Exception as e:
+            # Mostra erro no terminal/console para debug
+            print(f"ERRO AO GRAVAR LOG ({len(lote)} registro(s), tentativa {tentativa + 1}): {e}")
+            time.sleep(0.5 * (tentativa + 1))
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+def _loop_gravador():
+    lote = []
+    prazo = None  # Hora (monotonic) em que o lote aberto tem de ser gravado
+    avisos = []  # Quem chamou descarregar() e espera o lote atual ser gravado
+    while True:
+        try:
+            # Sem nada pendente espera indefinidamente; com lote aberto, só até o prazo do
+            # primeiro registro (registros novos não adiam a gravação)
+            item = _fila.get(timeout=max(0, prazo - time.monotonic()) if lote else None)
+        except queue.Empty:
+            item = None
+
+        parar = item is _PARAR
+        if isinstance(item, threading.Event):
+            avisos.append(item)
+        elif item is not None and not parar:
+            if not lote:
+                prazo = time.monotonic() + ESPERA_LOTE_S
+            lote.append(item)
+
+        vencido = lote and time.monotonic() >= prazo
+        if lote and (vencido or parar or avisos or len(lote) >= LOTE_MAXIMO):
+            _gravar_lote(lote)
+            lote = []
+        for aviso in avisos:
+            aviso.set()
+        avisos = []
+        if parar:
+            return
+
+
+def _iniciar_gravador():
+    global _thread
+    with _lock_thread:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_loop_gravador, name="auditoria", daemon=True)
+            _thread.start()
+
+
+def descarregar(timeout=5.0):
+    """Espera a gravação dos logs já registrados (ex.: antes de listar a auditoria)."""
+    if _thread is None or not _thread.is_alive():
+        return True
+    aviso = threading.Event()
+    _fila.put(aviso)
+    return aviso.wait(timeout)
+
+
+@atexit.register
+def _encerrar():
+    """Ao encerrar o processo, grava o que ainda estiver na fila."""
+    if _thread is not None and _thread.is_alive():
+        _fila.put(_PARAR)
+        _thread.join(timeout=10)
+
 
 def registrar_log(acao, alvo, detalhes=""):
     """
     Grava uma ação no histórico de auditoria com o horário corrigido.
-    Cria a tabela automaticamente se necessário.
+    A tabela 'audit_logs' é criada pelas migrações (database_schema.py).
+    A gravação é feita em segundo plano (ver descarregar()).
     """
-    # 1. Garante que a tabela existe antes de gravar
-    garantir_tabela_logs()
-    
-    # 2. Identifica o usuário
+    # 1. Identifica o usuário
     usuario = st.session_state.get("user_nome", "Sistema/Anônimo")
-    
-    # 3. Ajusta a hora (UTC -> Local -> Naive)
+
+    # 2. Ajusta a hora (UTC -> Local -> Naive)
     try:
         utc_now = datetime.now(pytz.utc)
         local_now = utc_now.astimezone(FUSO_HORARIO)
@@ -46,19 +117,7 @@ def registrar_log(acao, alvo, detalhes=""):
     except:
         # Fallback se der erro de fuso
         data_hora_salvar = datetime.now()
-    
-    try:
-        conn = sqlite3.connect("manutencao.db")
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO audit_logs (data_hora, usuario, acao, alvo, detalhes)
-            VALUES (?, ?, ?, ?, ?)
-        """, (data_hora_salvar, usuario, acao, alvo, detalhes))
-        
-        conn.commit()
-    except Exception as e:
-        # Mostra erro no terminal/console para debug
-        print(f"ERRO AO GRAVAR LOG: {e}")
-    finally:
-        conn.close()
+
+    # 3. Entra na fila de gravação (a tela segue sem esperar o banco)
+    _iniciar_gravador()
+    _fila.put((data_hora_salvar, usuario, acao, alvo, detalhes))
@@ -0,0 +1,154 @@
+"""
+Colunas derivadas da listagem do Painel Principal, calculadas na coluna inteira.
+
+`formatar_tempo` e `maiuscula` (escalares) definem o comportamento; `tempo_aberto` e
+`maiusculas` dão o mesmo resultado sem .apply por linha. `marcadores_tipos` escolhe
+um marcador (quadrado, círculo ou coração colorido) por tipo de serviço: o
+st.dataframe não pinta células pelo column_config, então a cor vira um símbolo no texto.
+
+Conferência e medição (custo por linha em 1 mil, 10 mil e 100 mil ordens):
+    python utils_painel.py
+    python utils_painel.py 1000 500000
+"""
+import colorsys
+
+import numpy as np
+import pandas as pd
+
+COLUNAS_MAIUSCULAS = ['frota', 'modelo', 'Gestao', 'Executante', 'OS_Oficial', 'Operacao', 'Local', 'descricao']
+
+# Marcadores por família de cor, na ordem de preferência. Um tipo recebe o primeiro livre
+# da família da sua cor; esgotada a família, o primeiro livre da paleta
+_PALETA = (("🟥", "🔴", "❤️"), ("🟧", "🟠", "🧡"), ("🟨", "🟡", "💛"), ("🟩", "🟢", "💚"),
+           ("🟦", "🔵", "💙"), ("🟪", "🟣", "💜"), ("🟫", "🟤", "🤎"), ("⬛", "⚫", "🖤"), ("⬜", "⚪", "🤍"))
+# Faixas de matiz (graus) -> família da _PALETA; cores quase cinza vão para preto/branco pelo brilho
+_FAIXAS_MATIZ = ((15, 0), (45, 1), (70, 2), (170, 3), (255, 4), (330, 5), (360, 0))
+_MARRON, _PRETO, _BRANCO = 6, 7, 8
+
+
+def formatar_tempo(td):
+    if pd.isnull(td): return "-"
+    ts = int(td.total_seconds())
+    d = ts // 86400
+    h = (ts % 86400) // 3600
+    m = ((ts % 86400) % 3600) // 60
+    if d > 0: return f"{d}d {h}h"
+    if h > 0: return f"{h}h {m}m"
+    return f"{m}m"
+
+
+def maiuscula(valor):
+    texto = str(valor).upper()
+    return '-' if texto in ('NONE', 'NAN') else texto
+
+
+def tempo_aberto(inicio, fim, agora):
+    """
+    `formatar_tempo(fim - inicio)` na coluna inteira ("2d 5h", "3h 10m", "45m"); ordens
+    sem fim contam até `agora`, sem início valem '-'.
+    """
+    segundos = (fim.fillna(agora) - inicio).dt.total_seconds()
+    ts = segundos.fillna(0).astype('int64')
+    d, h, m = ts // 86400, ts % 86400 // 3600, ts % 3600 // 60
+    d_txt, h_txt, m_txt = d.astype(str), h.astype(str), m.astype(str)
+    return ((m_txt + "m")
+            .mask(h > 0, h_txt + "h " + m_txt + "m")
+            .mask(d > 0, d_txt + "d " + h_txt + "h")
+            .where(segundos.notna(), "-"))
+
+
+def maiusculas(df, colunas=COLUNAS_MAIUSCULAS):
+    """
+    Passa as colunas de texto para maiúsculas (no pandas: o UPPER do SQLite ignora acentos);
+    vazios viram '-'. Altera `df` e o retorna.
+    """
+    colunas = [c for c in colunas if c in df.columns]
+    # No pandas 3 o astype(str) mantém os vazios como NaN (antes viravam 'None'/'nan'): fillna cobre os dois
+    df[colunas] = (df[colunas].astype(str).apply(lambda coluna: coluna.str.upper())
+                   .replace(['NONE', 'NAN'], '-').fillna('-'))
+    return df
+
+
+def _familia(cor_hex):
+    """Índice da família da _PALETA mais parecida com '#RRGGBB' (None se a cor for inválida)."""
+    texto = str(cor_hex or "").strip().lstrip("#")
+    if len(texto) != 6:
+        return None
+    try:
+        r, g, b = (int(texto[i:i + 2], 16) / 255 for i in (0, 2, 4))
+    except ValueError:
+        return None
+    matiz, saturacao, brilho = colorsys.rgb_to_hsv(r, g, b)
+    if saturacao < 0.25:
+        return _PRETO if brilho < 0.4 else _BRANCO
+    graus = matiz * 360
+    if 15 <= graus < 45 and brilho < 0.6:
+        return _MARRON
+    return next(familia for limite, familia in _FAIXAS_MATIZ if graus < limite)
+
+
+def marcadores_tipos(tipos):
+    """
+    {id: marcador} para os tipos de serviço, `tipos` = pares (id, cor_hex) na ordem do id.
+    Tipos diferentes nunca repetem marcador (mesmo com cores parecidas); passando do
+    tamanho da paleta, o marcador ganha um número. Tipos antigos mantêm o seu quando
+    um novo é cadastrado.
+    """
+    todos = [m for familia in _PALETA for m in familia]
+    livres = dict.fromkeys(todos)
+    marcadores = {}
+    for i, (tipo_id, cor) in enumerate(tipos):
+        familia = _familia(cor)
+        preferidos = [m for m in _PALETA[familia] if m in livres] if familia is not None else []
+        if preferidos or livres:
+            marcador = (preferidos or list(livres))[0]
+            del livres[marcador]
+        else:
+            marcador = f"{todos[i % len(todos)]}{i // len(todos) + 1}"
+        marcadores[tipo_id] = marcador
+    return marcadores
+
+
+def _painel_sintetico(linhas, tipos=15, semente=42):
+    """Ordens com a mistura de datas, vazios e acentos vista no Painel."""
+    rng = np.random.default_rng(semente)
+    agora = pd.Timestamp("2026-01-15 12:00")
+    inicio = pd.Series(agora - pd.to_timedelta(rng.integers(0, 90 * 86400, linhas), unit="s"))
+    fim = inicio + pd.to_timedelta(rng.integers(0, 20 * 86400, linhas), unit="s")
+    fim[rng.random(linhas) < 0.4] = pd.NaT  # em aberto
+    inicio[rng.random(linhas) < 0.01] = pd.NaT
+    textos = np.array(["trator", "colhedora", "manutenção elétrica", "Gestão Açúcar", None, np.nan, "pulverizador"],
+                      dtype=object)
+    df = pd.DataFrame({c: textos[rng.integers(0, len(textos), linhas)] for c in COLUNAS_MAIUSCULAS})
+    df['Operacao_Id'] = rng.integers(1, tipos + 1, linhas)
+    cores = [f"#{c:06X}" for c in rng.integers(0, 0xFFFFFF, tipos)]
+    return df, inicio, fim, agora, list(zip(range(1, tipos + 1), cores))
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    tamanhos = [int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    for linhas in tamanhos:
+        df, inicio, fim, agora, tipos = _painel_sintetico(linhas)
+        marcadores = marcadores_tipos(tipos)
+
+        t0 = time.perf_counter()
+        esperado_tempo = (fim.fillna(agora) - inicio).apply(formatar_tempo)
+        esperado_texto = pd.DataFrame({c: df[c].map(maiuscula) for c in COLUNAS_MAIUSCULAS})
+        esperado_marcador = df.apply(lambda row: marcadores[row['Operacao_Id']], axis=1)
+        t1 = time.perf_counter()
+        obtido_tempo = tempo_aberto(inicio, fim, agora)
+        t2 = time.perf_counter()
+        obtido_texto = maiusculas(df.copy())[COLUNAS_MAIUSCULAS]
+        t3 = time.perf_counter()
+        obtido_marcador = df['Operacao_Id'].map(marcadores)
+        t4 = time.perf_counter()
+
+        iguais = (esperado_tempo.equals(obtido_tempo) and esperado_texto.equals(obtido_texto)
+                  and esperado_marcador.equals(obtido_marcador))
+        por_linha = lambda s: f"{s / linhas * 1e9:.0f} ns/linha"
+        print(f"{linhas:>7} linhas: .apply por linha {por_linha(t1 - t0)} | Tempo_Aberto {por_linha(t2 - t1)}, "
+              f"maiúsculas {por_linha(t3 - t2)}, marcador {por_linha(t4 - t3)} | resultados idênticos: {iguais}")
+    print(f"marcadores distintos: {len(set(marcadores_tipos([(i, '#1E90FF') for i in range(30)]).values())) == 30}")
@@ -315,6 +315,16 @@ def gerar_relatorio_kpi(kpis, df_falhas, filtros_texto, graficos_data=None):
                 current_y, 
                 cor_barra=(52, 152, 219) # Azul
             )
+
+        # MTTR por turno (mesma base do card: paradas unidas)
+        if 'turno_mttr' in graficos_data:
+            current_y = desenhar_grafico_barras(
+                pdf,
+                "MTTR POR TURNO (HORAS POR PARADA)",
+                graficos_data['turno_mttr'],
+                current_y,
+                cor_barra=(243, 156, 18) # Laranja
+            )
             
         # 2. Top Máquinas
         if 'top_maquinas' in graficos_data:
@@ -335,4 +335,78 @@ def ui_empty_state(message="Nenhum dado encontrado.", icon="🔍"):
 
 def card_kpi(col, titulo, valor, icone="📊", cor_borda="transparent", subtexto=""):
     """Alias para compatibilidade com código antigo."""
-    ui_kpi_card(col, titulo, valor, icone, cor_borda, subtexto)
\ No newline at end of file
+    ui_kpi_card(col, titulo, valor, icone, cor_borda, subtexto)
+
+
+# --- PAGINAÇÃO POR CURSOR (keyset) ---
+
+def cursor_pagina_atual(chave, filtros=None):
+    """
+    Cursor da página exibida (None = primeira página).
+    A pilha de cursores fica na sessão e volta ao início quando `filtros` muda.
+    """
+    estado = st.session_state.setdefault(chave, {"filtros": filtros, "cursores": [None]})
+    if estado["filtros"] != filtros:
+        estado.update(filtros=filtros, cursores=[None])
+    return estado["cursores"][-1]
+
+
+def ui_paginacao(chave, proximo_cursor):
+    """Botões '◀ Mais recentes' / 'Mais antigos ▶'; `proximo_cursor` None desativa o avanço."""
+    estado = st.session_state[chave]
+    pagina = len(estado["cursores"])
+    c_ant, c_info, c_prox = st.columns([1, 2, 1])
+    if c_ant.button("◀ Mais recentes", key=f"{chave}_ant", disabled=pagina == 1, use_container_width=True):
+        estado["cursores"].pop()
+        st.rerun()
+    c_info.markdown(f"<div style='text-align: center; padding-top: 6px;'>Página {pagina}</div>",
+                    unsafe_allow_html=True)
+    if c_prox.button("Mais antigos ▶", key=f"{chave}_prox", disabled=proximo_cursor is None,
+                     use_container_width=True):
+        estado["cursores"].append(proximo_cursor)
+        st.rerun()
+
+
+# --- RELATÓRIOS EM SEGUNDO PLANO (jobs_relatorios) ---
+INTERVALO_JOB_S = 1.5
+
+
+@st.fragment(run_every=INTERVALO_JOB_S)
+def _acompanhar_job(job_id):
+    """Barra de progresso que se atualiza sozinha; ao terminar, recarrega a página para mostrar os downloads."""
+    import jobs_relatorios
+
+    job = jobs_relatorios.obter(job_id)
+    if job is None or job["status"] in (jobs_relatorios.CONCLUIDO, jobs_relatorios.ERRO):
+        st.rerun()
+    texto = job["mensagem"] or ("Na fila..." if job["status"] == jobs_relatorios.NA_FILA else "Gerando...")
+    st.progress(job["progresso"] or 0.0, text=f"⏳ {job['titulo'] or 'Relatório'}: {texto}")
+    st.caption("Pode continuar usando o sistema: o relatório fica pronto aqui.")
+
+
+def ui_relatorio_em_segundo_plano(chave, funcao, args=(), kwargs=None, artefatos=(), titulo=""):
+    """
+    Gera o relatório `funcao` ("modulo:funcao") num processo separado (ver jobs_relatorios.enviar)
+    sem travar a tela.
+    Retorna {nome: bytes} quando estiver pronto; enquanto isso mostra o progresso e retorna None.
+    `chave` identifica o relatório na sessão: mudar os filtros cancela o pedido anterior ainda na fila.
+    """
+    # Importado aqui: as telas que só usam o CSS/componentes não carregam o módulo dos jobs
+    import jobs_relatorios
+
+    job_id = jobs_relatorios.enviar(funcao, args=args, kwargs=kwargs, artefatos=artefatos, titulo=titulo,
+                                    usuario=st.session_state.get("user_nome"),
+                                    substitui=st.session_state.get(chave))
+    st.session_state[chave] = job_id
+
+    job = jobs_relatorios.obter(job_id)
+    if job is not None and job["status"] == jobs_relatorios.ERRO:
+        st.error(f"Não foi possível gerar o relatório: {job['erro']}")
+        if st.button("🔄 Tentar novamente", key=f"{chave}_refazer"):
+            jobs_relatorios.descartar(job_id)
+            st.rerun()
+        return None
+    arquivos = jobs_relatorios.carregar_artefatos(job_id)
+    if arquivos is None:
+        _acompanhar_job(job_id)
+    return arquivos
@@ -1,7 +1,7 @@
-import sqlite3
+from database import get_db_connection
 import pandas as pd
 
-conn = sqlite3.connect("manutencao.db")
+conn = get_db_connection()
 
 try:
     # QUERY CORRIGIDA: Usa JOIN para buscar o nome da frota na tabela certa
@@ -0,0 +1,99 @@
+"""
+Verificação de índices: roda EXPLAIN QUERY PLAN em todas as consultas SQL
+escritas no repository.py e nas páginas, e aponta as que fazem varredura
+completa de tabela (SCAN sem índice).
+
+Uso:
+    python verificar_indices.py            # relatório completo
+    python verificar_indices.py --so-scans # mostra apenas as consultas com SCAN
+"""
+import ast
+import glob
+import os
+import re
+import sys
+
+from database import get_db_connection
+from database_schema import inicializar_banco
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+ARQUIVOS_PADRAO = [os.path.join(RAIZ, "repository.py")] + sorted(glob.glob(os.path.join(RAIZ, "pages", "*.py")))
+
+_INICIO_SQL = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+
+def _texto_fstring(no):
+    """Monta o texto de uma f-string; trechos dinâmicos viram '?' (listas IN) ou vazio (filtros opcionais)."""
+    partes = []
+    for valor in no.values:
+        if isinstance(valor, ast.Constant):
+            partes.append(str(valor.value))
+        else:
+            codigo = ast.unparse(valor.value)
+            partes.append("?" if "'?'" in codigo or '"?"' in codigo else "")
+    return "".join(partes)
+
+
+def extrair_consultas(caminho):
+    """Retorna [(linha, sql)] com os literais de texto que começam com SELECT/WITH."""
+    with open(caminho, encoding="utf-8") as f:
+        arvore = ast.parse(f.read(), filename=caminho)
+
+    consultas = []
+    dentro_de_fstring = set()
+    for no in ast.walk(arvore):
+        if isinstance(no, ast.JoinedStr):
+            dentro_de_fstring.update(id(v) for v in no.values)
+            texto = _texto_fstring(no)
+        elif isinstance(no, ast.Constant) and isinstance(no.value, str) and id(no) not in dentro_de_fstring:
+            texto = no.value
+        else:
+            continue
+        if _INICIO_SQL.match(texto):
+            consultas.append((no.lineno, texto))
+    return sorted(consultas)
+
+
+def explicar(conn, sql):
+    """Executa EXPLAIN QUERY PLAN (parâmetros '?' recebem NULL) e retorna os detalhes do plano."""
+    params = [None] * sql.count("?")
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+
+def varreduras_completas(plano):
+    """Linhas do plano que percorrem a tabela inteira (SCAN sem USING INDEX)."""
+    return [p for p in plano if p.startswith("SCAN ") and " USING " not in p]
+
+
+def verificar(arquivos=None, so_scans=False):
+    """Imprime o relatório e retorna a quantidade de consultas com varredura completa."""
+    inicializar_banco()
+    conn = get_db_connection()
+    total_scans = 0
+    try:
+        for caminho in arquivos or ARQUIVOS_PADRAO:
+            nome = os.path.relpath(caminho, RAIZ)
+            for linha, sql in extrair_consultas(caminho):
+                try:
+                    plano = explicar(conn, sql)
+                except Exception as e:
+                    if not so_scans:
+                        print(f"⚪ {nome}:{linha} (não analisável: {e})")
+                    continue
+                scans = varreduras_completas(plano)
+                if scans:
+                    total_scans += 1
+                    print(f"🔴 {nome}:{linha} -> {'; '.join(scans)}")
+                    print(f"   {' '.join(sql.split())[:160]}")
+                elif not so_scans:
+                    print(f"🟢 {nome}:{linha} -> {'; '.join(plano)}")
+    finally:
+        conn.close()
+
+    print("-" * 50)
+    print(f"Consultas com varredura completa de tabela: {total_scans}")
+    return total_scans
+
+
+if __name__ == "__main__":
+    verificar(so_scans="--so-scans" in sys.argv)